@@ -1,18 +1,97 @@
+import http.client
+import json
 import sys
-from rag.pipeline.graph import get_graph
-from rag.core.container import get_container
+from time import perf_counter_ns
+from rag.pipeline.timing import TokenTimer
+from rag.core.config import SERVER_HOST, SERVER_PORT
+
+# サーバーが起動していなければすぐにローカル実行へフォールバックする
+CONNECT_TIMEOUT = 0.5
+
+
+def _ask_server(query, host=SERVER_HOST, port=SERVER_PORT, on_token=None):
+    """常駐サーバー (python -m rag.server) に問い合わせる。未起動なら None。
+
+    on_token を渡すとストリーミング (NDJSON) で受け取り、トークンごとに呼び出す。
+    """
+    conn = http.client.HTTPConnection(host, port, timeout=CONNECT_TIMEOUT)
+    try:
+        try:
+            conn.connect()
+        except OSError:
+            return None
+        # 接続後は生成完了まで待つ
+        conn.sock.settimeout(None)
+        body = json.dumps(
+            {"query": query, "stream": on_token is not None}, ensure_ascii=False,
+        ).encode("utf-8")
+        conn.request("POST", "/ask", body=body, headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        if response.status != 200:
+            payload = json.loads(response.read())
+            raise RuntimeError(f"RAG server error ({response.status}): {payload.get('error')}")
+        if on_token is None:
+            return json.loads(response.read())
+        for line in response:
+            message = json.loads(line)
+            if "token" in message:
+                on_token(message["token"])
+            elif "error" in message:
+                raise RuntimeError(f"RAG server error: {message['error']}")
+            elif "result" in message:
+                return message["result"]
+        raise RuntimeError("RAG server closed the stream without a result")
+    finally:
+        conn.close()
+
+
+def _ask_local(query, on_token):
+    # langgraph / langchain の import は 1 秒近くかかるので、サーバーが応答する場合は読み込まない
+    from rag.pipeline.graph import get_graph, stream_answer
+    from rag.core.container import get_container
+
+    graph = get_graph(container=get_container())
+    result = {}
+    for kind, value in stream_answer(graph, query):
+        if kind == "token":
+            on_token(value)
+        else:
+            result = value
+    return result
+
+
+def _summary(timer: TokenTimer) -> str:
+    """TTFT / トークン数 / 生成速度 / 全体時間を 1 行にまとめる。"""
+    total = (perf_counter_ns() - timer.start) / 1e9
+    if timer.ttft is None:
+        return f"total {total:.2f}s"
+    parts = [f"TTFT {timer.ttft:.2f}s", f"{timer.tokens} tokens"]
+    if timer.tokens_per_sec is not None:
+        parts.append(f"{timer.tokens_per_sec:.1f} tok/s")
+    parts.append(f"total {total:.2f}s")
+    return " / ".join(parts)
 
 
 def main():
     query = sys.argv[1]
-    graph = get_graph(container=get_container())
-    result = graph.invoke({"query": query})
+    timer = TokenTimer()
+
+    def on_token(token):
+        timer.tick()
+        print(token, end="", flush=True)
 
     print("\n=== Answer ===\n")
-    print(result["answer"])
+    result = _ask_server(query, on_token=on_token)
+    if result is None:
+        result = _ask_local(query, on_token)
+    if timer.tokens == 0:
+        # キャッシュヒットや検索結果なしの場合はトークンが流れてこない
+        print(result["answer"], end="")
+    print()
     print("\n=== Sources ===\n")
     for source in result.get("sources", []):
         print(f"- {source}")
+    print(f"\n({_summary(timer)})")
 
 
 if __name__ == "__main__":
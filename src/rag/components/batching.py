@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Sequence
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from rag.core.config import BATCH_MAX_WAIT_MS, BATCH_MAX_SIZE
+
+
+class MicroBatcher:
+    """複数スレッドからの呼び出しを短い時間窓でまとめて 1 回のバッチ処理にする。
+
+    最初のリクエストが届いてから max_wait_ms 経過するか、max_batch_size 件のリクエストが
+    集まった時点で fn(全アイテム) を一度だけ呼び、結果をリクエストごとに切り分けて返す。
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[list], Sequence],
+        *,
+        max_batch_size: int = BATCH_MAX_SIZE,
+        max_wait_ms: float = BATCH_MAX_WAIT_MS,
+    ):
+        self.fn = fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue: queue.Queue = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+
+    def submit(self, items: list) -> list:
+        """items をバッチに載せ、対応する結果のリストを返すまでブロックする。"""
+        if not items:
+            return []
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((list(items), future))
+        return future.result()
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            self._process(self._collect())
+
+    def _process(self, batch: list) -> None:
+        flat = [item for items, _ in batch for item in items]
+        try:
+            results = list(self.fn(flat))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.requests += len(batch)
+        offset = 0
+        for items, future in batch:
+            future.set_result(results[offset: offset + len(items)])
+            offset += len(items)
+
+
+class BatchingEmbeddings(Embeddings):
+    """embed_query を MicroBatcher 経由でまとめて embed_documents する Embeddings。
+
+    対称モデル（sentence-transformers）ではクエリとドキュメントの埋め込みは同一なので、
+    クエリを embed_documents でまとめて計算して問題ない。embed_documents（ingest）は素通し。
+    """
+
+    def __init__(self, base: Embeddings, batcher: MicroBatcher | None = None):
+        self.base = base
+        self.batcher = batcher or MicroBatcher(base.embed_documents)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.batcher.submit([text])[0]
+
+
+class BatchingReranker:
+    """同時に届いた複数クエリの (query, doc) ペアを 1 回の cross-encoder score にまとめる。"""
+
+    def __init__(self, reranker, batcher: MicroBatcher | None = None):
+        self.reranker = reranker
+        self.batcher = batcher or MicroBatcher(reranker.score)
+
+    @property
+    def top_n(self) -> int:
+        return self.reranker.top_n
+
+    def compress_documents(self, documents: List[Document], query: str) -> List[Document]:
+        if not documents:
+            return []
+        # スコアキャッシュにないペアだけがバッチに載る
+        scores = self.reranker.score_documents(query, documents, score_fn=self.batcher.submit)
+        return self.reranker.select_top(documents, scores)
+
+    def compress_documents_batch(self, requests) -> List[List[Document]]:
+        # 呼び出し側ですでにまとめてあるので時間窓を待たない
+        return self.reranker.compress_documents_batch(requests)
@@ -0,0 +1,264 @@
+"""プロセス内 BM25 インデックス（DB を使わないキーワード検索）。
+
+ingest 時に同じチャンクから転置インデックスを作り、ディレクトリに numpy 配列として保存する。
+検索時は np.load(mmap_mode="r") で開くので、起動時にインデックス全体を読み込まない。
+
+    terms.npy          uint64  語のハッシュ（昇順）
+    offsets.npy        int64   語ごとのポスティング範囲（CSR, len = 語数 + 1）
+    doc_ids.npy        int32   ポスティング: 文書番号（語ごとに昇順）
+    weights.npy        float32 ポスティング: BM25 の語×文書スコア（idf 込みで事前計算）
+    store.bin / store_offsets.npy  文書ストア（docstore）
+    meta.json          トークナイザ設定・文書数など
+
+    python -m rag.components.bm25 build            # data/ から構築（ingest でも構築される）
+    python -m rag.components.bm25 search "質問文"
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+import sys
+import unicodedata
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from rag.core.config import BM25_INDEX_PATH, BM25_NGRAM, BM25_K1, BM25_B
+from rag.components.docstore import (
+    DocStoreWriter, open_doc_store, read_document, read_meta, staging_directory, swap_directory, write_meta,
+)
+
+FORMAT_VERSION = 1
+_ARRAYS = ("terms", "offsets", "doc_ids", "weights")
+# ASCII 英数字は単語単位、それ以外（かな・漢字など）は文字 n-gram にする
+_RUN_PATTERN = re.compile(r"[0-9a-z]+|[^\W0-9a-z_]+")
+MAX_WORD_LENGTH = 32
+
+
+def tokenize(text: str, ngram: int = BM25_NGRAM) -> List[str]:
+    """NFKC 正規化・小文字化した上で、英数字は単語、日本語は文字 n-gram に分割する。"""
+    tokens = []
+    for run in _RUN_PATTERN.findall(unicodedata.normalize("NFKC", text).lower()):
+        if run.isascii():
+            tokens.append(run[:MAX_WORD_LENGTH])
+        elif len(run) <= ngram:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i: i + ngram] for i in range(len(run) - ngram + 1))
+    return tokens
+
+
+def term_hash(term: str) -> int:
+    """語を固定長の ID にする。語彙を文字列で持たずに済み、searchsorted で引ける。"""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class BM25Builder:
+    """チャンクを 1 件ずつ受け取り、BM25 インデックスを構築・保存する。
+
+    文書は path.tmp の store.bin に受け取ったそばから追記し、メモリには転置インデックスの材料だけを持つ。
+    """
+
+    def __init__(self, path: str | Path = BM25_INDEX_PATH, *, ngram: int = BM25_NGRAM,
+                 k1: float = BM25_K1, b: float = BM25_B):
+        self.path = Path(path)
+        self.ngram = ngram
+        self.k1 = k1
+        self.b = b
+        self._tmp: Path | None = None
+        self._docs: DocStoreWriter | None = None
+        self._vocab: Dict[str, int] = {}
+        self._term_ids = array("i")
+        self._tfs = array("I")
+        self._postings_doc = array("i")
+        self._lengths = array("I")
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def _staging(self) -> Path:
+        if self._tmp is None:
+            self._tmp = staging_directory(self.path)
+            self._docs = DocStoreWriter(self._tmp)
+        return self._tmp
+
+    def add(self, doc_id: str, text: str, metadata: dict | None = None) -> None:
+        self._staging()
+        doc = len(self._lengths)
+        tokens = tokenize(text, self.ngram)
+        counts: Dict[int, int] = {}
+        for token in tokens:
+            term = self._vocab.setdefault(token, len(self._vocab))
+            counts[term] = counts.get(term, 0) + 1
+        self._term_ids.extend(counts.keys())
+        self._tfs.extend(counts.values())
+        self._postings_doc.extend([doc] * len(counts))
+        self._lengths.append(len(tokens))
+        self._docs.add(doc_id, text, metadata)
+
+    def arrays(self) -> dict:
+        """保存する配列一式（CSR 形式の転置インデックス）を作る。"""
+        n_docs = len(self._lengths)
+        hashes = np.fromiter((term_hash(t) for t in self._vocab), dtype=np.uint64, count=len(self._vocab))
+        # 語をハッシュ順に並べ替え、ポスティングも語→文書の順に並べる（stable なので文書は昇順のまま）
+        order = np.argsort(hashes, kind="stable")
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        term_ids = rank[np.frombuffer(self._term_ids, dtype=np.int32)]
+        postings = np.argsort(term_ids, kind="stable")
+        term_ids = term_ids[postings]
+        doc_ids = np.frombuffer(self._postings_doc, dtype=np.int32)[postings]
+        tfs = np.frombuffer(self._tfs, dtype=np.uint32)[postings].astype(np.float32)
+
+        lengths = np.frombuffer(self._lengths, dtype=np.uint32).astype(np.float32)
+        avgdl = float(lengths.mean()) if n_docs else 0.0
+        df = np.bincount(term_ids, minlength=len(order)).astype(np.float32)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        # 空のコーパスや本文が空の文書だけだと avgdl が 0 になる（このとき lengths もすべて 0）
+        norm = self.k1 * (1 - self.b + self.b * lengths[doc_ids] / (avgdl or 1.0))
+        weights = (idf[term_ids] * tfs * (self.k1 + 1) / (tfs + norm)).astype(np.float32)
+
+        offsets = np.zeros(len(order) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(order)), out=offsets[1:])
+        return {
+            "terms": hashes[order],
+            "offsets": offsets,
+            "doc_ids": doc_ids.astype(np.int32),
+            "weights": weights,
+            "meta": {
+                "version": FORMAT_VERSION, "ngram": self.ngram, "k1": self.k1, "b": self.b,
+                "num_docs": n_docs, "avgdl": avgdl,
+            },
+        }
+
+    def save(self) -> Path:
+        """インデックスを書き出して self.path と差し替え、self.path を返す。"""
+        tmp = self._staging()
+        data = self.arrays()
+        for name in _ARRAYS:
+            np.save(tmp / f"{name}.npy", data[name])
+        self._docs.save(tmp)
+        write_meta(tmp, data["meta"])
+        self._tmp = self._docs = None
+        return swap_directory(tmp, self.path)
+
+
+class BM25Index:
+    """mmap した BM25 インデックス。KeywordSearchProtocol として HybridRetrieval に渡せる。"""
+
+    def __init__(self, terms, offsets, doc_ids, weights, store, store_offsets, meta: dict):
+        self.terms = terms
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.store = store
+        self.store_offsets = store_offsets
+        self.ngram = meta["ngram"]
+        self.num_docs = meta["num_docs"]
+
+    @classmethod
+    def load(cls, path: str | Path = BM25_INDEX_PATH) -> "BM25Index":
+        path = Path(path)
+        meta = read_meta(path, FORMAT_VERSION, "BM25 index")
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in _ARRAYS}
+        store, store_offsets = open_doc_store(path)
+        return cls(store=store, store_offsets=store_offsets, meta=meta, **arrays)
+
+    @classmethod
+    def from_builder(cls, builder: BM25Builder) -> "BM25Index":
+        """構築中のインデックスをそのまま検索する（テスト・小さなコーパス向け）。"""
+        builder._staging()
+        data = builder.arrays()
+        meta = data.pop("meta")
+        return cls(store=builder._docs.getvalue(), store_offsets=builder._docs.offsets, meta=meta, **data)
+
+    def __len__(self) -> int:
+        return self.num_docs
+
+    def document(self, doc: int) -> Document:
+        return read_document(self.store, self.store_offsets, doc)
+
+    def _postings(self, query: str):
+        hashes = np.fromiter(
+            (term_hash(t) for t in set(tokenize(query, self.ngram))), dtype=np.uint64,
+        )
+        if not hashes.size or not self.terms.size:
+            return None
+        pos = np.searchsorted(self.terms, hashes)
+        found = pos < self.terms.size
+        found[found] = self.terms[pos[found]] == hashes[found]
+        pos = pos[found]
+        if not pos.size:
+            return None
+        ranges = [(int(self.offsets[p]), int(self.offsets[p + 1])) for p in pos]
+        doc_ids = np.concatenate([self.doc_ids[s:e] for s, e in ranges])
+        weights = np.concatenate([self.weights[s:e] for s, e in ranges])
+        return doc_ids, weights
+
+    def search_with_score(self, query: str, k: int) -> List[Tuple[Document, float]]:
+        if self.num_docs == 0 or k <= 0:
+            return []
+        postings = self._postings(query)
+        if postings is None:
+            return []
+        doc_ids, weights = postings
+        docs, inverse = np.unique(doc_ids, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+        if docs.size > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(docs.size)
+        # 同点は文書番号順
+        top = top[np.lexsort((docs[top], -scores[top]))]
+        return [(self.document(int(docs[i])), float(scores[i])) for i in top]
+
+    def search(self, query: str, k: int) -> List[Document]:
+        return [doc for doc, _ in self.search_with_score(query, k)]
+
+    async def asearch(self, query: str, k: int) -> List[Document]:
+        # サブミリ秒で終わるので executor に逃がさない
+        return self.search(query, k)
+
+
+def build_index(documents: Iterable[Tuple[str, Document]], path: str | Path = BM25_INDEX_PATH) -> Path:
+    builder = BM25Builder(path)
+    for doc_id, doc in documents:
+        builder.add(doc_id, doc.page_content, doc.metadata)
+    return builder.save()
+
+
+def create_bm25_index(path: str | Path = BM25_INDEX_PATH) -> BM25Index:
+    return BM25Index.load(path)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else "build"
+    if command == "build":
+        from rag.data.ingest import iter_documents, load_csvs, load_pdfs
+        from rag.infra.manifest import chunk_id
+
+        documents = (
+            (chunk_id(doc.metadata["source"], doc.metadata["chunk_index"]), doc)
+            for doc in iter_documents(load_pdfs(), load_csvs())
+        )
+        print(f"Built BM25 index: {build_index(documents)}")
+    elif command == "search" and len(argv) > 1:
+        import time
+
+        index = create_bm25_index()
+        start = time.perf_counter()
+        results = index.search_with_score(argv[1], k=10)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        for doc, score in results:
+            print(f"{score:7.3f}  {doc.metadata.get('source')}  {doc.page_content[:60]!r}")
+        print(f"({len(index)} docs, {elapsed_ms:.2f} ms)")
+    else:
+        raise SystemExit("Usage: python -m rag.components.bm25 build | search QUERY")
+
+
+if __name__ == "__main__":
+    main()
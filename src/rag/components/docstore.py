@@ -0,0 +1,121 @@
+"""BM25 インデックスと NumPy ベクトルストアが共有する、文書ストアとディレクトリ単位の保存。
+
+    store.bin          文書ごとの JSON（id / page_content / metadata）を UTF-8 で連結したもの
+    store_offsets.npy  int64   store.bin 内の各文書の範囲
+    meta.json          形式のバージョンなど（内容は各インデックスが決める）
+
+インデックスは path.tmp に書き出してから path と差し替えるので、検索中のプロセスは旧ファイルを
+mmap したまま使い続けられる。
+"""
+from __future__ import annotations
+
+import json
+import shutil
+from array import array
+from pathlib import Path
+from typing import BinaryIO, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+STORE_FILE = "store.bin"
+OFFSETS_FILE = "store_offsets.npy"
+META_FILE = "meta.json"
+
+
+def encode_record(doc_id: str, text: str, metadata: dict | None = None) -> bytes:
+    record = {"id": doc_id, "page_content": text, "metadata": metadata or {}}
+    return json.dumps(record, ensure_ascii=False).encode("utf-8")
+
+
+class DocStoreWriter:
+    """文書を 1 件ずつ store.bin の形式で連結し、各文書の範囲を記録する。
+
+    directory を渡すと store.bin をそこへ逐次書き出し、メモリに残すのは各文書の範囲だけにする。
+    """
+
+    def __init__(self, directory: Path | None = None):
+        self._file: BinaryIO | None = open(directory / STORE_FILE, "wb") if directory is not None else None
+        self._data = bytearray()
+        self._offsets = array("q", [0])
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def add(self, doc_id: str, text: str, metadata: dict | None = None) -> None:
+        data = encode_record(doc_id, text, metadata)
+        if self._file is None:
+            self._data += data
+        else:
+            self._file.write(data)
+        self._offsets.append(self._offsets[-1] + len(data))
+
+    @property
+    def offsets(self) -> np.ndarray:
+        # frombuffer のままだと array がロックされ、以降の add が失敗する
+        return np.frombuffer(self._offsets, dtype=np.int64).copy()
+
+    def getvalue(self) -> bytes:
+        if self._file is None:
+            return bytes(self._data)
+        self._file.flush()
+        return Path(self._file.name).read_bytes()
+
+    def save(self, directory: Path) -> None:
+        """store_offsets.npy を書き出す。逐次書き出しでなければ store.bin も書く。"""
+        if self._file is None:
+            (directory / STORE_FILE).write_bytes(self.getvalue())
+        else:
+            self._file.close()
+        np.save(directory / OFFSETS_FILE, self.offsets)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+
+def open_doc_store(directory: str | Path) -> Tuple[object, np.ndarray]:
+    """store.bin と store_offsets.npy を mmap で開く。"""
+    directory = Path(directory)
+    store_path = directory / STORE_FILE
+    # 空ファイルは mmap できない
+    store = np.memmap(store_path, dtype=np.uint8, mode="r") if store_path.stat().st_size else b""
+    return store, np.load(directory / OFFSETS_FILE, mmap_mode="r")
+
+
+def read_document(store, offsets, i: int) -> Document:
+    start, end = int(offsets[i]), int(offsets[i + 1])
+    record = json.loads(bytes(store[start:end]).decode("utf-8"))
+    return Document(id=record["id"], page_content=record["page_content"], metadata=record["metadata"])
+
+
+def read_meta(directory: str | Path, version: int, kind: str) -> dict:
+    meta = json.loads((Path(directory) / META_FILE).read_text())
+    if meta.get("version") != version:
+        raise ValueError(f"Unsupported {kind} version: {meta.get('version')!r}")
+    return meta
+
+
+def write_meta(directory: Path, meta: dict) -> None:
+    (directory / META_FILE).write_text(json.dumps(meta))
+
+
+def staging_directory(path: str | Path) -> Path:
+    """path の書き出し先になる空の path.tmp を作る。"""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    return tmp
+
+
+def swap_directory(tmp: Path, path: str | Path) -> Path:
+    """書き終えた tmp を path と差し替える。"""
+    path = Path(path)
+    old = path.with_name(path.name + ".old")
+    shutil.rmtree(old, ignore_errors=True)
+    if path.exists():
+        path.rename(old)
+    tmp.rename(path)
+    shutil.rmtree(old, ignore_errors=True)
+    return path
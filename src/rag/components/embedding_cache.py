@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from rag.core.config import (
+    EMBED_MODEL, EMBED_CACHE_PATH, EMBED_CACHE_MAX_ENTRIES, MODEL_BACKEND, ONNX_QUANTIZE,
+)
+
+# SQLite の変数上限を超えないよう IN 句を分割する
+_SQL_CHUNK = 500
+# 読み出し時の last_access 更新はこの件数たまるか次の書き込みまでまとめて反映する
+_TOUCH_BATCH = 1000
+
+
+def cache_key(model_name: str, kind: str, text: str) -> str:
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{model_name}:{kind}:{digest}"
+
+
+def model_identity(backend: str = MODEL_BACKEND, quantize: bool = ONNX_QUANTIZE,
+                   model_name: str = EMBED_MODEL) -> str:
+    """キャッシュキーに使うモデル識別子。バックエンドと量子化の有無でベクトルが変わるので区別する。"""
+    precision = "q8" if backend == "onnx" and quantize else "fp32"
+    return f"{model_name}:{backend}:{precision}"
+
+
+class SQLiteEmbeddingStore:
+    """float32 ベクトルを BLOB で保存する SQLite ストア。max_entries を超えたら LRU で削除する。"""
+
+    def __init__(self, path: str | Path, max_entries: int):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        with self._lock:
+            # ingest ワーカーなど複数プロセスから同時に読み書きするため WAL を使う
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_embeddings_last_access ON embeddings (last_access)"
+            )
+            self._conn.commit()
+            # 件数は書き込みのたびに数え直さず手元で追う（他プロセスが足した分は次に開いたときに反映される）
+            self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self._touched: dict[str, int] = {}
+
+    def get_many(self, keys: List[str]) -> dict[str, np.ndarray]:
+        found = {}
+        now = time.time_ns()
+        with self._lock:
+            for i in range(0, len(keys), _SQL_CHUNK):
+                part = keys[i:i + _SQL_CHUNK]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", part,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+                    self._touched[key] = now
+            if len(self._touched) >= _TOUCH_BATCH:
+                self._flush_touched()
+                self._conn.commit()
+        return found
+
+    def put_many(self, items: dict[str, np.ndarray]) -> None:
+        if not items:
+            return
+        now = time.time_ns()
+        keys = list(items)
+        with self._lock:
+            # 削除対象を決める前に、読み出しで使われたエントリの last_access を反映しておく
+            self._flush_touched()
+            existing = 0
+            for i in range(0, len(keys), _SQL_CHUNK):
+                part = keys[i:i + _SQL_CHUNK]
+                placeholders = ",".join("?" * len(part))
+                existing += self._conn.execute(
+                    f"SELECT COUNT(*) FROM embeddings WHERE key IN ({placeholders})", part,
+                ).fetchone()[0]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                [
+                    (key, np.asarray(vec, dtype=np.float32).tobytes(), now)
+                    for key, vec in items.items()
+                ],
+            )
+            self._count += len(keys) - existing
+            excess = self._count - self.max_entries
+            if excess > 0:
+                # last_access のインデックスを古い順に辿るので、超過分だけを読んで消せる
+                deleted = self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    " SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                    (excess,),
+                ).rowcount
+                self._count -= deleted
+            self._conn.commit()
+
+    def flush(self) -> None:
+        """保留中の last_access 更新を書き込む。"""
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+
+    def _flush_touched(self) -> None:
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                [(at, key) for key, at in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class CachedEmbeddings(Embeddings):
+    """(model, sha256(text)) をキーに埋め込み結果をキャッシュする Embeddings ラッパー。"""
+
+    def __init__(self, embeddings: Embeddings, store: SQLiteEmbeddingStore, model_name: str = EMBED_MODEL):
+        self.base = embeddings
+        self.store = store
+        self.model_name = model_name
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [cache_key(self.model_name, "doc", t) for t in texts]
+        cached = self.store.get_many(list(dict.fromkeys(keys)))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+        if missing:
+            vectors = self.base.embed_documents(list(missing.values()))
+            computed = {
+                key: np.asarray(vec, dtype=np.float32)
+                for key, vec in zip(missing.keys(), vectors)
+            }
+            self.store.put_many(computed)
+            cached.update(computed)
+
+        return [cached[key].tolist() for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = cache_key(self.model_name, "query", text)
+        cached = self.store.get_many([key])
+        if key in cached:
+            return cached[key].tolist()
+        vec = np.asarray(self.base.embed_query(text), dtype=np.float32)
+        self.store.put_many({key: vec})
+        return vec.tolist()
+
+
+def create_embedding_cache(embeddings: Embeddings, backend: str = MODEL_BACKEND) -> CachedEmbeddings:
+    store = SQLiteEmbeddingStore(EMBED_CACHE_PATH, max_entries=EMBED_CACHE_MAX_ENTRIES)
+    return CachedEmbeddings(embeddings, store, model_name=model_identity(backend))
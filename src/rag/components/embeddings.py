@@ -1,6 +1,22 @@
-from rag.core.config import EMBED_MODEL
+from rag.core.config import EMBED_MODEL, MODEL_BACKEND
 
 
-def create_embeddings():
-    from langchain_huggingface import HuggingFaceEmbeddings
-    return HuggingFaceEmbeddings(model_name=EMBED_MODEL)
+def create_embeddings(*, cache: bool = False, backend: str = MODEL_BACKEND):
+    if backend == "onnx":
+        from rag.components.onnx_backend import create_onnx_embeddings
+        embeddings = create_onnx_embeddings()
+    elif backend == "torch":
+        from langchain_huggingface import HuggingFaceEmbeddings
+        embeddings = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
+    else:
+        raise ValueError(f"Unknown model backend: {backend!r} (expected 'torch' or 'onnx')")
+    if not cache:
+        return embeddings
+    from rag.components.embedding_cache import create_embedding_cache
+    return create_embedding_cache(embeddings, backend=backend)
+
+
+def create_tokenizer():
+    """EMBED_MODEL と同じ fast tokenizer（トークン数基準のチャンク分割用）。"""
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(EMBED_MODEL, use_fast=True)
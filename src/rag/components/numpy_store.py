@@ -0,0 +1,257 @@
+"""NumPy 行列によるプロセス内の完全（exact）ベクトル検索。Postgres を使わない構成用。
+
+正規化済みの埋め込みを float32 の連続行列として保存し、np.load(mmap_mode="r") で開く。
+起動時にコピーせず、検索は行列×ベクトル 1 回と argpartition で済む。
+
+    vectors.npy        float32 (件数, 次元)  L2 正規化済みの埋め込み
+    store.bin / store_offsets.npy  文書ストア（docstore）
+    meta.json          次元・件数・埋め込みモデル・コーパスバージョン
+
+構築は VECTOR_BACKEND=numpy で ingest を実行する（常に全件再構築）。埋め込みは受け取ったバッチごとに
+書き出すので、ingest 中のメモリはコーパスの大きさによらない。
+
+    python -m rag.components.numpy_store search "質問文"   # 上位 10 件と検索時間を表示
+"""
+from __future__ import annotations
+
+import shutil
+import sys
+import uuid
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from rag.core.config import EMBED_MODEL, NUMPY_STORE_PATH
+from rag.components.docstore import (
+    DocStoreWriter, open_doc_store, read_document, read_meta, staging_directory, swap_directory, write_meta,
+)
+
+FORMAT_VERSION = 1
+
+
+def normalize(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+def open_store(path: str | Path) -> dict:
+    """保存済みストアを mmap で開き、NumpyVectorStore のコンストラクタ引数として返す。"""
+    path = Path(path)
+    meta = read_meta(path, FORMAT_VERSION, "vector store")
+    store, store_offsets = open_doc_store(path)
+    vectors = np.load(path / "vectors.npy", mmap_mode="r")
+    return {"vectors": vectors, "store": store, "store_offsets": store_offsets, "meta": meta}
+
+
+class _RowWriter:
+    """float32 の (件数, dim) 行列を .npy に 1 バッチずつ追記する。件数は finish() でヘッダに書き込む。"""
+
+    def __init__(self, path: Path, dim: int):
+        self.dim = dim
+        self.rows = 0
+        self._file = open(path, "wb")
+        self._write_header()
+        self._data_start = self._file.tell()
+
+    def _write_header(self) -> None:
+        np.lib.format.write_array_header_1_0(
+            self._file, {"descr": "<f4", "fortran_order": False, "shape": (self.rows, self.dim)},
+        )
+
+    def append(self, rows: np.ndarray) -> None:
+        self._file.write(np.ascontiguousarray(rows, dtype="<f4").tobytes())
+        self.rows += len(rows)
+
+    def finish(self) -> None:
+        # numpy は shape の桁が増える分の余白をヘッダに取るので、同じ長さのまま書き直せる
+        self._file.seek(0)
+        self._write_header()
+        if self._file.tell() != self._data_start:
+            raise RuntimeError("vectors.npy header size changed while finalizing")
+        self._file.close()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class NumpyStoreWriter:
+    """vectorstore の add_documents / add_embeddings と同じ形で受け取り、path.tmp に逐次書き出す。
+
+    埋め込みは vectors.npy、文書は store.bin に受け取ったそばから追記するので、メモリに残るのは
+    各文書の範囲だけ。save() でヘッダと meta.json を仕上げて path と差し替える。
+    with ブロックを正常に抜けると save() し、例外で抜けると書きかけの path.tmp を消す（ingest の open_loader 用）。
+    """
+
+    def __init__(self, embeddings, path: str | Path = NUMPY_STORE_PATH):
+        self.embeddings = embeddings
+        self.path = Path(path)
+        self._tmp: Optional[Path] = None
+        self._docs: Optional[DocStoreWriter] = None
+        self._vectors: Optional[_RowWriter] = None
+
+    def __len__(self) -> int:
+        return len(self._docs) if self._docs is not None else 0
+
+    def _staging(self) -> Path:
+        if self._tmp is None:
+            self._tmp = staging_directory(self.path)
+            self._docs = DocStoreWriter(self._tmp)
+        return self._tmp
+
+    def add_embeddings(
+        self,
+        texts: Sequence[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in texts]
+        metadatas = metadatas or [{} for _ in texts]
+        tmp = self._staging()
+        if len(texts):
+            vectors = normalize(embeddings)
+            if self._vectors is None:
+                self._vectors = _RowWriter(tmp / "vectors.npy", vectors.shape[1])
+            elif vectors.shape[1] != self._vectors.dim:
+                raise ValueError(
+                    f"Embedding dimension {vectors.shape[1]} does not match the store ({self._vectors.dim})"
+                )
+            self._vectors.append(vectors)
+        for doc_id, text, metadata in zip(ids, texts, metadatas):
+            self._docs.add(doc_id, text, metadata)
+        return ids
+
+    def add_documents(self, documents, ids: Optional[List[str]] = None) -> List[str]:
+        texts = [doc.page_content for doc in documents]
+        return self.add_embeddings(
+            texts,
+            self.embeddings.embed_documents(texts),
+            metadatas=[doc.metadata for doc in documents],
+            ids=ids,
+        )
+
+    def save(self) -> Path:
+        """書き出したストアを仕上げて self.path と差し替え、self.path を返す。"""
+        tmp = self._staging()
+        if self._vectors is None:
+            np.save(tmp / "vectors.npy", np.zeros((0, 0), dtype=np.float32))
+        else:
+            self._vectors.finish()
+        self._docs.save(tmp)
+        vectors = np.load(tmp / "vectors.npy", mmap_mode="r")
+        meta = {
+            "version": FORMAT_VERSION, "dim": int(vectors.shape[1]), "count": len(self),
+            "embed_model": EMBED_MODEL, "corpus_version": uuid.uuid4().hex,
+        }
+        self._write_extra(tmp, vectors, meta)
+        del vectors
+        write_meta(tmp, meta)
+        self._tmp = None
+        return swap_directory(tmp, self.path)
+
+    def discard(self) -> None:
+        """書きかけの path.tmp を消す。"""
+        if self._tmp is None:
+            return
+        if self._vectors is not None:
+            self._vectors.close()
+        self._docs.close()
+        shutil.rmtree(self._tmp, ignore_errors=True)
+        self._tmp = None
+
+    def _write_extra(self, directory: Path, vectors: np.ndarray, meta: dict) -> None:
+        """サブクラスが追加のインデックスを同じディレクトリに書き出すためのフック。vectors は mmap した行列。"""
+
+    def __enter__(self) -> "NumpyStoreWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.save()
+        else:
+            self.discard()
+
+
+class NumpyVectorStore:
+    """mmap した埋め込み行列に対する exact 検索。VectorStoreProtocol / AsyncVectorStoreProtocol を満たす。
+
+    距離は PGVector（cosine）と同じ 1 - cos 類似度なので、TwoStageRetrieval の score_threshold をそのまま使える。
+    """
+
+    def __init__(self, embeddings, vectors, store, store_offsets, meta: dict):
+        self.embeddings = embeddings
+        self.vectors = vectors
+        self.store = store
+        self.store_offsets = store_offsets
+        self.meta = meta
+        self.corpus_version = meta.get("corpus_version", "")
+
+    @classmethod
+    def load(cls, embeddings, path: str | Path = NUMPY_STORE_PATH) -> "NumpyVectorStore":
+        return cls(embeddings, **open_store(path))
+
+    def __len__(self) -> int:
+        return len(self.store_offsets) - 1
+
+    def document(self, i: int) -> Document:
+        return read_document(self.store, self.store_offsets, i)
+
+    def search_indices(self, embedding, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """上位 k 件の行番号と cos 距離（昇順）。"""
+        n = len(self)
+        if k <= 0 or n == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        similarities = self.vectors @ normalize(embedding)
+        if k < n:
+            top = np.argpartition(-similarities, k - 1)[:k]
+        else:
+            top = np.arange(n)
+        # 同距離は行番号順
+        top = top[np.lexsort((top, -similarities[top]))]
+        return top, 1.0 - similarities[top]
+
+    def similarity_search_with_score_by_vector(self, embedding, k: int = 4) -> list:
+        top, distances = self.search_indices(embedding, k)
+        return [(self.document(int(i)), float(d)) for i, d in zip(top, distances)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4) -> list:
+        return self.similarity_search_with_score_by_vector(self.embeddings.embed_query(query), k)
+
+    async def asimilarity_search_with_score_by_vector(self, embedding, k: int = 4) -> list:
+        # 検索自体はマイクロ秒単位なので executor に逃がさない
+        return self.similarity_search_with_score_by_vector(embedding, k)
+
+    async def asimilarity_search_with_score(self, query: str, k: int = 4) -> list:
+        # 埋め込みは aembed_query に任せる
+        embedding = await self.embeddings.aembed_query(query)
+        return await self.asimilarity_search_with_score_by_vector(embedding, k)
+
+
+def create_numpy_vectorstore(embeddings, path: str | Path = NUMPY_STORE_PATH) -> NumpyVectorStore:
+    return NumpyVectorStore.load(embeddings, path)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) < 2 or argv[0] != "search":
+        raise SystemExit('Usage: python -m rag.components.numpy_store search "QUERY"')
+    import time
+    from rag.components.embeddings import create_embeddings
+    from rag.core.config import EMBED_CACHE_ENABLED
+
+    embeddings = create_embeddings(cache=EMBED_CACHE_ENABLED)
+    store = create_numpy_vectorstore(embeddings)
+    embedding = embeddings.embed_query(argv[1])
+    start = time.perf_counter()
+    results = store.similarity_search_with_score_by_vector(embedding, k=10)
+    elapsed_us = (time.perf_counter() - start) * 1e6
+    for doc, distance in results:
+        print(f"{distance:7.4f}  {doc.metadata.get('source')}  {doc.page_content[:60]!r}")
+    print(f"({len(store)} chunks, {elapsed_us:.0f} µs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""ONNX Runtime バックエンド（埋め込みモデル / cross-encoder）。
+
+models.backend: onnx のとき、create_embeddings / create_reranker が PyTorch の代わりにこちらを使う。
+onnxruntime / onnx は任意依存（pip install -r requirements-onnx.txt）なので、使う関数の中で import する。
+モデルは事前にエクスポートしておく:
+
+    python -m rag.components.onnx_backend export           # fp32 + int8 動的量子化
+    python -m rag.components.onnx_backend export --no-quantize
+    python -m rag.components.onnx_backend bench            # torch との速度・一致度比較
+"""
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from rag.core.config import (
+    EMBED_MODEL,
+    RERANKER_MODEL,
+    ONNX_DIR,
+    ONNX_QUANTIZE,
+    ONNX_INTRA_OP_THREADS,
+)
+
+EMBEDDER_SUBDIR = "embedder"
+RERANKER_SUBDIR = "reranker"
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+
+# all-MiniLM-L6-v2 / ms-marco-MiniLM-L-6-v2 の max_seq_length
+EMBED_MAX_LENGTH = 256
+RERANK_MAX_LENGTH = 512
+DEFAULT_BATCH_SIZE = 32
+
+
+def model_path(subdir: str, quantized: bool = ONNX_QUANTIZE, onnx_dir: str = ONNX_DIR) -> Path:
+    return Path(onnx_dir) / subdir / (INT8_FILE if quantized else FP32_FILE)
+
+
+def create_session(path: str | Path, intra_op_threads: int = ONNX_INTRA_OP_THREADS):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if intra_op_threads > 0:
+        options.intra_op_num_threads = intra_op_threads
+    return ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+
+
+def _load_tokenizer(path: Path):
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(str(path.parent), use_fast=True)
+
+
+def _session_inputs(session, encoded) -> dict:
+    # エクスポートしたモデルによっては token_type_ids を取らない
+    names = {i.name for i in session.get_inputs()}
+    return {k: np.asarray(v, dtype=np.int64) for k, v in encoded.items() if k in names}
+
+
+def mean_pool_normalize(hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """sentence-transformers の Pooling(mean) + Normalize と同じ計算。"""
+    mask = attention_mask[..., None].astype(hidden.dtype)
+    summed = (hidden * mask).sum(axis=1)
+    counts = np.clip(mask.sum(axis=1), 1e-9, None)
+    pooled = summed / counts
+    norms = np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+    return pooled / norms
+
+
+def sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+class OnnxEmbeddings(Embeddings):
+    """ONNX エクスポートした sentence-transformers モデルによる Embeddings。"""
+
+    def __init__(self, session, tokenizer, *, batch_size: int = DEFAULT_BATCH_SIZE,
+                 max_length: int = EMBED_MAX_LENGTH):
+        self.session = session
+        self.tokenizer = tokenizer
+        self.batch_size = batch_size
+        self.max_length = max_length
+
+    @classmethod
+    def from_path(cls, path: str | Path) -> "OnnxEmbeddings":
+        path = Path(path)
+        return cls(create_session(path), _load_tokenizer(path))
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_length, return_tensors="np",
+        )
+        hidden = self.session.run(None, _session_inputs(self.session, encoded))[0]
+        return mean_pool_normalize(hidden, np.asarray(encoded["attention_mask"]))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        vectors = [
+            self._embed_batch(list(texts[i: i + self.batch_size]))
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        return np.concatenate(vectors).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class OnnxCrossEncoder:
+    """HuggingFaceCrossEncoder.score と同じ形で使える ONNX cross-encoder。"""
+
+    def __init__(self, session, tokenizer, *, batch_size: int = DEFAULT_BATCH_SIZE,
+                 max_length: int = RERANK_MAX_LENGTH):
+        self.session = session
+        self.tokenizer = tokenizer
+        self.batch_size = batch_size
+        self.max_length = max_length
+
+    @classmethod
+    def from_path(cls, path: str | Path) -> "OnnxCrossEncoder":
+        path = Path(path)
+        return cls(create_session(path), _load_tokenizer(path))
+
+    def _score_batch(self, pairs: Sequence[Tuple[str, str]]) -> np.ndarray:
+        queries = [q for q, _ in pairs]
+        passages = [p for _, p in pairs]
+        encoded = self.tokenizer(
+            queries, passages, padding=True, truncation=True,
+            max_length=self.max_length, return_tensors="np",
+        )
+        logits = self.session.run(None, _session_inputs(self.session, encoded))[0]
+        # num_labels=1 の場合は CrossEncoder.predict と同じく sigmoid をかける
+        if logits.ndim > 1 and logits.shape[1] == 1:
+            return sigmoid(logits[:, 0])
+        return logits[:, 1] if logits.ndim > 1 else logits
+
+    def score(self, pairs: Sequence[Tuple[str, str]]) -> List[float]:
+        if not pairs:
+            return []
+        scores = [
+            self._score_batch(pairs[i: i + self.batch_size])
+            for i in range(0, len(pairs), self.batch_size)
+        ]
+        return np.concatenate(scores).tolist()
+
+
+def create_onnx_embeddings(quantized: bool = ONNX_QUANTIZE) -> OnnxEmbeddings:
+    return OnnxEmbeddings.from_path(model_path(EMBEDDER_SUBDIR, quantized))
+
+
+def create_onnx_cross_encoder(quantized: bool = ONNX_QUANTIZE) -> OnnxCrossEncoder:
+    return OnnxCrossEncoder.from_path(model_path(RERANKER_SUBDIR, quantized))
+
+
+# --- export / bench ---
+
+
+def _export(model, tokenizer, sample, out_dir: Path, output_name: str, quantize: bool) -> Path:
+    import torch
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tokenizer.save_pretrained(str(out_dir))
+    encoded = tokenizer(*sample, return_tensors="pt")
+    # BERT 系の forward(input_ids, attention_mask, token_type_ids) の引数順に合わせる
+    input_names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in encoded]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes[output_name] = {0: "batch"}
+    fp32_path = out_dir / FP32_FILE
+    model.eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(encoded[name] for name in input_names),
+            str(fp32_path),
+            input_names=input_names,
+            output_names=[output_name],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+        )
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(str(fp32_path), str(out_dir / INT8_FILE), weight_type=QuantType.QInt8)
+    return fp32_path
+
+
+def export_embedder(model_name: str = EMBED_MODEL, onnx_dir: str = ONNX_DIR, quantize: bool = True) -> Path:
+    from transformers import AutoModel, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+    model = AutoModel.from_pretrained(model_name)
+    model.config.return_dict = False
+    return _export(
+        model, tokenizer, (["export sample"],), Path(onnx_dir) / EMBEDDER_SUBDIR,
+        "last_hidden_state", quantize,
+    )
+
+
+def export_cross_encoder(model_name: str = RERANKER_MODEL, onnx_dir: str = ONNX_DIR, quantize: bool = True) -> Path:
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    model.config.return_dict = False
+    return _export(
+        model, tokenizer, (["query"], ["passage"]), Path(onnx_dir) / RERANKER_SUBDIR,
+        "logits", quantize,
+    )
+
+
+def _time_per_call(fn, repeat: int) -> float:
+    fn()  # warmup
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def bench(questions_path: str = "data/eval_questions.json", repeat: int = 5) -> None:
+    """eval_questions.json のクエリで torch と onnx(fp32/int8) の速度と一致度を比較する。"""
+    import json
+    from langchain_huggingface import HuggingFaceEmbeddings
+    from langchain_community.cross_encoders import HuggingFaceCrossEncoder
+
+    with open(questions_path) as f:
+        queries = [q["query"] for q in json.load(f)]
+    passages = queries[1:] + queries[:1]
+    pairs = [(q, p) for q in queries for p in passages[:5]]
+
+    torch_embed = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
+    torch_rerank = HuggingFaceCrossEncoder(model_name=RERANKER_MODEL)
+    ref_vectors = np.asarray(torch_embed.embed_documents(queries))
+    ref_scores = np.asarray(torch_rerank.score(pairs))
+
+    print(f"queries={len(queries)}  rerank pairs={len(pairs)}")
+    print(f"{'backend':<12} {'embed ms':>10} {'rerank ms':>10} {'min cos':>9} {'top1 agree':>11}")
+    t_embed = _time_per_call(lambda: torch_embed.embed_documents(queries), repeat)
+    t_rerank = _time_per_call(lambda: torch_rerank.score(pairs), repeat)
+    print(f"{'torch':<12} {t_embed * 1000:>10.1f} {t_rerank * 1000:>10.1f} {'-':>9} {'-':>11}")
+
+    for quantized in (False, True):
+        embed_path = model_path(EMBEDDER_SUBDIR, quantized)
+        rerank_path = model_path(RERANKER_SUBDIR, quantized)
+        if not embed_path.exists() or not rerank_path.exists():
+            continue
+        embed = OnnxEmbeddings.from_path(embed_path)
+        rerank = OnnxCrossEncoder.from_path(rerank_path)
+        vectors = np.asarray(embed.embed_documents(queries))
+        scores = np.asarray(rerank.score(pairs))
+        min_cos = float((vectors * ref_vectors).sum(axis=1).min())
+        agree = float(np.mean(
+            scores.reshape(len(queries), -1).argmax(axis=1)
+            == ref_scores.reshape(len(queries), -1).argmax(axis=1)
+        ))
+        o_embed = _time_per_call(lambda: embed.embed_documents(queries), repeat)
+        o_rerank = _time_per_call(lambda: rerank.score(pairs), repeat)
+        name = "onnx-int8" if quantized else "onnx-fp32"
+        print(f"{name:<12} {o_embed * 1000:>10.1f} {o_rerank * 1000:>10.1f} {min_cos:>9.4f} {agree:>11.0%}"
+              f"  (x{t_embed / o_embed:.1f} / x{t_rerank / o_rerank:.1f})")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else "export"
+    if command == "export":
+        quantize = "--no-quantize" not in argv
+        print(f"Exported: {export_embedder(quantize=quantize)}")
+        print(f"Exported: {export_cross_encoder(quantize=quantize)}")
+    elif command == "bench":
+        bench()
+    else:
+        raise SystemExit(f"Unknown command: {command!r} (expected 'export' or 'bench')")
+
+
+if __name__ == "__main__":
+    main()
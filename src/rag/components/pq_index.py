@@ -0,0 +1,193 @@
+"""IVF + 直積量子化（PQ）による圧縮ベクトルインデックス。数百万チャンク規模のコーパス向け。
+
+VECTOR_BACKEND=ivfpq で ingest すると、NumPy ストア（numpy_store）と同じディレクトリに次を追加で書き出す。
+
+    pq_centroids.npy  float32 (nlist, 次元)          IVF の粗いクラスタ中心
+    pq_codebooks.npy  float32 (m, ksub, 次元 / m)    残差（ベクトル - 所属クラスタ中心）の部分空間ごとのコードブック
+    pq_codes.npy      uint8   (件数, m)              各ベクトルの PQ コード（クラスタ順に並べる）
+    pq_order.npy      int32   (件数,)                pq_codes の各行に対応するストアの行番号
+    pq_offsets.npy    int64   (nlist + 1,)           クラスタごとの pq_codes の範囲
+
+検索は nprobe 個のクラスタだけを PQ の近似内積で走査して search_k × rerank_factor 件に絞り込み、
+その候補だけ mmap した元ベクトルから読んで正確な cos 距離で並べ直す。常駐するのはコード（1 件 m バイト）と
+コードブックだけなので、float32 行列（1 件 次元 × 4 バイト）に比べて 384 次元・m=64 で約 1/20 になる。
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+
+from rag.core.config import (
+    NUMPY_STORE_PATH, PQ_NLIST, PQ_M, PQ_NPROBE, PQ_RERANK_FACTOR, PQ_TRAIN_SIZE,
+)
+from rag.components.numpy_store import NumpyStoreWriter, NumpyVectorStore, normalize, open_store
+
+KSUB = 256  # uint8 コード
+_ARRAYS = ("centroids", "codebooks", "codes", "order", "offsets")
+_BLOCK = 8192  # 距離計算を何行ずつ行うか（一時配列のメモリを抑える）
+_CODEBOOK_SAMPLE = KSUB * 64  # コードブックの学習には中心あたり 64 点あれば十分
+
+
+def nearest(x: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """各行に最も近い（L2）中心の番号。"""
+    sq_norms = (centroids * centroids).sum(axis=1)
+    assign = np.empty(len(x), dtype=np.int64)
+    for start in range(0, len(x), _BLOCK):
+        block = x[start:start + _BLOCK]
+        assign[start:start + _BLOCK] = np.argmin(sq_norms - 2.0 * block @ centroids.T, axis=1)
+    return assign
+
+
+def kmeans(x: np.ndarray, k: int, *, iterations: int = 15, seed: int = 0) -> np.ndarray:
+    """Lloyd 法の k-means。空になったクラスタはランダムな点で埋め直す。"""
+    x = np.asarray(x, dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    k = min(k, len(x))
+    centroids = x[rng.choice(len(x), k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = nearest(x, centroids)
+        order = np.argsort(assign, kind="stable")
+        clusters, starts, counts = np.unique(assign[order], return_index=True, return_counts=True)
+        centroids[clusters] = np.add.reduceat(x[order], starts, axis=0) / counts[:, None]
+        empty = np.setdiff1d(np.arange(k), clusters)
+        if len(empty):
+            centroids[empty] = x[rng.choice(len(x), len(empty), replace=False)]
+    return centroids
+
+
+class PQIndex:
+    def __init__(self, centroids, codebooks, codes, order, offsets):
+        self.centroids = centroids
+        self.codebooks = codebooks
+        self.codes = codes
+        self.order = order
+        self.offsets = offsets
+
+    @property
+    def m(self) -> int:
+        return self.codebooks.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        """検索時に常駐する配列の合計バイト数。"""
+        return sum(getattr(self, name).nbytes for name in _ARRAYS)
+
+    @classmethod
+    def train(
+        cls,
+        vectors,
+        *,
+        nlist: int = PQ_NLIST,
+        m: int = PQ_M,
+        train_size: int = PQ_TRAIN_SIZE,
+        seed: int = 0,
+    ) -> "PQIndex":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        n, dim = vectors.shape
+        if dim % m:
+            raise ValueError(f"PQ_M={m} must divide the embedding dimension {dim}")
+        dsub = dim // m
+        if n == 0:
+            return cls(
+                np.zeros((0, dim), np.float32), np.zeros((m, 0, dsub), np.float32),
+                np.zeros((0, m), np.uint8), np.zeros(0, np.int32), np.zeros(1, np.int64),
+            )
+        nlist = nlist if nlist > 0 else max(1, int(round(np.sqrt(n))))
+
+        rng = np.random.default_rng(seed)
+        sample = vectors[np.sort(rng.choice(n, min(n, train_size), replace=False))]
+        centroids = kmeans(sample, nlist, seed=seed)
+        # sample は行番号順なので、先頭を切り出すと前半の行に偏る。改めて無作為に選ぶ
+        sample = sample[np.sort(rng.choice(len(sample), min(len(sample), _CODEBOOK_SAMPLE), replace=False))]
+        residuals = (sample - centroids[nearest(sample, centroids)]).reshape(len(sample), m, dsub)
+        codebooks = np.stack([
+            kmeans(residuals[:, j], KSUB, seed=seed + j + 1) for j in range(m)
+        ])
+
+        assign = nearest(vectors, centroids)
+        order = np.argsort(assign, kind="stable")
+        offsets = np.searchsorted(assign[order], np.arange(len(centroids) + 1)).astype(np.int64)
+        codes = np.empty((n, m), dtype=np.uint8)
+        for start in range(0, n, _BLOCK):
+            rows = order[start:start + _BLOCK]
+            residual = (vectors[rows] - centroids[assign[rows]]).reshape(len(rows), m, dsub)
+            for j in range(m):
+                codes[start:start + len(rows), j] = nearest(residual[:, j], codebooks[j])
+        return cls(centroids, codebooks, codes, order.astype(np.int32), offsets)
+
+    def save(self, directory: str | Path) -> None:
+        for name in _ARRAYS:
+            np.save(Path(directory) / f"pq_{name}.npy", getattr(self, name))
+
+    @classmethod
+    def load(cls, directory: str | Path) -> "PQIndex":
+        return cls(**{name: np.load(Path(directory) / f"pq_{name}.npy") for name in _ARRAYS})
+
+    def shortlist(self, query: np.ndarray, nprobe: int, size: int) -> np.ndarray:
+        """近似内積の上位 size 件の行番号（順不同）。query は正規化済みであること。"""
+        if len(self.centroids) == 0 or size <= 0:
+            return np.zeros(0, dtype=np.int64)
+        coarse = self.centroids @ query
+        nprobe = min(nprobe, len(coarse))
+        lists = np.argpartition(-coarse, nprobe - 1)[:nprobe]
+        starts, ends = self.offsets[lists], self.offsets[lists + 1]
+        lengths = ends - starts
+        if not lengths.sum():
+            return np.zeros(0, dtype=np.int64)
+        positions = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+        # q·x ≈ q·中心 + Σ_j q_j·コードブック_j[コード_j]
+        lut = np.einsum("md,mkd->mk", query.reshape(self.m, -1), self.codebooks)
+        approx = np.repeat(coarse[lists], lengths) + lut[np.arange(self.m), self.codes[positions]].sum(axis=1)
+        if size < len(approx):
+            positions = positions[np.argpartition(-approx, size - 1)[:size]]
+        return self.order[positions].astype(np.int64)
+
+
+class PQStoreWriter(NumpyStoreWriter):
+    """NumPy ストアと一緒に IVF-PQ インデックスを学習して書き出す。"""
+
+    def __init__(self, embeddings, path: str | Path = NUMPY_STORE_PATH, *, nlist: int = PQ_NLIST,
+                 m: int = PQ_M, train_size: int = PQ_TRAIN_SIZE):
+        super().__init__(embeddings, path)
+        self.nlist = nlist
+        self.m = m
+        self.train_size = train_size
+
+    def _write_extra(self, directory: Path, vectors: np.ndarray, meta: dict) -> None:
+        index = PQIndex.train(vectors, nlist=self.nlist, m=self.m, train_size=self.train_size)
+        index.save(directory)
+        meta["pq"] = {"nlist": len(index.centroids), "m": index.m, "bytes": index.nbytes}
+
+
+class PQVectorStore(NumpyVectorStore):
+    """IVF-PQ で候補を絞り、元ベクトルで再スコアする VectorStoreProtocol / AsyncVectorStoreProtocol。
+
+    返す距離は再スコア後の正確な 1 - cos なので、score_threshold は exact 検索と同じ意味で使える。
+    """
+
+    def __init__(self, embeddings, vectors, store, store_offsets, meta: dict, *, index: PQIndex,
+                 nprobe: int = PQ_NPROBE, rerank_factor: int = PQ_RERANK_FACTOR):
+        super().__init__(embeddings, vectors, store, store_offsets, meta)
+        self.index = index
+        self.nprobe = nprobe
+        self.rerank_factor = rerank_factor
+
+    @classmethod
+    def load(cls, embeddings, path: str | Path = NUMPY_STORE_PATH, **params) -> "PQVectorStore":
+        return cls(embeddings, **open_store(path), index=PQIndex.load(path), **params)
+
+    def search_indices(self, embedding, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if k <= 0 or len(self) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        query = normalize(embedding)
+        # 行番号順に読むと mmap のページアクセスが局所的になる
+        candidates = np.sort(self.index.shortlist(query, self.nprobe, k * self.rerank_factor))
+        similarities = self.vectors[candidates] @ query
+        top = np.argsort(-similarities, kind="stable")[:k]
+        return candidates[top], 1.0 - similarities[top]
+
+
+def create_pq_vectorstore(embeddings, path: str | Path = NUMPY_STORE_PATH) -> PQVectorStore:
+    return PQVectorStore.load(embeddings, path)
@@ -1,28 +1,153 @@
 from __future__ import annotations
 
-from typing import List
+import hashlib
+import heapq
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional, Sequence, Tuple
 
 from langchain_core.documents import Document
 from langchain_community.cross_encoders import HuggingFaceCrossEncoder
 
-from rag.core.config import RERANKER_MODEL, RERANK_TOP_K
+from rag.core.config import RERANKER_MODEL, RERANK_TOP_K, RERANK_SCORE_CACHE_SIZE, MODEL_BACKEND
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def score_cache_key(query: str, doc: Document) -> tuple[str, str]:
+    """(クエリハッシュ, 本文ハッシュ)。
+
+    チャンク ID は (source, chunk_index) から決まり、差分 ingest で本文が変わっても同じなのでキーに使わない。
+    スコアは (クエリ, 本文) だけで決まるため、ID の違う同一本文はキャッシュを共有してよい。
+    """
+    return _digest(query), _digest(doc.page_content)
+
+
+class ScoreCache:
+    """(query, chunk) → cross-encoder スコアの LRU キャッシュ。"""
+
+    def __init__(self, max_size: int = RERANK_SCORE_CACHE_SIZE):
+        self.max_size = max_size
+        self._data: OrderedDict[tuple[str, str], float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: Sequence[tuple[str, str]]) -> List[Optional[float]]:
+        with self._lock:
+            values = []
+            for key in keys:
+                value = self._data.get(key)
+                if value is not None:
+                    self._data.move_to_end(key)
+                values.append(value)
+            return values
+
+    def put_many(self, items: Sequence[tuple[tuple[str, str], float]]) -> None:
+        with self._lock:
+            for key, value in items:
+                self._data[key] = value
+                self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
 
 
 class CrossEncoderReranker:
-    """HuggingFaceCrossEncoder を使った reranker。RerankerProtocol を満たす。"""
+    """cross-encoder による reranker。RerankerProtocol を満たす。
+
+    model は score(pairs) を持つもの（既定は HuggingFaceCrossEncoder、ONNX 版も可）。
+    """
 
-    def __init__(self, model_name: str = RERANKER_MODEL, top_n: int = RERANK_TOP_K):
-        self._model = HuggingFaceCrossEncoder(model_name=model_name)
+    def __init__(
+        self,
+        model_name: str = RERANKER_MODEL,
+        top_n: int = RERANK_TOP_K,
+        score_cache: Optional[ScoreCache] = None,
+        model=None,
+    ):
+        self._model = model if model is not None else HuggingFaceCrossEncoder(model_name=model_name)
         self.top_n = top_n
+        self.score_cache = score_cache
+
+    def score(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        """(query, passage) ペアをまとめてスコアリングする。"""
+        if not pairs:
+            return []
+        return [float(s) for s in self._model.score(pairs)]
+
+    def score_documents(
+        self,
+        query: str,
+        documents: List[Document],
+        score_fn: Optional[Callable[[list], Sequence[float]]] = None,
+    ) -> List[float]:
+        """キャッシュにないペアだけを score_fn（既定は self.score）でスコアリングする。"""
+        score_fn = score_fn or self.score
+        if self.score_cache is None:
+            return list(score_fn([(query, doc.page_content) for doc in documents]))
+
+        keys = [score_cache_key(query, doc) for doc in documents]
+        scores = self.score_cache.get_many(keys)
+        misses = [i for i, s in enumerate(scores) if s is None]
+        if misses:
+            fresh = score_fn([(query, documents[i].page_content) for i in misses])
+            for i, s in zip(misses, fresh):
+                scores[i] = s
+            self.score_cache.put_many([(keys[i], scores[i]) for i in misses])
+        return scores
+
+    def select_top(self, documents: List[Document], scores) -> List[Document]:
+        # 全件ソートせず上位 top_n だけを取り出す（同点は元の順序を保つ）
+        top = heapq.nlargest(self.top_n, range(len(documents)), key=scores.__getitem__)
+        return [documents[i] for i in top]
 
     def compress_documents(self, documents: List[Document], query: str) -> List[Document]:
         if not documents:
             return []
-        pairs = [(query, doc.page_content) for doc in documents]
-        scores = self._model.score(pairs)
-        scored = sorted(zip(scores, documents), key=lambda x: x[0], reverse=True)
-        return [doc for _, doc in scored[: self.top_n]]
+        return self.select_top(documents, self.score_documents(query, documents))
+
+    def compress_documents_batch(
+        self, requests: Sequence[Tuple[List[Document], str]],
+    ) -> List[List[Document]]:
+        """複数の (documents, query) をまとめてリランクする。キャッシュにないペアは 1 回の score で処理する。"""
+        scores: List[List[Optional[float]]] = []
+        pending: List[Tuple[int, int]] = []
+        for r, (documents, query) in enumerate(requests):
+            if self.score_cache is not None:
+                cached = self.score_cache.get_many([score_cache_key(query, doc) for doc in documents])
+            else:
+                cached = [None] * len(documents)
+            scores.append(cached)
+            pending.extend((r, i) for i, s in enumerate(cached) if s is None)
+
+        fresh = self.score([(requests[r][1], requests[r][0][i].page_content) for r, i in pending])
+        for (r, i), s in zip(pending, fresh):
+            scores[r][i] = s
+        if self.score_cache is not None and pending:
+            self.score_cache.put_many([
+                (score_cache_key(requests[r][1], requests[r][0][i]), scores[r][i]) for r, i in pending
+            ])
+        return [
+            self.select_top(documents, s) if documents else []
+            for (documents, _), s in zip(requests, scores)
+        ]
 
 
-def create_reranker(top_n: int = RERANK_TOP_K) -> CrossEncoderReranker:
-    return CrossEncoderReranker(model_name=RERANKER_MODEL, top_n=top_n)
+def create_reranker(
+    top_n: int = RERANK_TOP_K,
+    score_cache_size: int = RERANK_SCORE_CACHE_SIZE,
+    backend: str = MODEL_BACKEND,
+) -> CrossEncoderReranker:
+    score_cache = ScoreCache(max_size=score_cache_size) if score_cache_size > 0 else None
+    if backend == "onnx":
+        from rag.components.onnx_backend import create_onnx_cross_encoder
+        return CrossEncoderReranker(
+            model_name=RERANKER_MODEL, top_n=top_n, score_cache=score_cache,
+            model=create_onnx_cross_encoder(),
+        )
+    if backend != "torch":
+        raise ValueError(f"Unknown model backend: {backend!r} (expected 'torch' or 'onnx')")
+    return CrossEncoderReranker(model_name=RERANKER_MODEL, top_n=top_n, score_cache=score_cache)
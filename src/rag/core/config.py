@@ -16,6 +16,13 @@ def _load_settings():
 _settings = _load_settings()
 
 
+def _env_bool(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return bool(default)
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
 def get_db_config():
     db = _settings["db"]
     return {
@@ -27,17 +34,96 @@ def get_db_config():
 
 
 EMBED_MODEL = _settings["models"]["embed_model"]
+EMBED_DIM = int(os.getenv("EMBED_DIM", _settings["models"]["embed_dim"]))
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", _settings["models"]["backend"])
+ONNX_DIR = str(_PROJECT_ROOT / os.getenv("ONNX_DIR", _settings["models"]["onnx_dir"]))
+ONNX_QUANTIZE = _env_bool("ONNX_QUANTIZE", _settings["models"]["onnx_quantize"])
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", _settings["models"]["onnx_intra_op_threads"]))
+
+EMBED_CACHE_ENABLED = _env_bool("EMBED_CACHE_ENABLED", _settings["embedding_cache"]["enabled"])
+EMBED_CACHE_PATH = str(_PROJECT_ROOT / os.getenv("EMBED_CACHE_PATH", _settings["embedding_cache"]["path"]))
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", _settings["embedding_cache"]["max_entries"]))
 
 LLM_MODEL_PATH = _settings["models"]["llm_model_path"]
 
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", _settings["chunking"]["chunk_size"]))
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", _settings["chunking"]["chunk_overlap"]))
+CHUNK_UNIT = os.getenv("CHUNK_UNIT", _settings["chunking"]["unit"])
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", _settings["chunking"]["chunk_tokens"]))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", _settings["chunking"]["chunk_overlap_tokens"]))
+
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", _settings["ingest"]["batch_size"]))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", _settings["ingest"]["workers"]))
+INGEST_PDF_WORKERS = int(os.getenv("INGEST_PDF_WORKERS", _settings["ingest"]["pdf_workers"]))
+INGEST_LOADER = os.getenv("INGEST_LOADER", _settings["ingest"]["loader"])
+INGEST_COPY_FLUSH_ROWS = int(os.getenv("INGEST_COPY_FLUSH_ROWS", _settings["ingest"]["copy_flush_rows"]))
+INGEST_CSV_CHUNKSIZE = int(os.getenv("INGEST_CSV_CHUNKSIZE", _settings["ingest"]["csv_chunksize"]))
+INGEST_CSV_METADATA_COLUMNS = (
+    [c.strip() for c in os.environ["INGEST_CSV_METADATA_COLUMNS"].split(",") if c.strip()]
+    if "INGEST_CSV_METADATA_COLUMNS" in os.environ
+    else list(_settings["ingest"]["csv_metadata_columns"])
+)
 
 RERANKER_MODEL = _settings["models"]["reranker_model"]
 
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", _settings["db_pool"]["pool_size"]))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", _settings["db_pool"]["max_overflow"]))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", _settings["db_pool"]["pool_timeout"]))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", _settings["db_pool"]["pool_recycle"]))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", _settings["db_pool"]["statement_timeout_ms"]))
+DB_PREPARE_THRESHOLD = int(os.getenv("DB_PREPARE_THRESHOLD", _settings["db_pool"]["prepare_threshold"]))
+
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", _settings["vector_index"]["type"])
+VECTOR_INDEX_M = int(os.getenv("VECTOR_INDEX_M", _settings["vector_index"]["m"]))
+VECTOR_INDEX_EF_CONSTRUCTION = int(os.getenv("VECTOR_INDEX_EF_CONSTRUCTION", _settings["vector_index"]["ef_construction"]))
+VECTOR_INDEX_EF_SEARCH = int(os.getenv("VECTOR_INDEX_EF_SEARCH", _settings["vector_index"]["ef_search"]))
+VECTOR_INDEX_LISTS = int(os.getenv("VECTOR_INDEX_LISTS", _settings["vector_index"]["lists"]))
+VECTOR_INDEX_PROBES = int(os.getenv("VECTOR_INDEX_PROBES", _settings["vector_index"]["probes"]))
+
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", _settings["vector_store"]["backend"])
+NUMPY_STORE_PATH = str(_PROJECT_ROOT / os.getenv("NUMPY_STORE_PATH", _settings["vector_store"]["numpy_path"]))
+PQ_NLIST = int(os.getenv("PQ_NLIST", _settings["vector_store"]["pq"]["nlist"]))
+PQ_M = int(os.getenv("PQ_M", _settings["vector_store"]["pq"]["m"]))
+PQ_NPROBE = int(os.getenv("PQ_NPROBE", _settings["vector_store"]["pq"]["nprobe"]))
+PQ_RERANK_FACTOR = int(os.getenv("PQ_RERANK_FACTOR", _settings["vector_store"]["pq"]["rerank_factor"]))
+PQ_TRAIN_SIZE = int(os.getenv("PQ_TRAIN_SIZE", _settings["vector_store"]["pq"]["train_size"]))
+PQ_RECALL_TOLERANCE = float(os.getenv("PQ_RECALL_TOLERANCE", _settings["vector_store"]["pq"]["recall_tolerance"]))
+
+RETRIEVAL_STRATEGY = os.getenv("RETRIEVAL_STRATEGY", _settings["search"]["strategy"])
 SEARCH_K = int(os.getenv("SEARCH_K", _settings["search"]["search_k"]))
 RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", _settings["search"]["rerank_top_k"]))
 SCORE_THRESHOLD = float(os.getenv("SCORE_THRESHOLD", _settings["search"]["score_threshold"]))
+RERANK_SCORE_CACHE_SIZE = int(os.getenv("RERANK_SCORE_CACHE_SIZE", _settings["search"]["rerank_score_cache_size"]))
+RERANK_DISTANCE_MARGIN = float(os.getenv("RERANK_DISTANCE_MARGIN", _settings["search"]["rerank_distance_margin"]))
+
+HYBRID_KEYWORD_K = int(os.getenv("HYBRID_KEYWORD_K", _settings["hybrid"]["keyword_k"]))
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", _settings["hybrid"]["rrf_k"]))
+HYBRID_RERANK_CANDIDATES = int(os.getenv("HYBRID_RERANK_CANDIDATES", _settings["hybrid"]["rerank_candidates"]))
+HYBRID_KEYWORD_BACKEND = os.getenv("HYBRID_KEYWORD_BACKEND", _settings["hybrid"]["keyword_backend"])
+HYBRID_KEYWORD_THRESHOLD = float(os.getenv("HYBRID_KEYWORD_THRESHOLD", _settings["hybrid"]["keyword_threshold"]))
+
+BM25_ENABLED = _env_bool("BM25_ENABLED", _settings["bm25"]["enabled"])
+BM25_INDEX_PATH = str(_PROJECT_ROOT / os.getenv("BM25_INDEX_PATH", _settings["bm25"]["path"]))
+BM25_NGRAM = int(os.getenv("BM25_NGRAM", _settings["bm25"]["ngram"]))
+BM25_K1 = float(os.getenv("BM25_K1", _settings["bm25"]["k1"]))
+BM25_B = float(os.getenv("BM25_B", _settings["bm25"]["b"]))
+
+ANSWER_CACHE_BACKEND = os.getenv("ANSWER_CACHE_BACKEND", _settings["answer_cache"]["backend"])
+ANSWER_CACHE_MAX_SIZE = int(os.getenv("ANSWER_CACHE_MAX_SIZE", _settings["answer_cache"]["max_size"]))
+ANSWER_CACHE_PATH = str(_PROJECT_ROOT / os.getenv("ANSWER_CACHE_PATH", _settings["answer_cache"]["path"]))
+
+SEMANTIC_CACHE_ENABLED = _env_bool("SEMANTIC_CACHE_ENABLED", _settings["semantic_cache"]["enabled"])
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", _settings["semantic_cache"]["threshold"]))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", _settings["semantic_cache"]["max_entries"]))
+
+BATCH_ENABLED = _env_bool("BATCH_ENABLED", _settings["batching"]["enabled"])
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", _settings["batching"]["max_wait_ms"]))
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", _settings["batching"]["max_batch_size"]))
+
+EVAL_CONCURRENCY = int(os.getenv("EVAL_CONCURRENCY", _settings["evaluation"]["concurrency"]))
+
+SERVER_HOST = os.getenv("SERVER_HOST", _settings["server"]["host"])
+SERVER_PORT = int(os.getenv("SERVER_PORT", _settings["server"]["port"]))
 
 LLM_N_CTX = _settings["llm"]["n_ctx"]
 LLM_MAX_TOKENS = _settings["llm"]["max_tokens"]
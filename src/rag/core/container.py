@@ -3,9 +3,24 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Optional
 
-from rag.core.config import SEARCH_K, RERANK_TOP_K, SCORE_THRESHOLD
+from rag.core.config import (
+    SEARCH_K,
+    RERANK_TOP_K,
+    SCORE_THRESHOLD,
+    RERANK_DISTANCE_MARGIN,
+    RETRIEVAL_STRATEGY,
+    HYBRID_KEYWORD_K,
+    HYBRID_RRF_K,
+    HYBRID_RERANK_CANDIDATES,
+    HYBRID_KEYWORD_BACKEND,
+    EMBED_CACHE_ENABLED,
+    BATCH_ENABLED,
+    VECTOR_BACKEND,
+)
 from rag.core.interfaces import (
     VectorStoreProtocol,
+    AsyncVectorStoreProtocol,
+    KeywordSearchProtocol,
     RerankerProtocol,
     LLMProtocol,
     PromptBuilder,
@@ -13,11 +28,20 @@ from rag.core.interfaces import (
 )
 
 
+# ingest 時にファイルへ書き出し、プロセス内で検索するバックエンド（DB 不要）
+LOCAL_VECTOR_BACKENDS = ("numpy", "ivfpq")
+
+
 @dataclass(frozen=True)
 class RagSettings:
     search_k: int = SEARCH_K
     rerank_top_k: int = RERANK_TOP_K
     score_threshold: float = SCORE_THRESHOLD
+    rerank_distance_margin: float = RERANK_DISTANCE_MARGIN
+    retrieval_strategy: str = RETRIEVAL_STRATEGY
+    keyword_k: int = HYBRID_KEYWORD_K
+    rrf_k: int = HYBRID_RRF_K
+    rerank_candidates: int = HYBRID_RERANK_CANDIDATES
 
 
 class AppContainer:
@@ -27,38 +51,106 @@ class AppContainer:
         settings=None,
         embeddings=None,
         vectorstore: VectorStoreProtocol | None = None,
+        async_vectorstore: AsyncVectorStoreProtocol | None = None,
+        keyword_search: KeywordSearchProtocol | None = None,
         reranker: RerankerProtocol | None = None,
         llm: LLMProtocol | None = None,
         prompt_builder: PromptBuilder | None = None,
         retrieval_strategy: RetrievalStrategyProtocol | None = None,
+        manifest=None,
+        vector_index=None,
+        answer_cache=None,
+        semantic_cache=None,
     ):
         self.settings = settings or RagSettings()
         self._embeddings = embeddings
         self._vectorstore = vectorstore
+        self._maintenance_vectorstore = None
+        self._async_vectorstore = async_vectorstore
+        self._keyword_search = keyword_search
         self._reranker = reranker
         self._llm = llm
         self._prompt_builder = prompt_builder
         self._retrieval_strategy = retrieval_strategy
+        self._manifest = manifest
+        self._vector_index = vector_index
+        self._answer_cache = answer_cache
+        self._answer_cache_resolved = answer_cache is not None
+        self._semantic_cache = semantic_cache
+        self._semantic_cache_resolved = semantic_cache is not None
 
     @property
     def embeddings(self):
         if self._embeddings is None:
             from rag.components.embeddings import create_embeddings
-            self._embeddings = create_embeddings()
+            embeddings = create_embeddings(cache=EMBED_CACHE_ENABLED)
+            if BATCH_ENABLED:
+                from rag.components.batching import BatchingEmbeddings
+                embeddings = BatchingEmbeddings(embeddings)
+            self._embeddings = embeddings
         return self._embeddings
 
     @property
     def vectorstore(self) -> VectorStoreProtocol:
         if self._vectorstore is None:
-            from rag.infra.db import create_vectorstore
-            self._vectorstore = create_vectorstore(self.embeddings)
+            if VECTOR_BACKEND == "numpy":
+                from rag.components.numpy_store import create_numpy_vectorstore
+                self._vectorstore = create_numpy_vectorstore(self.embeddings)
+            elif VECTOR_BACKEND == "ivfpq":
+                from rag.components.pq_index import create_pq_vectorstore
+                self._vectorstore = create_pq_vectorstore(self.embeddings)
+            elif VECTOR_BACKEND == "pgvector":
+                from rag.infra.db import create_vectorstore
+                self._vectorstore = create_vectorstore(self.embeddings)
+            else:
+                raise ValueError(
+                    f"Unknown vector backend: {VECTOR_BACKEND!r} (expected 'pgvector', 'numpy' or 'ivfpq')"
+                )
         return self._vectorstore
 
+    @property
+    def maintenance_vectorstore(self):
+        """ingest の削除・書き込み用の PGVector（statement_timeout のない engine を使う）。"""
+        if self._maintenance_vectorstore is None:
+            from rag.infra.db import create_vectorstore, get_maintenance_engine
+            self._maintenance_vectorstore = create_vectorstore(self.embeddings, engine=get_maintenance_engine())
+        return self._maintenance_vectorstore
+
+    @property
+    def async_vectorstore(self) -> AsyncVectorStoreProtocol:
+        if self._async_vectorstore is None:
+            if VECTOR_BACKEND in LOCAL_VECTOR_BACKENDS:
+                # NumPy ストアは同期・非同期の両方を 1 つのオブジェクトで提供する
+                self._async_vectorstore = self.vectorstore
+                return self._async_vectorstore
+            from rag.infra.db import create_async_vectorstore
+            self._async_vectorstore = create_async_vectorstore(self.embeddings)
+        return self._async_vectorstore
+
+    @property
+    def keyword_search(self) -> KeywordSearchProtocol:
+        if self._keyword_search is None:
+            if HYBRID_KEYWORD_BACKEND == "bm25":
+                from rag.components.bm25 import create_bm25_index
+                self._keyword_search = create_bm25_index()
+            elif HYBRID_KEYWORD_BACKEND == "pg_trgm":
+                from rag.infra.keyword_search import create_keyword_search
+                self._keyword_search = create_keyword_search()
+            else:
+                raise ValueError(
+                    f"Unknown keyword backend: {HYBRID_KEYWORD_BACKEND!r} (expected 'pg_trgm' or 'bm25')"
+                )
+        return self._keyword_search
+
     @property
     def reranker(self) -> RerankerProtocol:
         if self._reranker is None:
             from rag.components.reranker import create_reranker
-            self._reranker = create_reranker()
+            reranker = create_reranker()
+            if BATCH_ENABLED:
+                from rag.components.batching import BatchingReranker
+                reranker = BatchingReranker(reranker)
+            self._reranker = reranker
         return self._reranker
 
     @property
@@ -75,20 +167,93 @@ class AppContainer:
             self._prompt_builder = build_prompt
         return self._prompt_builder
 
+    def _paired_async_vectorstore(self):
+        # vectorstore が注入されている場合は既定の PGVector を勝手に組み合わせない（self.vectorstore の解決前に呼ぶ）
+        return self.async_vectorstore if self._vectorstore is None else self._async_vectorstore
+
     @property
     def retrieval_strategy(self) -> RetrievalStrategyProtocol:
         if self._retrieval_strategy is None:
-            from rag.pipeline.retrieval import TwoStageRetrieval
-
-            self._retrieval_strategy = TwoStageRetrieval(
-                vectorstore=self.vectorstore,
-                reranker=self.reranker,
-                search_k=self.settings.search_k,
-                rerank_top_k=self.settings.rerank_top_k,
-                score_threshold=self.settings.score_threshold,
-            )
+            from rag.pipeline.retrieval import TwoStageRetrieval, HybridRetrieval, LexicalRetrieval
+
+            settings = self.settings
+            if settings.retrieval_strategy == "two_stage":
+                async_vectorstore = self._paired_async_vectorstore()
+                self._retrieval_strategy = TwoStageRetrieval(
+                    vectorstore=self.vectorstore,
+                    async_vectorstore=async_vectorstore,
+                    reranker=self.reranker,
+                    search_k=settings.search_k,
+                    rerank_top_k=settings.rerank_top_k,
+                    score_threshold=settings.score_threshold,
+                    rerank_distance_margin=settings.rerank_distance_margin,
+                )
+            elif settings.retrieval_strategy == "hybrid":
+                async_vectorstore = self._paired_async_vectorstore()
+                self._retrieval_strategy = HybridRetrieval(
+                    vectorstore=self.vectorstore,
+                    async_vectorstore=async_vectorstore,
+                    keyword_search=self.keyword_search,
+                    reranker=self.reranker,
+                    search_k=settings.search_k,
+                    rerank_top_k=settings.rerank_top_k,
+                    score_threshold=settings.score_threshold,
+                    keyword_k=settings.keyword_k,
+                    rrf_k=settings.rrf_k,
+                    rerank_candidates=settings.rerank_candidates,
+                )
+            elif settings.retrieval_strategy == "lexical":
+                self._retrieval_strategy = LexicalRetrieval(
+                    keyword_search=self.keyword_search,
+                    reranker=self.reranker,
+                    rerank_top_k=settings.rerank_top_k,
+                    keyword_k=settings.keyword_k,
+                    rerank_candidates=settings.rerank_candidates,
+                )
+            else:
+                raise ValueError(
+                    f"Unknown retrieval strategy: {settings.retrieval_strategy!r}"
+                    " (expected 'two_stage', 'hybrid' or 'lexical')"
+                )
         return self._retrieval_strategy
 
+    @property
+    def manifest(self):
+        if self._manifest is None:
+            from rag.infra.manifest import create_manifest
+            self._manifest = create_manifest()
+        return self._manifest
+
+    @property
+    def vector_index(self):
+        if self._vector_index is None:
+            from rag.infra.vector_index import create_vector_index
+            self._vector_index = create_vector_index()
+        return self._vector_index
+
+    @property
+    def answer_cache(self):
+        # backend=none の場合は None のままなので、解決済みかどうかを別に持つ
+        if not self._answer_cache_resolved:
+            from rag.pipeline.answer_cache import create_answer_cache
+            self._answer_cache = create_answer_cache()
+            self._answer_cache_resolved = True
+        return self._answer_cache
+
+    @property
+    def semantic_cache(self):
+        if not self._semantic_cache_resolved:
+            from rag.pipeline.semantic_cache import create_semantic_cache
+            self._semantic_cache = create_semantic_cache()
+            self._semantic_cache_resolved = True
+        return self._semantic_cache
+
+    def corpus_version(self) -> str:
+        if VECTOR_BACKEND in LOCAL_VECTOR_BACKENDS:
+            # ingest のたびにストアごと作り直すので、ストアに記録したバージョンをそのまま使う
+            return self.vectorstore.corpus_version
+        return self.manifest.current_version()
+
 
 _container = None
 
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Protocol, List, Callable
+from typing import Protocol, List, Callable, Iterator, AsyncIterator, Optional, Sequence
 from langchain_core.documents import Document
 
 
@@ -8,6 +8,10 @@ class VectorStoreProtocol(Protocol):
     def similarity_search_with_score(self, query: str, k: int = 4) -> list: ...
 
 
+class KeywordSearchProtocol(Protocol):
+    def search(self, query: str, k: int) -> List[Document]: ...
+
+
 class RerankerProtocol(Protocol):
     def compress_documents(self, documents: List[Document], query: str) -> List[Document]: ...
 
@@ -15,9 +19,34 @@ class RerankerProtocol(Protocol):
 class LLMProtocol(Protocol):
     def invoke(self, prompt: str) -> str: ...
 
+    def stream(self, prompt: str) -> Iterator[str]: ...
+
+
+class AsyncVectorStoreProtocol(Protocol):
+    async def asimilarity_search_with_score(self, query: str, k: int = 4) -> list: ...
+
+
+class AsyncKeywordSearchProtocol(Protocol):
+    async def asearch(self, query: str, k: int) -> List[Document]: ...
+
+
+class AsyncLLMProtocol(Protocol):
+    async def ainvoke(self, prompt: str) -> str: ...
+
+    def astream(self, prompt: str) -> AsyncIterator[str]: ...
+
 
 PromptBuilder = Callable[[str, List[str]], str]
 
 
 class RetrievalStrategyProtocol(Protocol):
-    def retrieve(self, query: str) -> List[Document]: ...
+    # embedding: クエリの埋め込み済みベクトル（あればベクトル検索で再埋め込みしない）
+    def retrieve(self, query: str, embedding: Optional[List[float]] = None) -> List[Document]: ...
+
+
+class AsyncRetrievalStrategyProtocol(Protocol):
+    async def aretrieve(self, query: str, embedding: Optional[List[float]] = None) -> List[Document]: ...
+
+
+class BatchRetrievalStrategyProtocol(Protocol):
+    def retrieve_batch(self, queries: Sequence[str]) -> List[List[Document]]: ...
@@ -1,50 +1,171 @@
-def split_text(text, chunk_size=500, overlap=100):
+import re
+from bisect import bisect_right
+
+import numpy as np
+
+# 分割候補位置: 空白の直前、および日本語句読点・改行の直後
+_SPACE_CODEPOINTS = np.array([ord(c) for c in " \t\n\r\x0b\x0c\xa0\u3000"], dtype=np.uint32)
+_BREAK_AFTER_CODEPOINTS = np.array([ord(c) for c in "。、！？!?\n"], dtype=np.uint32)
+
+
+def _codepoint_mask(codepoints, targets):
+    mask = np.zeros(len(codepoints), dtype=bool)
+    for cp in targets:
+        mask |= codepoints == cp
+    return mask
+
+
+def boundary_offsets(text):
+    """チャンク境界にできるオフセットを昇順で返す（テキスト全体を1回だけベクトル演算で走査する）。"""
     if not text:
         return []
-    if len(text) <= chunk_size:
-        return [text]
-
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        if end >= len(text):
-            chunk = text[start:].strip()
-            if chunk:
-                chunks.append(chunk)
-            break
+    codepoints = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    mask = _codepoint_mask(codepoints, _SPACE_CODEPOINTS)
+    mask[1:] |= _codepoint_mask(codepoints[:-1], _BREAK_AFTER_CODEPOINTS)
+    mask[0] = False
+    return np.flatnonzero(mask).tolist()
+
+
+def _strip_span(text, start, end):
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def split_text_spans(text, chunk_size=500, overlap=100, boundaries=None):
+    """テキストを (start, end) オフセットのリストに分割する。
 
-        # 単語境界で分割: 後方の最寄り空白を探す
-        boundary = text.rfind(" ", start, end)
-        if boundary <= start:
-            # chunk_size 内に空白がない場合、前方の空白まで拡張
-            boundary = text.find(" ", end)
-            if boundary == -1:
-                chunk = text[start:].strip()
-                if chunk:
-                    chunks.append(chunk)
-                break
-
-        chunks.append(text[start:boundary].strip())
-        # 次のチャンク開始位置: overlap 分戻るが、単語境界を保持
-        next_start = boundary + 1 - overlap
-        if next_start <= start:
-            next_start = boundary + 1
-        # next_start が単語の途中なら次の空白まで進む
-        if next_start > 0 and next_start < len(text) and text[next_start - 1] != " ":
-            word_start = text.rfind(" ", start, next_start)
-            if word_start > start:
-                next_start = word_start + 1
+    境界は boundary_offsets で事前計算し、各チャンクの終端・次の開始位置は二分探索で求める。
+    chunk_size 内に境界がない場合（空白のない日本語など）は chunk_size で切る。
+    """
+    if not text:
+        return []
+    n = len(text)
+    if n <= chunk_size:
+        return [(0, n)]
+
+    chunk_size = max(chunk_size, 1)
+    bounds = boundary_offsets(text) if boundaries is None else boundaries
+    spans = []
+    start = _strip_span(text, 0, n)[0]
+    while start < n:
+        limit = start + chunk_size
+        hard_cut = False
+        if limit >= n:
+            end = n
+        else:
+            i = bisect_right(bounds, limit) - 1
+            if i >= 0 and bounds[i] > start:
+                end = bounds[i]
             else:
-                next_start = boundary + 1
+                end = limit
+                hard_cut = True
+
+        s, e = _strip_span(text, start, end)
+        if s < e:
+            spans.append((s, e))
+        if end >= n:
+            break
+
+        # 次のチャンク開始位置: overlap 分以上戻った最寄りの境界（境界がなければ文字単位で戻る）
+        j = bisect_right(bounds, end - overlap) - 1
+        if j >= 0 and bounds[j] > start:
+            next_start = bounds[j]
+        elif hard_cut and end - overlap > start:
+            next_start = end - overlap
+        else:
+            next_start = end
         start = next_start
+        while start < n and text[start].isspace():
+            start += 1
 
-    return chunks
+    return spans
 
 
-def split_by_structure(text, chunk_size=None, overlap=100):
-    import re
+def split_text(text, chunk_size=500, overlap=100):
+    return [text[s:e] for s, e in split_text_spans(text, chunk_size=chunk_size, overlap=overlap)]
+
+
+def token_offsets(tokenizer, texts):
+    """fast tokenizer の offset mapping を texts まとめて1回で取得する（特殊トークンなし）。"""
+    encoded = tokenizer(
+        list(texts),
+        add_special_tokens=False,
+        return_offsets_mapping=True,
+        return_attention_mask=False,
+        return_token_type_ids=False,
+        verbose=False,
+    )
+    return [[tuple(o) for o in offsets] for offsets in encoded["offset_mapping"]]
 
+
+def _check_token_overlap(max_tokens, overlap_tokens):
+    # overlap が窓以上だと各チャンクが 1 トークンずつしか進まず、チャンク数がトークン数に比例して膨らむ
+    if overlap_tokens >= max_tokens:
+        raise ValueError(
+            f"overlap_tokens ({overlap_tokens}) must be smaller than max_tokens ({max_tokens})"
+        )
+
+
+def split_token_spans(text, offsets, max_tokens, overlap_tokens=0, boundaries=None):
+    """トークン数 max_tokens 以下のチャンクに分割し、(start, end) 文字オフセットを返す。
+
+    offsets はトークンごとの (start, end) 文字オフセット。チャンク終端は max_tokens 以内で
+    最も後ろにある文字境界に揃え、境界がなければトークン単位で切る。
+    overlap_tokens が max_tokens 以上なら ValueError。
+    """
+    _check_token_overlap(max_tokens, overlap_tokens)
+    if not text or not offsets:
+        return []
+    n_tokens = len(offsets)
+    if n_tokens <= max_tokens:
+        return [(offsets[0][0], offsets[-1][1])]
+
+    max_tokens = max(max_tokens, 1)
+    bounds = boundary_offsets(text) if boundaries is None else boundaries
+    starts = [s for s, _ in offsets]
+    ends = [e for _, e in offsets]
+    spans = []
+    i = 0
+    while i < n_tokens:
+        j = min(i + max_tokens, n_tokens)
+        if j < n_tokens:
+            # j 番目のトークンの開始位置以下で最も後ろの境界までに収まるトークン数に縮める
+            b = bisect_right(bounds, starts[j]) - 1
+            if b >= 0 and bounds[b] > starts[i]:
+                aligned = bisect_right(ends, bounds[b])
+                if aligned > i:
+                    j = aligned
+        spans.append((starts[i], ends[j - 1]))
+        if j >= n_tokens:
+            break
+
+        # 次のチャンク開始: overlap_tokens 分以上戻った最寄りの境界の直後のトークン
+        k = max(j - overlap_tokens, i + 1)
+        b = bisect_right(bounds, starts[k]) - 1
+        if b >= 0 and bounds[b] > starts[i]:
+            aligned = bisect_right(starts, bounds[b] - 1)
+            if i < aligned <= k:
+                k = aligned
+        i = k
+
+    return spans
+
+
+def split_by_tokens(texts, tokenizer, max_tokens, overlap_tokens=0):
+    """texts をまとめてトークナイズし、それぞれをトークン数基準で分割する。"""
+    _check_token_overlap(max_tokens, overlap_tokens)
+    texts = list(texts)
+    results = []
+    for text, offsets in zip(texts, token_offsets(tokenizer, texts)):
+        spans = split_token_spans(text, offsets, max_tokens, overlap_tokens)
+        results.append([text[s:e] for s, e in spans])
+    return results
+
+
+def split_by_structure(text, chunk_size=None, overlap=100):
     if not text:
         return []
 
@@ -61,3 +182,17 @@ def split_by_structure(text, chunk_size=None, overlap=100):
         else:
             result.append(para)
     return result
+
+
+def split_by_structure_tokens(text, tokenizer, max_tokens, overlap_tokens=0):
+    """split_by_structure のトークン版。ページ内の段落をまとめて1回でトークナイズする。"""
+    if not text:
+        return []
+
+    paragraphs = re.split(r'\n\s*\n', text)
+    paragraphs = [p.strip() for p in paragraphs if p.strip()]
+
+    result = []
+    for chunks in split_by_tokens(paragraphs, tokenizer, max_tokens, overlap_tokens):
+        result.extend(chunks)
+    return result
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import chain, islice
+
+from tqdm import tqdm
+
+_worker_embeddings = None
+
+
+def _init_worker():
+    """埋め込みワーカー初期化。プロセスごとにモデルを1回だけロードする。"""
+    global _worker_embeddings
+    try:
+        import torch
+        # ワーカー数 × torch スレッド数でコアを奪い合わないよう1スレッドに固定
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    from rag.components.embeddings import create_embeddings
+    from rag.core.config import EMBED_CACHE_ENABLED
+    _worker_embeddings = create_embeddings(cache=EMBED_CACHE_ENABLED)
+
+
+def _embed_batch(texts):
+    return _worker_embeddings.embed_documents(texts)
+
+
+@dataclass(frozen=True)
+class EmbedStats:
+    chunks: int
+    seconds: float
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return self.chunks / self.seconds if self.seconds > 0 else 0.0
+
+
+def iter_batches(items, batch_size):
+    it = iter(items)
+    while True:
+        batch = list(islice(it, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def resolve_workers(workers, n_batches=None):
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    if n_batches is not None:
+        workers = min(workers, n_batches)
+    return max(1, workers)
+
+
+def embed_and_store(items, vectorstore, *, batch_size, workers) -> EmbedStats:
+    """(Document, doc_id) のストリームを batch_size ごとに埋め込み、完了したバッチから順に vectorstore へ書き込む。
+
+    バッチが1つしかない場合やワーカーが1の場合は vectorstore 自身の embeddings でインプロセス処理する。
+    """
+    batches = iter_batches(items, batch_size)
+    # 先頭2バッチだけ先読みし、単一バッチならプロセスプールを起動しない
+    head = list(islice(batches, 2))
+    workers = resolve_workers(workers, None if len(head) > 1 else len(head))
+    batches = chain(head, batches)
+
+    count = 0
+    start = time.perf_counter()
+    with tqdm(unit="chunk", desc="Embedding") as progress:
+        if workers == 1:
+            for batch in batches:
+                vectorstore.add_documents(
+                    [doc for doc, _ in batch], ids=[doc_id for _, doc_id in batch],
+                )
+                progress.update(len(batch))
+                count += len(batch)
+        else:
+            count = _embed_with_pool(batches, vectorstore, workers, progress)
+    return EmbedStats(chunks=count, seconds=time.perf_counter() - start)
+
+
+def _embed_with_pool(batches, vectorstore, workers, progress):
+    count = 0
+
+    def write(batch, future):
+        nonlocal count
+        vectorstore.add_embeddings(
+            texts=[doc.page_content for doc, _ in batch],
+            embeddings=future.result(),
+            metadatas=[doc.metadata for doc, _ in batch],
+            ids=[doc_id for _, doc_id in batch],
+        )
+        progress.update(len(batch))
+        count += len(batch)
+
+    # torch を安全に使うため fork ではなく spawn でワーカーを起動
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker) as pool:
+        pending = deque()
+        for batch in batches:
+            texts = [doc.page_content for doc, _ in batch]
+            pending.append((batch, pool.submit(_embed_batch, texts)))
+            # 先行バッチの書き込み中も後続バッチの埋め込みを進める（キューは workers×2 まで）
+            if len(pending) >= workers * 2:
+                write(*pending.popleft())
+        while pending:
+            write(*pending.popleft())
+    return count
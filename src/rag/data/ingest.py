@@ -1,72 +1,273 @@
+import multiprocessing
 import os
+import sys
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
 from pypdf import PdfReader
 import pandas as pd
 from langchain_core.documents import Document
-from rag.core.container import get_container
-from rag.data.chunking import split_by_structure
-from rag.core.config import CHUNK_SIZE, CHUNK_OVERLAP
-from rag.infra.db import create_vectorstore
+from rag.core.container import LOCAL_VECTOR_BACKENDS, get_container
+from rag.data.chunking import split_by_structure, split_by_structure_tokens
+from rag.core.config import (
+    CHUNK_SIZE, CHUNK_OVERLAP, CHUNK_UNIT, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS,
+    INGEST_BATCH_SIZE, INGEST_WORKERS, INGEST_PDF_WORKERS, INGEST_LOADER,
+    INGEST_CSV_CHUNKSIZE, INGEST_CSV_METADATA_COLUMNS, BM25_ENABLED, BM25_INDEX_PATH, VECTOR_BACKEND,
+    NUMPY_STORE_PATH,
+)
+from rag.data.embedding_pipeline import embed_and_store, resolve_workers
+from rag.infra.manifest import ManifestEntry, chunk_id, content_hash
 
 DATA_DIR = "data"
 
+_CATEGORY_COLUMNS = ("category", "カテゴリ")
 
-def load_pdfs():
-    texts = []
-    for file in os.listdir(f"{DATA_DIR}/pdf"):
-        if file.endswith(".pdf"):
-            reader = PdfReader(f"{DATA_DIR}/pdf/{file}")
-            for i, page in enumerate(reader.pages):
-                texts.append((page.extract_text(), f"{file}:p{i+1}"))
-    return texts
 
+def _extract_pdf(file):
+    reader = PdfReader(f"{DATA_DIR}/pdf/{file}")
+    return [(page.extract_text(), f"{file}:p{i+1}") for i, page in enumerate(reader.pages)]
 
-def load_csvs():
-    texts = []
-    for file in os.listdir(f"{DATA_DIR}/csv"):
-        if file.endswith(".csv"):
-            df = pd.read_csv(f"{DATA_DIR}/csv/{file}")
-            for idx, row in df.iterrows():
-                content_parts = []
-                for k, v in row.items():
-                    if k.lower() not in ("category", "カテゴリ"):
-                        content_parts.append(str(v))
-                text = "\n".join(content_parts)
-                texts.append((text, f"{file}:r{idx+1}"))
+
+def load_pdfs(workers=INGEST_PDF_WORKERS):
+    """PDF をページ単位で (text, source) として逐次 yield する。ファイル単位でプロセス並列に抽出する。"""
+    files = [file for file in os.listdir(f"{DATA_DIR}/pdf") if file.endswith(".pdf")]
+    workers = resolve_workers(workers, len(files))
+    if workers == 1:
+        for file in files:
+            yield from _extract_pdf(file)
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        # 先読みは workers×2 ファイルまでに抑え、メモリ使用量をコーパスサイズに依存させない
+        pending = deque()
+        for file in files:
+            pending.append(pool.submit(_extract_pdf, file))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def _join_columns(df, columns):
+    """行ごとに columns を改行区切りで連結する（列単位のベクトル化処理）。"""
+    if not columns:
+        return pd.Series("", index=df.index)
+    texts = df[columns[0]].astype(str)
+    if len(columns) > 1:
+        texts = texts.str.cat([df[c].astype(str) for c in columns[1:]], sep="\n")
     return texts
 
 
-def main():
-    container = get_container()
+def _metadata_records(df, columns):
+    if not columns:
+        return [{}] * len(df)
+    # jsonb に入れられるよう numpy 型を Python 型に、欠損値を None にする
+    meta = df[columns].astype(object)
+    return meta.where(meta.notna(), None).to_dict("records")
+
 
-    # 既存ドキュメントをクリア（コレクション削除→vectorstore再生成）
-    container.vectorstore.delete_collection()
-    container._vectorstore = create_vectorstore(container.embeddings)
+def load_csvs(chunksize=INGEST_CSV_CHUNKSIZE, metadata_columns=INGEST_CSV_METADATA_COLUMNS):
+    """CSV を1行=1件の (text, source, metadata) として逐次 yield する。
+
+    chunksize 行ずつ読み込み、metadata_columns に指定した列は本文ではなく metadata に入れる。
+    """
+    for file in os.listdir(f"{DATA_DIR}/csv"):
+        if not file.endswith(".csv"):
+            continue
+        for df in pd.read_csv(f"{DATA_DIR}/csv/{file}", chunksize=chunksize):
+            content_columns = [
+                c for c in df.columns
+                if str(c).lower() not in _CATEGORY_COLUMNS and c not in metadata_columns
+            ]
+            meta_columns = [c for c in metadata_columns if c in df.columns]
+            texts = _join_columns(df, content_columns)
+            # read_csv の chunksize 読み込みでは index がファイル先頭からの通し番号になる
+            sources = f"{file}:r" + (df.index + 1).astype(str)
+            yield from zip(texts, sources, _metadata_records(df, meta_columns))
 
-    pdf_items = load_pdfs()
-    csv_items = load_csvs()
 
-    documents = []
+def create_chunker(unit=CHUNK_UNIT):
+    """PDF ページを分割する関数を返す。unit="token" なら EMBED_MODEL のトークン数で分割する。"""
+    if unit == "char":
+        return lambda text: split_by_structure(text, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP)
+    if unit == "token":
+        from rag.components.embeddings import create_tokenizer
+        tokenizer = create_tokenizer()
+        return lambda text: split_by_structure_tokens(
+            text, tokenizer, max_tokens=CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS,
+        )
+    raise ValueError(f"Unknown chunk unit: {unit!r} (expected 'char' or 'token')")
 
-    # PDF: split_by_structure（段落ベース分割）
+
+def iter_documents(pdf_items, csv_items, chunker=None):
+    chunker = chunker or create_chunker()
+
+    # PDF: 段落ベース分割（split_by_structure / split_by_structure_tokens）
     for text, source in pdf_items:
-        chunks = split_by_structure(text, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP)
+        chunks = chunker(text)
         for i, chunk in enumerate(chunks):
-            documents.append(Document(
+            yield Document(
                 page_content=chunk,
                 metadata={"source": source, "chunk_index": i},
-            ))
+            )
 
     # CSV: 1行=1ドキュメント（分割なし）
-    for text, source in csv_items:
+    for text, source, metadata in csv_items:
         if text.strip():
-            documents.append(Document(
+            yield Document(
                 page_content=text,
-                metadata={"source": source, "chunk_index": 0},
-            ))
+                metadata={**metadata, "source": source, "chunk_index": 0},
+            )
+
+
+def open_loader(container, *, upsert, loader=INGEST_LOADER):
+    """埋め込みの書き込み先を返す（with で使う）。copy は COPY BINARY で一括投入する。"""
+    if loader == "pgvector":
+        return nullcontext(container.maintenance_vectorstore)
+    if loader == "copy":
+        from rag.infra.bulk_loader import CopyVectorLoader
+        return CopyVectorLoader(container.embeddings, upsert=upsert)
+    raise ValueError(f"Unknown ingest loader: {loader!r} (expected 'copy' or 'pgvector')")
+
+
+def tap_bm25(documents, builder):
+    """ドキュメントを流しつつ BM25 インデックスにも追加する（差分モードでも全チャンクを通す）。"""
+    for doc in documents:
+        builder.add(
+            chunk_id(doc.metadata["source"], doc.metadata["chunk_index"]),
+            doc.page_content,
+            doc.metadata,
+        )
+        yield doc
+
+
+class DocumentDiff:
+    """manifest と比較しながらドキュメントを流し、追加・変更分だけを通す。"""
+
+    def __init__(self, existing):
+        self.existing = existing
+        self.entries = []
+        self.unchanged = 0
+        self._seen = set()
+
+    def changed(self, documents):
+        """追加・変更ドキュメントを (Document, doc_id) として yield する。"""
+        for doc in documents:
+            key = (doc.metadata["source"], doc.metadata["chunk_index"])
+            self._seen.add(key)
+            digest = content_hash(doc.page_content)
+            current = self.existing.get(key)
+            if current is not None and current.content_hash == digest:
+                self.unchanged += 1
+                continue
+            entry = ManifestEntry(
+                source=key[0],
+                chunk_index=key[1],
+                content_hash=digest,
+                doc_id=chunk_id(*key),
+            )
+            self.entries.append(entry)
+            yield doc, entry.doc_id
+
+    def stale(self):
+        """changed() を最後まで消費した後、今回見つからなかった manifest エントリを返す。"""
+        return [entry for key, entry in self.existing.items() if key not in self._seen]
+
+
+def ingest_numpy(container, backend=VECTOR_BACKEND):
+    """VECTOR_BACKEND=numpy / ivfpq: DB を使わず全チャンクを埋め込み、NumPy ストアに書き出す（常に全件再構築）。
+
+    ivfpq では保存時に全埋め込みから IVF-PQ インデックスを学習する。
+    """
+    if backend == "ivfpq":
+        from rag.components.pq_index import PQStoreWriter as writer_cls
+    else:
+        from rag.components.numpy_store import NumpyStoreWriter as writer_cls
+
+    documents = iter_documents(load_pdfs(), load_csvs())
+    bm25 = None
+    if BM25_ENABLED:
+        from rag.components.bm25 import BM25Builder
+        bm25 = BM25Builder(BM25_INDEX_PATH)
+        documents = tap_bm25(documents, bm25)
+
+    items = (
+        (doc, chunk_id(doc.metadata["source"], doc.metadata["chunk_index"])) for doc in documents
+    )
+    with writer_cls(container.embeddings, NUMPY_STORE_PATH) as writer:
+        stats = embed_and_store(items, writer, batch_size=INGEST_BATCH_SIZE, workers=INGEST_WORKERS)
+    print(f"Embedded {stats.chunks} chunks in {stats.seconds:.1f}s "
+          f"({stats.chunks_per_sec:.1f} chunks/sec)")
+    print(f"Vector store: {len(writer)} chunks -> {writer.path}")
+
+    if bm25 is not None:
+        print(f"BM25 index: {len(bm25)} chunks -> {bm25.save()}")
+
+
+def main(incremental=False):
+    container = get_container()
+    if VECTOR_BACKEND in LOCAL_VECTOR_BACKENDS:
+        # 差分モードでも全件を作り直す（埋め込みキャッシュがあれば未変更チャンクは再計算しない）
+        ingest_numpy(container, VECTOR_BACKEND)
+        return
+    manifest = container.manifest
+
+    # 差分モード: コレクションは残したまま変更分のみ反映
+    existing = manifest.load() if incremental else {}
+    if incremental and not existing and manifest.collection_has_documents():
+        # manifest なしで差分投入すると既存チャンクを知らないまま全件を足し、コーパスが重複する
+        print("Manifest is empty but the collection already has chunks; running a full rebuild instead")
+        incremental = False
+
+    if not incremental:
+        # 既存ドキュメントをクリア（コレクション削除→再作成）
+        container.maintenance_vectorstore.delete_collection()
+        container.maintenance_vectorstore.create_collection()
+        manifest.clear()
+        # 一括投入中にインデックス（ANN / metadata GIN）を逐次更新すると遅いので、投入後に作り直す
+        container.vector_index.drop()
+
+    documents = iter_documents(load_pdfs(), load_csvs())
+    bm25 = None
+    if BM25_ENABLED:
+        from rag.components.bm25 import BM25Builder
+        bm25 = BM25Builder(BM25_INDEX_PATH)
+        documents = tap_bm25(documents, bm25)
+
+    diff = DocumentDiff(existing)
+    # 全件投入では ID が衝突しないので、一時テーブルを経由せず直接 COPY する
+    with open_loader(container, upsert=incremental, loader=INGEST_LOADER) as loader:
+        stats = embed_and_store(
+            diff.changed(documents),
+            loader,
+            batch_size=INGEST_BATCH_SIZE,
+            workers=INGEST_WORKERS,
+        )
+    if diff.entries:
+        manifest.upsert(diff.entries)
+        print(f"Embedded {stats.chunks} chunks in {stats.seconds:.1f}s "
+              f"({stats.chunks_per_sec:.1f} chunks/sec)")
+
+    stale = diff.stale()
+    # 消えたチャンクは新しいチャンクの投入後に削除し、空コレクションの時間帯を作らない
+    if stale:
+        container.maintenance_vectorstore.delete(ids=[e.doc_id for e in stale])
+        manifest.delete([e.key for e in stale])
+
+    # 差分モードでは HNSW は逐次更新されるので、無ければ作るだけ
+    container.vector_index.create()
+
+    if bm25 is not None:
+        print(f"BM25 index: {len(bm25)} chunks -> {bm25.save()}")
+
+    # コレクションが変わったらバージョンを更新し、回答キャッシュを無効化する
+    if diff.entries or stale or not incremental:
+        manifest.bump_version()
 
-    if documents:
-        container.vectorstore.add_documents(documents)
+    print(f"Ingested: {len(diff.entries)} upserted, {len(stale)} deleted, "
+          f"{diff.unchanged} unchanged")
 
 
 if __name__ == "__main__":
-    main()
+    main(incremental="--incremental" in sys.argv)
@@ -0,0 +1,87 @@
+"""圧縮インデックス（IVF-PQ）と exact 検索の比較（evaluate --pq）。
+
+同じ NumPy ストアに対して exact 検索と IVF-PQ（+ 元ベクトルでの再スコア）を実行し、
+常駐メモリ・1 段目の再現率（exact の上位 k 件をどれだけ含むか）・検索時間と、
+リランク後の Retrieval@k / MRR を並べる。Retrieval@k の低下が tolerance 以内かを判定する。
+"""
+from __future__ import annotations
+
+import time
+from types import SimpleNamespace
+
+from rag.core.config import (
+    SEARCH_K, RERANK_TOP_K, SCORE_THRESHOLD, RERANK_DISTANCE_MARGIN, PQ_RECALL_TOLERANCE,
+)
+from rag.evaluation.metrics import percentile
+
+
+def _retrieval_metrics(questions, store, reranker) -> dict:
+    from rag.evaluation.evaluate import run_retrieval_evaluation
+    from rag.pipeline.retrieval import TwoStageRetrieval
+
+    strategy = TwoStageRetrieval(
+        vectorstore=store,
+        reranker=reranker,
+        search_k=SEARCH_K,
+        rerank_top_k=RERANK_TOP_K,
+        score_threshold=SCORE_THRESHOLD,
+        rerank_distance_margin=RERANK_DISTANCE_MARGIN,
+    )
+    results = run_retrieval_evaluation(questions, SimpleNamespace(retrieval_strategy=strategy))
+    total = len(results) or 1
+    return {
+        "retrieval_at_k": sum(1 for r in results if r["retrieval_hit"]) / total,
+        "mrr": sum(r["mrr"] for r in results) / total,
+    }
+
+
+def _search_ms(store, query_vectors, k):
+    elapsed = []
+    rows = []
+    for vector in query_vectors:
+        start = time.perf_counter()
+        top, _ = store.search_indices(vector, k)
+        elapsed.append((time.perf_counter() - start) * 1000)
+        rows.append(set(top.tolist()))
+    return rows, elapsed
+
+
+def run_pq_comparison(questions, exact, approx, reranker, *, k: int = SEARCH_K) -> dict:
+    """exact / approx は同じストアを開いた NumpyVectorStore と PQVectorStore。"""
+    queries = [q["query"] for q in questions]
+    query_vectors = exact.embeddings.embed_documents(queries) if queries else []
+    exact_rows, exact_ms = _search_ms(exact, query_vectors, k)
+    approx_rows, approx_ms = _search_ms(approx, query_vectors, k)
+    recalls = [len(a & e) / len(e) for a, e in zip(approx_rows, exact_rows) if e]
+    return {
+        "chunks": len(exact),
+        "exact_bytes": exact.vectors.nbytes,
+        "pq_bytes": approx.index.nbytes,
+        "k": k,
+        "first_stage_recall": sum(recalls) / len(recalls) if recalls else 1.0,
+        "exact_ms_p50": percentile(exact_ms, 50),
+        "pq_ms_p50": percentile(approx_ms, 50),
+        "exact": _retrieval_metrics(questions, exact, reranker),
+        "pq": _retrieval_metrics(questions, approx, reranker),
+    }
+
+
+def print_pq_report(report, tolerance: float = PQ_RECALL_TOLERANCE) -> bool:
+    """レポートを表示し、Retrieval@k の低下が tolerance 以内なら True を返す。"""
+    mib = 1024 * 1024
+    ratio = report["exact_bytes"] / report["pq_bytes"] if report["pq_bytes"] else 0.0
+    drop = report["exact"]["retrieval_at_k"] - report["pq"]["retrieval_at_k"]
+    ok = drop <= tolerance + 1e-9
+
+    print("\n=== IVF-PQ vs Exact ===\n")
+    print(f"Chunks: {report['chunks']}")
+    print(f"Memory: float32 {report['exact_bytes'] / mib:.1f} MiB -> PQ {report['pq_bytes'] / mib:.1f} MiB"
+          f" ({ratio:.1f}x smaller)")
+    print(f"First-stage recall@{report['k']}: {report['first_stage_recall'] * 100:.1f}%")
+    print(f"Search p50: exact {report['exact_ms_p50']:.2f}ms / PQ {report['pq_ms_p50']:.2f}ms")
+    print(f"\n{'':8}{'R@k':>8}{'MRR':>8}")
+    for name in ("exact", "pq"):
+        metrics = report[name]
+        print(f"{name:8}{metrics['retrieval_at_k'] * 100:>7.1f}%{metrics['mrr']:>8.3f}")
+    print(f"\nRetrieval@k drop: {drop * 100:.1f}pt (tolerance {tolerance * 100:.1f}pt) -> {'OK' if ok else 'FAIL'}")
+    return ok
@@ -1,12 +1,16 @@
 import json
 import sys
-from rag.pipeline.graph import get_graph
+import time
+from rag.pipeline.graph import get_graph, PROFILE_KEY
+from rag.pipeline.timing import collect
 from rag.core.container import get_container
 from rag.evaluation.metrics import (
     retrieval_at_k, faithfulness, exact_match, measure_latency,
-    context_relevance, retrieval_mrr,
+    context_relevance, retrieval_mrr, latency_summary, decode_tokens_per_sec,
+)
+from rag.core.config import (
+    CHUNK_SIZE, CHUNK_OVERLAP, SEARCH_K, RERANK_TOP_K, SCORE_THRESHOLD, EVAL_CONCURRENCY,
 )
-from rag.core.config import CHUNK_SIZE, CHUNK_OVERLAP, SEARCH_K, RERANK_TOP_K, SCORE_THRESHOLD
 
 
 def load_questions(path="data/eval_questions.json"):
@@ -14,9 +18,18 @@ def load_questions(path="data/eval_questions.json"):
         return json.load(f)
 
 
+# レポートでの表示順（graph のノードと、その中の stage）。これ以外のステージは末尾に出す
+STAGE_ORDER = (
+    "semantic_lookup", "retrieve", "vector_search", "keyword_search", "rerank",
+    "generate", "prompt", "llm", "prefill", "decode", "semantic_store",
+)
+NODE_STAGES = ("semantic_lookup", "retrieve", "generate", "semantic_store")
+
+
 def evaluate_single(query, expected_source, expected_keywords, graph):
     def _run():
-        return graph.invoke({"query": query})
+        # profile: generate をストリーミングで実行し prefill / decode を分けて計測する
+        return graph.invoke({"query": query}, {"configurable": {PROFILE_KEY: True}})
 
     result, latency = measure_latency(_run)
 
@@ -30,6 +43,8 @@ def evaluate_single(query, expected_source, expected_keywords, graph):
         "exact_match": exact_match(answer, expected_keywords),
         "latency": latency,
         "answer": answer,
+        "timings": result.get("timings", {}),
+        "generated_tokens": result.get("generated_tokens", 0),
     }
 
 
@@ -62,17 +77,50 @@ def print_report(results, config):
     print(f"Faithfulness: {faithfulness_pct:.1f}%")
     print(f"Exact Match: {exact_match_pct:.1f}%")
     print(f"Latency: {avg_latency:.1f}s")
+    print_latency_percentiles(results)
+    print_stage_breakdown(results)
+    tokens_per_sec = decode_tokens_per_sec(results)
+    if tokens_per_sec:
+        print(f"Decode: {tokens_per_sec:.1f} tokens/s")
     print(f"\nQuestions evaluated: {total}")
 
 
+def print_latency_percentiles(results):
+    s = latency_summary([r["latency"] for r in results])
+    print(f"Latency p50={s['p50']:.2f}s p90={s['p90']:.2f}s p99={s['p99']:.2f}s max={s['max']:.2f}s")
+
+
+def print_stage_breakdown(results):
+    """ノード / ステージごとの処理時間（ms）の p50 / p90 / p99 / max。計測値がなければ何も出さない。"""
+    samples = {}
+    for r in results:
+        for name, ns in r.get("timings", {}).items():
+            samples.setdefault(name, []).append(ns / 1e6)
+    if not samples:
+        return
+    names = [n for n in STAGE_ORDER if n in samples] + sorted(n for n in samples if n not in STAGE_ORDER)
+    print("\n--- Stage breakdown (ms) ---")
+    print(f"{'stage':<18}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}{'n':>5}")
+    for name in names:
+        s = latency_summary(samples[name])
+        # ノード内のステージは字下げして表示する
+        label = name if name in NODE_STAGES else f"  {name}"
+        print(
+            f"{label:<18}{s['p50']:>10.1f}{s['p90']:>10.1f}{s['p99']:>10.1f}{s['max']:>10.1f}"
+            f"{len(samples[name]):>5}"
+        )
+
+
 # --- Retrieval-only evaluation ---
 
 
 def evaluate_single_retrieval(query, expected_source, expected_keywords, container):
     def _run():
-        return container.retrieval_strategy.retrieve(query)
+        with collect("retrieve") as timings:
+            docs = container.retrieval_strategy.retrieve(query)
+        return docs, timings
 
-    docs, latency = measure_latency(_run)
+    (docs, timings), latency = measure_latency(_run)
     sources = [doc.metadata.get("source", "") for doc in docs]
 
     return {
@@ -82,6 +130,7 @@ def evaluate_single_retrieval(query, expected_source, expected_keywords, contain
         "mrr": retrieval_mrr(docs, expected_source),
         "retrieved_count": len(docs),
         "latency": latency,
+        "timings": timings,
     }
 
 
@@ -116,10 +165,12 @@ def print_retrieval_report(results, config):
     print(f"MRR: {avg_mrr:.3f}")
     print(f"Avg Retrieved: {avg_count:.1f} docs")
     print(f"Latency: {avg_latency:.1f}s")
+    print_latency_percentiles(results)
+    print_stage_breakdown(results)
     print(f"\nQuestions evaluated: {total}")
 
 
-def main():
+def main(batch=False):
     questions = load_questions()
     config = {
         "CHUNK_SIZE": CHUNK_SIZE,
@@ -127,12 +178,24 @@ def main():
         "SEARCH_K": SEARCH_K,
         "RERANK_TOP_K": RERANK_TOP_K,
     }
-    graph = get_graph(container=get_container())
-    results = run_evaluation(questions, graph)
+    start = time.perf_counter()
+    if batch:
+        from rag.evaluation.batch import run_batch_evaluation
+        # 2 並列以上ではワーカーごとに LLM をロードする（llama.cpp のモデルは共有できない）
+        llm_factory = None
+        if EVAL_CONCURRENCY > 1:
+            from rag.components.llm import create_llm
+            llm_factory = create_llm
+        results = run_batch_evaluation(questions, get_container(), llm_factory=llm_factory)
+    else:
+        # 評価ではレイテンシを正しく測るため回答キャッシュ / セマンティックキャッシュを通さない
+        graph = get_graph(container=get_container(), use_cache=False)
+        results = run_evaluation(questions, graph)
     print_report(results, config)
+    print(f"Wall time: {time.perf_counter() - start:.1f}s")
 
 
-def main_retrieval():
+def main_retrieval(batch=False):
     questions = load_questions()
     config = {
         "CHUNK_SIZE": CHUNK_SIZE,
@@ -142,12 +205,51 @@ def main_retrieval():
         "SCORE_THRESHOLD": SCORE_THRESHOLD,
     }
     container = get_container()
-    results = run_retrieval_evaluation(questions, container)
+    start = time.perf_counter()
+    if batch:
+        from rag.evaluation.batch import run_batch_retrieval_evaluation
+        results = run_batch_retrieval_evaluation(questions, container)
+    else:
+        results = run_retrieval_evaluation(questions, container)
     print_retrieval_report(results, config)
+    print(f"Wall time: {time.perf_counter() - start:.1f}s")
+
+
+def main_sweep(grid_path="env/config/sweep.yaml"):
+    from rag.evaluation.sweep import load_grid, run_sweep, print_sweep_report
+
+    questions = load_questions()
+    start = time.perf_counter()
+    rows = run_sweep(questions, load_grid(grid_path))
+    print_sweep_report(rows)
+    print(f"Wall time: {time.perf_counter() - start:.1f}s")
+
+
+def main_pq():
+    """IVF-PQ と exact 検索を同じストアで比較する（VECTOR_BACKEND=ivfpq で ingest 済みであること）。"""
+    from rag.components.numpy_store import create_numpy_vectorstore
+    from rag.components.pq_index import create_pq_vectorstore
+    from rag.evaluation.compression import run_pq_comparison, print_pq_report
+
+    container = get_container()
+    exact = create_numpy_vectorstore(container.embeddings)
+    approx = create_pq_vectorstore(container.embeddings)
+    report = run_pq_comparison(load_questions(), exact, approx, container.reranker)
+    if not print_pq_report(report):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
-    if "--retrieval-only" in sys.argv:
-        main_retrieval()
+    batch = "--batch" in sys.argv
+    if "--pq" in sys.argv:
+        main_pq()
+    elif "--sweep" in sys.argv:
+        i = sys.argv.index("--sweep")
+        if i + 1 < len(sys.argv) and not sys.argv[i + 1].startswith("--"):
+            main_sweep(sys.argv[i + 1])
+        else:
+            main_sweep()
+    elif "--retrieval-only" in sys.argv:
+        main_retrieval(batch=batch)
     else:
-        main()
+        main(batch=batch)
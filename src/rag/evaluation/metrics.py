@@ -36,7 +36,34 @@ def retrieval_mrr(documents, expected_source):
 
 
 def measure_latency(func):
-    start = time.time()
+    start = time.perf_counter_ns()
     result = func()
-    elapsed = time.time() - start
+    elapsed = (time.perf_counter_ns() - start) / 1e9
     return result, elapsed
+
+
+def percentile(values, q):
+    """q パーセンタイル（0〜100、隣接値の線形補間。numpy.percentile の既定と同じ）。"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100
+    lower = int(pos)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (pos - lower)
+
+
+def latency_summary(values):
+    return {
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else 0.0,
+    }
+
+
+def decode_tokens_per_sec(results):
+    """decode 区間（最初のトークン以降）の生成速度。prefill は含めない。"""
+    tokens = sum(max(0, r.get("generated_tokens", 0) - 1) for r in results)
+    decode_ns = sum(r.get("timings", {}).get("decode", 0) for r in results)
+    return tokens / (decode_ns / 1e9) if decode_ns else 0.0
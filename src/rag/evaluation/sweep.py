@@ -0,0 +1,215 @@
+"""検索パラメータのスイープ（evaluate --sweep GRID）。
+
+GRID は各パラメータの候補値を並べた YAML（例: env/config/sweep.yaml）。省略したパラメータは現在の設定値で固定する。
+
+    CHUNK_SIZE: [300, 500]
+    SEARCH_K: [10, 20]
+    SCORE_THRESHOLD: [0.4, 0.5, 0.6]
+
+DB への ingest は行わず、チャンク分割設定ごとにコーパスをメモリ上で埋め込んで TwoStageRetrieval を組み立てる。
+チャンクの埋め込みは SQLite 埋め込みキャッシュを通すので、同じチャンクは設定・実行をまたいで再計算しない。
+クエリ埋め込みは全設定で 1 回だけ計算し、cross-encoder のスコアは (クエリ, チャンク本文) 単位でキャッシュする。
+"""
+from __future__ import annotations
+
+import itertools
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Sequence
+
+import numpy as np
+import yaml
+from langchain_core.documents import Document
+
+from rag.core.config import (
+    CHUNK_SIZE, CHUNK_OVERLAP, SEARCH_K, RERANK_TOP_K, SCORE_THRESHOLD, RERANK_DISTANCE_MARGIN,
+)
+from rag.evaluation.metrics import percentile
+
+CHUNK_PARAMS = ("CHUNK_SIZE", "CHUNK_OVERLAP")
+RETRIEVAL_PARAMS = ("SEARCH_K", "RERANK_TOP_K", "SCORE_THRESHOLD")
+SWEEP_PARAMS = CHUNK_PARAMS + RETRIEVAL_PARAMS
+DEFAULTS = {
+    "CHUNK_SIZE": CHUNK_SIZE,
+    "CHUNK_OVERLAP": CHUNK_OVERLAP,
+    "SEARCH_K": SEARCH_K,
+    "RERANK_TOP_K": RERANK_TOP_K,
+    "SCORE_THRESHOLD": SCORE_THRESHOLD,
+}
+
+
+def load_grid(path) -> Dict[str, list]:
+    with open(path) as f:
+        grid = yaml.safe_load(f) or {}
+    unknown = sorted(set(grid) - set(SWEEP_PARAMS))
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {unknown} (expected some of {SWEEP_PARAMS})")
+    return {
+        name: list(grid[name]) if isinstance(grid.get(name), list) else [grid.get(name, DEFAULTS[name])]
+        for name in SWEEP_PARAMS
+    }
+
+
+def chunk_configs(grid) -> List[dict]:
+    """チャンク分割設定の組み合わせ（overlap >= chunk_size の組は除く）。"""
+    return [
+        {"CHUNK_SIZE": size, "CHUNK_OVERLAP": overlap}
+        for size, overlap in itertools.product(grid["CHUNK_SIZE"], grid["CHUNK_OVERLAP"])
+        if overlap < size
+    ]
+
+
+def retrieval_configs(grid) -> List[dict]:
+    return [
+        dict(zip(RETRIEVAL_PARAMS, values))
+        for values in itertools.product(*(grid[name] for name in RETRIEVAL_PARAMS))
+    ]
+
+
+def _normalize(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+
+class MatrixVectorStore:
+    """クエリ×チャンクの cos 距離を事前に計算しておき、similarity_search_with_score を返す。
+
+    距離は PGVector の cosine と同じ 1 - cos 類似度なので、SCORE_THRESHOLD をそのまま比較できる。
+    評価する質問以外のクエリは受け付けない。
+    """
+
+    def __init__(self, documents: Sequence[Document], doc_vectors, queries: Sequence[str], query_vectors):
+        self.documents = list(documents)
+        self._rows = {query: i for i, query in enumerate(queries)}
+        if self.documents:
+            self._distances = 1.0 - _normalize(query_vectors) @ _normalize(doc_vectors).T
+        else:
+            self._distances = np.zeros((len(queries), 0), dtype=np.float32)
+        # 同距離はチャンク順
+        self._order = np.argsort(self._distances, axis=1, kind="stable")
+
+    def similarity_search_with_score(self, query: str, k: int = 4) -> list:
+        row = self._rows[query]
+        return [(self.documents[i], float(self._distances[row, i])) for i in self._order[row, :k]]
+
+
+def load_corpus():
+    """PDF のページと CSV の行を一度だけ読み込む（チャンク分割設定ごとに再利用する）。"""
+    from rag.data.ingest import load_pdfs, load_csvs
+    return list(load_pdfs()), list(load_csvs())
+
+
+def chunk_corpus(corpus, chunk_size: int, overlap: int) -> List[Document]:
+    from rag.data.chunking import split_by_structure
+    from rag.data.ingest import iter_documents
+
+    pdf_items, csv_items = corpus
+    # スコアキャッシュは本文ハッシュがキーなので、設定をまたいで同じチャンクのスコアを共有できる
+    return list(iter_documents(
+        pdf_items, csv_items,
+        chunker=lambda text: split_by_structure(text, chunk_size=chunk_size, overlap=overlap),
+    ))
+
+
+def _summarize(results, candidates: List[int], query_ms: float, pair_ms: float) -> dict:
+    total = len(results) or 1
+    # 推定レイテンシ: クエリ埋め込み + 候補数 × 1 ペアあたりの cross-encoder 時間（DB 検索は含まない）
+    est_ms = [query_ms + n * pair_ms for n in candidates]
+    return {
+        "retrieval_at_k": sum(1 for r in results if r["retrieval_hit"]) / total,
+        "mrr": sum(r["mrr"] for r in results) / total,
+        "context_relevance": sum(r["context_relevance"] for r in results) / total,
+        "avg_candidates": sum(candidates) / total,
+        "est_latency_ms": sum(est_ms) / total,
+        "est_latency_p90_ms": percentile(est_ms, 90),
+    }
+
+
+def run_sweep(questions, grid, *, embeddings=None, reranker=None, corpus=None) -> List[dict]:
+    """グリッドの全組み合わせを評価し、設定と指標を並べた行のリストを返す。"""
+    from rag.evaluation.evaluate import run_retrieval_evaluation
+    from rag.pipeline.retrieval import TwoStageRetrieval
+
+    chunk_grid = chunk_configs(grid)
+    retrieval_grid = retrieval_configs(grid)
+    max_k = max(grid["SEARCH_K"])
+    if embeddings is None:
+        from rag.components.embeddings import create_embeddings
+        embeddings = create_embeddings(cache=True)
+    if reranker is None:
+        from rag.components.reranker import create_reranker
+        # 全設定の (クエリ, 候補) が収まる大きさにする
+        reranker = create_reranker(
+            top_n=max(grid["RERANK_TOP_K"]),
+            score_cache_size=max(1, len(questions) * max_k * len(chunk_grid)),
+        )
+    corpus = corpus if corpus is not None else load_corpus()
+
+    queries = [q["query"] for q in questions]
+    start = time.perf_counter()
+    query_vectors = embeddings.embed_documents(queries)
+    query_ms = (time.perf_counter() - start) * 1000 / max(1, len(queries))
+
+    rows = []
+    for chunking in chunk_grid:
+        documents = chunk_corpus(corpus, chunking["CHUNK_SIZE"], chunking["CHUNK_OVERLAP"])
+        doc_vectors = embeddings.embed_documents([doc.page_content for doc in documents])
+        store = MatrixVectorStore(documents, doc_vectors, queries, query_vectors)
+
+        # 最も広い設定の候補をまとめてスコアリングしておけば、以降の設定はキャッシュだけで済む
+        widest = TwoStageRetrieval(
+            vectorstore=store, reranker=reranker, search_k=max_k, rerank_top_k=max(grid["RERANK_TOP_K"]),
+            score_threshold=max(grid["SCORE_THRESHOLD"]), rerank_distance_margin=RERANK_DISTANCE_MARGIN,
+        )
+        candidates = [widest._filter(store.similarity_search_with_score(q, k=max_k)) for q in queries]
+        pairs = sum(len(c) for c in candidates)
+        start = time.perf_counter()
+        if hasattr(reranker, "compress_documents_batch"):
+            reranker.compress_documents_batch(list(zip(candidates, queries)))
+        pair_ms = (time.perf_counter() - start) * 1000 / pairs if pairs else 0.0
+
+        for settings in retrieval_grid:
+            strategy = TwoStageRetrieval(
+                vectorstore=store,
+                reranker=reranker,
+                search_k=settings["SEARCH_K"],
+                rerank_top_k=settings["RERANK_TOP_K"],
+                score_threshold=settings["SCORE_THRESHOLD"],
+                rerank_distance_margin=RERANK_DISTANCE_MARGIN,
+            )
+            results = run_retrieval_evaluation(questions, SimpleNamespace(retrieval_strategy=strategy))
+            counts = [
+                len(strategy._filter(store.similarity_search_with_score(q, k=settings["SEARCH_K"])))
+                for q in queries
+            ]
+            rows.append({
+                **chunking, **settings, "chunks": len(documents),
+                **_summarize(results, counts, query_ms, pair_ms),
+            })
+    return rows
+
+
+def print_sweep_report(rows):
+    print("\n=== Sweep Report ===\n")
+    header = (
+        f"{'chunk':>6}{'overlap':>8}{'k':>4}{'top_k':>6}{'thr':>6}"
+        f"{'R@k':>8}{'MRR':>7}{'CtxRel':>8}{'cand':>6}{'est_ms':>8}{'p90_ms':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(
+            f"{row['CHUNK_SIZE']:>6}{row['CHUNK_OVERLAP']:>8}{row['SEARCH_K']:>4}"
+            f"{row['RERANK_TOP_K']:>6}{row['SCORE_THRESHOLD']:>6.2f}"
+            f"{row['retrieval_at_k'] * 100:>7.1f}%{row['mrr']:>7.3f}{row['context_relevance'] * 100:>7.1f}%"
+            f"{row['avg_candidates']:>6.1f}{row['est_latency_ms']:>8.1f}{row['est_latency_p90_ms']:>8.1f}"
+        )
+    if rows:
+        best = max(rows, key=lambda r: (r["retrieval_at_k"], r["mrr"], -r["est_latency_ms"]))
+        print(
+            f"\nBest: CHUNK_SIZE={best['CHUNK_SIZE']} CHUNK_OVERLAP={best['CHUNK_OVERLAP']}"
+            f" SEARCH_K={best['SEARCH_K']} RERANK_TOP_K={best['RERANK_TOP_K']}"
+            f" SCORE_THRESHOLD={best['SCORE_THRESHOLD']}"
+        )
+    print(f"\nConfigurations evaluated: {len(rows)}")
+    print("est_ms: クエリ埋め込み + 候補数 × cross-encoder 1 ペアの実測時間（DB 検索は含まない）")
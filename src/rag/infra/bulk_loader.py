@@ -0,0 +1,169 @@
+"""COPY ... FROM STDIN (FORMAT BINARY) による langchain_pg_embedding への一括投入。
+
+PGVector.add_embeddings は INSERT ... ON CONFLICT をバッチごとに発行するため、大量のチャンクでは
+書き込みが ingest 時間の大半を占める。ここではバイナリ COPY のストリームを直接組み立てて流し込む。
+"""
+from __future__ import annotations
+
+import json
+import struct
+import uuid
+from typing import List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import text
+
+from rag.core.config import COLLECTION_NAME, INGEST_COPY_FLUSH_ROWS
+from rag.infra.db import get_maintenance_engine
+from rag.infra.vector_index import COLLECTION_TABLE, EMBEDDING_TABLE
+
+STAGING_TABLE = "rag_copy_staging"
+COLUMNS = ("id", "collection_id", "embedding", "document", "cmetadata")
+
+COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+COPY_TRAILER = struct.pack("!h", -1)
+_FIELD_COUNT = struct.pack("!h", len(COLUMNS))
+_JSONB_VERSION = b"\x01"
+
+
+def _field(data: bytes) -> bytes:
+    return struct.pack("!i", len(data)) + data
+
+
+def encode_vector(vector: np.ndarray) -> bytes:
+    """pgvector の vector_recv 形式: int16 次元数, int16 予約, float4 × 次元数（ビッグエンディアン）。"""
+    return struct.pack("!hh", len(vector), 0) + np.asarray(vector, dtype=">f4").tobytes()
+
+
+def encode_row(doc_id: str, collection_id: uuid.UUID, vector, document: str, metadata: dict) -> bytes:
+    return b"".join((
+        _FIELD_COUNT,
+        _field(doc_id.encode("utf-8")),
+        _field(collection_id.bytes),
+        _field(encode_vector(vector)),
+        _field(document.encode("utf-8")),
+        _field(_JSONB_VERSION + json.dumps(metadata or {}, ensure_ascii=False).encode("utf-8")),
+    ))
+
+
+class CopyVectorLoader:
+    """vectorstore の add_documents / add_embeddings と同じ形で使えるバイナリ COPY ローダー。
+
+    行は flush_rows 件ずつまとめて 1 トランザクションで COPY する。upsert=True のときは一時テーブルに
+    COPY してから INSERT ... ON CONFLICT で反映する（差分 ingest 用）。with ブロックを抜けると残りを書き込む。
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        *,
+        engine=None,
+        collection_name: str = COLLECTION_NAME,
+        upsert: bool = True,
+        flush_rows: int = INGEST_COPY_FLUSH_ROWS,
+    ):
+        self.embeddings = embeddings
+        self._engine = engine
+        self.collection_name = collection_name
+        self.upsert = upsert
+        self.flush_rows = max(1, flush_rows)
+        self.rows_written = 0
+        self._collection_id: uuid.UUID | None = None
+        self._buffer: list[bytes] = []
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            # 大きなフラッシュが statement_timeout で打ち切られないよう、ingest 用の engine を使う
+            self._engine = get_maintenance_engine()
+        return self._engine
+
+    def _get_collection_id(self) -> uuid.UUID:
+        if self._collection_id is None:
+            with self.engine.connect() as conn:
+                value = conn.execute(
+                    text(f"SELECT uuid FROM {COLLECTION_TABLE} WHERE name = :name"),
+                    {"name": self.collection_name},
+                ).scalar()
+            if value is None:
+                raise ValueError(f"Collection not found: {self.collection_name!r}")
+            self._collection_id = value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+        return self._collection_id
+
+    def add_embeddings(
+        self,
+        texts: Sequence[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in texts]
+        metadatas = metadatas or [{} for _ in texts]
+        collection_id = self._get_collection_id()
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        self._buffer.extend(
+            encode_row(doc_id, collection_id, vector, text_, metadata)
+            for doc_id, vector, text_, metadata in zip(ids, vectors, texts, metadatas)
+        )
+        if len(self._buffer) >= self.flush_rows:
+            self.flush()
+        return ids
+
+    def add_documents(self, documents, ids: Optional[List[str]] = None) -> List[str]:
+        texts = [doc.page_content for doc in documents]
+        return self.add_embeddings(
+            texts,
+            self.embeddings.embed_documents(texts),
+            metadatas=[doc.metadata for doc in documents],
+            ids=ids,
+        )
+
+    def _copy_sql(self, table: str) -> str:
+        return f"COPY {table} ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT BINARY)"
+
+    def flush(self) -> int:
+        """バッファ中の行を COPY し、書き込んだ行数を返す。"""
+        if not self._buffer:
+            return 0
+        rows, self._buffer = self._buffer, []
+        raw = self.engine.raw_connection()
+        try:
+            with raw.driver_connection.cursor() as cur:
+                # 一括投入中の行は再実行で作り直せるので、コミットごとの WAL flush を待たない
+                cur.execute("SET LOCAL synchronous_commit TO OFF")
+                table = EMBEDDING_TABLE
+                if self.upsert:
+                    cur.execute(
+                        f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE}"
+                        f" (LIKE {EMBEDDING_TABLE} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+                    )
+                    table = STAGING_TABLE
+                with cur.copy(self._copy_sql(table)) as copy:
+                    copy.write(COPY_HEADER)
+                    for row in rows:
+                        copy.write(row)
+                    copy.write(COPY_TRAILER)
+                if self.upsert:
+                    cur.execute(
+                        f"INSERT INTO {EMBEDDING_TABLE} ({', '.join(COLUMNS)})"
+                        f" SELECT {', '.join(COLUMNS)} FROM {STAGING_TABLE}"
+                        " ON CONFLICT (id) DO UPDATE SET embedding = EXCLUDED.embedding,"
+                        " document = EXCLUDED.document, cmetadata = EXCLUDED.cmetadata"
+                    )
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+        self.rows_written += len(rows)
+        return len(rows)
+
+    def __enter__(self) -> "CopyVectorLoader":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.flush()
+        else:
+            self._buffer = []
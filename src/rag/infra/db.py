@@ -1,11 +1,144 @@
+import threading
+
 from langchain_postgres import PGVector
-from rag.core.config import CONNECTION_STRING, COLLECTION_NAME
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from rag.core.config import (
+    CONNECTION_STRING,
+    COLLECTION_NAME,
+    EMBED_DIM,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_STATEMENT_TIMEOUT_MS,
+    DB_PREPARE_THRESHOLD,
+)
+
+# プロセス内で共有する engine（= 接続プール）。検索用のストアと manifest はこれを使う
+_engine = None
+_async_engine = None
+# ingest / インデックス管理用（statement_timeout なし）
+_maintenance_engine = None
+_engine_lock = threading.Lock()
+
+
+def connect_options(statement_timeout: bool = True) -> str:
+    from rag.infra.vector_index import search_options
+    # hnsw.ef_search / ivfflat.probes / statement_timeout はセッション変数なので接続時に設定する
+    options = search_options()
+    if statement_timeout and DB_STATEMENT_TIMEOUT_MS > 0:
+        options += f" -c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    return options
+
+
+def engine_args(*, statement_timeout: bool = True) -> dict:
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+        "connect_args": {
+            "options": connect_options(statement_timeout),
+            # psycopg3 は同じ SQL を prepare_threshold 回実行するとサーバー側で prepare し、
+            # 以降は類似検索クエリの計画を再利用する。PgBouncer(transaction) 越しでは -1 で無効化
+            "prepare_threshold": DB_PREPARE_THRESHOLD if DB_PREPARE_THRESHOLD >= 0 else None,
+        },
+    }
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_engine(CONNECTION_STRING, **engine_args())
+    return _engine
+
+
+def get_maintenance_engine():
+    """ingest（COPY / 削除）とインデックス作成用の engine。
+
+    CREATE INDEX や全件 COPY は statement_timeout を超えうるので、検索用とは接続を分けてタイムアウトを付けない。
+    """
+    global _maintenance_engine
+    if _maintenance_engine is None:
+        with _engine_lock:
+            if _maintenance_engine is None:
+                _maintenance_engine = create_engine(CONNECTION_STRING, **engine_args(statement_timeout=False))
+    return _maintenance_engine
+
+
+def get_async_engine():
+    """非同期ストア用の engine。接続は最初に使ったイベントループに紐づく。"""
+    global _async_engine
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                _async_engine = create_async_engine(CONNECTION_STRING, **engine_args())
+    return _async_engine
+
+
+def _stats(pool) -> dict:
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        # QueuePool.overflow() は未使用分を負数で返す
+        "overflow": max(0, pool.overflow()),
+        "max_overflow": DB_MAX_OVERFLOW,
+    }
+
+
+def pool_stats() -> dict:
+    """生成済みの engine ごとの接続プール使用状況。"""
+    stats = {}
+    if _engine is not None:
+        stats["sync"] = _stats(_engine.pool)
+    if _async_engine is not None:
+        stats["async"] = _stats(_async_engine.pool)
+    if _maintenance_engine is not None:
+        stats["maintenance"] = _stats(_maintenance_engine.pool)
+    return stats
+
+
+def dispose_engine() -> None:
+    global _engine, _maintenance_engine
+    with _engine_lock:
+        engines = (_engine, _maintenance_engine)
+        _engine = _maintenance_engine = None
+    for engine in engines:
+        if engine is not None:
+            engine.dispose()
+
+
+async def dispose_async_engine() -> None:
+    global _async_engine
+    with _engine_lock:
+        engine, _async_engine = _async_engine, None
+    if engine is not None:
+        await engine.dispose()
+
+
+def create_vectorstore(embeddings, engine=None):
+    return PGVector(
+        embeddings=embeddings,
+        collection_name=COLLECTION_NAME,
+        connection=engine if engine is not None else get_engine(),
+        use_jsonb=True,
+        embedding_length=EMBED_DIM,
+    )
 
 
-def create_vectorstore(embeddings):
+def create_async_vectorstore(embeddings):
+    """asimilarity_search_with_score 用の PGVector（async engine / psycopg3 async）。"""
     return PGVector(
         embeddings=embeddings,
         collection_name=COLLECTION_NAME,
-        connection=CONNECTION_STRING,
+        connection=get_async_engine(),
         use_jsonb=True,
+        embedding_length=EMBED_DIM,
+        async_mode=True,
     )
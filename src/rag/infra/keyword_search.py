@@ -0,0 +1,114 @@
+"""pg_trgm によるキーワード検索（HybridRetrieval の 1st stage 用）。
+
+MiniLM の埋め込みは英語中心で、製品コードや「アカウント削除」のような日本語の完全一致語に弱い。
+ここではクエリから語を取り出し、langchain_pg_embedding.document に対する trigram の
+word_similarity で候補を順位付けする。索引は VectorIndexManager が ingest 後に作る。
+"""
+from __future__ import annotations
+
+import re
+from typing import List
+
+from langchain_core.documents import Document
+from sqlalchemy import text
+
+from rag.core.config import COLLECTION_NAME, HYBRID_KEYWORD_THRESHOLD
+from rag.infra.db import get_engine, get_async_engine
+from rag.infra.vector_index import COLLECTION_TABLE, EMBEDDING_TABLE
+
+# カタカナ・漢字・英数字の連続を 1 語とする（ひらがなは助詞・送り仮名として区切りに使う）
+_TERM_PATTERN = re.compile(r"[0-9A-Za-z゠-ヿ一-鿿０-９Ａ-Ｚａ-ｚ_\-]+")
+MAX_TERMS = 8
+MIN_TERM_LENGTH = 2
+
+# `<%` の閾値はトランザクション内だけで変更する
+_SET_THRESHOLD = text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)")
+
+
+def extract_terms(query: str, max_terms: int = MAX_TERMS) -> List[str]:
+    """クエリから検索語を取り出す（重複除去・出現順）。"""
+    terms = []
+    for term in _TERM_PATTERN.findall(query):
+        term = term.strip("_-")
+        if len(term) >= MIN_TERM_LENGTH and term not in terms:
+            terms.append(term)
+    return terms[:max_terms]
+
+
+def keyword_query_sql(n_terms: int) -> str:
+    """n_terms 個の語に対する検索 SQL。語ごとの `<%` を OR で結び、GIN(gin_trgm_ops) を BitmapOr で使わせる。"""
+    params = [f":t{i}" for i in range(n_terms)]
+    match = " OR ".join(f"{p} <% e.document" for p in params)
+    score = " + ".join(f"word_similarity({p}, e.document)" for p in params)
+    return (
+        f"SELECT e.id, e.document, e.cmetadata, {score} AS score"
+        f" FROM {EMBEDDING_TABLE} e JOIN {COLLECTION_TABLE} c ON e.collection_id = c.uuid"
+        f" WHERE c.name = :collection AND ({match})"
+        " ORDER BY score DESC LIMIT :k"
+    )
+
+
+class TrigramKeywordSearch:
+    """pg_trgm の word_similarity でチャンクを検索する。"""
+
+    def __init__(
+        self,
+        engine=None,
+        async_engine=None,
+        *,
+        collection_name: str = COLLECTION_NAME,
+        threshold: float = HYBRID_KEYWORD_THRESHOLD,
+    ):
+        self._engine = engine
+        self._async_engine = async_engine
+        self.collection_name = collection_name
+        self.threshold = threshold
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._engine = get_engine()
+        return self._engine
+
+    @property
+    def async_engine(self):
+        if self._async_engine is None:
+            self._async_engine = get_async_engine()
+        return self._async_engine
+
+    def _query(self, query: str, k: int):
+        terms = extract_terms(query)
+        if not terms:
+            return None
+        params = {f"t{i}": term for i, term in enumerate(terms)}
+        params.update(collection=self.collection_name, k=k)
+        return text(keyword_query_sql(len(terms))), params
+
+    @staticmethod
+    def _to_documents(rows) -> List[Document]:
+        return [
+            Document(id=row[0], page_content=row[1] or "", metadata=row[2] or {})
+            for row in rows
+        ]
+
+    def search(self, query: str, k: int) -> List[Document]:
+        statement = self._query(query, k)
+        if statement is None:
+            return []
+        with self.engine.begin() as conn:
+            conn.execute(_SET_THRESHOLD, {"threshold": str(self.threshold)})
+            rows = conn.execute(*statement).all()
+        return self._to_documents(rows)
+
+    async def asearch(self, query: str, k: int) -> List[Document]:
+        statement = self._query(query, k)
+        if statement is None:
+            return []
+        async with self.async_engine.begin() as conn:
+            await conn.execute(_SET_THRESHOLD, {"threshold": str(self.threshold)})
+            rows = (await conn.execute(*statement)).all()
+        return self._to_documents(rows)
+
+
+def create_keyword_search() -> TrigramKeywordSearch:
+    return TrigramKeywordSearch()
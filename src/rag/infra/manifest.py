@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import hashlib
+import uuid
+from dataclasses import dataclass
+
+from sqlalchemy import text
+
+from rag.core.config import COLLECTION_NAME
+from rag.infra.db import get_engine
+from rag.infra.vector_index import COLLECTION_TABLE, EMBEDDING_TABLE
+
+MANIFEST_TABLE = "rag_ingest_manifest"
+VERSION_TABLE = "rag_corpus_version"
+
+_CHUNK_ID_NAMESPACE = uuid.UUID("6f1c2a4e-3b8d-4f5a-9c7e-2d1b0a9e8f47")
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_id(source: str, chunk_index: int, collection_name: str = COLLECTION_NAME) -> str:
+    """(collection, source, chunk_index) から決定的なドキュメントIDを生成する。"""
+    return str(uuid.uuid5(_CHUNK_ID_NAMESPACE, f"{collection_name}:{source}:{chunk_index}"))
+
+
+@dataclass(frozen=True)
+class ManifestEntry:
+    source: str
+    chunk_index: int
+    content_hash: str
+    doc_id: str
+
+    @property
+    def key(self) -> tuple[str, int]:
+        return (self.source, self.chunk_index)
+
+
+class IngestManifest:
+    """チャンク単位の content hash を保持する manifest テーブル。差分 ingest に使う。"""
+
+    def __init__(self, engine=None, collection_name: str = COLLECTION_NAME):
+        self._engine = engine
+        self.collection_name = collection_name
+        self._table_ready = False
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._engine = get_engine()
+        return self._engine
+
+    def _ensure_table(self, conn) -> None:
+        if self._table_ready:
+            return
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} ("
+            " collection_name VARCHAR NOT NULL,"
+            " source VARCHAR NOT NULL,"
+            " chunk_index INTEGER NOT NULL,"
+            " content_hash CHAR(64) NOT NULL,"
+            " doc_id VARCHAR NOT NULL,"
+            " PRIMARY KEY (collection_name, source, chunk_index)"
+            ")"
+        ))
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} ("
+            " collection_name VARCHAR PRIMARY KEY,"
+            " version VARCHAR NOT NULL,"
+            " updated_at TIMESTAMPTZ NOT NULL DEFAULT now()"
+            ")"
+        ))
+        self._table_ready = True
+
+    def load(self) -> dict[tuple[str, int], ManifestEntry]:
+        with self.engine.begin() as conn:
+            self._ensure_table(conn)
+            rows = conn.execute(
+                text(
+                    f"SELECT source, chunk_index, content_hash, doc_id FROM {MANIFEST_TABLE}"
+                    " WHERE collection_name = :collection"
+                ),
+                {"collection": self.collection_name},
+            )
+            entries = [ManifestEntry(*row) for row in rows]
+        return {entry.key: entry for entry in entries}
+
+    def upsert(self, entries: list[ManifestEntry]) -> None:
+        if not entries:
+            return
+        params = [
+            {
+                "collection": self.collection_name,
+                "source": e.source,
+                "chunk_index": e.chunk_index,
+                "content_hash": e.content_hash,
+                "doc_id": e.doc_id,
+            }
+            for e in entries
+        ]
+        with self.engine.begin() as conn:
+            self._ensure_table(conn)
+            conn.execute(
+                text(
+                    f"INSERT INTO {MANIFEST_TABLE}"
+                    " (collection_name, source, chunk_index, content_hash, doc_id)"
+                    " VALUES (:collection, :source, :chunk_index, :content_hash, :doc_id)"
+                    " ON CONFLICT (collection_name, source, chunk_index)"
+                    " DO UPDATE SET content_hash = EXCLUDED.content_hash, doc_id = EXCLUDED.doc_id"
+                ),
+                params,
+            )
+
+    def delete(self, keys: list[tuple[str, int]]) -> None:
+        if not keys:
+            return
+        params = [
+            {"collection": self.collection_name, "source": source, "chunk_index": idx}
+            for source, idx in keys
+        ]
+        with self.engine.begin() as conn:
+            self._ensure_table(conn)
+            conn.execute(
+                text(
+                    f"DELETE FROM {MANIFEST_TABLE}"
+                    " WHERE collection_name = :collection"
+                    " AND source = :source AND chunk_index = :chunk_index"
+                ),
+                params,
+            )
+
+    def clear(self) -> None:
+        with self.engine.begin() as conn:
+            self._ensure_table(conn)
+            conn.execute(
+                text(f"DELETE FROM {MANIFEST_TABLE} WHERE collection_name = :collection"),
+                {"collection": self.collection_name},
+            )
+
+    def collection_has_documents(self) -> bool:
+        """コレクションに 1 件でもチャンクがあるか。PGVector のテーブルが未作成なら False。"""
+        with self.engine.connect() as conn:
+            if conn.execute(text(f"SELECT to_regclass('{EMBEDDING_TABLE}')")).scalar() is None:
+                return False
+            return conn.execute(
+                text(
+                    f"SELECT EXISTS (SELECT 1 FROM {EMBEDDING_TABLE} e"
+                    f" JOIN {COLLECTION_TABLE} c ON e.collection_id = c.uuid"
+                    " WHERE c.name = :collection)"
+                ),
+                {"collection": self.collection_name},
+            ).scalar()
+
+    def current_version(self) -> str:
+        """ingest ごとに更新されるコーパスのバージョン。未 ingest なら空文字。"""
+        with self.engine.begin() as conn:
+            self._ensure_table(conn)
+            row = conn.execute(
+                text(f"SELECT version FROM {VERSION_TABLE} WHERE collection_name = :collection"),
+                {"collection": self.collection_name},
+            ).fetchone()
+        return row[0] if row else ""
+
+    def bump_version(self) -> str:
+        version = uuid.uuid4().hex
+        with self.engine.begin() as conn:
+            self._ensure_table(conn)
+            conn.execute(
+                text(
+                    f"INSERT INTO {VERSION_TABLE} (collection_name, version)"
+                    " VALUES (:collection, :version)"
+                    " ON CONFLICT (collection_name)"
+                    " DO UPDATE SET version = EXCLUDED.version, updated_at = now()"
+                ),
+                {"collection": self.collection_name, "version": version},
+            )
+        return version
+
+
+def create_manifest() -> IngestManifest:
+    return IngestManifest(collection_name=COLLECTION_NAME)
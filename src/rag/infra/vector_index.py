@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import math
+import sys
+
+from sqlalchemy import text
+
+from rag.core.config import (
+    EMBED_DIM,
+    VECTOR_INDEX_TYPE,
+    VECTOR_INDEX_M,
+    VECTOR_INDEX_EF_CONSTRUCTION,
+    VECTOR_INDEX_EF_SEARCH,
+    VECTOR_INDEX_LISTS,
+    VECTOR_INDEX_PROBES,
+    RETRIEVAL_STRATEGY,
+)
+from rag.infra.db import get_maintenance_engine
+
+EMBEDDING_TABLE = "langchain_pg_embedding"
+COLLECTION_TABLE = "langchain_pg_collection"
+INDEX_NAME = "ix_langchain_pg_embedding_vector"
+# PGVector がテーブル作成時に作る metadata 用 GIN インデックス（一括投入中は外す）
+METADATA_INDEX_NAME = "ix_cmetadata_gin"
+# HybridRetrieval のキーワード検索（pg_trgm）用
+TRIGRAM_INDEX_NAME = "ix_langchain_pg_embedding_document_trgm"
+
+# PGVector の DistanceStrategy（値）→ pgvector の operator class
+OPERATOR_CLASSES = {
+    "cosine": "vector_cosine_ops",
+    "l2": "vector_l2_ops",
+    "inner": "vector_ip_ops",
+}
+INDEX_TYPES = ("hnsw", "ivfflat", "none")
+
+
+def ivfflat_lists(rows: int) -> int:
+    """pgvector 推奨値: 100万行までは rows/1000、それ以上は sqrt(rows)。"""
+    if rows <= 1_000_000:
+        return max(1, rows // 1000)
+    return int(math.sqrt(rows))
+
+
+def search_options(
+    ef_search: int = VECTOR_INDEX_EF_SEARCH, probes: int = VECTOR_INDEX_PROBES,
+) -> str:
+    """接続ごとに設定する検索パラメータ（libpq の options 形式）。"""
+    return f"-c hnsw.ef_search={ef_search} -c ivfflat.probes={probes}"
+
+
+class VectorIndexManager:
+    """langchain_pg_embedding.embedding の ANN インデックス（HNSW / IVFFlat）を管理する。
+
+    ANN インデックスには次元固定の列が必要なので、未指定なら vector(dim) に揃える。
+    一括投入中に外す metadata GIN / trigram インデックスもあわせて作り直す。
+    CREATE INDEX は大きなコレクションで数分かかるので、statement_timeout のない engine で実行する。
+    """
+
+    def __init__(
+        self,
+        engine=None,
+        *,
+        index_type: str = VECTOR_INDEX_TYPE,
+        distance: str = "cosine",
+        dimension: int = EMBED_DIM,
+        m: int = VECTOR_INDEX_M,
+        ef_construction: int = VECTOR_INDEX_EF_CONSTRUCTION,
+        lists: int = VECTOR_INDEX_LISTS,
+        keyword: bool = RETRIEVAL_STRATEGY == "hybrid",
+    ):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown vector index type: {index_type!r} (expected one of {INDEX_TYPES})")
+        if distance not in OPERATOR_CLASSES:
+            raise ValueError(f"Unknown distance: {distance!r} (expected one of {tuple(OPERATOR_CLASSES)})")
+        self._engine = engine
+        self.index_type = index_type
+        self.distance = distance
+        self.dimension = dimension
+        self.m = m
+        self.ef_construction = ef_construction
+        self.lists = lists
+        self.keyword = keyword
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._engine = get_maintenance_engine()
+        return self._engine
+
+    @property
+    def enabled(self) -> bool:
+        return self.index_type != "none"
+
+    def _ensure_dimension(self, conn) -> None:
+        typmod = conn.execute(text(
+            "SELECT atttypmod FROM pg_attribute"
+            f" WHERE attrelid = '{EMBEDDING_TABLE}'::regclass AND attname = 'embedding'"
+        )).scalar()
+        if typmod is not None and typmod < 0:
+            conn.execute(text(
+                f"ALTER TABLE {EMBEDDING_TABLE}"
+                f" ALTER COLUMN embedding TYPE vector({self.dimension})"
+            ))
+
+    def create_index_sql(self, rows: int = 0) -> str:
+        opclass = OPERATOR_CLASSES[self.distance]
+        if self.index_type == "hnsw":
+            params = f"m = {self.m}, ef_construction = {self.ef_construction}"
+        else:
+            params = f"lists = {self.lists or ivfflat_lists(rows)}"
+        return (
+            f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON {EMBEDDING_TABLE}"
+            f" USING {self.index_type} (embedding {opclass}) WITH ({params})"
+        )
+
+    def exists(self) -> bool:
+        with self.engine.connect() as conn:
+            return conn.execute(
+                text("SELECT 1 FROM pg_indexes WHERE indexname = :name"), {"name": INDEX_NAME},
+            ).first() is not None
+
+    def create(self) -> None:
+        with self.engine.begin() as conn:
+            if self.enabled:
+                self._ensure_dimension(conn)
+                rows = 0
+                if self.index_type == "ivfflat" and not self.lists:
+                    rows = conn.execute(text(f"SELECT count(*) FROM {EMBEDDING_TABLE}")).scalar() or 0
+                conn.execute(text(self.create_index_sql(rows)))
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {METADATA_INDEX_NAME} ON {EMBEDDING_TABLE}"
+                " USING gin (cmetadata jsonb_path_ops)"
+            ))
+            if self.keyword:
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX_NAME} ON {EMBEDDING_TABLE}"
+                    " USING gin (document gin_trgm_ops)"
+                ))
+            conn.execute(text(f"ANALYZE {EMBEDDING_TABLE}"))
+
+    def drop(self) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(text(f"DROP INDEX IF EXISTS {INDEX_NAME}"))
+            conn.execute(text(f"DROP INDEX IF EXISTS {METADATA_INDEX_NAME}"))
+            conn.execute(text(f"DROP INDEX IF EXISTS {TRIGRAM_INDEX_NAME}"))
+
+    def rebuild(self) -> None:
+        """IVFFlat のクラスタ中心はデータに依存するため、大きな変更後は作り直す。"""
+        self.drop()
+        self.create()
+
+
+def create_vector_index() -> VectorIndexManager:
+    return VectorIndexManager()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else "rebuild"
+    manager = create_vector_index()
+    if command == "rebuild":
+        manager.rebuild()
+        print(f"Rebuilt {manager.index_type} index {INDEX_NAME}")
+    elif command == "drop":
+        manager.drop()
+        print(f"Dropped index {INDEX_NAME}")
+    else:
+        raise SystemExit(f"Unknown command: {command!r} (expected 'rebuild' or 'drop')")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional, Protocol
+
+from rag.core.config import ANSWER_CACHE_BACKEND, ANSWER_CACHE_MAX_SIZE, ANSWER_CACHE_PATH
+
+# キャッシュするのは JSON 化できる結果フィールドのみ（Document は保存しない）
+CACHED_FIELDS = ("answer", "sources", "contexts")
+
+
+def normalize_query(query: str) -> str:
+    """全角/半角・大小文字・空白の揺れを吸収したキャッシュ用クエリ。"""
+    return " ".join(unicodedata.normalize("NFKC", query).lower().split())
+
+
+def answer_cache_key(query: str, corpus_version: str) -> str:
+    return hashlib.sha256(f"{corpus_version}\0{normalize_query(query)}".encode("utf-8")).hexdigest()
+
+
+class AnswerCacheProtocol(Protocol):
+    def get(self, key: str) -> Optional[dict]: ...
+
+    def set(self, key: str, value: dict) -> None: ...
+
+
+class LRUAnswerCache:
+    """プロセス内 LRU キャッシュ。"""
+
+    def __init__(self, max_size: int = ANSWER_CACHE_MAX_SIZE):
+        self.max_size = max_size
+        self._data: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: dict) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteAnswerCache:
+    """プロセスをまたいで共有できる SQLite キャッシュ。max_size を超えたら古い順に削除する。"""
+
+    def __init__(self, path: str | Path = ANSWER_CACHE_PATH, max_size: int = ANSWER_CACHE_MAX_SIZE):
+        self.path = Path(path)
+        self.max_size = max_size
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, last_access INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_answers_last_access ON answers (last_access)"
+            )
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM answers WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE answers SET last_access = ? WHERE key = ?", (time.time_ns(), key),
+            )
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def set(self, key: str, value: dict) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers (key, value, last_access) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), time.time_ns()),
+            )
+            self._conn.execute(
+                "DELETE FROM answers WHERE key IN ("
+                " SELECT key FROM answers ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_size,),
+            )
+            self._conn.commit()
+
+
+class CachedGraph:
+    """コンパイル済み RAG グラフの前段に置く回答キャッシュ。
+
+    キーは正規化クエリ + コーパスバージョン。ingest でバージョンが変わると自動的にミスになる。
+    読んだバージョンは入力の corpus_version としてグラフに渡し、グラフ内で読み直さない。
+    """
+
+    def __init__(self, graph, cache: AnswerCacheProtocol, version_provider: Callable[[], str]):
+        self.graph = graph
+        self.cache = cache
+        self.version_provider = version_provider
+
+    def _lookup(self, query: str, version: str) -> tuple[str, Optional[dict]]:
+        key = answer_cache_key(query, version)
+        cached = self.cache.get(key)
+        if cached is None:
+            return key, None
+        return key, {"query": query, **cached, "cached": True}
+
+    @staticmethod
+    def _with_version(input: dict, version: str) -> dict:
+        return {**input, "corpus_version": version}
+
+    def _store(self, key: str, result: dict) -> None:
+        self.cache.set(key, {field: result.get(field, []) for field in CACHED_FIELDS})
+
+    @staticmethod
+    def _cached_chunks(result: dict, stream_mode):
+        if not isinstance(stream_mode, (list, tuple)):
+            return [result] if stream_mode == "values" else []
+        return [("values", result)] if "values" in stream_mode else []
+
+    @staticmethod
+    def _values_of(chunk, stream_mode):
+        if not isinstance(stream_mode, (list, tuple)):
+            return chunk if stream_mode == "values" else None
+        return chunk[1] if chunk[0] == "values" else None
+
+    def invoke(self, input: dict, config=None, **kwargs) -> dict:
+        version = self.version_provider()
+        key, hit = self._lookup(input["query"], version)
+        if hit is not None:
+            return hit
+        result = self.graph.invoke(self._with_version(input, version), config, **kwargs)
+        self._store(key, result)
+        return result
+
+    async def ainvoke(self, input: dict, config=None, **kwargs) -> dict:
+        # バージョン取得は DB アクセスなのでイベントループを塞がないようにする
+        version = await asyncio.to_thread(self.version_provider)
+        key, hit = self._lookup(input["query"], version)
+        if hit is not None:
+            return hit
+        result = await self.graph.ainvoke(self._with_version(input, version), config, **kwargs)
+        self._store(key, result)
+        return result
+
+    def stream(self, input: dict, config=None, *, stream_mode="values", **kwargs):
+        """graph.stream の前段キャッシュ。ヒット時は最終 state のみを values として返す。"""
+        version = self.version_provider()
+        key, hit = self._lookup(input["query"], version)
+        if hit is not None:
+            yield from self._cached_chunks(hit, stream_mode)
+            return
+        final = None
+        for chunk in self.graph.stream(self._with_version(input, version), config, stream_mode=stream_mode, **kwargs):
+            final = self._values_of(chunk, stream_mode) or final
+            yield chunk
+        if final is not None:
+            self._store(key, final)
+
+    async def astream(self, input: dict, config=None, *, stream_mode="values", **kwargs):
+        version = await asyncio.to_thread(self.version_provider)
+        key, hit = self._lookup(input["query"], version)
+        if hit is not None:
+            for chunk in self._cached_chunks(hit, stream_mode):
+                yield chunk
+            return
+        final = None
+        async for chunk in self.graph.astream(self._with_version(input, version), config, stream_mode=stream_mode, **kwargs):
+            final = self._values_of(chunk, stream_mode) or final
+            yield chunk
+        if final is not None:
+            self._store(key, final)
+
+    def __getattr__(self, name):
+        return getattr(self.graph, name)
+
+
+def create_answer_cache(backend: str = ANSWER_CACHE_BACKEND) -> Optional[AnswerCacheProtocol]:
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return LRUAnswerCache(max_size=ANSWER_CACHE_MAX_SIZE)
+    if backend == "sqlite":
+        return SQLiteAnswerCache(path=ANSWER_CACHE_PATH, max_size=ANSWER_CACHE_MAX_SIZE)
+    raise ValueError(f"Unknown answer cache backend: {backend!r} (expected 'none', 'memory' or 'sqlite')")
@@ -1,8 +1,29 @@
+import asyncio
+import inspect
 from dataclasses import dataclass, field
-from typing import List
+from typing import Annotated, Dict, List
 from langchain_core.documents import Document
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langgraph.config import get_stream_writer
 from langgraph.graph import StateGraph, END
 
+from rag.pipeline.timing import TokenTimer, collect, merge_timings, stage
+
+# graph.stream(..., config={"configurable": {STREAM_TOKENS_KEY: True}}, stream_mode="custom")
+# で generate ノードが LLM のトークンを {"token": ...} として逐次送出する
+STREAM_TOKENS_KEY = "stream_tokens"
+# config={"configurable": {PROFILE_KEY: True}} で generate ノードがストリーミングで生成し、
+# prefill / decode の時間と生成トークン数を記録する（評価用）
+PROFILE_KEY = "profile"
+
+
+def _stream_tokens_enabled(config) -> bool:
+    return bool(config and config.get("configurable", {}).get(STREAM_TOKENS_KEY))
+
+
+def _profile_enabled(config) -> bool:
+    return bool(config and config.get("configurable", {}).get(PROFILE_KEY))
+
 
 @dataclass
 class RAGState:
@@ -12,62 +33,252 @@ class RAGState:
     prompt: str = ""
     answer: str = ""
     sources: List[str] = field(default_factory=list)
+    query_embedding: List[float] = field(default_factory=list)
+    cache_hit: bool = False
+    # リクエスト中に 1 度だけ読むコーパスバージョン（CachedGraph が入力に入れる。空なら lookup で読む）
+    corpus_version: str = ""
+    # ノード / ステージごとの処理時間（ns）。各ノードの更新がマージされる
+    timings: Annotated[Dict[str, int], merge_timings] = field(default_factory=dict)
+    generated_tokens: int = 0
+
+
+def _semantic_lookup_result(container, embedding, version) -> dict:
+    hit = container.semantic_cache.lookup(embedding, version)
+    if hit is None:
+        return {"query_embedding": embedding, "corpus_version": version}
+    value, _score = hit
+    return {"query_embedding": embedding, "corpus_version": version, "cache_hit": True, **value}
+
+
+def create_semantic_lookup(container):
+    def semantic_lookup(state: RAGState) -> dict:
+        embedding = container.embeddings.embed_query(state.query)
+        version = state.corpus_version or container.corpus_version()
+        return _semantic_lookup_result(container, embedding, version)
+    return semantic_lookup
+
+
+def create_asemantic_lookup(container):
+    async def asemantic_lookup(state: RAGState) -> dict:
+        embedding = await container.embeddings.aembed_query(state.query)
+        version = state.corpus_version or await asyncio.to_thread(container.corpus_version)
+        return _semantic_lookup_result(container, embedding, version)
+    return asemantic_lookup
+
+
+def create_semantic_store(container):
+    def semantic_store(state: RAGState) -> dict:
+        # 検索結果なしの回答はキャッシュしない（ingest 後に答えられる可能性があるため）
+        if state.cache_hit or not state.contexts or not state.query_embedding:
+            return {}
+        container.semantic_cache.add(
+            state.query_embedding,
+            {"answer": state.answer, "sources": state.sources, "contexts": state.contexts},
+            state.corpus_version or container.corpus_version(),
+        )
+        return {}
+    return semantic_store
+
+
+def route_after_lookup(state: RAGState) -> str:
+    return END if state.cache_hit else "retrieve"
+
+
+def _retrieve_kwargs(state: RAGState) -> dict:
+    # semantic_lookup で埋め込んだクエリをベクトル検索に渡し、同じクエリを 2 回埋め込まない
+    return {"embedding": state.query_embedding} if state.query_embedding else {}
 
 
 def create_retrieve(container):
     def retrieve(state: RAGState) -> dict:
-        docs = container.retrieval_strategy.retrieve(state.query)
+        docs = container.retrieval_strategy.retrieve(state.query, **_retrieve_kwargs(state))
         return {"reranked_documents": docs}
     return retrieve
 
 
+def create_aretrieve(container):
+    async def aretrieve(state: RAGState) -> dict:
+        docs = await container.retrieval_strategy.aretrieve(state.query, **_retrieve_kwargs(state))
+        return {"reranked_documents": docs}
+    return aretrieve
+
+
+NO_CONTEXT_RESULT = {
+    "contexts": [],
+    "prompt": "",
+    "answer": "該当する情報が見つかりませんでした。",
+    "sources": [],
+}
+
+
+def _contexts_and_sources(state: RAGState):
+    contexts = [doc.page_content for doc in state.reranked_documents]
+    sources = list(dict.fromkeys(
+        doc.metadata.get("source", "") for doc in state.reranked_documents
+    ))
+    return contexts, sources
+
+
 def create_generate(container):
-    def generate_node(state: RAGState) -> dict:
-        contexts = [doc.page_content for doc in state.reranked_documents]
-        sources = list(dict.fromkeys(
-            doc.metadata.get("source", "") for doc in state.reranked_documents
-        ))
+    def generate_node(state: RAGState, config: RunnableConfig = None) -> dict:
+        contexts, sources = _contexts_and_sources(state)
         if not contexts:
-            return {
-                "contexts": [],
-                "prompt": "",
-                "answer": "該当する情報が見つかりませんでした。",
-                "sources": [],
-            }
-        prompt = container.prompt_builder(state.query, contexts)
-        answer = container.llm.invoke(prompt)
+            return dict(NO_CONTEXT_RESULT)
+        with stage("prompt"):
+            prompt = container.prompt_builder(state.query, contexts)
+        generated_tokens = 0
+        if _stream_tokens_enabled(config) or _profile_enabled(config):
+            writer = get_stream_writer() if _stream_tokens_enabled(config) else None
+            timer = TokenTimer()
+            tokens = []
+            for token in container.llm.stream(prompt):
+                timer.tick()
+                if writer is not None:
+                    writer({"token": token})
+                tokens.append(token)
+            generated_tokens = timer.finish()
+            answer = "".join(tokens)
+        else:
+            with stage("llm"):
+                answer = container.llm.invoke(prompt)
         return {
             "contexts": contexts,
             "prompt": prompt,
             "answer": answer,
             "sources": sources,
+            "generated_tokens": generated_tokens,
         }
     return generate_node
 
 
-def build_rag_graph(*, container=None):
+def create_agenerate(container):
+    async def agenerate_node(state: RAGState, config: RunnableConfig = None) -> dict:
+        contexts, sources = _contexts_and_sources(state)
+        if not contexts:
+            return dict(NO_CONTEXT_RESULT)
+        with stage("prompt"):
+            prompt = container.prompt_builder(state.query, contexts)
+        generated_tokens = 0
+        if _stream_tokens_enabled(config) or _profile_enabled(config):
+            writer = get_stream_writer() if _stream_tokens_enabled(config) else None
+            timer = TokenTimer()
+            tokens = []
+            async for token in container.llm.astream(prompt):
+                timer.tick()
+                if writer is not None:
+                    writer({"token": token})
+                tokens.append(token)
+            generated_tokens = timer.finish()
+            answer = "".join(tokens)
+        else:
+            with stage("llm"):
+                answer = await container.llm.ainvoke(prompt)
+        return {
+            "contexts": contexts,
+            "prompt": prompt,
+            "answer": answer,
+            "sources": sources,
+            "generated_tokens": generated_tokens,
+        }
+    return agenerate_node
+
+
+def _timed(name: str, func):
+    """ノード関数を包み、ノード全体と内部の stage() の処理時間を {"timings": ...} として更新に加える。"""
+    takes_config = "config" in inspect.signature(func).parameters
+
+    if inspect.iscoroutinefunction(func):
+        async def atimed(state: RAGState, config: RunnableConfig = None) -> dict:
+            with collect(name) as timings:
+                update = await (func(state, config) if takes_config else func(state))
+            return {**update, "timings": timings}
+        return atimed
+
+    def timed(state: RAGState, config: RunnableConfig = None) -> dict:
+        with collect(name) as timings:
+            update = func(state, config) if takes_config else func(state)
+        return {**update, "timings": timings}
+    return timed
+
+
+def _node(name, sync_factory, async_factory, container):
+    # invoke/stream では同期版、ainvoke/astream では非同期版が呼ばれる
+    return RunnableLambda(
+        _timed(name, sync_factory(container)), afunc=_timed(name, async_factory(container)), name=name,
+    )
+
+
+def build_rag_graph(*, container=None, semantic_cache=True):
+    """semantic_cache=False ならコンテナにセマンティックキャッシュがあっても lookup / store ノードを置かない。"""
     if container is None:
         from rag.core.container import get_container
         container = get_container()
 
     workflow = StateGraph(RAGState)
-    workflow.add_node("retrieve", create_retrieve(container))
-    workflow.add_node("generate", create_generate(container))
-
-    workflow.set_entry_point("retrieve")
+    workflow.add_node("retrieve", _node("retrieve", create_retrieve, create_aretrieve, container))
+    workflow.add_node("generate", _node("generate", create_generate, create_agenerate, container))
     workflow.add_edge("retrieve", "generate")
-    workflow.add_edge("generate", END)
+
+    if not semantic_cache or container.semantic_cache is None:
+        workflow.set_entry_point("retrieve")
+        workflow.add_edge("generate", END)
+    else:
+        # 言い換えクエリがキャッシュにヒットすれば retrieve / generate (LLM) を丸ごと飛ばす
+        workflow.add_node(
+            "semantic_lookup",
+            _node("semantic_lookup", create_semantic_lookup, create_asemantic_lookup, container),
+        )
+        workflow.add_node("semantic_store", _timed("semantic_store", create_semantic_store(container)))
+        workflow.set_entry_point("semantic_lookup")
+        workflow.add_conditional_edges("semantic_lookup", route_after_lookup, ["retrieve", END])
+        workflow.add_edge("generate", "semantic_store")
+        workflow.add_edge("semantic_store", END)
 
     return workflow.compile()
 
 
-_graph = None
+def with_answer_cache(graph, container):
+    cache = container.answer_cache
+    if cache is None:
+        return graph
+    from rag.pipeline.answer_cache import CachedGraph
+    return CachedGraph(graph, cache, version_provider=container.corpus_version)
+
 
+def stream_answer(graph, query: str):
+    """トークンを ("token", str) で逐次返し、最後に ("result", 最終 state) を返す。"""
+    config = {"configurable": {STREAM_TOKENS_KEY: True}}
+    result = {}
+    for mode, chunk in graph.stream({"query": query}, config, stream_mode=["custom", "values"]):
+        if mode == "custom" and "token" in chunk:
+            yield "token", chunk["token"]
+        elif mode == "values":
+            result = chunk
+    yield "result", result
 
-def get_graph(*, container=None):
-    global _graph
-    if container is not None:
-        return build_rag_graph(container=container)
-    if _graph is None:
-        _graph = build_rag_graph()
-    return _graph
+
+async def astream_answer(graph, query: str):
+    """stream_answer の非同期版。"""
+    config = {"configurable": {STREAM_TOKENS_KEY: True}}
+    result = {}
+    async for mode, chunk in graph.astream({"query": query}, config, stream_mode=["custom", "values"]):
+        if mode == "custom" and "token" in chunk:
+            yield "token", chunk["token"]
+        elif mode == "values":
+            result = chunk
+    yield "result", result
+
+
+# container を省略した呼び出し用に、use_cache ごとに 1 つだけ組み立てて使い回す
+_graphs: Dict[bool, object] = {}
+
+
+def get_graph(*, container=None, use_cache=True):
+    if container is None:
+        if use_cache not in _graphs:
+            from rag.core.container import get_container
+            _graphs[use_cache] = get_graph(container=get_container(), use_cache=use_cache)
+        return _graphs[use_cache]
+    # use_cache=False は回答キャッシュもセマンティックキャッシュも通さない（評価用）
+    graph = build_rag_graph(container=container, semantic_cache=use_cache)
+    return with_answer_cache(graph, container) if use_cache else graph
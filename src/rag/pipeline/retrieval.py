@@ -1,10 +1,102 @@
 from __future__ import annotations
 
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional, Sequence
 from langchain_core.documents import Document
 
-from rag.core.interfaces import VectorStoreProtocol, RerankerProtocol
+from rag.core.interfaces import (
+    VectorStoreProtocol,
+    RerankerProtocol,
+    AsyncVectorStoreProtocol,
+    KeywordSearchProtocol,
+)
+from rag.pipeline.timing import stage
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _search_executor() -> ThreadPoolExecutor:
+    """ベクトル検索と並行してキーワード検索を流すためのスレッドプール（接続プールと同じ大きさ）。"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                from rag.core.config import DB_POOL_SIZE
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, DB_POOL_SIZE), thread_name_prefix="keyword-search",
+                )
+    return _executor
+
+
+def _doc_key(doc: Document):
+    return doc.id or doc.page_content
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Document]], k: int = 60) -> List[Document]:
+    """複数の順位リストを RRF（score = Σ 1 / (k + rank)）で 1 つに統合する。
+
+    同じチャンクは id（無ければ本文）で同一視し、最初に現れた Document を残す。
+    """
+    scores: dict = {}
+    docs: dict = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = _doc_key(doc)
+            docs.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    # 同点は先に現れた順（dict の挿入順）を保つ
+    ordered = sorted(scores, key=lambda key: -scores[key])
+    return [docs[key] for key in ordered]
+
+
+def vector_search(vectorstore, query: str, k: int, embedding=None) -> list:
+    """ベクトル検索。クエリの埋め込み済みベクトルがあれば by_vector 検索で再埋め込みを省く。"""
+    by_vector = getattr(vectorstore, "similarity_search_with_score_by_vector", None)
+    if embedding is not None and by_vector is not None:
+        return by_vector(embedding, k=k)
+    return vectorstore.similarity_search_with_score(query, k=k)
+
+
+async def avector_search(vectorstore, async_vectorstore, query: str, k: int, embedding=None) -> list:
+    """vector_search の非同期版。async_vectorstore が無ければ同期検索を executor で実行する。"""
+    if async_vectorstore is None:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, lambda: vector_search(vectorstore, query, k, embedding),
+        )
+    by_vector = getattr(async_vectorstore, "asimilarity_search_with_score_by_vector", None)
+    if embedding is not None and by_vector is not None:
+        return await by_vector(embedding, k=k)
+    return await async_vectorstore.asimilarity_search_with_score(query, k=k)
+
+
+def batch_vector_search(vectorstore, queries: Sequence[str], k: int) -> List[list]:
+    """複数クエリのベクトル検索。埋め込みは 1 回の embed_documents にまとめ、検索は接続プール分だけ並行に流す。
+
+    埋め込みモデルはクエリ / 文書で同じ変換（プレフィックスなし）なので embed_documents で代用できる。
+    by_vector 検索を持たないストアはクエリごとの検索を並行に実行する。
+    """
+    by_vector = getattr(vectorstore, "similarity_search_with_score_by_vector", None)
+    embeddings = getattr(vectorstore, "embeddings", None)
+    if by_vector is None or embeddings is None:
+        return list(_search_executor().map(
+            lambda query: vectorstore.similarity_search_with_score(query, k=k), queries,
+        ))
+    vectors = embeddings.embed_documents(list(queries))
+    return list(_search_executor().map(lambda vector: by_vector(vector, k=k), vectors))
+
+
+def batch_rerank(reranker, queries: Sequence[str], candidates: Sequence[List[Document]]) -> List[List[Document]]:
+    """全クエリの候補をまとめてリランクする（compress_documents_batch が無い reranker は 1 件ずつ）。"""
+    if hasattr(reranker, "compress_documents_batch"):
+        return reranker.compress_documents_batch(list(zip(candidates, queries)))
+    return [
+        (reranker.compress_documents(list(docs), query) or []) if docs else []
+        for query, docs in zip(queries, candidates)
+    ]
 
 
 @dataclass(frozen=True)
@@ -14,16 +106,169 @@ class TwoStageRetrieval:
     search_k: int
     rerank_top_k: int
     score_threshold: float = 0.5
+    # 1位との距離差がこの値を超える候補は cross-encoder に回さない（0 = 無効）
+    rerank_distance_margin: float = 0.0
+    # 非同期検索用のストア（PGVector async_mode）。None なら同期検索を executor で実行する
+    async_vectorstore: Optional[AsyncVectorStoreProtocol] = None
 
-    def retrieve(self, query: str) -> List[Document]:
+    def _filter(self, results) -> List[Document]:
+        kept = [(doc, score) for doc, score in results if score <= self.score_threshold]
+        if self.rerank_distance_margin > 0 and len(kept) > self.rerank_top_k:
+            # カスケード: 1st stage で大きく離された候補はリランクしても上位に来ないとみなす。
+            # ただし rerank_top_k 件は必ず残す
+            kept.sort(key=lambda x: x[1])
+            cutoff = kept[0][1] + self.rerank_distance_margin
+            kept = [
+                (doc, score) for i, (doc, score) in enumerate(kept)
+                if i < self.rerank_top_k or score <= cutoff
+            ]
+        return [doc for doc, _ in kept]
+
+    def retrieve(self, query: str, embedding=None) -> List[Document]:
         # 1st stage: vector search with score filtering
-        results = self.vectorstore.similarity_search_with_score(
-            query, k=self.search_k,
-        )
-        docs = [doc for doc, score in results if score <= self.score_threshold]
+        with stage("vector_search"):
+            results = vector_search(self.vectorstore, query, self.search_k, embedding)
+        docs = self._filter(results)
         if not docs:
             return []
 
         # 2nd stage: rerank
-        reranked = self.reranker.compress_documents(list(docs), query) or []
+        with stage("rerank"):
+            reranked = self.reranker.compress_documents(list(docs), query) or []
+        return list(reranked[: self.rerank_top_k])
+
+    def retrieve_batch(self, queries: Sequence[str]) -> List[List[Document]]:
+        """retrieve を複数クエリ分まとめて行う（評価用）。結果はクエリの順序で返す。"""
+        candidates = [self._filter(r) for r in batch_vector_search(self.vectorstore, queries, self.search_k)]
+        reranked = batch_rerank(self.reranker, queries, candidates)
+        return [list(docs[: self.rerank_top_k]) for docs in reranked]
+
+    async def aretrieve(self, query: str, embedding=None) -> List[Document]:
+        loop = asyncio.get_running_loop()
+        # 1st stage: DB 待ちの間はイベントループを他のリクエストに譲る
+        with stage("vector_search"):
+            results = await avector_search(
+                self.vectorstore, self.async_vectorstore, query, self.search_k, embedding,
+            )
+        docs = self._filter(results)
+        if not docs:
+            return []
+
+        # 2nd stage: cross-encoder は CPU バウンドなので executor に逃がす
+        with stage("rerank"):
+            reranked = await loop.run_in_executor(
+                None, self.reranker.compress_documents, list(docs), query,
+            ) or []
         return list(reranked[: self.rerank_top_k])
+
+
+@dataclass(frozen=True)
+class HybridRetrieval:
+    """ベクトル検索とキーワード検索（pg_trgm）を並行に実行し、RRF で統合してからリランクする。"""
+
+    vectorstore: VectorStoreProtocol
+    keyword_search: KeywordSearchProtocol
+    reranker: RerankerProtocol
+    search_k: int
+    rerank_top_k: int
+    score_threshold: float = 0.5
+    keyword_k: int = 20
+    rrf_k: int = 60
+    # 融合後、cross-encoder に回す件数
+    rerank_candidates: int = 10
+    async_vectorstore: Optional[AsyncVectorStoreProtocol] = None
+
+    def _fuse(self, vector_results, keyword_docs: List[Document]) -> List[Document]:
+        vector_docs = [doc for doc, score in vector_results if score <= self.score_threshold]
+        fused = reciprocal_rank_fusion([vector_docs, keyword_docs], k=self.rrf_k)
+        return fused[: self.rerank_candidates]
+
+    def retrieve(self, query: str, embedding=None) -> List[Document]:
+        # 1st stage: キーワード検索を別スレッドで流し、その間にベクトル検索を行う
+        keyword = _search_executor().submit(self.keyword_search.search, query, self.keyword_k)
+        with stage("vector_search"):
+            vector_results = vector_search(self.vectorstore, query, self.search_k, embedding)
+        # ベクトル検索より遅かった分だけがここで計上される
+        with stage("keyword_search"):
+            keyword_docs = keyword.result()
+        docs = self._fuse(vector_results, keyword_docs)
+        if not docs:
+            return []
+
+        # 2nd stage: rerank
+        with stage("rerank"):
+            reranked = self.reranker.compress_documents(list(docs), query) or []
+        return list(reranked[: self.rerank_top_k])
+
+    def retrieve_batch(self, queries: Sequence[str]) -> List[List[Document]]:
+        """retrieve を複数クエリ分まとめて行う（評価用）。結果はクエリの順序で返す。"""
+        keyword = [
+            _search_executor().submit(self.keyword_search.search, query, self.keyword_k)
+            for query in queries
+        ]
+        vector_results = batch_vector_search(self.vectorstore, queries, self.search_k)
+        candidates = [self._fuse(v, kw.result()) for v, kw in zip(vector_results, keyword)]
+        reranked = batch_rerank(self.reranker, queries, candidates)
+        return [list(docs[: self.rerank_top_k]) for docs in reranked]
+
+    async def _avector(self, query: str, embedding=None):
+        with stage("vector_search"):
+            return await avector_search(
+                self.vectorstore, self.async_vectorstore, query, self.search_k, embedding,
+            )
+
+    async def _akeyword(self, query: str) -> List[Document]:
+        with stage("keyword_search"):
+            if hasattr(self.keyword_search, "asearch"):
+                return await self.keyword_search.asearch(query, self.keyword_k)
+            return await asyncio.get_running_loop().run_in_executor(
+                None, self.keyword_search.search, query, self.keyword_k,
+            )
+
+    async def aretrieve(self, query: str, embedding=None) -> List[Document]:
+        vector_results, keyword_docs = await asyncio.gather(
+            self._avector(query, embedding), self._akeyword(query),
+        )
+        docs = self._fuse(vector_results, keyword_docs)
+        if not docs:
+            return []
+
+        with stage("rerank"):
+            reranked = await asyncio.get_running_loop().run_in_executor(
+                None, self.reranker.compress_documents, list(docs), query,
+            ) or []
+        return list(reranked[: self.rerank_top_k])
+
+
+@dataclass(frozen=True)
+class LexicalRetrieval:
+    """キーワード検索（BM25 など）の上位をそのままリランクする。DB を使わない最速経路。"""
+
+    keyword_search: KeywordSearchProtocol
+    reranker: RerankerProtocol
+    rerank_top_k: int
+    keyword_k: int = 20
+    rerank_candidates: int = 10
+
+    def retrieve(self, query: str, embedding=None) -> List[Document]:
+        # embedding はベクトル検索を使う戦略とシグネチャを揃えるためだけに受け取る
+        with stage("keyword_search"):
+            docs = self.keyword_search.search(query, self.keyword_k)[: self.rerank_candidates]
+        if not docs:
+            return []
+        with stage("rerank"):
+            reranked = self.reranker.compress_documents(list(docs), query) or []
+        return list(reranked[: self.rerank_top_k])
+
+    def retrieve_batch(self, queries: Sequence[str]) -> List[List[Document]]:
+        """retrieve を複数クエリ分まとめて行う（評価用）。結果はクエリの順序で返す。"""
+        candidates = [
+            self.keyword_search.search(query, self.keyword_k)[: self.rerank_candidates]
+            for query in queries
+        ]
+        reranked = batch_rerank(self.reranker, queries, candidates)
+        return [list(docs[: self.rerank_top_k]) for docs in reranked]
+
+    async def aretrieve(self, query: str, embedding=None) -> List[Document]:
+        # to_thread は contextvars を引き継ぐので、ステージ計測もそのまま記録される
+        return await asyncio.to_thread(self.retrieve, query)
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import threading
+from typing import Optional, Sequence
+
+import numpy as np
+
+from rag.core.config import SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES
+
+
+class SemanticCache:
+    """言い換えクエリ向けのセマンティックキャッシュ。
+
+    正規化済みクエリ埋め込みを NumPy 行列に保持し、内積（= cos 類似度）の最大値が
+    threshold 以上なら保存済みの回答を返す。満杯時は最も長く参照されていない行を上書きする。
+    コーパスバージョンが変わったら全件破棄する。
+    """
+
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+    ):
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries)
+        self._matrix: Optional[np.ndarray] = None
+        self._values: list[Optional[dict]] = []
+        self._last_access = np.zeros(self.max_entries, dtype=np.int64)
+        self._size = 0
+        self._clock = 0
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm > 0 else v
+
+    def _sync_version(self, version: str) -> None:
+        if version != self._version:
+            self._matrix = None
+            self._values = []
+            self._size = 0
+            self._version = version
+
+    def lookup(self, vector: Sequence[float], version: str) -> Optional[tuple[dict, float]]:
+        """最も近い既回答クエリの (値, 類似度)。閾値未満なら None。"""
+        with self._lock:
+            self._sync_version(version)
+            if self._size == 0:
+                return None
+            scores = self._matrix[: self._size] @ self._normalize(vector)
+            best = int(np.argmax(scores))
+            score = float(scores[best])
+            if score < self.threshold:
+                return None
+            self._clock += 1
+            self._last_access[best] = self._clock
+            return self._values[best], score
+
+    def add(self, vector: Sequence[float], value: dict, version: str) -> None:
+        with self._lock:
+            self._sync_version(version)
+            v = self._normalize(vector)
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_entries, v.shape[0]), dtype=np.float32)
+            if self._size < self.max_entries:
+                row = self._size
+                self._size += 1
+                self._values.append(value)
+            else:
+                row = int(np.argmin(self._last_access))
+                self._values[row] = value
+            self._matrix[row] = v
+            self._clock += 1
+            self._last_access[row] = self._clock
+
+    def __len__(self) -> int:
+        return self._size
+
+
+def create_semantic_cache(enabled: bool = SEMANTIC_CACHE_ENABLED) -> Optional[SemanticCache]:
+    if not enabled:
+        return None
+    return SemanticCache(threshold=SEMANTIC_CACHE_THRESHOLD, max_entries=SEMANTIC_CACHE_MAX_ENTRIES)
@@ -0,0 +1,88 @@
+"""パイプライン内の処理時間計測（perf_counter_ns）。
+
+グラフのノード実行中は contextvar に記録先の dict を置き、stage() で囲んだ区間の経過時間（ns）を
+加算する。ノードの外（記録先なし）で呼ばれた stage() は何もしない。
+ノードの更新には {"timings": {ステージ名: ns}} が入り、RAGState 側で dict としてマージされる。
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter_ns
+from typing import Dict, Optional
+
+_timings: ContextVar[Optional[Dict[str, int]]] = ContextVar("rag_timings", default=None)
+
+
+def merge_timings(left: Optional[dict], right: Optional[dict]) -> dict:
+    """RAGState.timings の reducer。ノードごとの計測結果を 1 つの dict にまとめる。"""
+    return {**(left or {}), **(right or {})}
+
+
+def record(name: str, elapsed_ns: int) -> None:
+    timings = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0) + elapsed_ns
+
+
+@contextmanager
+def stage(name: str):
+    if _timings.get() is None:
+        yield
+        return
+    start = perf_counter_ns()
+    try:
+        yield
+    finally:
+        record(name, perf_counter_ns() - start)
+
+
+@contextmanager
+def collect(name: str):
+    """ブロック内の stage() を集め、ブロック全体の時間を name として記録した dict を返す。"""
+    timings: Dict[str, int] = {}
+    token = _timings.set(timings)
+    start = perf_counter_ns()
+    try:
+        yield timings
+    finally:
+        timings[name] = perf_counter_ns() - start
+        _timings.reset(token)
+
+
+class TokenTimer:
+    """ストリーミング生成を prefill（最初のトークンが出るまで）と decode（それ以降）に分けて計測する。"""
+
+    def __init__(self):
+        self.start = perf_counter_ns()
+        self.first: Optional[int] = None
+        self.last: Optional[int] = None
+        self.tokens = 0
+
+    def tick(self) -> None:
+        now = perf_counter_ns()
+        if self.first is None:
+            self.first = now
+        self.last = now
+        self.tokens += 1
+
+    @property
+    def ttft(self) -> Optional[float]:
+        """time-to-first-token（秒）。トークンが出ていなければ None。"""
+        return None if self.first is None else (self.first - self.start) / 1e9
+
+    @property
+    def tokens_per_sec(self) -> Optional[float]:
+        # 1 トークン目までは prefill なので、デコード速度は 2 トークン目以降で測る
+        if self.tokens < 2:
+            return None
+        elapsed = self.last - self.first
+        return (self.tokens - 1) * 1e9 / elapsed if elapsed > 0 else None
+
+    def finish(self) -> int:
+        """prefill / decode を記録し、生成トークン数を返す。"""
+        end = perf_counter_ns()
+        first = self.first if self.first is not None else end
+        record("prefill", first - self.start)
+        record("decode", end - first)
+        return self.tokens
@@ -0,0 +1,254 @@
+"""常駐クエリサーバー。
+
+コンテナ（埋め込み / リランカー / LLM）を一度だけ構築してウォームな状態で保持し、
+HTTP/JSON で質問を受け付ける。`python -m rag.server` で起動する。
+グラフは専用スレッドのイベントループ上で ainvoke / astream され、DB 待ちの間に
+他リクエストのリランキングや生成（executor 上）を進められる。
+
+    POST /ask     {"query": "..."} -> {"answer", "sources", "contexts", "cached"}
+                  {"query": "...", "stream": true} -> NDJSON: {"token": ...} 行の後に {"result": {...}}
+    GET  /health  -> {"status": "ok"}
+    GET  /metrics -> {"db_pool": {"sync": {...}, "async": {...}}}
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import queue
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from rag.core.config import SERVER_HOST, SERVER_PORT
+from rag.infra.db import pool_stats, dispose_async_engine
+from rag.pipeline.graph import get_graph, astream_answer
+
+RESPONSE_FIELDS = ("answer", "sources", "contexts")
+
+
+async def aiter_in_thread(iterator, executor: Executor | None = None):
+    """同期イテレータを executor（既定はループの default executor）で回し、要素を非同期に受け取る。"""
+    loop = asyncio.get_running_loop()
+    items: asyncio.Queue = asyncio.Queue()
+
+    def produce():
+        try:
+            for item in iterator:
+                loop.call_soon_threadsafe(items.put_nowait, ("item", item))
+        except BaseException as e:
+            loop.call_soon_threadsafe(items.put_nowait, ("error", e))
+        else:
+            loop.call_soon_threadsafe(items.put_nowait, ("done", None))
+
+    producer = loop.run_in_executor(executor, produce)
+    while True:
+        kind, value = await items.get()
+        if kind == "item":
+            yield value
+        elif kind == "error":
+            await producer
+            raise value
+        else:
+            break
+    await producer
+
+
+class AsyncRunner:
+    """ハンドラースレッドからコルーチンを投入するための常駐イベントループ。"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def iterate(self, agen):
+        """非同期ジェネレーターを呼び出し元スレッドで同期的に消費する。"""
+        results: queue.Queue = queue.Queue()
+
+        async def pump():
+            try:
+                async for item in agen:
+                    results.put(("item", item))
+            except BaseException as e:
+                results.put(("error", e))
+            else:
+                results.put(("done", None))
+
+        asyncio.run_coroutine_threadsafe(pump(), self.loop)
+        while True:
+            kind, value = results.get()
+            if kind == "item":
+                yield value
+            elif kind == "error":
+                raise value
+            else:
+                return
+
+    def close(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+class SerializedLLM:
+    """llama.cpp のモデルはスレッドセーフではないため、生成呼び出しを直列化する。
+
+    非同期呼び出しは専用の 1 スレッド executor で実行する。順番待ちは executor のキューで行うので、
+    default executor（ベクトル検索・リランク用）のスレッドが LLM 待ちで塞がらない。
+    """
+
+    def __init__(self, llm):
+        self.llm = llm
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm")
+
+    def invoke(self, prompt: str) -> str:
+        with self._lock:
+            return self.llm.invoke(prompt)
+
+    def stream(self, prompt: str):
+        with self._lock:
+            yield from self.llm.stream(prompt)
+
+    async def ainvoke(self, prompt: str) -> str:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.invoke, prompt)
+
+    async def astream(self, prompt: str):
+        async for token in aiter_in_thread(self.stream(prompt), self._executor):
+            yield token
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+
+def to_response(result: dict) -> dict:
+    payload = {field: result.get(field, []) for field in RESPONSE_FIELDS}
+    payload["cached"] = bool(result.get("cached") or result.get("cache_hit"))
+    return payload
+
+
+def build_app():
+    """サーバー用のコンテナとグラフを構築し、モデルを先にロードしておく。"""
+    from rag.components.llm import create_llm
+    from rag.core.container import AppContainer
+
+    container = AppContainer(llm=SerializedLLM(create_llm()))
+    # 初回リクエストでのモデルロードを避けるため、ここで遅延プロパティを解決する
+    container.embeddings.embed_query("warmup")
+    container.reranker
+    container.retrieval_strategy
+    graph = get_graph(container=container)
+    return container, graph
+
+
+def make_handler(graph, runner: AsyncRunner):
+    class RAGRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send_json(self, status: int, payload: dict) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_json(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send_json(200, {"status": "ok"})
+            elif self.path == "/metrics":
+                self._send_json(200, {"db_pool": pool_stats()})
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/ask":
+                self._send_json(404, {"error": "not found"})
+                return
+            try:
+                body = self._read_json()
+                query = body.get("query")
+            except (ValueError, AttributeError):
+                self._send_json(400, {"error": "invalid JSON body"})
+                return
+            if not isinstance(query, str) or not query:
+                self._send_json(400, {"error": "'query' is required"})
+                return
+            if body.get("stream"):
+                self._stream_answer(query)
+                return
+            try:
+                result = runner.run(graph.ainvoke({"query": query}))
+            except Exception as e:
+                self._send_json(500, {"error": str(e)})
+                return
+            self._send_json(200, to_response(result))
+
+        def _stream_answer(self, query: str) -> None:
+            # 長さが事前に分からないので、接続を閉じてレスポンスの終端とする
+            self.close_connection = True
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+            self.send_header("Connection", "close")
+            self.end_headers()
+
+            def write_line(obj: dict) -> None:
+                self.wfile.write(json.dumps(obj, ensure_ascii=False).encode("utf-8") + b"\n")
+                self.wfile.flush()
+
+            try:
+                for kind, value in runner.iterate(astream_answer(graph, query)):
+                    if kind == "token":
+                        write_line({"token": value})
+                    else:
+                        write_line({"result": to_response(value)})
+            except Exception as e:
+                write_line({"error": str(e)})
+
+    return RAGRequestHandler
+
+
+class RAGServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, graph):
+        self.runner = AsyncRunner()
+        super().__init__(address, make_handler(graph, self.runner))
+
+    def server_close(self) -> None:
+        super().server_close()
+        # async engine の接続はこのループに紐づいているので、ループを止める前に閉じる
+        self.runner.run(dispose_async_engine())
+        self.runner.close()
+
+
+def create_server(graph, host: str = SERVER_HOST, port: int = SERVER_PORT) -> RAGServer:
+    return RAGServer((host, port), graph)
+
+
+def main():
+    print("Loading models...")
+    _, graph = build_app()
+    server = create_server(graph)
+    host, port = server.server_address[:2]
+    print(f"RAG server listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+from unittest.mock import MagicMock
+import pytest
+
+
+class TestNormalizeQuery:
+    def test_collapses_whitespace_and_case(self):
+        from rag.pipeline.answer_cache import normalize_query
+
+        assert normalize_query("  Hello   World ") == "hello world"
+
+    def test_nfkc_fullwidth(self):
+        from rag.pipeline.answer_cache import normalize_query
+
+        assert normalize_query("ＡＰＩ　料金") == normalize_query("API 料金")
+
+
+class TestAnswerCacheKey:
+    def test_same_for_equivalent_queries(self):
+        from rag.pipeline.answer_cache import answer_cache_key
+
+        assert answer_cache_key("料金は？", "v1") == answer_cache_key(" 料金は？ ", "v1")
+
+    def test_changes_with_corpus_version(self):
+        from rag.pipeline.answer_cache import answer_cache_key
+
+        assert answer_cache_key("料金は？", "v1") != answer_cache_key("料金は？", "v2")
+
+
+class TestLRUAnswerCache:
+    def test_get_set(self):
+        from rag.pipeline.answer_cache import LRUAnswerCache
+
+        cache = LRUAnswerCache(max_size=2)
+        cache.set("k", {"answer": "a"})
+        assert cache.get("k") == {"answer": "a"}
+        assert cache.get("missing") is None
+
+    def test_evicts_least_recently_used(self):
+        from rag.pipeline.answer_cache import LRUAnswerCache
+
+        cache = LRUAnswerCache(max_size=2)
+        cache.set("a", {})
+        cache.set("b", {})
+        cache.get("a")
+        cache.set("c", {})
+        assert cache.get("b") is None
+        assert cache.get("a") == {}
+        assert len(cache) == 2
+
+
+class TestSQLiteAnswerCache:
+    def test_roundtrip_and_persistence(self, tmp_path):
+        from rag.pipeline.answer_cache import SQLiteAnswerCache
+
+        path = tmp_path / "answers.sqlite3"
+        SQLiteAnswerCache(path, max_size=10).set("k", {"answer": "回答", "sources": ["s"]})
+        assert SQLiteAnswerCache(path, max_size=10).get("k") == {"answer": "回答", "sources": ["s"]}
+
+    def test_size_bounded(self, tmp_path):
+        from rag.pipeline.answer_cache import SQLiteAnswerCache
+
+        cache = SQLiteAnswerCache(tmp_path / "a.sqlite3", max_size=1)
+        cache.set("a", {})
+        cache.set("b", {})
+        assert cache.get("a") is None
+        assert cache.get("b") == {}
+
+
+class TestCachedGraph:
+    def _graph(self):
+        graph = MagicMock()
+        graph.invoke.return_value = {
+            "query": "q", "answer": "回答", "sources": ["s"], "contexts": ["c"],
+            "reranked_documents": [object()],
+        }
+        return graph
+
+    def test_miss_invokes_graph_and_stores(self):
+        from rag.pipeline.answer_cache import CachedGraph, LRUAnswerCache
+
+        graph = self._graph()
+        cached = CachedGraph(graph, LRUAnswerCache(), version_provider=lambda: "v1")
+        result = cached.invoke({"query": "q"})
+
+        graph.invoke.assert_called_once()
+        assert result["answer"] == "回答"
+
+    def test_hit_skips_graph(self):
+        from rag.pipeline.answer_cache import CachedGraph, LRUAnswerCache
+
+        graph = self._graph()
+        cached = CachedGraph(graph, LRUAnswerCache(), version_provider=lambda: "v1")
+        cached.invoke({"query": "q"})
+        result = cached.invoke({"query": " Q "})
+
+        graph.invoke.assert_called_once()
+        assert result == {"query": " Q ", "answer": "回答", "sources": ["s"], "contexts": ["c"], "cached": True}
+
+    def test_version_change_invalidates(self):
+        from rag.pipeline.answer_cache import CachedGraph, LRUAnswerCache
+
+        graph = self._graph()
+        versions = iter(["v1", "v2"])
+        cached = CachedGraph(graph, LRUAnswerCache(), version_provider=lambda: next(versions))
+        cached.invoke({"query": "q"})
+        cached.invoke({"query": "q"})
+
+        assert graph.invoke.call_count == 2
+
+    def test_delegates_other_attributes(self):
+        from rag.pipeline.answer_cache import CachedGraph, LRUAnswerCache
+
+        graph = self._graph()
+        cached = CachedGraph(graph, LRUAnswerCache(), version_provider=lambda: "v1")
+        assert cached.nodes is graph.nodes
+
+
+class TestCreateAnswerCache:
+    def test_none_backend(self):
+        from rag.pipeline.answer_cache import create_answer_cache
+
+        assert create_answer_cache("none") is None
+
+    def test_memory_backend(self):
+        from rag.pipeline.answer_cache import create_answer_cache, LRUAnswerCache
+
+        assert isinstance(create_answer_cache("memory"), LRUAnswerCache)
+
+    def test_unknown_backend_raises(self):
+        from rag.pipeline.answer_cache import create_answer_cache
+
+        with pytest.raises(ValueError):
+            create_answer_cache("redis")
+
+
+class TestCachedGraphStream:
+    def test_miss_passes_through_and_stores(self):
+        from rag.pipeline.answer_cache import CachedGraph, LRUAnswerCache
+
+        graph = MagicMock()
+        graph.stream.return_value = iter([
+            ("custom", {"token": "回答"}),
+            ("values", {"query": "q", "answer": "回答", "sources": ["s"], "contexts": ["c"]}),
+        ])
+        cache = LRUAnswerCache()
+        cached = CachedGraph(graph, cache, version_provider=lambda: "v1")
+        chunks = list(cached.stream({"query": "q"}, stream_mode=["custom", "values"]))
+
+        assert chunks[0] == ("custom", {"token": "回答"})
+        assert len(cache) == 1
+
+    def test_hit_yields_final_values_only(self):
+        from rag.pipeline.answer_cache import CachedGraph, LRUAnswerCache, answer_cache_key
+
+        graph = MagicMock()
+        cache = LRUAnswerCache()
+        cache.set(answer_cache_key("q", "v1"), {"answer": "回答", "sources": [], "contexts": []})
+        cached = CachedGraph(graph, cache, version_provider=lambda: "v1")
+        chunks = list(cached.stream({"query": "q"}, stream_mode=["custom", "values"]))
+
+        graph.stream.assert_not_called()
+        assert chunks == [("values", {"query": "q", "answer": "回答", "sources": [], "contexts": [], "cached": True})]
+
+
+class TestCachedGraphAsync:
+    def test_ainvoke_miss_then_hit(self):
+        import asyncio
+        from unittest.mock import AsyncMock
+        from rag.pipeline.answer_cache import CachedGraph, LRUAnswerCache
+
+        graph = MagicMock()
+        graph.ainvoke = AsyncMock(return_value={"answer": "回答", "sources": [], "contexts": []})
+        cached = CachedGraph(graph, LRUAnswerCache(), version_provider=lambda: "v1")
+
+        asyncio.run(cached.ainvoke({"query": "q"}))
+        result = asyncio.run(cached.ainvoke({"query": "q"}))
+
+        graph.ainvoke.assert_awaited_once()
+        assert result["cached"] is True
+
+    def test_astream_stores_final_values(self):
+        import asyncio
+        from rag.pipeline.answer_cache import CachedGraph, LRUAnswerCache
+
+        async def astream(*args, **kwargs):
+            yield ("custom", {"token": "回答"})
+            yield ("values", {"answer": "回答", "sources": [], "contexts": []})
+
+        graph = MagicMock()
+        graph.astream = astream
+        cache = LRUAnswerCache()
+        cached = CachedGraph(graph, cache, version_provider=lambda: "v1")
+
+        async def collect():
+            return [c async for c in cached.astream({"query": "q"}, stream_mode=["custom", "values"])]
+
+        assert len(asyncio.run(collect())) == 2
+        assert len(cache) == 1
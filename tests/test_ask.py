@@ -3,33 +3,40 @@ import sys
 import pytest
 
 
+@pytest.fixture(autouse=True)
+def no_server():
+    """既存テストはサーバー未起動（ローカル実行）を前提とする。"""
+    with patch("cli.ask._ask_server", return_value=None) as mock:
+        yield mock
+
+
 class TestMain:
     @patch("builtins.print")
-    @patch("cli.ask.get_container")
-    @patch("cli.ask.get_graph")
+    @patch("rag.core.container.get_container")
+    @patch("rag.pipeline.graph.get_graph")
     @patch("cli.ask.sys")
-    def test_uses_graph_invoke(self, mock_sys, mock_get_graph, mock_get_container, mock_print):
+    def test_uses_graph_stream(self, mock_sys, mock_get_graph, mock_get_container, mock_print):
         mock_sys.argv = ["ask.py", "質問テスト"]
-        mock_get_graph.return_value.invoke.return_value = {
+        mock_get_graph.return_value.stream.return_value = [("values", {
             "answer": "回答テスト",
             "sources": ["doc.pdf:p1", "data.csv:r1"],
-        }
+        })]
         from cli.ask import main
 
         main()
 
-        mock_get_graph.return_value.invoke.assert_called_once_with({"query": "質問テスト"})
+        assert mock_get_graph.return_value.stream.call_args[0][0] == {"query": "質問テスト"}
 
     @patch("builtins.print")
-    @patch("cli.ask.get_container")
-    @patch("cli.ask.get_graph")
+    @patch("rag.core.container.get_container")
+    @patch("rag.pipeline.graph.get_graph")
     @patch("cli.ask.sys")
     def test_prints_answer(self, mock_sys, mock_get_graph, mock_get_container, mock_print):
         mock_sys.argv = ["ask.py", "テスト"]
-        mock_get_graph.return_value.invoke.return_value = {
+        mock_get_graph.return_value.stream.return_value = [("values", {
             "answer": "回答テスト",
             "sources": ["doc.pdf:p1"],
-        }
+        })]
         from cli.ask import main
 
         main()
@@ -38,15 +45,15 @@ class TestMain:
         assert "回答テスト" in printed
 
     @patch("builtins.print")
-    @patch("cli.ask.get_container")
-    @patch("cli.ask.get_graph")
+    @patch("rag.core.container.get_container")
+    @patch("rag.pipeline.graph.get_graph")
     @patch("cli.ask.sys")
     def test_prints_sources(self, mock_sys, mock_get_graph, mock_get_container, mock_print):
         mock_sys.argv = ["ask.py", "テスト"]
-        mock_get_graph.return_value.invoke.return_value = {
+        mock_get_graph.return_value.stream.return_value = [("values", {
             "answer": "回答テスト",
             "sources": ["doc.pdf:p1", "data.csv:r1"],
-        }
+        })]
         from cli.ask import main
 
         main()
@@ -57,31 +64,31 @@ class TestMain:
         assert "data.csv:r1" in printed
 
     @patch("builtins.print")
-    @patch("cli.ask.get_container")
-    @patch("cli.ask.get_graph")
+    @patch("rag.core.container.get_container")
+    @patch("rag.pipeline.graph.get_graph")
     @patch("cli.ask.sys")
     def test_passes_query_from_argv(self, mock_sys, mock_get_graph, mock_get_container, mock_print):
         mock_sys.argv = ["ask.py", "テスト質問"]
-        mock_get_graph.return_value.invoke.return_value = {
+        mock_get_graph.return_value.stream.return_value = [("values", {
             "answer": "回答",
             "sources": [],
-        }
+        })]
         from cli.ask import main
 
         main()
 
-        mock_get_graph.return_value.invoke.assert_called_once_with({"query": "テスト質問"})
+        assert mock_get_graph.return_value.stream.call_args[0][0] == {"query": "テスト質問"}
 
     @patch("builtins.print")
-    @patch("cli.ask.get_container")
-    @patch("cli.ask.get_graph")
+    @patch("rag.core.container.get_container")
+    @patch("rag.pipeline.graph.get_graph")
     @patch("cli.ask.sys")
     def test_prints_answer_and_sources_sections(self, mock_sys, mock_get_graph, mock_get_container, mock_print):
         mock_sys.argv = ["ask.py", "テスト"]
-        mock_get_graph.return_value.invoke.return_value = {
+        mock_get_graph.return_value.stream.return_value = [("values", {
             "answer": "回答テスト",
             "sources": ["doc.pdf:p1"],
-        }
+        })]
         from cli.ask import main
 
         main()
@@ -101,15 +108,15 @@ class TestMainEdgeCases:
             main()
 
     @patch("builtins.print")
-    @patch("cli.ask.get_container")
-    @patch("cli.ask.get_graph")
+    @patch("rag.core.container.get_container")
+    @patch("rag.pipeline.graph.get_graph")
     @patch("cli.ask.sys")
     def test_main_empty_sources(self, mock_sys, mock_get_graph, mock_get_container, mock_print):
         mock_sys.argv = ["ask.py", "テスト"]
-        mock_get_graph.return_value.invoke.return_value = {
+        mock_get_graph.return_value.stream.return_value = [("values", {
             "answer": "回答",
             "sources": [],
-        }
+        })]
         from cli.ask import main
 
         main()
@@ -117,15 +124,110 @@ class TestMainEdgeCases:
         assert "回答" in printed
 
     @patch("builtins.print")
-    @patch("cli.ask.get_container")
-    @patch("cli.ask.get_graph")
+    @patch("rag.core.container.get_container")
+    @patch("rag.pipeline.graph.get_graph")
     @patch("cli.ask.sys")
     def test_main_missing_sources_key(self, mock_sys, mock_get_graph, mock_get_container, mock_print):
         mock_sys.argv = ["ask.py", "テスト"]
-        mock_get_graph.return_value.invoke.return_value = {
+        mock_get_graph.return_value.stream.return_value = [("values", {
             "answer": "回答",
             # "sources" キーなし → .get() で [] がデフォルト
-        }
+        })]
         from cli.ask import main
 
         main()  # クラッシュしない
+
+
+class TestServerClient:
+    @patch("builtins.print")
+    @patch("rag.pipeline.graph.get_graph")
+    @patch("cli.ask.sys")
+    def test_uses_server_when_running(self, mock_sys, mock_get_graph, mock_print, no_server):
+        mock_sys.argv = ["ask.py", "テスト"]
+        no_server.return_value = {"answer": "サーバー回答", "sources": ["doc.pdf:p1"]}
+        from cli.ask import main
+
+        main()
+
+        assert no_server.call_args[0][0] == "テスト"
+        mock_get_graph.assert_not_called()
+        printed = " ".join(str(c) for c in mock_print.call_args_list)
+        assert "サーバー回答" in printed
+
+
+class TestStreaming:
+    @patch("builtins.print")
+    @patch("rag.core.container.get_container")
+    @patch("rag.pipeline.graph.get_graph")
+    @patch("cli.ask.sys")
+    def test_requests_token_stream(self, mock_sys, mock_get_graph, mock_get_container, mock_print):
+        mock_sys.argv = ["ask.py", "テスト"]
+        mock_get_graph.return_value.stream.return_value = [("values", {"answer": "a", "sources": []})]
+        from cli.ask import main
+
+        main()
+
+        kwargs = mock_get_graph.return_value.stream.call_args
+        assert kwargs[0][1] == {"configurable": {"stream_tokens": True}}
+        assert kwargs[1]["stream_mode"] == ["custom", "values"]
+
+    @patch("builtins.print")
+    @patch("rag.core.container.get_container")
+    @patch("rag.pipeline.graph.get_graph")
+    @patch("cli.ask.sys")
+    def test_prints_tokens_as_they_arrive(self, mock_sys, mock_get_graph, mock_get_container, mock_print):
+        mock_sys.argv = ["ask.py", "テスト"]
+        mock_get_graph.return_value.stream.return_value = [
+            ("custom", {"token": "回"}),
+            ("custom", {"token": "答"}),
+            ("values", {"answer": "回答", "sources": []}),
+        ]
+        from cli.ask import main
+
+        main()
+
+        printed = [c.args[0] for c in mock_print.call_args_list if c.args]
+        assert "回" in printed
+        assert "答" in printed
+        # ストリーム済みなので最終回答は重複表示しない
+        assert "回答" not in printed
+        assert any("TTFT" in str(p) and "tok/s" in str(p) for p in printed)
+
+
+class TestSummary:
+    @patch("cli.ask.perf_counter_ns", return_value=3_000_000_000)
+    @patch("rag.pipeline.timing.perf_counter_ns")
+    def test_ttft_and_tokens_per_sec(self, mock_timer_ns, mock_now):
+        from cli.ask import _summary
+        from rag.pipeline.timing import TokenTimer
+
+        mock_timer_ns.side_effect = [0, 1_000_000_000, 1_500_000_000, 2_000_000_000]
+        timer = TokenTimer()
+        for _ in range(3):
+            timer.tick()
+
+        assert _summary(timer) == "TTFT 1.00s / 3 tokens / 2.0 tok/s / total 3.00s"
+
+    def test_no_tokens(self):
+        from cli.ask import _summary
+        from rag.pipeline.timing import TokenTimer
+
+        summary = _summary(TokenTimer())
+        assert "TTFT" not in summary and summary.startswith("total ")
+
+
+class TestStartupImports:
+    def test_server_path_does_not_import_graph(self):
+        import os
+        import subprocess
+        from pathlib import Path
+
+        src = Path(__file__).resolve().parents[1] / "src"
+        code = (
+            "import sys; import cli.ask; "
+            "print(any(m in sys.modules for m in ('rag.pipeline.graph', 'rag.core.container', 'langgraph')))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], env={**os.environ, "PYTHONPATH": str(src)}, capture_output=True, text=True, check=True,
+        )
+        assert result.stdout.strip() == "False"
@@ -0,0 +1,166 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+from langchain_core.documents import Document
+
+
+def _run_concurrently(fn, args_list):
+    results = [None] * len(args_list)
+    barrier = threading.Barrier(len(args_list))
+
+    def worker(i, args):
+        barrier.wait()
+        results[i] = fn(*args)
+
+    threads = [threading.Thread(target=worker, args=(i, a)) for i, a in enumerate(args_list)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+class TestMicroBatcher:
+    def test_single_submit(self):
+        from rag.components.batching import MicroBatcher
+
+        batcher = MicroBatcher(lambda items: [x * 2 for x in items], max_wait_ms=0)
+        assert batcher.submit([1, 2, 3]) == [2, 4, 6]
+
+    def test_empty_submit_skips_fn(self):
+        from rag.components.batching import MicroBatcher
+
+        fn = MagicMock()
+        assert MicroBatcher(fn).submit([]) == []
+        fn.assert_not_called()
+
+    def test_concurrent_requests_coalesced(self):
+        from rag.components.batching import MicroBatcher
+
+        calls = []
+
+        def fn(items):
+            calls.append(list(items))
+            return [x * 10 for x in items]
+
+        batcher = MicroBatcher(fn, max_batch_size=4, max_wait_ms=500)
+        results = _run_concurrently(batcher.submit, [([i, i + 100],) for i in range(4)])
+
+        assert len(calls) == 1
+        assert sorted(calls[0]) == sorted([0, 100, 1, 101, 2, 102, 3, 103])
+        for i, result in enumerate(results):
+            assert result == [i * 10, (i + 100) * 10]
+
+    def test_max_batch_size_splits_batches(self):
+        from rag.components.batching import MicroBatcher
+
+        calls = []
+
+        def fn(items):
+            calls.append(len(items))
+            return items
+
+        batcher = MicroBatcher(fn, max_batch_size=2, max_wait_ms=200)
+        results = _run_concurrently(batcher.submit, [([i],) for i in range(4)])
+
+        assert results == [[0], [1], [2], [3]]
+        assert all(n <= 2 for n in calls)
+        assert batcher.requests == 4
+
+    def test_exception_propagates_to_all_waiters(self):
+        from rag.components.batching import MicroBatcher
+
+        def fn(items):
+            raise RuntimeError("model error")
+
+        batcher = MicroBatcher(fn, max_wait_ms=0)
+        with pytest.raises(RuntimeError, match="model error"):
+            batcher.submit([1])
+        # ワーカーは例外後も生きている
+        batcher.fn = lambda items: items
+        assert batcher.submit([1]) == [1]
+
+
+class TestBatchingEmbeddings:
+    def test_embed_query_uses_batched_embed_documents(self):
+        from rag.components.batching import BatchingEmbeddings, MicroBatcher
+
+        base = MagicMock()
+        base.embed_documents.side_effect = lambda texts: [[float(len(t))] for t in texts]
+        embeddings = BatchingEmbeddings(base, MicroBatcher(base.embed_documents, max_wait_ms=300))
+
+        results = _run_concurrently(embeddings.embed_query, [("a",), ("bb",), ("ccc",)])
+
+        assert results == [[1.0], [2.0], [3.0]]
+        base.embed_documents.assert_called_once()
+        base.embed_query.assert_not_called()
+
+    def test_embed_documents_passthrough(self):
+        from rag.components.batching import BatchingEmbeddings
+
+        base = MagicMock()
+        base.embed_documents.return_value = [[1.0]]
+        assert BatchingEmbeddings(base).embed_documents(["x"]) == [[1.0]]
+
+
+class TestBatchingReranker:
+    def _reranker(self, top_n=2):
+        from rag.components.reranker import CrossEncoderReranker
+
+        with patch("rag.components.reranker.HuggingFaceCrossEncoder") as mock_hf:
+            mock_hf.return_value.score.side_effect = lambda pairs: [float(len(p[1])) for p in pairs]
+            reranker = CrossEncoderReranker(top_n=top_n)
+        return reranker
+
+    def test_coalesces_pairs_across_queries(self):
+        from rag.components.batching import BatchingReranker, MicroBatcher
+
+        reranker = self._reranker()
+        batching = BatchingReranker(reranker, MicroBatcher(reranker.score, max_wait_ms=300))
+        docs_a = [Document(page_content=t) for t in ["a", "aaa", "aa"]]
+        docs_b = [Document(page_content=t) for t in ["bbbb", "b"]]
+
+        results = _run_concurrently(batching.compress_documents, [(docs_a, "qa"), (docs_b, "qb")])
+
+        reranker._model.score.assert_called_once()
+        assert len(reranker._model.score.call_args[0][0]) == 5
+        assert [d.page_content for d in results[0]] == ["aaa", "aa"]
+        assert [d.page_content for d in results[1]] == ["bbbb", "b"]
+
+    def test_matches_unbatched(self):
+        from rag.components.batching import BatchingReranker
+
+        reranker = self._reranker()
+        docs = [Document(page_content=t) for t in ["x", "xxx", "xx", "xxxx"]]
+        assert BatchingReranker(reranker).compress_documents(docs, "q") == reranker.compress_documents(docs, "q")
+
+    def test_batch_call_bypasses_batcher(self):
+        from rag.components.batching import BatchingReranker
+
+        reranker = self._reranker(top_n=1)
+        batcher = MagicMock()
+        docs = [Document(page_content=t) for t in ["x", "xxx"]]
+
+        result = BatchingReranker(reranker, batcher).compress_documents_batch([(docs, "q")])
+
+        assert result == [[docs[1]]]
+        batcher.submit.assert_not_called()
+
+    def test_cached_pairs_not_resubmitted(self):
+        from rag.components.batching import BatchingReranker
+        from rag.components.reranker import ScoreCache
+
+        reranker = self._reranker()
+        reranker.score_cache = ScoreCache()
+        batching = BatchingReranker(reranker)
+        docs = [Document(page_content=t, id=t) for t in ["x", "xx"]]
+        batching.compress_documents(docs, "q")
+        batching.compress_documents(docs, "q")
+
+        reranker._model.score.assert_called_once()
+
+    def test_empty_documents(self):
+        from rag.components.batching import BatchingReranker
+
+        assert BatchingReranker(self._reranker()).compress_documents([], "q") == []
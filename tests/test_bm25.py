@@ -0,0 +1,196 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+
+def _builder(docs, path):
+    from rag.components.bm25 import BM25Builder
+
+    builder = BM25Builder(path, ngram=2, k1=1.2, b=0.75)
+    for doc_id, text, metadata in docs:
+        builder.add(doc_id, text, metadata)
+    return builder
+
+
+DOCS = [
+    ("id1", "アカウント削除は設定画面から行えます", {"source": "faq.csv:r1"}),
+    ("id2", "料金プランの変更について", {"source": "faq.csv:r2"}),
+    ("id3", "アカウントの作成方法", {"source": "faq.csv:r3"}),
+    ("id4", "型番 AB-1234 の保証期間は1年です", {"source": "faq.csv:r4"}),
+]
+
+
+class TestTokenize:
+    def test_japanese_bigrams(self):
+        from rag.components.bm25 import tokenize
+
+        assert tokenize("削除方法", ngram=2) == ["削除", "除方", "方法"]
+
+    def test_ascii_words_are_whole_tokens(self):
+        from rag.components.bm25 import tokenize
+
+        assert tokenize("Model AB-1234", ngram=2) == ["model", "ab", "1234"]
+
+    def test_nfkc_normalizes_full_width(self):
+        from rag.components.bm25 import tokenize
+
+        assert tokenize("ＡＢ１２", ngram=2) == tokenize("ab12", ngram=2)
+
+    def test_short_run_kept_as_is(self):
+        from rag.components.bm25 import tokenize
+
+        assert tokenize("料、金", ngram=2) == ["料", "金"]
+
+    def test_punctuation_dropped(self):
+        from rag.components.bm25 import tokenize
+
+        assert tokenize("？！。", ngram=2) == []
+
+
+class TestBM25Builder:
+    def test_csr_layout(self, tmp_path):
+        data = _builder(DOCS, tmp_path / "bm25").arrays()
+
+        assert np.all(np.diff(data["terms"].astype(np.float64)) > 0)
+        assert data["offsets"][0] == 0
+        assert data["offsets"][-1] == len(data["doc_ids"]) == len(data["weights"])
+        assert data["meta"]["num_docs"] == 4
+
+    def test_postings_sorted_by_doc(self, tmp_path):
+        data = _builder(DOCS, tmp_path / "bm25").arrays()
+        offsets, doc_ids = data["offsets"], data["doc_ids"]
+
+        for start, end in zip(offsets[:-1], offsets[1:]):
+            assert np.all(np.diff(doc_ids[start:end]) > 0)
+
+    def test_weight_matches_bm25_formula(self, tmp_path):
+        from rag.components.bm25 import term_hash
+
+        builder = _builder([("a", "aa bb", {}), ("b", "aa aa aa cc", {})], tmp_path / "bm25")
+        data = builder.arrays()
+        term = np.searchsorted(data["terms"], np.uint64(term_hash("cc")))
+        start, end = data["offsets"][term], data["offsets"][term + 1]
+
+        n, df, tf, dl, avgdl = 2, 1, 1, 4, 3
+        idf = np.log1p((n - df + 0.5) / (df + 0.5))
+        expected = idf * tf * 2.2 / (tf + 1.2 * (1 - 0.75 + 0.75 * dl / avgdl))
+        assert data["doc_ids"][start:end].tolist() == [1]
+        assert data["weights"][start] == pytest.approx(expected, rel=1e-5)
+
+
+    def test_short_average_length_not_clamped(self, tmp_path):
+        from rag.components.bm25 import term_hash
+
+        data = _builder([("a", "", {}), ("b", "cc", {})], tmp_path / "bm25").arrays()
+        term = np.searchsorted(data["terms"], np.uint64(term_hash("cc")))
+
+        n, df, tf, dl, avgdl = 2, 1, 1, 1, 0.5
+        idf = np.log1p((n - df + 0.5) / (df + 0.5))
+        expected = idf * tf * 2.2 / (tf + 1.2 * (1 - 0.75 + 0.75 * dl / avgdl))
+        assert data["weights"][data["offsets"][term]] == pytest.approx(expected, rel=1e-5)
+
+    def test_streams_documents_to_staging_directory(self, tmp_path):
+        builder = _builder(DOCS, tmp_path / "bm25")
+
+        assert (tmp_path / "bm25.tmp" / "store.bin").exists()
+        assert builder._docs.getvalue().startswith(b'{"id": "id1"')
+        assert not builder._docs._data
+
+
+class TestBM25Index:
+    def test_exact_term_ranks_first(self, tmp_path):
+        from rag.components.bm25 import BM25Index
+
+        index = BM25Index.from_builder(_builder(DOCS, tmp_path / "bm25"))
+        docs = index.search("アカウント削除", k=2)
+
+        assert [d.id for d in docs] == ["id1", "id3"]
+        assert docs[0].metadata == {"source": "faq.csv:r1"}
+
+    def test_product_code(self, tmp_path):
+        from rag.components.bm25 import BM25Index
+
+        index = BM25Index.from_builder(_builder(DOCS, tmp_path / "bm25"))
+
+        assert index.search("AB-1234 保証", k=1)[0].id == "id4"
+
+    def test_scores_descending(self, tmp_path):
+        from rag.components.bm25 import BM25Index
+
+        results = BM25Index.from_builder(_builder(DOCS, tmp_path / "bm25")).search_with_score("アカウント", k=10)
+        scores = [score for _, score in results]
+
+        assert scores == sorted(scores, reverse=True)
+        assert {d.id for d, _ in results} == {"id1", "id3"}
+
+    def test_unknown_terms_return_empty(self, tmp_path):
+        from rag.components.bm25 import BM25Index
+
+        assert BM25Index.from_builder(_builder(DOCS, tmp_path / "bm25")).search("zzz", k=3) == []
+
+    def test_asearch(self, tmp_path):
+        from rag.components.bm25 import BM25Index
+
+        index = BM25Index.from_builder(_builder(DOCS, tmp_path / "bm25"))
+
+        assert asyncio.run(index.asearch("料金", k=1))[0].id == "id2"
+
+    def test_save_and_load_memory_maps(self, tmp_path):
+        from rag.components.bm25 import BM25Index
+
+        path = _builder(DOCS, tmp_path / "bm25").save()
+        index = BM25Index.load(path)
+
+        assert isinstance(index.doc_ids, np.memmap)
+        assert len(index) == 4
+        assert index.search("料金プラン", k=1)[0].page_content == "料金プランの変更について"
+
+    def test_save_replaces_existing_index(self, tmp_path):
+        from rag.components.bm25 import BM25Index
+
+        _builder(DOCS, tmp_path / "bm25").save()
+        _builder(DOCS[:1], tmp_path / "bm25").save()
+
+        assert len(BM25Index.load(tmp_path / "bm25")) == 1
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["bm25"]
+
+    def test_empty_index(self, tmp_path):
+        from rag.components.bm25 import BM25Builder, BM25Index
+
+        index = BM25Index.load(BM25Builder(tmp_path / "bm25").save())
+
+        assert len(index) == 0
+        assert index.search("アカウント", k=3) == []
+
+    def test_empty_documents_score_finite(self, tmp_path):
+        import warnings
+        from rag.components.bm25 import BM25Index
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            empty = _builder([("e1", "", {}), ("e2", "。", {})], tmp_path / "empty")
+            assert BM25Index.from_builder(empty).search("アカウント", k=3) == []
+
+            builder = _builder([("e1", "", {}), ("e2", "", {}), ("id1", "料金", {})], tmp_path / "bm25")
+            data = builder.arrays()
+            results = BM25Index.from_builder(builder).search_with_score("料金", k=3)
+
+        assert np.all(np.isfinite(data["weights"]))
+        assert [d.id for d, _ in results] == ["id1"]
+        assert np.isfinite(results[0][1])
+
+    def test_empty_in_memory_index(self, tmp_path):
+        from rag.components.bm25 import BM25Builder, BM25Index
+
+        assert BM25Index.from_builder(BM25Builder(tmp_path / "bm25")).search_with_score("料金", k=3) == []
+
+    def test_rejects_unknown_version(self, tmp_path):
+        import json
+        from rag.components.bm25 import BM25Index
+
+        path = _builder(DOCS, tmp_path / "bm25").save()
+        (path / "meta.json").write_text(json.dumps({"version": 99}))
+
+        with pytest.raises(ValueError):
+            BM25Index.load(path)
@@ -0,0 +1,177 @@
+import json
+import struct
+import uuid
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+COLLECTION_ID = uuid.UUID("12345678-1234-5678-1234-567812345678")
+
+
+def _fields(row: bytes):
+    """バイナリ COPY の 1 行をフィールドのバイト列に分解する。"""
+    (count,) = struct.unpack_from("!h", row, 0)
+    offset, fields = 2, []
+    for _ in range(count):
+        (length,) = struct.unpack_from("!i", row, offset)
+        offset += 4
+        fields.append(row[offset: offset + length])
+        offset += length
+    assert offset == len(row)
+    return fields
+
+
+def _loader(**kwargs):
+    from rag.infra.bulk_loader import CopyVectorLoader
+
+    engine = MagicMock()
+    engine.connect.return_value.__enter__.return_value.execute.return_value.scalar.return_value = COLLECTION_ID
+    raw = engine.raw_connection.return_value
+    cur = raw.driver_connection.cursor.return_value.__enter__.return_value
+    copy = cur.copy.return_value.__enter__.return_value
+    loader = CopyVectorLoader(MagicMock(), engine=engine, collection_name="documents", **kwargs)
+    return loader, raw, cur, copy
+
+
+def _written(copy) -> bytes:
+    return b"".join(c.args[0] for c in copy.write.call_args_list)
+
+
+class TestEncoding:
+    def test_encode_vector(self):
+        from rag.infra.bulk_loader import encode_vector
+
+        data = encode_vector(np.array([1.0, -2.5], dtype=np.float32))
+
+        assert struct.unpack("!hhff", data) == (2, 0, 1.0, -2.5)
+
+    def test_encode_row_fields(self):
+        from rag.infra.bulk_loader import encode_row
+
+        row = encode_row("id-1", COLLECTION_ID, [0.5, 0.25], "本文", {"source": "a.pdf:p1"})
+        doc_id, collection_id, vector, document, metadata = _fields(row)
+
+        assert doc_id == b"id-1"
+        assert collection_id == COLLECTION_ID.bytes
+        assert struct.unpack("!hhff", vector) == (2, 0, 0.5, 0.25)
+        assert document.decode("utf-8") == "本文"
+        assert metadata[:1] == b"\x01"
+        assert json.loads(metadata[1:]) == {"source": "a.pdf:p1"}
+
+    def test_empty_metadata_is_object(self):
+        from rag.infra.bulk_loader import encode_row
+
+        metadata = _fields(encode_row("id", COLLECTION_ID, [0.0], "", None))[4]
+        assert metadata == b"\x01{}"
+
+
+class TestCopyVectorLoader:
+    def test_buffers_until_flush_rows(self):
+        loader, raw, cur, copy = _loader(flush_rows=3)
+        loader.add_embeddings(["a", "b"], [[0.1], [0.2]], ids=["1", "2"])
+
+        raw.commit.assert_not_called()
+
+        loader.add_embeddings(["c"], [[0.3]], ids=["3"])
+
+        raw.commit.assert_called_once()
+        assert loader.rows_written == 3
+
+    def test_direct_copy_without_upsert(self):
+        from rag.infra.bulk_loader import COPY_HEADER, COPY_TRAILER
+
+        loader, raw, cur, copy = _loader(upsert=False)
+        loader.add_embeddings(["a"], [[0.1, 0.2]], metadatas=[{"k": 1}], ids=["1"])
+        assert loader.flush() == 1
+
+        cur.copy.assert_called_once_with(
+            "COPY langchain_pg_embedding (id, collection_id, embedding, document, cmetadata)"
+            " FROM STDIN WITH (FORMAT BINARY)"
+        )
+        data = _written(copy)
+        assert data.startswith(COPY_HEADER)
+        assert data.endswith(COPY_TRAILER)
+        assert _fields(data[len(COPY_HEADER):-len(COPY_TRAILER)])[0] == b"1"
+        executed = [c.args[0] for c in cur.execute.call_args_list]
+        assert not any("INSERT" in sql for sql in executed)
+        raw.close.assert_called_once()
+
+    def test_upsert_goes_through_staging_table(self):
+        loader, raw, cur, copy = _loader(upsert=True)
+        loader.add_embeddings(["a"], [[0.1]], ids=["1"])
+        loader.flush()
+
+        assert "rag_copy_staging" in cur.copy.call_args.args[0]
+        executed = [c.args[0] for c in cur.execute.call_args_list]
+        assert any("CREATE TEMP TABLE IF NOT EXISTS rag_copy_staging" in sql for sql in executed)
+        assert "ON CONFLICT (id) DO UPDATE" in executed[-1]
+
+    def test_add_documents_embeds_texts(self):
+        loader, raw, cur, copy = _loader()
+        loader.embeddings.embed_documents.return_value = [[0.1], [0.2]]
+        ids = loader.add_documents(
+            [Document(page_content="x", metadata={}), Document(page_content="y", metadata={})],
+            ids=["1", "2"],
+        )
+
+        assert ids == ["1", "2"]
+        loader.embeddings.embed_documents.assert_called_once_with(["x", "y"])
+
+    def test_flush_empty_is_noop(self):
+        loader, raw, cur, copy = _loader()
+
+        assert loader.flush() == 0
+        loader._engine.raw_connection.assert_not_called()
+
+    def test_context_manager_flushes_remaining_rows(self):
+        loader, raw, cur, copy = _loader()
+        with loader:
+            loader.add_embeddings(["a"], [[0.1]], ids=["1"])
+
+        raw.commit.assert_called_once()
+
+    def test_context_manager_discards_rows_on_error(self):
+        loader, raw, cur, copy = _loader()
+        with pytest.raises(RuntimeError):
+            with loader:
+                loader.add_embeddings(["a"], [[0.1]], ids=["1"])
+                raise RuntimeError("boom")
+
+        loader._engine.raw_connection.assert_not_called()
+
+    def test_rolls_back_on_copy_failure(self):
+        loader, raw, cur, copy = _loader()
+        copy.write.side_effect = RuntimeError("copy failed")
+        loader.add_embeddings(["a"], [[0.1]], ids=["1"])
+
+        with pytest.raises(RuntimeError):
+            loader.flush()
+        raw.rollback.assert_called_once()
+        raw.close.assert_called_once()
+
+    def test_missing_collection_raises(self):
+        loader, raw, cur, copy = _loader()
+        loader._engine.connect.return_value.__enter__.return_value.execute.return_value.scalar.return_value = None
+
+        with pytest.raises(ValueError, match="Collection not found"):
+            loader.add_embeddings(["a"], [[0.1]], ids=["1"])
+
+
+@pytest.mark.integration
+class TestCopyVectorLoaderIntegration:
+    @pytest.mark.parametrize("upsert", [False, True])
+    def test_loaded_rows_are_searchable(self, test_vectorstore, test_embeddings, upsert):
+        from rag.infra.bulk_loader import CopyVectorLoader
+
+        texts = ["RAGシステムの概要", "ベクトル検索"]
+        with CopyVectorLoader(test_embeddings, collection_name="test_documents", upsert=upsert) as loader:
+            loader.add_embeddings(
+                texts, test_embeddings.embed_documents(texts),
+                metadatas=[{"source": "a.pdf:p1"}, {"source": "b.pdf:p1"}], ids=["a", "b"],
+            )
+
+        docs = test_vectorstore.get_by_ids(["a", "b"])
+        assert sorted(d.page_content for d in docs) == sorted(texts)
+        assert {d.metadata["source"] for d in docs} == {"a.pdf:p1", "b.pdf:p1"}
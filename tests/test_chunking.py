@@ -247,3 +247,180 @@ class TestSplitByStructureEdgeCases:
         text = "short\n\nanother"
         result = split_by_structure(text, chunk_size=0)
         assert isinstance(result, list)
+
+
+class TestBoundaryOffsets:
+    def test_before_whitespace(self):
+        from rag.data.chunking import boundary_offsets
+
+        assert boundary_offsets("ab cd ef") == [2, 5]
+
+    def test_after_japanese_punctuation(self):
+        from rag.data.chunking import boundary_offsets
+
+        text = "今日は晴れ。明日は雨、たぶん。"
+        assert boundary_offsets(text) == [6, 11]
+
+    def test_newline(self):
+        from rag.data.chunking import boundary_offsets
+
+        assert boundary_offsets("ab\ncd") == [2, 3]
+
+    def test_empty(self):
+        from rag.data.chunking import boundary_offsets
+
+        assert boundary_offsets("") == []
+
+
+class TestSplitTextSpans:
+    def test_spans_index_into_original_text(self):
+        from rag.data.chunking import split_text_spans, split_text
+
+        text = "hello world this is a test sentence for chunking"
+        spans = split_text_spans(text, chunk_size=20, overlap=5)
+        assert [text[s:e] for s, e in spans] == split_text(text, chunk_size=20, overlap=5)
+
+    def test_spans_are_monotonic(self):
+        from rag.data.chunking import split_text_spans
+
+        text = "word " * 500
+        spans = split_text_spans(text, chunk_size=100, overlap=30)
+        starts = [s for s, _ in spans]
+        assert starts == sorted(starts)
+        assert len(set(starts)) == len(starts)
+
+    def test_accepts_precomputed_boundaries(self):
+        from rag.data.chunking import split_text_spans, boundary_offsets
+
+        text = "alpha bravo charlie delta echo foxtrot"
+        bounds = boundary_offsets(text)
+        assert split_text_spans(text, 15, 5, boundaries=bounds) == split_text_spans(text, 15, 5)
+
+    def test_japanese_without_spaces_respects_chunk_size(self):
+        from rag.data.chunking import split_text
+
+        text = "あ" * 1000
+        result = split_text(text, chunk_size=300, overlap=50)
+        assert all(len(c) <= 300 for c in result)
+        assert len(result) == 4
+
+    def test_japanese_splits_after_punctuation(self):
+        from rag.data.chunking import split_text
+
+        text = "これはテストです。" * 30
+        result = split_text(text, chunk_size=100, overlap=20)
+        assert len(result) > 1
+        assert all(c.endswith("。") for c in result)
+        assert all(len(c) <= 100 for c in result)
+
+    def test_japanese_overlap(self):
+        from rag.data.chunking import split_text
+
+        text = "一文目です。二文目です。三文目です。四文目です。五文目です。"
+        result = split_text(text, chunk_size=18, overlap=6)
+        for prev, nxt in zip(result, result[1:]):
+            assert prev[-6:] in nxt
+
+    def test_chunk_size_zero_terminates(self):
+        from rag.data.chunking import split_text_spans
+
+        assert len(split_text_spans("ab cd", chunk_size=0, overlap=0)) >= 1
+
+
+class _WordTokenizer:
+    """空白区切り1語=1トークンの fast tokenizer 互換スタブ（日本語は1文字=1トークン）"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, **kwargs):
+        import re
+        self.calls.append((list(texts), kwargs))
+        return {
+            "offset_mapping": [
+                [(m.start(), m.end()) for m in re.finditer(r"[A-Za-z0-9]+|[^\sA-Za-z0-9]", t)]
+                for t in texts
+            ]
+        }
+
+
+class TestTokenChunking:
+    def test_token_offsets_single_batched_call(self):
+        from rag.data.chunking import token_offsets
+
+        tok = _WordTokenizer()
+        result = token_offsets(tok, ["a b", "c"])
+        assert result == [[(0, 1), (2, 3)], [(0, 1)]]
+        assert len(tok.calls) == 1
+        assert tok.calls[0][1]["add_special_tokens"] is False
+        assert tok.calls[0][1]["return_offsets_mapping"] is True
+
+    def test_short_text_single_span(self):
+        from rag.data.chunking import split_token_spans
+
+        assert split_token_spans("a b c", [(0, 1), (2, 3), (4, 5)], max_tokens=5) == [(0, 5)]
+
+    def test_each_chunk_within_token_limit(self):
+        from rag.data.chunking import split_by_tokens
+
+        tok = _WordTokenizer()
+        text = " ".join(f"w{i}" for i in range(100))
+        chunks = split_by_tokens([text], tok, max_tokens=10, overlap_tokens=3)[0]
+        assert len(chunks) > 1
+        assert all(len(c.split()) <= 10 for c in chunks)
+
+    def test_token_overlap(self):
+        from rag.data.chunking import split_by_tokens
+
+        tok = _WordTokenizer()
+        text = " ".join(f"w{i}" for i in range(30))
+        chunks = split_by_tokens([text], tok, max_tokens=10, overlap_tokens=3)[0]
+        for prev, nxt in zip(chunks, chunks[1:]):
+            assert prev.split()[-3:] == nxt.split()[:3]
+
+    def test_overlap_not_smaller_than_window_raises(self):
+        import pytest
+        from rag.data.chunking import split_by_tokens, split_token_spans
+
+        tok = _WordTokenizer()
+        for overlap_tokens in (10, 12):
+            with pytest.raises(ValueError, match="overlap_tokens"):
+                split_by_tokens(["w0 w1"], tok, max_tokens=10, overlap_tokens=overlap_tokens)
+            with pytest.raises(ValueError):
+                split_token_spans("a b", [(0, 1), (2, 3)], max_tokens=10, overlap_tokens=overlap_tokens)
+        assert tok.calls == []
+
+    def test_no_token_lost(self):
+        from rag.data.chunking import split_by_tokens
+
+        tok = _WordTokenizer()
+        text = " ".join(f"w{i}" for i in range(57))
+        chunks = split_by_tokens([text], tok, max_tokens=8, overlap_tokens=2)[0]
+        seen = set()
+        for c in chunks:
+            seen.update(c.split())
+        assert seen == set(text.split())
+
+    def test_japanese_aligned_to_punctuation(self):
+        from rag.data.chunking import split_by_tokens
+
+        tok = _WordTokenizer()
+        text = "今日は晴れ。明日は雨。明後日は曇り。"
+        chunks = split_by_tokens([text], tok, max_tokens=8, overlap_tokens=0)[0]
+        assert chunks == ["今日は晴れ。", "明日は雨。", "明後日は曇り。"]
+
+    def test_split_by_structure_tokens_batches_paragraphs(self):
+        from rag.data.chunking import split_by_structure_tokens
+
+        tok = _WordTokenizer()
+        text = "para one\n\n" + " ".join(f"w{i}" for i in range(30)) + "\n\npara three"
+        chunks = split_by_structure_tokens(text, tok, max_tokens=10, overlap_tokens=2)
+        assert chunks[0] == "para one"
+        assert chunks[-1] == "para three"
+        assert len(chunks) > 3
+        assert len(tok.calls) == 1
+
+    def test_split_by_structure_tokens_empty(self):
+        from rag.data.chunking import split_by_structure_tokens
+
+        assert split_by_structure_tokens("", _WordTokenizer(), 10) == []
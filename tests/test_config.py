@@ -12,6 +12,7 @@ class TestLoadSettings:
         assert "llm" in _settings
         assert "chunking" in _settings
         assert "search" in _settings
+        assert "ingest" in _settings
         assert "collection_name" in _settings
 
 
@@ -64,6 +65,93 @@ class TestConstants:
 
         assert CHUNK_OVERLAP == 80
 
+    def test_chunk_unit_default(self):
+        from rag.core.config import CHUNK_UNIT
+
+        assert CHUNK_UNIT == "char"
+
+    def test_chunk_tokens_default(self):
+        from rag.core.config import CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS
+
+        assert CHUNK_TOKENS == 250
+        assert CHUNK_OVERLAP_TOKENS == 50
+
+    def test_ingest_batch_size_default(self):
+        from rag.core.config import INGEST_BATCH_SIZE
+
+        assert INGEST_BATCH_SIZE == 64
+
+    def test_ingest_workers_default(self):
+        from rag.core.config import INGEST_WORKERS
+
+        assert INGEST_WORKERS == 0
+
+    def test_ingest_pdf_workers_default(self):
+        from rag.core.config import INGEST_PDF_WORKERS
+
+        assert INGEST_PDF_WORKERS == 0
+
+    def test_ingest_csv_chunksize_default(self):
+        from rag.core.config import INGEST_CSV_CHUNKSIZE
+
+        assert INGEST_CSV_CHUNKSIZE == 10000
+
+    def test_ingest_csv_metadata_columns_default(self):
+        from rag.core.config import INGEST_CSV_METADATA_COLUMNS
+
+        assert INGEST_CSV_METADATA_COLUMNS == []
+
+    def test_answer_cache_defaults(self):
+        from rag.core.config import ANSWER_CACHE_BACKEND, ANSWER_CACHE_MAX_SIZE
+
+        assert ANSWER_CACHE_BACKEND == "memory"
+        assert ANSWER_CACHE_MAX_SIZE == 1024
+
+    def test_semantic_cache_disabled_by_default(self):
+        from rag.core.config import SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_THRESHOLD
+
+        assert SEMANTIC_CACHE_ENABLED is False
+        assert SEMANTIC_CACHE_THRESHOLD == 0.9
+
+    def test_hybrid_defaults(self):
+        from rag.core.config import RETRIEVAL_STRATEGY, HYBRID_RRF_K, HYBRID_RERANK_CANDIDATES
+
+        assert RETRIEVAL_STRATEGY == "two_stage"
+        assert HYBRID_RRF_K == 60
+        assert HYBRID_RERANK_CANDIDATES == 10
+
+    def test_vector_index_defaults(self):
+        from rag.core.config import EMBED_DIM, VECTOR_INDEX_TYPE, VECTOR_INDEX_EF_SEARCH
+
+        assert EMBED_DIM == 384
+        assert VECTOR_INDEX_TYPE == "hnsw"
+        assert VECTOR_INDEX_EF_SEARCH == 40
+
+    def test_model_backend_default(self):
+        from rag.core.config import MODEL_BACKEND, ONNX_QUANTIZE
+
+        assert MODEL_BACKEND == "torch"
+        assert ONNX_QUANTIZE is True
+
+    def test_rerank_tuning_defaults(self):
+        from rag.core.config import RERANK_SCORE_CACHE_SIZE, RERANK_DISTANCE_MARGIN
+
+        assert RERANK_SCORE_CACHE_SIZE == 4096
+        assert RERANK_DISTANCE_MARGIN == 0.0
+
+    def test_batching_defaults(self):
+        from rag.core.config import BATCH_ENABLED, BATCH_MAX_WAIT_MS, BATCH_MAX_SIZE
+
+        assert BATCH_ENABLED is False
+        assert BATCH_MAX_WAIT_MS == 10
+        assert BATCH_MAX_SIZE == 16
+
+    def test_server_defaults(self):
+        from rag.core.config import SERVER_HOST, SERVER_PORT
+
+        assert SERVER_HOST == "127.0.0.1"
+        assert SERVER_PORT == 8765
+
     def test_reranker_model(self):
         from rag.core.config import RERANKER_MODEL
 
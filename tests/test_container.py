@@ -184,3 +184,198 @@ class TestGetContainer:
         c1 = get_container()
         c2 = get_container()
         assert c1 is c2
+
+
+class TestManifest:
+    def test_injected_manifest(self):
+        from rag.core.container import AppContainer
+
+        mock_manifest = MagicMock()
+        container = AppContainer(manifest=mock_manifest)
+        assert container.manifest is mock_manifest
+
+    @patch("rag.infra.manifest.create_manifest")
+    def test_manifest_lazy_loads(self, mock_create_manifest):
+        from rag.core.container import AppContainer
+
+        container = AppContainer()
+        m = container.manifest
+        mock_create_manifest.assert_called_once()
+        assert m is mock_create_manifest.return_value
+
+
+class TestAnswerCache:
+    def test_injected_answer_cache(self):
+        from rag.core.container import AppContainer
+
+        cache = MagicMock()
+        container = AppContainer(answer_cache=cache)
+        assert container.answer_cache is cache
+
+    @patch("rag.pipeline.answer_cache.create_answer_cache", return_value=None)
+    def test_none_backend_resolved_once(self, mock_create):
+        from rag.core.container import AppContainer
+
+        container = AppContainer()
+        assert container.answer_cache is None
+        assert container.answer_cache is None
+        mock_create.assert_called_once()
+
+    def test_corpus_version_from_manifest(self):
+        from rag.core.container import AppContainer
+
+        manifest = MagicMock()
+        manifest.current_version.return_value = "v1"
+        container = AppContainer(manifest=manifest)
+        assert container.corpus_version() == "v1"
+
+
+class TestSemanticCache:
+    @patch("rag.pipeline.semantic_cache.create_semantic_cache", return_value=None)
+    def test_disabled_resolved_once(self, mock_create):
+        from rag.core.container import AppContainer
+
+        container = AppContainer()
+        assert container.semantic_cache is None
+        assert container.semantic_cache is None
+        mock_create.assert_called_once()
+
+    def test_injected_semantic_cache(self):
+        from rag.core.container import AppContainer
+
+        cache = MagicMock()
+        assert AppContainer(semantic_cache=cache).semantic_cache is cache
+
+
+class TestAsyncVectorstore:
+    @patch("rag.components.embeddings.create_embeddings")
+    @patch("rag.infra.db.create_async_vectorstore")
+    def test_lazy_loads(self, mock_create, mock_create_emb):
+        from rag.core.container import AppContainer
+
+        container = AppContainer()
+        assert container.async_vectorstore is mock_create.return_value
+        mock_create.assert_called_once_with(mock_create_emb.return_value)
+
+    @patch("rag.infra.db.create_async_vectorstore")
+    def test_default_strategy_gets_async_store(self, mock_create):
+        from rag.core.container import AppContainer
+
+        container = AppContainer(embeddings=MagicMock(), reranker=MagicMock())
+        with patch("rag.infra.db.create_vectorstore"):
+            strategy = container.retrieval_strategy
+        assert strategy.async_vectorstore is mock_create.return_value
+
+    @patch("rag.infra.db.create_async_vectorstore")
+    def test_injected_vectorstore_not_paired_with_default(self, mock_create):
+        from rag.core.container import AppContainer
+
+        container = AppContainer(vectorstore=MagicMock(), reranker=MagicMock())
+        assert container.retrieval_strategy.async_vectorstore is None
+        mock_create.assert_not_called()
+
+
+class TestBatching:
+    @patch("rag.core.container.BATCH_ENABLED", True)
+    @patch("rag.components.embeddings.create_embeddings")
+    def test_wraps_embeddings_when_enabled(self, mock_create_emb):
+        from rag.core.container import AppContainer
+        from rag.components.batching import BatchingEmbeddings
+
+        embeddings = AppContainer().embeddings
+        assert isinstance(embeddings, BatchingEmbeddings)
+        assert embeddings.base is mock_create_emb.return_value
+
+    @patch("rag.core.container.BATCH_ENABLED", True)
+    @patch("rag.components.reranker.create_reranker")
+    def test_wraps_reranker_when_enabled(self, mock_create_reranker):
+        from rag.core.container import AppContainer
+        from rag.components.batching import BatchingReranker
+
+        reranker = AppContainer().reranker
+        assert isinstance(reranker, BatchingReranker)
+        assert reranker.reranker is mock_create_reranker.return_value
+
+    @patch("rag.core.container.BATCH_ENABLED", False)
+    @patch("rag.components.reranker.create_reranker")
+    def test_no_wrapping_when_disabled(self, mock_create_reranker):
+        from rag.core.container import AppContainer
+
+        assert AppContainer().reranker is mock_create_reranker.return_value
+
+
+class TestVectorIndex:
+    @patch("rag.infra.vector_index.create_vector_index")
+    def test_lazy_loads(self, mock_create):
+        from rag.core.container import AppContainer
+
+        container = AppContainer()
+        assert container.vector_index is mock_create.return_value
+        assert container.vector_index is mock_create.return_value
+        mock_create.assert_called_once()
+
+
+class TestHybridRetrieval:
+    def test_hybrid_strategy_selected(self):
+        from rag.core.container import AppContainer, RagSettings
+        from rag.pipeline.retrieval import HybridRetrieval
+
+        keyword = MagicMock()
+        container = AppContainer(
+            settings=RagSettings(retrieval_strategy="hybrid", rerank_candidates=5),
+            vectorstore=MagicMock(), reranker=MagicMock(), keyword_search=keyword,
+        )
+        strategy = container.retrieval_strategy
+
+        assert isinstance(strategy, HybridRetrieval)
+        assert strategy.keyword_search is keyword
+        assert strategy.rerank_candidates == 5
+
+    def test_unknown_strategy_raises(self):
+        from rag.core.container import AppContainer, RagSettings
+
+        container = AppContainer(
+            settings=RagSettings(retrieval_strategy="bogus"),
+            vectorstore=MagicMock(), reranker=MagicMock(),
+        )
+        with pytest.raises(ValueError):
+            container.retrieval_strategy
+
+    @patch("rag.infra.keyword_search.create_keyword_search")
+    def test_keyword_search_lazy_loads(self, mock_create):
+        from rag.core.container import AppContainer
+
+        container = AppContainer()
+        assert container.keyword_search is mock_create.return_value
+        assert container.keyword_search is mock_create.return_value
+        mock_create.assert_called_once()
+
+
+class TestLexicalRetrieval:
+    def test_lexical_strategy_needs_no_vectorstore(self):
+        from rag.core.container import AppContainer, RagSettings
+        from rag.pipeline.retrieval import LexicalRetrieval
+
+        container = AppContainer(
+            settings=RagSettings(retrieval_strategy="lexical"),
+            reranker=MagicMock(), keyword_search=MagicMock(),
+        )
+        with patch("rag.infra.db.create_vectorstore") as mock_create_vs:
+            strategy = container.retrieval_strategy
+
+        assert isinstance(strategy, LexicalRetrieval)
+        mock_create_vs.assert_not_called()
+
+    @patch("rag.core.container.HYBRID_KEYWORD_BACKEND", "bm25")
+    @patch("rag.components.bm25.create_bm25_index")
+    def test_bm25_keyword_backend(self, mock_create):
+        from rag.core.container import AppContainer
+
+        assert AppContainer().keyword_search is mock_create.return_value
+
+    @patch("rag.core.container.HYBRID_KEYWORD_BACKEND", "bogus")
+    def test_unknown_keyword_backend_raises(self):
+        from rag.core.container import AppContainer
+
+        with pytest.raises(ValueError):
+            AppContainer().keyword_search
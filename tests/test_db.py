@@ -2,11 +2,20 @@ from unittest.mock import patch, MagicMock
 import pytest
 
 
+@pytest.fixture(autouse=True)
+def reset_engines(monkeypatch):
+    import rag.infra.db as db
+    monkeypatch.setattr(db, "_engine", None)
+    monkeypatch.setattr(db, "_async_engine", None)
+    monkeypatch.setattr(db, "_maintenance_engine", None)
+
+
 class TestCreateVectorstore:
+    @patch("rag.infra.db.get_engine")
     @patch("rag.infra.db.PGVector")
-    def test_creates_pgvector_with_correct_params(self, mock_pgvector_class):
+    def test_creates_pgvector_with_correct_params(self, mock_pgvector_class, mock_get_engine):
         from rag.infra.db import create_vectorstore
-        from rag.core.config import CONNECTION_STRING, COLLECTION_NAME
+        from rag.core.config import COLLECTION_NAME
 
         mock_embeddings = MagicMock()
         create_vectorstore(mock_embeddings)
@@ -14,8 +23,9 @@ class TestCreateVectorstore:
         mock_pgvector_class.assert_called_once_with(
             embeddings=mock_embeddings,
             collection_name=COLLECTION_NAME,
-            connection=CONNECTION_STRING,
+            connection=mock_get_engine.return_value,
             use_jsonb=True,
+            embedding_length=384,
         )
 
     @patch("rag.infra.db.PGVector")
@@ -57,11 +67,138 @@ class TestCreateVectorstore:
         assert call_kwargs["embeddings"] is mock_embeddings
 
     @patch("rag.infra.db.PGVector")
-    def test_connection_string_format(self, mock_pgvector_class):
+    def test_stores_share_engine(self, mock_pgvector_class):
         from rag.infra.db import create_vectorstore
 
+        create_vectorstore(MagicMock())
+        create_vectorstore(MagicMock())
+
+        first, second = mock_pgvector_class.call_args_list
+        assert first[1]["connection"] is second[1]["connection"]
+
+
+class TestCreateAsyncVectorstore:
+    @patch("rag.infra.db.get_async_engine")
+    @patch("rag.infra.db.PGVector")
+    def test_creates_async_mode_pgvector(self, mock_pgvector_class, mock_get_async_engine):
+        from rag.infra.db import create_async_vectorstore
+        from rag.core.config import COLLECTION_NAME
+
         mock_embeddings = MagicMock()
-        create_vectorstore(mock_embeddings)
+        create_async_vectorstore(mock_embeddings)
 
-        call_kwargs = mock_pgvector_class.call_args[1]
-        assert "postgresql+psycopg://" in call_kwargs["connection"]
+        mock_pgvector_class.assert_called_once_with(
+            embeddings=mock_embeddings,
+            collection_name=COLLECTION_NAME,
+            connection=mock_get_async_engine.return_value,
+            use_jsonb=True,
+            embedding_length=384,
+            async_mode=True,
+        )
+
+
+class TestEngineArgs:
+    def test_sets_ann_search_parameters(self):
+        from rag.infra.db import engine_args
+
+        options = engine_args()["connect_args"]["options"]
+        assert "-c hnsw.ef_search=40" in options
+        assert "-c ivfflat.probes=10" in options
+
+    def test_sets_statement_timeout(self):
+        from rag.infra.db import engine_args
+
+        assert "-c statement_timeout=30000" in engine_args()["connect_args"]["options"]
+
+    def test_maintenance_engine_has_no_statement_timeout(self):
+        from rag.infra.db import engine_args
+
+        options = engine_args(statement_timeout=False)["connect_args"]["options"]
+        assert "statement_timeout" not in options
+        assert "-c hnsw.ef_search=40" in options
+
+    @patch("rag.infra.db.create_engine")
+    def test_maintenance_engine_is_separate(self, mock_create_engine):
+        from rag.infra.db import get_engine, get_maintenance_engine
+
+        mock_create_engine.side_effect = lambda *a, **k: MagicMock()
+        assert get_maintenance_engine() is get_maintenance_engine()
+        assert get_maintenance_engine() is not get_engine()
+        maintenance_args = mock_create_engine.call_args_list[0][1]
+        assert "statement_timeout" not in maintenance_args["connect_args"]["options"]
+
+    def test_index_and_copy_use_maintenance_engine(self):
+        from rag.infra.bulk_loader import CopyVectorLoader
+        from rag.infra.vector_index import VectorIndexManager
+
+        engine = MagicMock()
+        with patch("rag.infra.vector_index.get_maintenance_engine", return_value=engine), \
+                patch("rag.infra.bulk_loader.get_maintenance_engine", return_value=engine):
+            assert VectorIndexManager().engine is engine
+            assert CopyVectorLoader(MagicMock()).engine is engine
+
+    def test_pool_settings(self):
+        from rag.infra.db import engine_args
+
+        args = engine_args()
+        assert args["pool_size"] == 5
+        assert args["max_overflow"] == 10
+        assert args["pool_recycle"] == 1800
+        assert args["pool_pre_ping"] is True
+
+    def test_prepare_threshold(self):
+        from rag.infra.db import engine_args
+
+        assert engine_args()["connect_args"]["prepare_threshold"] == 1
+
+    def test_negative_prepare_threshold_disables(self):
+        from rag.infra.db import engine_args
+
+        with patch("rag.infra.db.DB_PREPARE_THRESHOLD", -1):
+            assert engine_args()["connect_args"]["prepare_threshold"] is None
+
+
+class TestGetEngine:
+    def test_engine_is_shared(self):
+        from rag.infra.db import get_engine
+
+        assert get_engine() is get_engine()
+
+    def test_engine_uses_pool_settings(self):
+        from rag.infra.db import get_engine
+
+        pool = get_engine().pool
+        assert pool.size() == 5
+        assert pool.timeout() == 30
+
+    def test_async_engine_is_shared(self):
+        from rag.infra.db import get_async_engine
+
+        assert get_async_engine() is get_async_engine()
+
+
+class TestPoolStats:
+    def test_empty_before_engines_exist(self):
+        from rag.infra.db import pool_stats
+
+        assert pool_stats() == {}
+
+    def test_reports_sync_pool(self):
+        from rag.infra.db import get_engine, pool_stats
+
+        get_engine()
+        stats = pool_stats()
+
+        assert stats["sync"] == {
+            "size": 5, "checked_out": 0, "checked_in": 0, "overflow": 0, "max_overflow": 10,
+        }
+        assert "async" not in stats
+
+    def test_dispose_engine_resets(self):
+        from rag.infra.db import get_engine, dispose_engine, pool_stats
+
+        engine = get_engine()
+        dispose_engine()
+
+        assert pool_stats() == {}
+        assert get_engine() is not engine
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+
+class TestDocStore:
+    def test_roundtrip(self, tmp_path):
+        from rag.components.docstore import DocStoreWriter, open_doc_store, read_document
+
+        writer = DocStoreWriter()
+        writer.add("a", "アカウント削除", {"source": "faq.csv:r1"})
+        writer.add("b", "料金プラン")
+        writer.save(tmp_path)
+        store, offsets = open_doc_store(tmp_path)
+
+        assert isinstance(store, np.memmap)
+        doc = read_document(store, offsets, 0)
+        assert (doc.id, doc.page_content, doc.metadata) == ("a", "アカウント削除", {"source": "faq.csv:r1"})
+        assert read_document(store, offsets, 1).metadata == {}
+
+    def test_offsets_snapshot_does_not_block_add(self):
+        from rag.components.docstore import DocStoreWriter
+
+        writer = DocStoreWriter()
+        writer.add("a", "x")
+        offsets = writer.offsets
+        writer.add("b", "y")
+
+        assert len(offsets) == 2 and len(writer.offsets) == 3
+
+    def test_empty_store(self, tmp_path):
+        from rag.components.docstore import DocStoreWriter, open_doc_store
+
+        DocStoreWriter().save(tmp_path)
+        store, offsets = open_doc_store(tmp_path)
+
+        assert store == b"" and offsets.tolist() == [0]
+
+
+class TestDirectorySwap:
+    def test_replaces_existing(self, tmp_path):
+        from rag.components.docstore import staging_directory, swap_directory
+
+        path = tmp_path / "index"
+        path.mkdir()
+        (path / "old.txt").write_text("old")
+        tmp = staging_directory(path)
+        (tmp / "new.txt").write_text("new")
+
+        assert swap_directory(tmp, path) == path
+        assert [p.name for p in path.iterdir()] == ["new.txt"]
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["index"]
+
+    def test_staging_starts_empty(self, tmp_path):
+        from rag.components.docstore import staging_directory
+
+        leftover = staging_directory(tmp_path / "index")
+        (leftover / "partial.npy").write_bytes(b"x")
+
+        assert list(staging_directory(tmp_path / "index").iterdir()) == []
+
+    def test_meta_version_check(self, tmp_path):
+        from rag.components.docstore import read_meta, write_meta
+
+        write_meta(tmp_path, {"version": 2})
+
+        assert read_meta(tmp_path, 2, "index") == {"version": 2}
+        with pytest.raises(ValueError, match="Unsupported index version"):
+            read_meta(tmp_path, 1, "index")
@@ -0,0 +1,159 @@
+from unittest.mock import MagicMock
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def store(tmp_path):
+    from rag.components.embedding_cache import SQLiteEmbeddingStore
+    return SQLiteEmbeddingStore(tmp_path / "emb.sqlite3", max_entries=100)
+
+
+@pytest.fixture
+def base_embeddings():
+    base = MagicMock()
+    base.embed_documents.side_effect = lambda texts: [[float(len(t)), 1.0] for t in texts]
+    base.embed_query.side_effect = lambda text: [float(len(text)), 2.0]
+    return base
+
+
+class TestCacheKey:
+    def test_includes_model_name(self):
+        from rag.components.embedding_cache import cache_key
+
+        assert cache_key("m1", "doc", "text") != cache_key("m2", "doc", "text")
+
+    def test_separates_query_and_doc(self):
+        from rag.components.embedding_cache import cache_key
+
+        assert cache_key("m", "doc", "text") != cache_key("m", "query", "text")
+
+    def test_model_identity_separates_backends(self):
+        from rag.components.embedding_cache import model_identity
+
+        identities = {
+            model_identity("torch", True),
+            model_identity("onnx", True),
+            model_identity("onnx", False),
+        }
+        assert len(identities) == 3
+        # torch では量子化設定は効かない
+        assert model_identity("torch", True) == model_identity("torch", False)
+
+    def test_backends_do_not_share_entries(self, tmp_path, monkeypatch):
+        from rag.components import embedding_cache
+
+        monkeypatch.setattr(embedding_cache, "EMBED_CACHE_PATH", str(tmp_path / "emb.sqlite3"))
+        torch_base, onnx_base = MagicMock(), MagicMock()
+        torch_base.embed_query.return_value = [1.0, 0.0]
+        onnx_base.embed_query.return_value = [0.0, 1.0]
+
+        embedding_cache.create_embedding_cache(torch_base, backend="torch").embed_query("q")
+        result = embedding_cache.create_embedding_cache(onnx_base, backend="onnx").embed_query("q")
+
+        assert result == [0.0, 1.0]
+        onnx_base.embed_query.assert_called_once_with("q")
+
+
+class TestSQLiteEmbeddingStore:
+    def test_roundtrip_float32(self, store):
+        store.put_many({"k": np.array([0.5, 0.25], dtype=np.float32)})
+        result = store.get_many(["k", "missing"])
+        assert list(result) == ["k"]
+        assert result["k"].dtype == np.float32
+        assert result["k"].tolist() == [0.5, 0.25]
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        from rag.components.embedding_cache import SQLiteEmbeddingStore
+
+        store = SQLiteEmbeddingStore(tmp_path / "lru.sqlite3", max_entries=2)
+        store.put_many({"a": np.zeros(2)})
+        store.put_many({"b": np.zeros(2)})
+        store.get_many(["a"])  # a を最近使用に更新
+        store.put_many({"c": np.zeros(2)})
+
+        assert len(store) == 2
+        assert set(store.get_many(["a", "b", "c"])) == {"a", "c"}
+
+    def test_reads_do_not_commit_each_lookup(self, tmp_path):
+        from rag.components.embedding_cache import SQLiteEmbeddingStore
+
+        store = SQLiteEmbeddingStore(tmp_path / "t.sqlite3", max_entries=10)
+        store.put_many({"a": np.zeros(2)})
+        before = store._conn.total_changes
+        store.get_many(["a"])
+        store.get_many(["a"])
+
+        assert store._conn.total_changes == before
+        store.flush()
+        assert store._conn.total_changes == before + 1
+
+    def test_no_eviction_below_cap(self, tmp_path):
+        from rag.components.embedding_cache import SQLiteEmbeddingStore
+
+        store = SQLiteEmbeddingStore(tmp_path / "c.sqlite3", max_entries=3)
+        statements = []
+        store._conn.set_trace_callback(statements.append)
+        store.put_many({"a": np.zeros(2), "b": np.zeros(2)})
+        store.put_many({"a": np.ones(2)})  # 置き換えは件数に数えない
+        store.put_many({"c": np.zeros(2)})
+
+        assert not any(s.startswith("DELETE") for s in statements)
+        assert len(store) == 3
+
+    def test_evicts_only_excess(self, tmp_path):
+        from rag.components.embedding_cache import SQLiteEmbeddingStore
+
+        path = tmp_path / "e.sqlite3"
+        SQLiteEmbeddingStore(path, max_entries=10).put_many({k: np.zeros(2) for k in "abcd"})
+        store = SQLiteEmbeddingStore(path, max_entries=3)
+        store.put_many({"e": np.zeros(2), "f": np.zeros(2)})
+
+        assert len(store) == 3
+        assert set(store.get_many(list("abcdef"))) >= {"e", "f"}
+
+    def test_persists_across_instances(self, tmp_path):
+        from rag.components.embedding_cache import SQLiteEmbeddingStore
+
+        path = tmp_path / "p.sqlite3"
+        SQLiteEmbeddingStore(path, max_entries=10).put_many({"k": np.ones(3)})
+        assert "k" in SQLiteEmbeddingStore(path, max_entries=10).get_many(["k"])
+
+
+class TestCachedEmbeddings:
+    def test_embed_documents_only_computes_misses(self, store, base_embeddings):
+        from rag.components.embedding_cache import CachedEmbeddings
+
+        emb = CachedEmbeddings(base_embeddings, store, model_name="m")
+        emb.embed_documents(["aa", "bbb"])
+        result = emb.embed_documents(["aa", "cccc"])
+
+        assert base_embeddings.embed_documents.call_args_list[1].args[0] == ["cccc"]
+        assert result == [[2.0, 1.0], [4.0, 1.0]]
+
+    def test_embed_documents_deduplicates(self, store, base_embeddings):
+        from rag.components.embedding_cache import CachedEmbeddings
+
+        emb = CachedEmbeddings(base_embeddings, store, model_name="m")
+        result = emb.embed_documents(["x", "x"])
+
+        base_embeddings.embed_documents.assert_called_once_with(["x"])
+        assert result == [[1.0, 1.0], [1.0, 1.0]]
+
+    def test_embed_query_cached(self, store, base_embeddings):
+        from rag.components.embedding_cache import CachedEmbeddings
+
+        emb = CachedEmbeddings(base_embeddings, store, model_name="m")
+        first = emb.embed_query("質問")
+        second = emb.embed_query("質問")
+
+        base_embeddings.embed_query.assert_called_once_with("質問")
+        assert first == second == [2.0, 2.0]
+
+    def test_all_hits_skip_model(self, store, base_embeddings):
+        from rag.components.embedding_cache import CachedEmbeddings
+
+        emb = CachedEmbeddings(base_embeddings, store, model_name="m")
+        emb.embed_documents(["a"])
+        emb.embed_documents(["a"])
+        base_embeddings.embed_documents.assert_called_once()
@@ -0,0 +1,111 @@
+from concurrent.futures import Future
+from unittest.mock import patch, MagicMock
+from langchain_core.documents import Document
+
+
+class _InlineExecutor:
+    """ProcessPoolExecutor の代わりに submit を同期実行するテスト用 executor"""
+
+    def __init__(self, *args, **kwargs):
+        self.kwargs = kwargs
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+def _docs(n):
+    return [
+        Document(page_content=f"text{i}", metadata={"source": f"s{i}", "chunk_index": 0})
+        for i in range(n)
+    ]
+
+
+class TestIterBatches:
+    def test_splits_into_batches(self):
+        from rag.data.embedding_pipeline import iter_batches
+
+        assert list(iter_batches([1, 2, 3, 4, 5], 2)) == [[1, 2], [3, 4], [5]]
+
+    def test_empty_input(self):
+        from rag.data.embedding_pipeline import iter_batches
+
+        assert list(iter_batches([], 2)) == []
+
+    def test_accepts_iterator(self):
+        from rag.data.embedding_pipeline import iter_batches
+
+        assert list(iter_batches(iter(range(3)), 2)) == [[0, 1], [2]]
+
+
+class TestResolveWorkers:
+    def test_zero_uses_cpu_count(self):
+        from rag.data.embedding_pipeline import resolve_workers
+
+        with patch("rag.data.embedding_pipeline.os.cpu_count", return_value=8):
+            assert resolve_workers(0, 100) == 8
+
+    def test_capped_by_batch_count(self):
+        from rag.data.embedding_pipeline import resolve_workers
+
+        assert resolve_workers(8, 3) == 3
+
+    def test_at_least_one(self):
+        from rag.data.embedding_pipeline import resolve_workers
+
+        assert resolve_workers(4, 0) == 1
+
+
+class TestEmbedAndStore:
+    def test_single_worker_uses_add_documents_per_batch(self):
+        from rag.data.embedding_pipeline import embed_and_store
+
+        vs = MagicMock()
+        docs = _docs(5)
+        items = zip(docs, [f"id{i}" for i in range(5)])
+        stats = embed_and_store(items, vs, batch_size=2, workers=1)
+
+        assert vs.add_documents.call_count == 3
+        assert vs.add_documents.call_args_list[0].kwargs["ids"] == ["id0", "id1"]
+        assert stats.chunks == 5
+
+    @patch("rag.data.embedding_pipeline._embed_batch", side_effect=lambda texts: [[0.1] * 3 for _ in texts])
+    @patch("rag.data.embedding_pipeline.ProcessPoolExecutor", _InlineExecutor)
+    def test_pool_writes_batches_in_order(self, mock_embed):
+        from rag.data.embedding_pipeline import embed_and_store
+
+        vs = MagicMock()
+        docs = _docs(5)
+        items = zip(docs, [f"id{i}" for i in range(5)])
+        embed_and_store(items, vs, batch_size=2, workers=2)
+
+        vs.add_documents.assert_not_called()
+        written = [c.kwargs["ids"] for c in vs.add_embeddings.call_args_list]
+        assert written == [["id0", "id1"], ["id2", "id3"], ["id4"]]
+        assert vs.add_embeddings.call_args_list[0].kwargs["texts"] == ["text0", "text1"]
+        assert mock_embed.call_count == 3
+
+    @patch("rag.data.embedding_pipeline.ProcessPoolExecutor")
+    def test_single_batch_stays_in_process(self, mock_pool_cls):
+        from rag.data.embedding_pipeline import embed_and_store
+
+        vs = MagicMock()
+        items = zip(_docs(2), ["id0", "id1"])
+        stats = embed_and_store(items, vs, batch_size=10, workers=4)
+
+        mock_pool_cls.assert_not_called()
+        vs.add_documents.assert_called_once()
+        assert stats.chunks == 2
+
+    def test_stats_chunks_per_sec(self):
+        from rag.data.embedding_pipeline import EmbedStats
+
+        assert EmbedStats(chunks=100, seconds=2.0).chunks_per_sec == 50.0
+        assert EmbedStats(chunks=0, seconds=0.0).chunks_per_sec == 0.0
@@ -16,3 +16,12 @@ class TestCreateEmbeddings:
         from langchain_huggingface import HuggingFaceEmbeddings
         result = rag.components.embeddings.create_embeddings()
         assert result == HuggingFaceEmbeddings.return_value
+
+    @patch.dict(sys.modules, {"langchain_huggingface": MagicMock()})
+    @patch("rag.components.embedding_cache.create_embedding_cache")
+    def test_cache_wraps_embeddings(self, mock_create_cache):
+        import rag.components.embeddings
+        from langchain_huggingface import HuggingFaceEmbeddings
+        result = rag.components.embeddings.create_embeddings(cache=True)
+        mock_create_cache.assert_called_once_with(HuggingFaceEmbeddings.return_value, backend="torch")
+        assert result == mock_create_cache.return_value
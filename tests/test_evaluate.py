@@ -161,7 +161,9 @@ class TestEvaluateSingle:
         from rag.evaluation.evaluate import evaluate_single
 
         evaluate_single("my query", "s", ["a"], mock_graph)
-        mock_graph.invoke.assert_called_once_with({"query": "my query"})
+        mock_graph.invoke.assert_called_once_with(
+            {"query": "my query"}, {"configurable": {"profile": True}},
+        )
 
     def test_uses_answer_from_graph_result(self):
         mock_graph = MagicMock()
@@ -194,7 +196,7 @@ class TestRunEvaluation:
     def test_aggregates_retrieval_hits(self):
         call_count = {"n": 0}
 
-        def mock_invoke(input_dict):
+        def mock_invoke(input_dict, config=None):
             call_count["n"] += 1
             if call_count["n"] == 1:
                 return {"answer": "keyword1", "sources": ["faq.csv:r1"]}
@@ -313,6 +315,7 @@ class TestEvaluateMain:
 
         call_args = mock_run.call_args[0]
         assert call_args[1] == mock_get_graph.return_value
+        assert mock_get_graph.call_args.kwargs["use_cache"] is False
 
 
 class TestRunEvaluationExtended:
@@ -684,3 +687,53 @@ class TestMainRetrieval:
         mock_load.assert_called_once()
         mock_run.assert_called_once()
         mock_print.assert_called_once()
+
+
+class TestStageBreakdown:
+    @patch("builtins.print")
+    def test_prints_percentiles_per_stage(self, mock_print):
+        from rag.evaluation.evaluate import print_report
+
+        config = {"CHUNK_SIZE": 500, "CHUNK_OVERLAP": 100, "SEARCH_K": 10, "RERANK_TOP_K": 3}
+        results = [
+            {"query": f"q{i}", "retrieval_hit": True, "faithfulness": 1.0, "exact_match": True,
+             "latency": 0.1 * (i + 1), "answer": "a", "generated_tokens": 5,
+             "timings": {"retrieve": (i + 1) * 1_000_000, "rerank": 500_000,
+                         "generate": 2_000_000, "prefill": 1_000_000, "decode": 1_000_000}}
+            for i in range(10)
+        ]
+        print_report(results, config)
+        lines = [str(c.args[0]) if c.args else "" for c in mock_print.call_args_list]
+
+        assert any(line.startswith("Latency p50=0.55s p90=0.91s") for line in lines)
+        retrieve = next(line for line in lines if line.startswith("retrieve"))
+        assert retrieve.split()[1:] == ["5.5", "9.1", "9.9", "10.0", "10"]
+        assert any(line.startswith("  rerank") for line in lines)
+        assert any("Decode: 4000.0 tokens/s" in line for line in lines)
+
+    @patch("builtins.print")
+    def test_no_timings_no_breakdown(self, mock_print):
+        from rag.evaluation.evaluate import print_report
+
+        config = {"CHUNK_SIZE": 500, "CHUNK_OVERLAP": 100, "SEARCH_K": 10, "RERANK_TOP_K": 3}
+        results = [{"query": "q", "retrieval_hit": True, "faithfulness": 1.0, "exact_match": True, "latency": 0.5, "answer": "a"}]
+        print_report(results, config)
+        printed = " ".join(str(c) for c in mock_print.call_args_list)
+
+        assert "Stage breakdown" not in printed
+        assert "tokens/s" not in printed
+
+    def test_retrieval_eval_records_stages(self):
+        from rag.evaluation.evaluate import evaluate_single_retrieval
+        from rag.pipeline.timing import stage
+
+        container = MagicMock()
+
+        def retrieve(query):
+            with stage("vector_search"):
+                return [Document(page_content="c", metadata={"source": "s"})]
+
+        container.retrieval_strategy.retrieve.side_effect = retrieve
+        result = evaluate_single_retrieval("q", "s", [], container)
+
+        assert {"retrieve", "vector_search"} <= set(result["timings"])
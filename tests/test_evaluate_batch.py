@@ -0,0 +1,168 @@
+import threading
+import time
+from unittest.mock import patch, MagicMock
+
+from langchain_core.documents import Document
+
+from rag.evaluation.batch import (
+    retrieve_all, run_batch_evaluation, run_batch_retrieval_evaluation,
+)
+
+QUESTIONS = [
+    {"query": "q0", "expected_source": "s0", "expected_keywords": ["a0"]},
+    {"query": "q1", "expected_source": "s1", "expected_keywords": ["a1"]},
+    {"query": "q2", "expected_source": "s9", "expected_keywords": ["zz"]},
+]
+
+
+def _doc(i):
+    return Document(id=f"id{i}", page_content=f"a{i}", metadata={"source": f"s{i}"})
+
+
+def _container():
+    container = MagicMock()
+    container.retrieval_strategy.retrieve_batch.side_effect = lambda queries: [
+        [_doc(int(q[1:]))] for q in queries
+    ]
+    container.prompt_builder.side_effect = lambda query, contexts: f"{query}|{','.join(contexts)}"
+    # 評価では prefill / decode を測るためストリーミングで生成する
+    container.llm.stream.side_effect = lambda prompt: iter(["answer ", prompt.split("|")[1]])
+    return container
+
+
+class TestRetrieveAll:
+    def test_uses_retrieve_batch(self):
+        strategy = MagicMock()
+        strategy.retrieve_batch.return_value = [[], []]
+
+        docs, elapsed = retrieve_all(strategy, ["a", "b"])
+
+        strategy.retrieve_batch.assert_called_once_with(["a", "b"])
+        strategy.retrieve.assert_not_called()
+        assert docs == [[], []] and elapsed >= 0
+
+    def test_falls_back_to_retrieve(self):
+        class Strategy:
+            def retrieve(self, query):
+                return [Document(page_content=query)]
+
+        docs, _ = retrieve_all(Strategy(), ["a", "b"])
+        assert [d[0].page_content for d in docs] == ["a", "b"]
+
+
+class TestRunBatchRetrievalEvaluation:
+    def test_metrics_in_question_order(self):
+        results = run_batch_retrieval_evaluation(QUESTIONS, _container())
+
+        assert [r["query"] for r in results] == ["q0", "q1", "q2"]
+        assert [r["retrieval_hit"] for r in results] == [True, True, False]
+        assert [r["mrr"] for r in results] == [1.0, 1.0, 0.0]
+        assert all(r["retrieved_count"] == 1 for r in results)
+
+    def test_empty_questions(self):
+        container = MagicMock()
+        container.retrieval_strategy.retrieve_batch.return_value = []
+        assert run_batch_retrieval_evaluation([], container) == []
+
+
+class TestRunBatchEvaluation:
+    def test_generates_with_retrieved_contexts(self):
+        container = _container()
+
+        results = run_batch_evaluation(QUESTIONS, container, concurrency=2)
+
+        container.retrieval_strategy.retrieve_batch.assert_called_once_with(["q0", "q1", "q2"])
+        assert [r["answer"] for r in results] == ["answer a0", "answer a1", "answer a2"]
+        assert [r["retrieval_hit"] for r in results] == [True, True, False]
+        assert [r["exact_match"] for r in results] == [True, True, False]
+        assert all(r["generated_tokens"] == 2 for r in results)
+        assert {"generate", "prompt", "prefill", "decode"} <= set(results[0]["timings"])
+
+    def test_no_context_skips_llm(self):
+        container = _container()
+        container.retrieval_strategy.retrieve_batch.side_effect = lambda queries: [[] for _ in queries]
+
+        results = run_batch_evaluation(QUESTIONS[:1], container)
+
+        container.llm.stream.assert_not_called()
+        assert results[0]["retrieval_hit"] is False
+
+    def test_preserves_order_when_completion_is_out_of_order(self):
+        container = _container()
+        # 先頭の質問ほど生成に時間がかかる
+        container.llm.stream.side_effect = lambda prompt: iter([
+            time.sleep(0.05 * (3 - int(prompt[1]))) or prompt.split("|")[0]
+        ])
+
+        results = run_batch_evaluation(QUESTIONS, container, concurrency=3)
+
+        assert [r["answer"] for r in results] == ["q0", "q1", "q2"]
+
+    def test_concurrency_limit(self):
+        container = _container()
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def stream(prompt):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            yield "x"
+
+        container.llm.stream.side_effect = stream
+        questions = [dict(QUESTIONS[0], query=f"q{i % 3}") for i in range(8)]
+
+        run_batch_evaluation(questions, container, concurrency=2)
+
+        assert peak[0] <= 2
+
+    def test_llm_factory_per_worker(self):
+        container = _container()
+        created = []
+
+        def factory():
+            llm = MagicMock()
+            llm.stream.side_effect = lambda prompt: iter(["o", "k"])
+            created.append(llm)
+            return llm
+
+        results = run_batch_evaluation(QUESTIONS, container, concurrency=1, llm_factory=factory)
+
+        assert len(created) == 1
+        assert created[0].stream.call_count == 3
+        container.llm.stream.assert_not_called()
+        assert all(r["answer"] == "ok" for r in results)
+
+
+class TestEvaluateMainBatch:
+    @patch("rag.evaluation.evaluate.print_report")
+    @patch("rag.evaluation.batch.run_batch_evaluation")
+    @patch("rag.evaluation.evaluate.run_evaluation")
+    @patch("rag.evaluation.evaluate.load_questions", return_value=[])
+    @patch("rag.evaluation.evaluate.get_container")
+    @patch("rag.evaluation.evaluate.get_graph")
+    def test_main_batch_uses_batch_runner(self, mock_get_graph, mock_get_container, mock_load,
+                                          mock_run, mock_batch, mock_print):
+        from rag.evaluation.evaluate import main
+
+        main(batch=True)
+
+        mock_batch.assert_called_once()
+        assert mock_batch.call_args[0][1] == mock_get_container.return_value
+        mock_run.assert_not_called()
+        mock_get_graph.assert_not_called()
+
+    @patch("rag.evaluation.evaluate.print_retrieval_report")
+    @patch("rag.evaluation.batch.run_batch_retrieval_evaluation")
+    @patch("rag.evaluation.evaluate.run_retrieval_evaluation")
+    @patch("rag.evaluation.evaluate.load_questions", return_value=[])
+    @patch("rag.evaluation.evaluate.get_container")
+    def test_main_retrieval_batch(self, mock_get_container, mock_load, mock_run, mock_batch, mock_print):
+        from rag.evaluation.evaluate import main_retrieval
+
+        main_retrieval(batch=True)
+
+        mock_batch.assert_called_once_with([], mock_get_container.return_value)
+        mock_run.assert_not_called()
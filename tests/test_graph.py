@@ -8,9 +8,9 @@ from rag.core.container import AppContainer, RagSettings
 @pytest.fixture(autouse=True)
 def reset_graph():
     import rag.pipeline.graph
-    rag.pipeline.graph._graph = None
+    rag.pipeline.graph._graphs.clear()
     yield
-    rag.pipeline.graph._graph = None
+    rag.pipeline.graph._graphs.clear()
 
 
 @pytest.fixture
@@ -18,6 +18,7 @@ def mock_container():
     container = MagicMock(spec=AppContainer)
     container.settings = RagSettings(search_k=20, rerank_top_k=3)
     container.prompt_builder = lambda q, c: f"以下の情報を基に回答してください:\n\n{c}\n\n質問:{q}\n回答:"
+    container.semantic_cache = None
     return container
 
 
@@ -213,3 +214,318 @@ class TestGetGraph:
         g2 = get_graph(container=mock_container)
         # container injection always creates a new graph
         assert g2 is not g1
+
+
+class TestGetGraphAnswerCache:
+    def test_wraps_with_answer_cache(self, mock_container):
+        from rag.pipeline.graph import get_graph
+        from rag.pipeline.answer_cache import CachedGraph
+
+        graph = get_graph(container=mock_container)
+        assert isinstance(graph, CachedGraph)
+        assert graph.cache is mock_container.answer_cache
+
+    def test_use_cache_false_returns_compiled_graph(self, mock_container):
+        from rag.pipeline.graph import get_graph
+        from rag.pipeline.answer_cache import CachedGraph
+
+        graph = get_graph(container=mock_container, use_cache=False)
+        assert not isinstance(graph, CachedGraph)
+
+    def test_default_container_is_wrapped(self, mock_container):
+        from unittest.mock import patch
+        from rag.pipeline.graph import get_graph
+        from rag.pipeline.answer_cache import CachedGraph
+
+        with patch("rag.core.container.get_container", return_value=mock_container):
+            cached = get_graph()
+            uncached = get_graph(use_cache=False)
+
+        assert isinstance(cached, CachedGraph)
+        assert cached.cache is mock_container.answer_cache
+        assert not isinstance(uncached, CachedGraph)
+        assert get_graph() is cached
+
+    def test_no_cache_configured(self, mock_container):
+        from rag.pipeline.graph import get_graph
+        from rag.pipeline.answer_cache import CachedGraph
+
+        mock_container.answer_cache = None
+        graph = get_graph(container=mock_container)
+        assert not isinstance(graph, CachedGraph)
+
+
+class TestSemanticCacheNodes:
+    @pytest.fixture
+    def cached_container(self, mock_container):
+        from rag.pipeline.semantic_cache import SemanticCache
+
+        mock_container.semantic_cache = SemanticCache(threshold=0.9, max_entries=8)
+        mock_container.corpus_version.return_value = "v1"
+        mock_container.embeddings.embed_query.side_effect = (
+            lambda q: [1.0, 0.0] if "パスワード" in q else [0.0, 1.0]
+        )
+        mock_container.retrieval_strategy.retrieve.return_value = [
+            Document(page_content="リセット手順", metadata={"source": "faq.csv:r1"}),
+        ]
+        mock_container.llm.invoke.return_value = "回答"
+        return mock_container
+
+    def test_graph_has_cache_nodes(self, cached_container):
+        from rag.pipeline.graph import build_rag_graph
+
+        graph = build_rag_graph(container=cached_container)
+        assert "semantic_lookup" in graph.nodes
+        assert "semantic_store" in graph.nodes
+
+    def test_paraphrase_skips_retrieve_and_llm(self, cached_container):
+        from rag.pipeline.graph import build_rag_graph
+
+        graph = build_rag_graph(container=cached_container)
+        first = graph.invoke({"query": "パスワードを忘れた"})
+        second = graph.invoke({"query": "パスワードをリセットしたい"})
+
+        assert not first.get("cache_hit")
+        assert second["cache_hit"] is True
+        assert second["answer"] == "回答"
+        assert second["sources"] == ["faq.csv:r1"]
+        cached_container.retrieval_strategy.retrieve.assert_called_once()
+        cached_container.llm.invoke.assert_called_once()
+
+    def test_unrelated_query_misses(self, cached_container):
+        from rag.pipeline.graph import build_rag_graph
+
+        graph = build_rag_graph(container=cached_container)
+        graph.invoke({"query": "パスワードを忘れた"})
+        graph.invoke({"query": "料金プラン"})
+
+        assert cached_container.llm.invoke.call_count == 2
+
+    def test_miss_reuses_query_embedding(self, cached_container):
+        from rag.pipeline.graph import build_rag_graph
+
+        graph = build_rag_graph(container=cached_container)
+        graph.invoke({"query": "パスワードを忘れた"})
+
+        cached_container.embeddings.embed_query.assert_called_once_with("パスワードを忘れた")
+        cached_container.retrieval_strategy.retrieve.assert_called_once_with(
+            "パスワードを忘れた", embedding=[1.0, 0.0],
+        )
+
+    def test_corpus_version_read_once_per_request(self, cached_container):
+        from rag.pipeline.answer_cache import LRUAnswerCache
+        from rag.pipeline.graph import get_graph
+
+        cached_container.answer_cache = LRUAnswerCache()
+        graph = get_graph(container=cached_container)
+        graph.invoke({"query": "パスワードを忘れた"})
+
+        cached_container.corpus_version.assert_called_once()
+        assert cached_container.semantic_cache.lookup([1.0, 0.0], "v1") is not None
+
+    def test_store_reuses_version_from_lookup(self, cached_container):
+        from rag.pipeline.graph import build_rag_graph
+
+        build_rag_graph(container=cached_container).invoke({"query": "パスワードを忘れた"})
+
+        cached_container.corpus_version.assert_called_once()
+
+    def test_use_cache_false_skips_semantic_cache(self, cached_container):
+        from rag.pipeline.graph import get_graph
+
+        graph = get_graph(container=cached_container, use_cache=False)
+        graph.invoke({"query": "パスワードを忘れた"})
+        result = graph.invoke({"query": "パスワードをリセットしたい"})
+
+        assert "semantic_lookup" not in graph.nodes
+        assert not result.get("cache_hit")
+        assert cached_container.llm.invoke.call_count == 2
+        assert len(cached_container.semantic_cache) == 0
+
+    def test_empty_result_not_cached(self, cached_container):
+        from rag.pipeline.graph import build_rag_graph
+
+        cached_container.retrieval_strategy.retrieve.return_value = []
+        graph = build_rag_graph(container=cached_container)
+        graph.invoke({"query": "パスワードを忘れた"})
+
+        assert len(cached_container.semantic_cache) == 0
+
+
+class TestTokenStreaming:
+    @pytest.fixture
+    def streaming_container(self, mock_container):
+        mock_container.retrieval_strategy.retrieve.return_value = [
+            Document(page_content="context", metadata={"source": "s1"}),
+        ]
+        mock_container.llm.stream.return_value = iter(["回", "答"])
+        return mock_container
+
+    def test_generate_streams_when_requested(self, streaming_container):
+        from rag.pipeline.graph import build_rag_graph, stream_answer
+
+        graph = build_rag_graph(container=streaming_container)
+        events = list(stream_answer(graph, "質問"))
+
+        assert events[:2] == [("token", "回"), ("token", "答")]
+        kind, result = events[-1]
+        assert kind == "result"
+        assert result["answer"] == "回答"
+        streaming_container.llm.invoke.assert_not_called()
+
+    def test_invoke_does_not_stream(self, streaming_container):
+        from rag.pipeline.graph import build_rag_graph
+
+        streaming_container.llm.invoke.return_value = "回答"
+        graph = build_rag_graph(container=streaming_container)
+        graph.invoke({"query": "質問"})
+
+        streaming_container.llm.stream.assert_not_called()
+
+    def test_no_context_yields_result_only(self, streaming_container):
+        from rag.pipeline.graph import build_rag_graph, stream_answer
+
+        streaming_container.retrieval_strategy.retrieve.return_value = []
+        graph = build_rag_graph(container=streaming_container)
+        events = list(stream_answer(graph, "質問"))
+
+        assert len(events) == 1
+        assert events[0][1]["answer"] == "該当する情報が見つかりませんでした。"
+
+
+class TestTimings:
+    @pytest.fixture
+    def timed_container(self, mock_container):
+        mock_container.retrieval_strategy.retrieve.return_value = [
+            Document(page_content="context", metadata={"source": "s1"}),
+        ]
+        mock_container.llm.invoke.return_value = "回答"
+        mock_container.llm.stream.return_value = iter(["回", "答", "です"])
+        return mock_container
+
+    def test_invoke_records_node_timings(self, timed_container):
+        from rag.pipeline.graph import build_rag_graph
+
+        result = build_rag_graph(container=timed_container).invoke({"query": "質問"})
+
+        assert {"retrieve", "generate", "prompt", "llm"} <= set(result["timings"])
+        assert all(isinstance(ns, int) and ns >= 0 for ns in result["timings"].values())
+        assert result["timings"]["generate"] >= result["timings"]["llm"]
+        timed_container.llm.stream.assert_not_called()
+
+    def test_profile_splits_prefill_and_decode(self, timed_container):
+        from rag.pipeline.graph import build_rag_graph, PROFILE_KEY
+
+        graph = build_rag_graph(container=timed_container)
+        result = graph.invoke({"query": "質問"}, {"configurable": {PROFILE_KEY: True}})
+
+        assert result["answer"] == "回答です"
+        assert result["generated_tokens"] == 3
+        assert {"prefill", "decode"} <= set(result["timings"])
+        assert "llm" not in result["timings"]
+        timed_container.llm.invoke.assert_not_called()
+
+    def test_retrieval_stages_recorded(self, timed_container):
+        from unittest.mock import MagicMock
+        from rag.pipeline.graph import build_rag_graph
+        from rag.pipeline.retrieval import TwoStageRetrieval
+
+        vectorstore = MagicMock()
+        vectorstore.similarity_search_with_score.return_value = [
+            (Document(page_content="c", metadata={"source": "s"}), 0.1),
+        ]
+        reranker = MagicMock()
+        reranker.compress_documents.side_effect = lambda docs, query: docs
+        timed_container.retrieval_strategy = TwoStageRetrieval(
+            vectorstore=vectorstore, reranker=reranker, search_k=5, rerank_top_k=3,
+        )
+
+        result = build_rag_graph(container=timed_container).invoke({"query": "質問"})
+
+        assert {"vector_search", "rerank"} <= set(result["timings"])
+
+
+class TestAsyncGraph:
+    @pytest.fixture
+    def async_container(self, mock_container):
+        from unittest.mock import AsyncMock
+
+        docs = [Document(page_content="context", metadata={"source": "s1"})]
+        mock_container.retrieval_strategy.aretrieve = AsyncMock(return_value=docs)
+        mock_container.llm.ainvoke = AsyncMock(return_value="非同期回答")
+
+        async def astream(prompt):
+            for token in ["非同期", "回答"]:
+                yield token
+
+        mock_container.llm.astream = astream
+        return mock_container
+
+    def test_ainvoke_uses_async_nodes(self, async_container):
+        import asyncio
+        from rag.pipeline.graph import build_rag_graph
+
+        graph = build_rag_graph(container=async_container)
+        result = asyncio.run(graph.ainvoke({"query": "質問"}))
+
+        assert result["answer"] == "非同期回答"
+        assert result["sources"] == ["s1"]
+        async_container.retrieval_strategy.aretrieve.assert_awaited_once_with("質問")
+        async_container.retrieval_strategy.retrieve.assert_not_called()
+        async_container.llm.invoke.assert_not_called()
+
+    def test_ainvoke_profile_records_timings(self, async_container):
+        import asyncio
+        from rag.pipeline.graph import build_rag_graph, PROFILE_KEY
+
+        graph = build_rag_graph(container=async_container)
+        result = asyncio.run(graph.ainvoke({"query": "質問"}, {"configurable": {PROFILE_KEY: True}}))
+
+        assert result["answer"] == "非同期回答"
+        assert result["generated_tokens"] == 2
+        assert {"retrieve", "generate", "prefill", "decode"} <= set(result["timings"])
+
+    def test_astream_answer_yields_tokens(self, async_container):
+        import asyncio
+        from rag.pipeline.graph import build_rag_graph, astream_answer
+
+        graph = build_rag_graph(container=async_container)
+
+        async def collect():
+            return [event async for event in astream_answer(graph, "質問")]
+
+        events = asyncio.run(collect())
+        assert events[:2] == [("token", "非同期"), ("token", "回答")]
+        assert events[-1][1]["answer"] == "非同期回答"
+
+    def test_async_semantic_lookup_hit(self, async_container):
+        import asyncio
+        from unittest.mock import AsyncMock
+        from rag.pipeline.semantic_cache import SemanticCache
+        from rag.pipeline.graph import build_rag_graph
+
+        async_container.semantic_cache = SemanticCache(threshold=0.9, max_entries=4)
+        async_container.semantic_cache.add([1.0, 0.0], {"answer": "保存済み", "sources": [], "contexts": ["c"]}, "v1")
+        async_container.corpus_version.return_value = "v1"
+        async_container.embeddings.aembed_query = AsyncMock(return_value=[1.0, 0.0])
+
+        graph = build_rag_graph(container=async_container)
+        result = asyncio.run(graph.ainvoke({"query": "質問"}))
+
+        assert result["answer"] == "保存済み"
+        async_container.retrieval_strategy.aretrieve.assert_not_awaited()
+
+    def test_async_semantic_miss_reuses_query_embedding(self, async_container):
+        import asyncio
+        from unittest.mock import AsyncMock
+        from rag.pipeline.semantic_cache import SemanticCache
+        from rag.pipeline.graph import build_rag_graph
+
+        async_container.semantic_cache = SemanticCache(threshold=0.9, max_entries=4)
+        async_container.corpus_version.return_value = "v1"
+        async_container.embeddings.aembed_query = AsyncMock(return_value=[0.0, 1.0])
+
+        graph = build_rag_graph(container=async_container)
+        asyncio.run(graph.ainvoke({"query": "質問"}))
+
+        async_container.retrieval_strategy.aretrieve.assert_awaited_once_with("質問", embedding=[0.0, 1.0])
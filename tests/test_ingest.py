@@ -3,6 +3,12 @@ from langchain_core.documents import Document
 import pytest
 
 
+@pytest.fixture(autouse=True)
+def pgvector_loader(monkeypatch):
+    """main() のテストは maintenance_vectorstore.add_documents への書き込みを検証する（COPY ローダーは別途）。"""
+    monkeypatch.setattr("rag.data.ingest.INGEST_LOADER", "pgvector")
+
+
 class TestLoadPdfs:
     @patch("rag.data.ingest.PdfReader")
     @patch("rag.data.ingest.os.listdir", return_value=["doc.pdf", "notes.txt"])
@@ -12,7 +18,7 @@ class TestLoadPdfs:
         mock_reader.return_value.pages = [page]
         from rag.data.ingest import load_pdfs
 
-        result = load_pdfs()
+        result = list(load_pdfs())
 
         mock_reader.assert_called_once_with("data/pdf/doc.pdf")
         assert result == [("page text", "doc.pdf:p1")]
@@ -27,7 +33,7 @@ class TestLoadPdfs:
         mock_reader.return_value.pages = [page1, page2]
         from rag.data.ingest import load_pdfs
 
-        result = load_pdfs()
+        result = list(load_pdfs())
         assert result == [("page 1", "a.pdf:p1"), ("page 2", "a.pdf:p2")]
 
     @patch("rag.data.ingest.PdfReader")
@@ -44,7 +50,7 @@ class TestLoadPdfs:
         ]
         from rag.data.ingest import load_pdfs
 
-        result = load_pdfs()
+        result = list(load_pdfs(workers=1))
         assert len(result) == 2
         assert result[0] == ("content A", "first.pdf:p1")
         assert result[1] == ("content B", "second.pdf:p1")
@@ -57,7 +63,7 @@ class TestLoadPdfs:
         mock_reader.return_value.pages = [page]
         from rag.data.ingest import load_pdfs
 
-        result = load_pdfs()
+        result = list(load_pdfs())
         assert isinstance(result[0], tuple)
         assert len(result[0]) == 2
         text, source = result[0]
@@ -73,7 +79,7 @@ class TestLoadPdfs:
         mock_reader.return_value.pages = pages
         from rag.data.ingest import load_pdfs
 
-        result = load_pdfs()
+        result = list(load_pdfs())
         assert result[0][1] == "doc.pdf:p1"
         assert result[1][1] == "doc.pdf:p2"
         assert result[2][1] == "doc.pdf:p3"
@@ -84,12 +90,12 @@ class TestLoadCsvs:
     @patch("rag.data.ingest.os.listdir", return_value=["data.csv", "readme.md"])
     def test_loads_only_csv_files(self, mock_listdir, mock_read_csv):
         import pandas as pd
-        mock_read_csv.return_value = pd.DataFrame({"name": ["Alice"], "age": [30]})
+        mock_read_csv.return_value = iter([pd.DataFrame({"name": ["Alice"], "age": [30]})])
         from rag.data.ingest import load_csvs
 
-        result = load_csvs()
+        result = list(load_csvs())
 
-        mock_read_csv.assert_called_once_with("data/csv/data.csv")
+        mock_read_csv.assert_called_once_with("data/csv/data.csv", chunksize=10000)
         assert len(result) == 1
         assert "Alice" in result[0][0]
         assert "30" in result[0][0]
@@ -99,13 +105,13 @@ class TestLoadCsvs:
     @patch("rag.data.ingest.os.listdir", return_value=["data.csv"])
     def test_converts_rows_to_key_value(self, mock_listdir, mock_read_csv):
         import pandas as pd
-        mock_read_csv.return_value = pd.DataFrame({
+        mock_read_csv.return_value = iter([pd.DataFrame({
             "col1": ["a", "b"],
             "col2": [1, 2],
-        })
+        })])
         from rag.data.ingest import load_csvs
 
-        result = load_csvs()
+        result = list(load_csvs())
         assert len(result) == 2
         assert "a" in result[0][0]
         assert "1" in result[0][0]
@@ -117,20 +123,73 @@ class TestLoadCsvs:
     def test_loads_multiple_csv_files(self, mock_listdir, mock_read_csv):
         import pandas as pd
         mock_read_csv.side_effect = [
-            pd.DataFrame({"q": ["q1"]}),
-            pd.DataFrame({"name": ["p1"]}),
+            iter([pd.DataFrame({"q": ["q1"]})]),
+            iter([pd.DataFrame({"name": ["p1"]})]),
         ]
         from rag.data.ingest import load_csvs
 
-        result = load_csvs()
+        result = list(load_csvs())
         assert len(result) == 2
         assert result[0][1] == "faq.csv:r1"
         assert result[1][1] == "products.csv:r1"
 
 
+class TestLoadCsvsVectorized:
+    @patch("rag.data.ingest.pd.read_csv")
+    @patch("rag.data.ingest.os.listdir", return_value=["faq.csv"])
+    def test_excludes_category_column(self, mock_listdir, mock_read_csv):
+        import pandas as pd
+        mock_read_csv.return_value = iter([pd.DataFrame({
+            "question": ["q1"], "answer": ["a1"], "category": ["アカウント"],
+        })])
+        from rag.data.ingest import load_csvs
+
+        result = list(load_csvs())
+        assert result == [("q1\na1", "faq.csv:r1", {})]
+
+    @patch("rag.data.ingest.pd.read_csv")
+    @patch("rag.data.ingest.os.listdir", return_value=["p.csv"])
+    def test_row_numbers_continue_across_chunks(self, mock_listdir, mock_read_csv):
+        import pandas as pd
+        mock_read_csv.return_value = iter([
+            pd.DataFrame({"name": ["a", "b"]}, index=[0, 1]),
+            pd.DataFrame({"name": ["c"]}, index=[2]),
+        ])
+        from rag.data.ingest import load_csvs
+
+        result = list(load_csvs(chunksize=2))
+        assert [source for _, source, _ in result] == ["p.csv:r1", "p.csv:r2", "p.csv:r3"]
+        mock_read_csv.assert_called_once_with("data/csv/p.csv", chunksize=2)
+
+    @patch("rag.data.ingest.pd.read_csv")
+    @patch("rag.data.ingest.os.listdir", return_value=["p.csv"])
+    def test_metadata_columns_moved_out_of_content(self, mock_listdir, mock_read_csv):
+        import pandas as pd
+        mock_read_csv.return_value = iter([pd.DataFrame({
+            "name": ["plan"], "price": [980], "sku": [None],
+        })])
+        from rag.data.ingest import load_csvs
+
+        text, source, metadata = list(load_csvs(metadata_columns=["price", "sku"]))[0]
+        assert text == "plan"
+        assert metadata == {"price": 980, "sku": None}
+        assert type(metadata["price"]) is int
+
+    @patch("rag.data.ingest.get_container")
+    @patch("rag.data.ingest.load_csvs", return_value=[("plan", "p.csv:r1", {"price": 980})])
+    @patch("rag.data.ingest.load_pdfs", return_value=[])
+    def test_csv_metadata_reaches_document(self, mock_pdfs, mock_csvs, mock_get_container):
+        from rag.data.ingest import main
+
+        main()
+
+        docs = mock_get_container.return_value.maintenance_vectorstore.add_documents.call_args[0][0]
+        assert docs[0].metadata == {"price": 980, "source": "p.csv:r1", "chunk_index": 0}
+
+
 class TestMain:
     @patch("rag.data.ingest.get_container")
-    @patch("rag.data.ingest.load_csvs", return_value=[("csv text", "file.csv:r1")])
+    @patch("rag.data.ingest.load_csvs", return_value=[("csv text", "file.csv:r1", {})])
     @patch("rag.data.ingest.load_pdfs", return_value=[("pdf text", "doc.pdf:p1")])
     def test_full_pipeline(self, mock_pdfs, mock_csvs, mock_get_container):
         from rag.data.ingest import main
@@ -139,19 +198,19 @@ class TestMain:
 
         mock_pdfs.assert_called_once()
         mock_csvs.assert_called_once()
-        mock_get_container.return_value.vectorstore.add_documents.assert_called_once()
-        docs = mock_get_container.return_value.vectorstore.add_documents.call_args[0][0]
+        mock_get_container.return_value.maintenance_vectorstore.add_documents.assert_called_once()
+        docs = mock_get_container.return_value.maintenance_vectorstore.add_documents.call_args[0][0]
         assert len(docs) == 2
 
     @patch("rag.data.ingest.get_container")
-    @patch("rag.data.ingest.load_csvs", return_value=[("csv text", "file.csv:r1")])
+    @patch("rag.data.ingest.load_csvs", return_value=[("csv text", "file.csv:r1", {})])
     @patch("rag.data.ingest.load_pdfs", return_value=[("pdf text", "doc.pdf:p1")])
     def test_documents_have_metadata(self, mock_pdfs, mock_csvs, mock_get_container):
         from rag.data.ingest import main
 
         main()
 
-        docs = mock_get_container.return_value.vectorstore.add_documents.call_args[0][0]
+        docs = mock_get_container.return_value.maintenance_vectorstore.add_documents.call_args[0][0]
         for doc in docs:
             assert isinstance(doc, Document)
             assert "source" in doc.metadata
@@ -165,18 +224,18 @@ class TestMain:
 
         main()
 
-        docs = mock_get_container.return_value.vectorstore.add_documents.call_args[0][0]
+        docs = mock_get_container.return_value.maintenance_vectorstore.add_documents.call_args[0][0]
         assert len(docs) == 3  # 3 paragraphs
 
     @patch("rag.data.ingest.get_container")
-    @patch("rag.data.ingest.load_csvs", return_value=[("csv row text", "data.csv:r1")])
+    @patch("rag.data.ingest.load_csvs", return_value=[("csv row text", "data.csv:r1", {})])
     @patch("rag.data.ingest.load_pdfs", return_value=[])
     def test_csv_one_row_one_document(self, mock_pdfs, mock_csvs, mock_get_container):
         from rag.data.ingest import main
 
         main()
 
-        docs = mock_get_container.return_value.vectorstore.add_documents.call_args[0][0]
+        docs = mock_get_container.return_value.maintenance_vectorstore.add_documents.call_args[0][0]
         assert len(docs) == 1
         assert docs[0].page_content == "csv row text"
         assert docs[0].metadata["chunk_index"] == 0
@@ -189,12 +248,12 @@ class TestMain:
 
         main()
 
-        mock_get_container.return_value.vectorstore.add_documents.assert_not_called()
+        mock_get_container.return_value.maintenance_vectorstore.add_documents.assert_not_called()
 
     @patch("rag.data.ingest.get_container")
     @patch("rag.data.ingest.load_csvs", return_value=[
-        ("row1 text", "data.csv:r1"),
-        ("row2 text", "data.csv:r2"),
+        ("row1 text", "data.csv:r1", {}),
+        ("row2 text", "data.csv:r2", {}),
     ])
     @patch("rag.data.ingest.load_pdfs", return_value=[
         ("pdf text", "doc.pdf:p1"),
@@ -204,19 +263,19 @@ class TestMain:
 
         main()
 
-        mock_get_container.return_value.vectorstore.add_documents.assert_called_once()
-        docs = mock_get_container.return_value.vectorstore.add_documents.call_args[0][0]
+        mock_get_container.return_value.maintenance_vectorstore.add_documents.assert_called_once()
+        docs = mock_get_container.return_value.maintenance_vectorstore.add_documents.call_args[0][0]
         assert len(docs) == 3
 
     @patch("rag.data.ingest.get_container")
-    @patch("rag.data.ingest.load_csvs", return_value=[("csv text", "file.csv:r1")])
+    @patch("rag.data.ingest.load_csvs", return_value=[("csv text", "file.csv:r1", {})])
     @patch("rag.data.ingest.load_pdfs", return_value=[("pdf text", "doc.pdf:p1")])
     def test_main_creates_correct_documents(self, mock_pdfs, mock_csvs, mock_get_container):
         from rag.data.ingest import main
 
         main()
 
-        docs = mock_get_container.return_value.vectorstore.add_documents.call_args[0][0]
+        docs = mock_get_container.return_value.maintenance_vectorstore.add_documents.call_args[0][0]
         for doc in docs:
             assert isinstance(doc, Document)
             assert isinstance(doc.page_content, str)
@@ -231,7 +290,7 @@ class TestMain:
 
         main()
 
-        docs = mock_get_container.return_value.vectorstore.add_documents.call_args[0][0]
+        docs = mock_get_container.return_value.maintenance_vectorstore.add_documents.call_args[0][0]
         assert len(docs) > 1
 
 
@@ -240,14 +299,14 @@ class TestLoadEdgeCases:
     def test_load_pdfs_empty_directory(self, mock_listdir):
         from rag.data.ingest import load_pdfs
 
-        result = load_pdfs()
+        result = list(load_pdfs())
         assert result == []
 
     @patch("rag.data.ingest.os.listdir", return_value=[])
     def test_load_csvs_empty_directory(self, mock_listdir):
         from rag.data.ingest import load_csvs
 
-        result = load_csvs()
+        result = list(load_csvs())
         assert result == []
 
     @patch("rag.data.ingest.PdfReader")
@@ -258,7 +317,7 @@ class TestLoadEdgeCases:
         mock_reader.return_value.pages = [page]
         from rag.data.ingest import load_pdfs
 
-        result = load_pdfs()
+        result = list(load_pdfs())
         # 空テキストでもタプルとして返される
         assert result == [("", "doc.pdf:p1")]
 
@@ -270,7 +329,7 @@ class TestLoadEdgeCases:
         mock_reader.return_value.pages = [page]
         from rag.data.ingest import load_pdfs
 
-        result = load_pdfs()
+        result = list(load_pdfs())
         assert result == [(None, "doc.pdf:p1")]
 
     @patch("rag.data.ingest.os.listdir", side_effect=FileNotFoundError)
@@ -278,19 +337,19 @@ class TestLoadEdgeCases:
         from rag.data.ingest import load_pdfs
 
         with pytest.raises(FileNotFoundError):
-            load_pdfs()
+            list(load_pdfs())
 
     @patch("rag.data.ingest.os.listdir", side_effect=FileNotFoundError)
     def test_load_csvs_missing_directory_raises_error(self, mock_listdir):
         from rag.data.ingest import load_csvs
 
         with pytest.raises(FileNotFoundError):
-            load_csvs()
+            list(load_csvs())
 
 
 class TestMainEdgeCases:
     @patch("rag.data.ingest.get_container")
-    @patch("rag.data.ingest.load_csvs", return_value=[("", "empty.csv:r1")])
+    @patch("rag.data.ingest.load_csvs", return_value=[("", "empty.csv:r1", {})])
     @patch("rag.data.ingest.load_pdfs", return_value=[])
     def test_empty_csv_text_produces_no_documents(self, mock_pdfs, mock_csvs, mock_get_container):
         from rag.data.ingest import main
@@ -298,4 +357,309 @@ class TestMainEdgeCases:
         main()
 
         # 空テキストはTextSplitterがドキュメントを生成しないため add_documents 未呼出
-        mock_get_container.return_value.vectorstore.add_documents.assert_not_called()
+        mock_get_container.return_value.maintenance_vectorstore.add_documents.assert_not_called()
+
+
+class TestDocumentDiff:
+    def _doc(self, text, source, idx=0):
+        return Document(page_content=text, metadata={"source": source, "chunk_index": idx})
+
+    def test_all_new_when_manifest_empty(self):
+        from rag.data.ingest import DocumentDiff
+
+        docs = [self._doc("a", "f.csv:r1"), self._doc("b", "f.csv:r2")]
+        diff = DocumentDiff({})
+        changed = list(diff.changed(docs))
+        assert [doc for doc, _ in changed] == docs
+        assert [e.key for e in diff.entries] == [("f.csv:r1", 0), ("f.csv:r2", 0)]
+        assert diff.stale() == []
+
+    def test_unchanged_chunk_is_skipped(self):
+        from rag.data.ingest import DocumentDiff
+        from rag.infra.manifest import ManifestEntry, content_hash, chunk_id
+
+        doc = self._doc("same", "f.csv:r1")
+        existing = {("f.csv:r1", 0): ManifestEntry("f.csv:r1", 0, content_hash("same"), chunk_id("f.csv:r1", 0))}
+        diff = DocumentDiff(existing)
+        assert list(diff.changed([doc])) == []
+        assert diff.entries == []
+        assert diff.unchanged == 1
+        assert diff.stale() == []
+
+    def test_modified_chunk_reuses_doc_id(self):
+        from rag.data.ingest import DocumentDiff
+        from rag.infra.manifest import ManifestEntry, content_hash, chunk_id
+
+        existing = {("f.csv:r1", 0): ManifestEntry("f.csv:r1", 0, content_hash("old"), chunk_id("f.csv:r1", 0))}
+        diff = DocumentDiff(existing)
+        changed = list(diff.changed([self._doc("new", "f.csv:r1")]))
+        assert len(changed) == 1
+        assert changed[0][1] == chunk_id("f.csv:r1", 0)
+        assert diff.entries[0].content_hash == content_hash("new")
+
+    def test_missing_source_is_stale(self):
+        from rag.data.ingest import DocumentDiff
+        from rag.infra.manifest import ManifestEntry
+
+        gone = ManifestEntry("old.pdf:p1", 0, "x" * 64, "id-1")
+        diff = DocumentDiff({gone.key: gone})
+        list(diff.changed([]))
+        assert diff.stale() == [gone]
+
+
+class TestStreamingLoaders:
+    @patch("rag.data.ingest.PdfReader")
+    @patch("rag.data.ingest.os.listdir", return_value=["doc.pdf"])
+    def test_load_pdfs_is_lazy(self, mock_listdir, mock_reader):
+        from rag.data.ingest import load_pdfs
+
+        load_pdfs()
+        mock_listdir.assert_not_called()
+        mock_reader.assert_not_called()
+
+    @patch("rag.data.ingest.ProcessPoolExecutor")
+    @patch("rag.data.ingest.os.listdir", return_value=["a.pdf", "b.pdf", "c.pdf"])
+    def test_load_pdfs_uses_pool_per_file_in_order(self, mock_listdir, mock_pool_cls):
+        from concurrent.futures import Future
+        from rag.data.ingest import load_pdfs, _extract_pdf
+
+        def submit(fn, file):
+            assert fn is _extract_pdf
+            future = Future()
+            future.set_result([(f"text {file}", f"{file}:p1")])
+            return future
+
+        mock_pool_cls.return_value.__enter__.return_value.submit.side_effect = submit
+        result = list(load_pdfs(workers=2))
+
+        assert mock_pool_cls.call_args.kwargs["max_workers"] == 2
+        assert [source for _, source in result] == ["a.pdf:p1", "b.pdf:p1", "c.pdf:p1"]
+
+    def test_iter_documents_is_lazy(self):
+        from rag.data.ingest import iter_documents
+
+        def pdf_items():
+            yield ("para", "doc.pdf:p1")
+            raise AssertionError("should not be consumed")
+
+        docs = iter_documents(pdf_items(), [])
+        first = next(docs)
+        assert first.page_content == "para"
+
+
+class TestMainVectorIndex:
+    @patch("rag.data.ingest.get_container")
+    @patch("rag.data.ingest.load_csvs", return_value=[("csv text", "file.csv:r1", {})])
+    @patch("rag.data.ingest.load_pdfs", return_value=[])
+    def test_full_ingest_rebuilds_index_after_load(self, mock_pdfs, mock_csvs, mock_get_container):
+        from rag.data.ingest import main
+
+        container = mock_get_container.return_value
+        calls = []
+        container.vector_index.drop.side_effect = lambda: calls.append("drop")
+        container.maintenance_vectorstore.add_documents.side_effect = lambda *a, **k: calls.append("add")
+        container.vector_index.create.side_effect = lambda: calls.append("create")
+        main()
+
+        assert calls == ["drop", "add", "create"]
+
+
+class TestMainIncremental:
+    @patch("rag.data.ingest.get_container")
+    @patch("rag.data.ingest.load_csvs", return_value=[("csv text", "file.csv:r1", {})])
+    @patch("rag.data.ingest.load_pdfs", return_value=[])
+    def test_incremental_keeps_collection(self, mock_pdfs, mock_csvs, mock_get_container):
+        from rag.data.ingest import main
+
+        container = mock_get_container.return_value
+        container.manifest.load.return_value = {}
+        container.manifest.collection_has_documents.return_value = False
+        main(incremental=True)
+
+        container.maintenance_vectorstore.delete_collection.assert_not_called()
+        container.manifest.clear.assert_not_called()
+        container.maintenance_vectorstore.add_documents.assert_called_once()
+        container.vector_index.drop.assert_not_called()
+        container.vector_index.create.assert_called_once()
+
+    @patch("rag.data.ingest.get_container")
+    @patch("rag.data.ingest.load_csvs", return_value=[("csv text", "file.csv:r1", {})])
+    @patch("rag.data.ingest.load_pdfs", return_value=[])
+    def test_empty_manifest_with_existing_rows_rebuilds(self, mock_pdfs, mock_csvs, mock_get_container):
+        from rag.data import ingest
+
+        container = mock_get_container.return_value
+        container.manifest.load.return_value = {}
+        container.manifest.collection_has_documents.return_value = True
+        with patch.object(ingest, "open_loader", wraps=ingest.open_loader) as loader:
+            ingest.main(incremental=True)
+
+        container.maintenance_vectorstore.delete_collection.assert_called_once()
+        container.manifest.clear.assert_called_once()
+        container.vector_index.drop.assert_called_once()
+        assert loader.call_args.kwargs["upsert"] is False
+
+    @patch("rag.data.ingest.get_container")
+    @patch("rag.data.ingest.load_csvs", return_value=[("csv text", "file.csv:r1", {})])
+    @patch("rag.data.ingest.load_pdfs", return_value=[])
+    def test_incremental_skips_unchanged(self, mock_pdfs, mock_csvs, mock_get_container):
+        from rag.data.ingest import main
+        from rag.infra.manifest import ManifestEntry, content_hash, chunk_id
+
+        container = mock_get_container.return_value
+        container.manifest.load.return_value = {
+            ("file.csv:r1", 0): ManifestEntry("file.csv:r1", 0, content_hash("csv text"), chunk_id("file.csv:r1", 0)),
+        }
+        main(incremental=True)
+
+        container.maintenance_vectorstore.add_documents.assert_not_called()
+        container.maintenance_vectorstore.delete.assert_not_called()
+        container.manifest.bump_version.assert_not_called()
+
+    @patch("rag.data.ingest.get_container")
+    @patch("rag.data.ingest.load_csvs", return_value=[])
+    @patch("rag.data.ingest.load_pdfs", return_value=[])
+    def test_incremental_deletes_stale_chunks(self, mock_pdfs, mock_csvs, mock_get_container):
+        from rag.data.ingest import main
+        from rag.infra.manifest import ManifestEntry
+
+        container = mock_get_container.return_value
+        gone = ManifestEntry("old.pdf:p1", 0, "x" * 64, "id-1")
+        container.manifest.load.return_value = {gone.key: gone}
+        main(incremental=True)
+
+        container.maintenance_vectorstore.delete.assert_called_once_with(ids=["id-1"])
+        container.manifest.delete.assert_called_once_with([("old.pdf:p1", 0)])
+        container.manifest.bump_version.assert_called_once()
+
+    @patch("rag.data.ingest.get_container")
+    @patch("rag.data.ingest.load_csvs", return_value=[("csv text", "file.csv:r1", {})])
+    @patch("rag.data.ingest.load_pdfs", return_value=[])
+    def test_full_rebuild_clears_manifest_and_records_entries(self, mock_pdfs, mock_csvs, mock_get_container):
+        from rag.data.ingest import main
+        from rag.infra.manifest import chunk_id
+
+        container = mock_get_container.return_value
+        main()
+
+        container.maintenance_vectorstore.delete_collection.assert_called_once()
+        container.maintenance_vectorstore.create_collection.assert_called_once()
+        container.manifest.clear.assert_called_once()
+        assert container.maintenance_vectorstore.add_documents.call_args[1]["ids"] == [chunk_id("file.csv:r1", 0)]
+        container.manifest.upsert.assert_called_once()
+        container.manifest.bump_version.assert_called_once()
+
+
+class TestCreateChunker:
+    def test_char_unit_uses_split_by_structure(self):
+        from rag.data.ingest import create_chunker
+
+        chunker = create_chunker("char")
+        assert chunker("para1\n\npara2") == ["para1", "para2"]
+
+    @patch("rag.components.embeddings.create_tokenizer")
+    def test_token_unit_loads_embedding_tokenizer(self, mock_create_tokenizer):
+        from rag.data.ingest import create_chunker
+
+        mock_create_tokenizer.return_value.return_value = {"offset_mapping": [[(0, 5)]]}
+        chunker = create_chunker("token")
+        assert chunker("hello") == ["hello"]
+        mock_create_tokenizer.assert_called_once()
+
+    def test_unknown_unit_raises(self):
+        from rag.data.ingest import create_chunker
+
+        with pytest.raises(ValueError):
+            create_chunker("words")
+
+
+class TestOpenLoader:
+    def test_pgvector_uses_vectorstore(self):
+        from rag.data.ingest import open_loader
+
+        container = MagicMock()
+        with open_loader(container, upsert=True, loader="pgvector") as loader:
+            assert loader is container.maintenance_vectorstore
+
+    def test_copy_loader(self):
+        from rag.data.ingest import open_loader
+        from rag.infra.bulk_loader import CopyVectorLoader
+
+        container = MagicMock()
+        loader = open_loader(container, upsert=False, loader="copy")
+
+        assert isinstance(loader, CopyVectorLoader)
+        assert loader.embeddings is container.embeddings
+        assert loader.upsert is False
+
+    def test_unknown_loader_raises(self):
+        from rag.data.ingest import open_loader
+
+        with pytest.raises(ValueError):
+            open_loader(MagicMock(), upsert=True, loader="bogus")
+
+    @patch("rag.infra.bulk_loader.CopyVectorLoader")
+    @patch("rag.data.ingest.get_container")
+    @patch("rag.data.ingest.load_csvs", return_value=[("csv text", "file.csv:r1", {})])
+    @patch("rag.data.ingest.load_pdfs", return_value=[])
+    def test_main_copies_without_upsert_on_full_ingest(self, mock_pdfs, mock_csvs, mock_get_container,
+                                                       mock_loader_cls, monkeypatch):
+        from rag.data.ingest import main
+
+        monkeypatch.setattr("rag.data.ingest.INGEST_LOADER", "copy")
+        main()
+
+        container = mock_get_container.return_value
+        mock_loader_cls.assert_called_once_with(container.embeddings, upsert=False)
+        loader = mock_loader_cls.return_value.__enter__.return_value
+        loader.add_documents.assert_called_once()
+        container.maintenance_vectorstore.add_documents.assert_not_called()
+
+
+class TestMainBM25:
+    @patch("rag.components.bm25.BM25Builder.save", autospec=True)
+    @patch("rag.data.ingest.get_container")
+    @patch("rag.data.ingest.load_csvs", return_value=[("csv text", "file.csv:r1", {})])
+    @patch("rag.data.ingest.load_pdfs", return_value=[])
+    def test_incremental_indexes_unchanged_chunks(self, mock_pdfs, mock_csvs, mock_get_container,
+                                                  mock_save, monkeypatch, tmp_path):
+        from rag.data.ingest import main
+        from rag.infra.manifest import ManifestEntry, chunk_id, content_hash
+
+        monkeypatch.setattr("rag.data.ingest.BM25_ENABLED", True)
+        monkeypatch.setattr("rag.data.ingest.BM25_INDEX_PATH", tmp_path / "bm25")
+        container = mock_get_container.return_value
+        container.manifest.load.return_value = {
+            ("file.csv:r1", 0): ManifestEntry(
+                "file.csv:r1", 0, content_hash("csv text"), chunk_id("file.csv:r1", 0),
+            ),
+        }
+        main(incremental=True)
+
+        container.maintenance_vectorstore.add_documents.assert_not_called()
+        # 差分モードでも変更のないチャンクを含めて全件でインデックスを作る
+        builder = mock_save.call_args[0][0]
+        assert len(builder) == 1
+        assert builder.path == tmp_path / "bm25"
+
+    @patch("rag.data.ingest.get_container")
+    @patch("rag.data.ingest.load_csvs", return_value=[("csv text", "file.csv:r1", {})])
+    @patch("rag.data.ingest.load_pdfs", return_value=[])
+    def test_disabled_by_default(self, mock_pdfs, mock_csvs, mock_get_container):
+        from rag.data.ingest import main
+
+        with patch("rag.components.bm25.BM25Builder.save") as mock_save:
+            main()
+        mock_save.assert_not_called()
+
+
+class TestTapBM25:
+    def test_adds_with_chunk_ids(self):
+        from rag.data.ingest import tap_bm25
+        from rag.infra.manifest import chunk_id
+
+        builder = MagicMock()
+        doc = Document(page_content="本文", metadata={"source": "a.pdf:p1", "chunk_index": 2})
+
+        assert list(tap_bm25([doc], builder)) == [doc]
+        builder.add.assert_called_once_with(chunk_id("a.pdf:p1", 2), "本文", doc.metadata)
@@ -33,6 +33,11 @@ class TestLLMProtocol:
         result = obj.invoke("prompt")
         assert result == "answer"
 
+    def test_stream_duck_type_compatible(self):
+        obj = MagicMock()
+        obj.stream.return_value = iter(["ans", "wer"])
+        assert "".join(obj.stream("prompt")) == "answer"
+
 
 class TestRetrievalStrategyProtocol:
     def test_duck_type_compatible(self):
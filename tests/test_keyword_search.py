@@ -0,0 +1,106 @@
+import asyncio
+from unittest.mock import MagicMock, AsyncMock
+
+import pytest
+
+
+class TestExtractTerms:
+    def test_splits_japanese_on_hiragana(self):
+        from rag.infra.keyword_search import extract_terms
+
+        assert extract_terms("アカウント削除の方法は？") == ["アカウント削除", "方法"]
+
+    def test_keeps_product_codes(self):
+        from rag.infra.keyword_search import extract_terms
+
+        assert extract_terms("型番 AB-1234 の保証期間") == ["型番", "AB-1234", "保証期間"]
+
+    def test_drops_short_and_duplicate_terms(self):
+        from rag.infra.keyword_search import extract_terms
+
+        assert extract_terms("a 料金 と 料金") == ["料金"]
+
+    def test_limits_term_count(self):
+        from rag.infra.keyword_search import extract_terms
+
+        assert len(extract_terms(" ".join(f"語{i:02d}" for i in range(20)), max_terms=8)) == 8
+
+
+class TestKeywordQuerySql:
+    def test_or_of_word_similarity_operators(self):
+        from rag.infra.keyword_search import keyword_query_sql
+
+        sql = keyword_query_sql(2)
+
+        assert "(:t0 <% e.document OR :t1 <% e.document)" in sql
+        assert "word_similarity(:t0, e.document) + word_similarity(:t1, e.document) AS score" in sql
+        assert "c.name = :collection" in sql
+        assert sql.endswith("ORDER BY score DESC LIMIT :k")
+
+
+def _search():
+    from rag.infra.keyword_search import TrigramKeywordSearch
+
+    engine = MagicMock()
+    conn = engine.begin.return_value.__enter__.return_value
+    conn.execute.return_value.all.return_value = [("id1", "本文", {"source": "a.csv:r1"})]
+    return TrigramKeywordSearch(engine=engine, collection_name="documents", threshold=0.4), conn
+
+
+class TestTrigramKeywordSearch:
+    def test_search_returns_documents(self):
+        search, conn = _search()
+
+        docs = search.search("アカウント削除の方法", k=5)
+
+        assert [(d.id, d.page_content, d.metadata) for d in docs] == [
+            ("id1", "本文", {"source": "a.csv:r1"}),
+        ]
+        threshold_call, query_call = conn.execute.call_args_list
+        assert threshold_call.args[1] == {"threshold": "0.4"}
+        assert query_call.args[1] == {
+            "t0": "アカウント削除", "t1": "方法", "collection": "documents", "k": 5,
+        }
+
+    def test_query_without_terms_skips_db(self):
+        search, conn = _search()
+
+        assert search.search("の？", k=5) == []
+        search.engine.begin.assert_not_called()
+
+    def test_asearch(self):
+        from rag.infra.keyword_search import TrigramKeywordSearch
+
+        async_engine = MagicMock()
+        conn = MagicMock()
+        result = MagicMock()
+        result.all.return_value = [("id2", "本文2", None)]
+        conn.execute = AsyncMock(side_effect=[None, result])
+        async_engine.begin.return_value.__aenter__ = AsyncMock(return_value=conn)
+        async_engine.begin.return_value.__aexit__ = AsyncMock(return_value=False)
+        search = TrigramKeywordSearch(async_engine=async_engine)
+
+        docs = asyncio.run(search.asearch("保証期間", k=3))
+
+        assert [(d.id, d.metadata) for d in docs] == [("id2", {})]
+        assert conn.execute.await_count == 2
+
+
+@pytest.mark.integration
+class TestTrigramKeywordSearchIntegration:
+    def test_finds_exact_japanese_term(self, test_vectorstore):
+        from langchain_core.documents import Document
+        from sqlalchemy import text
+        from rag.infra.db import get_engine
+        from rag.infra.keyword_search import TrigramKeywordSearch
+
+        with get_engine().begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        test_vectorstore.add_documents([
+            Document(page_content="アカウント削除は設定画面から行えます", metadata={"source": "faq.csv:r1"}),
+            Document(page_content="料金プランの変更について", metadata={"source": "faq.csv:r2"}),
+        ], ids=["kw-1", "kw-2"])
+
+        docs = TrigramKeywordSearch(collection_name="test_documents").search("アカウント削除の方法", k=5)
+
+        assert docs[0].id == "kw-1"
@@ -0,0 +1,121 @@
+from unittest.mock import MagicMock, patch
+
+
+class TestContentHash:
+    def test_same_text_same_hash(self):
+        from rag.infra.manifest import content_hash
+
+        assert content_hash("テキスト") == content_hash("テキスト")
+
+    def test_different_text_different_hash(self):
+        from rag.infra.manifest import content_hash
+
+        assert content_hash("a") != content_hash("b")
+
+    def test_sha256_hex_length(self):
+        from rag.infra.manifest import content_hash
+
+        assert len(content_hash("a")) == 64
+
+
+class TestChunkId:
+    def test_deterministic(self):
+        from rag.infra.manifest import chunk_id
+
+        assert chunk_id("doc.pdf:p1", 0) == chunk_id("doc.pdf:p1", 0)
+
+    def test_differs_by_chunk_index(self):
+        from rag.infra.manifest import chunk_id
+
+        assert chunk_id("doc.pdf:p1", 0) != chunk_id("doc.pdf:p1", 1)
+
+    def test_differs_by_collection(self):
+        from rag.infra.manifest import chunk_id
+
+        assert chunk_id("doc.pdf:p1", 0, "a") != chunk_id("doc.pdf:p1", 0, "b")
+
+
+class TestIngestManifest:
+    def _manifest(self):
+        from rag.infra.manifest import IngestManifest
+
+        engine = MagicMock()
+        conn = engine.begin.return_value.__enter__.return_value
+        return IngestManifest(engine=engine, collection_name="documents"), conn
+
+    @patch("rag.infra.manifest.get_engine")
+    def test_default_engine_is_shared_pool(self, mock_get_engine):
+        from rag.infra.manifest import IngestManifest
+
+        assert IngestManifest().engine is mock_get_engine.return_value
+
+    def test_load_returns_entries_by_key(self):
+        from rag.infra.manifest import ManifestEntry
+
+        manifest, conn = self._manifest()
+        conn.execute.side_effect = [None, None, [("f.csv:r1", 0, "h" * 64, "id-1")]]
+
+        result = manifest.load()
+        assert result == {("f.csv:r1", 0): ManifestEntry("f.csv:r1", 0, "h" * 64, "id-1")}
+
+    def test_tables_created_once(self):
+        manifest, conn = self._manifest()
+        manifest.clear()
+        manifest.clear()
+
+        statements = [str(c.args[0]) for c in conn.execute.call_args_list]
+        assert sum("CREATE TABLE IF NOT EXISTS rag_ingest_manifest" in s for s in statements) == 1
+        assert sum("CREATE TABLE IF NOT EXISTS rag_corpus_version" in s for s in statements) == 1
+
+    def test_upsert_empty_is_noop(self):
+        manifest, conn = self._manifest()
+        manifest.upsert([])
+        conn.execute.assert_not_called()
+
+    def test_delete_empty_is_noop(self):
+        manifest, conn = self._manifest()
+        manifest.delete([])
+        conn.execute.assert_not_called()
+
+    def test_upsert_passes_collection_name(self):
+        from rag.infra.manifest import ManifestEntry
+
+        manifest, conn = self._manifest()
+        manifest.upsert([ManifestEntry("f.csv:r1", 0, "h" * 64, "id-1")])
+
+        params = conn.execute.call_args.args[1]
+        assert params[0]["collection"] == "documents"
+        assert params[0]["doc_id"] == "id-1"
+
+    def test_current_version_empty_when_never_ingested(self):
+        manifest, conn = self._manifest()
+        conn.execute.return_value.fetchone.return_value = None
+        assert manifest.current_version() == ""
+
+    def test_current_version_returns_stored_value(self):
+        manifest, conn = self._manifest()
+        conn.execute.return_value.fetchone.return_value = ("v1",)
+        assert manifest.current_version() == "v1"
+
+    def test_bump_version_returns_new_value(self):
+        manifest, conn = self._manifest()
+        v1 = manifest.bump_version()
+        v2 = manifest.bump_version()
+        assert v1 != v2
+        assert conn.execute.call_args.args[1]["version"] == v2
+
+    def test_collection_has_documents(self):
+        manifest, _ = self._manifest()
+        conn = manifest.engine.connect.return_value.__enter__.return_value
+        conn.execute.return_value.scalar.side_effect = ["langchain_pg_embedding", True]
+
+        assert manifest.collection_has_documents() is True
+        assert conn.execute.call_args.args[1] == {"collection": "documents"}
+
+    def test_collection_has_documents_without_pgvector_tables(self):
+        manifest, _ = self._manifest()
+        conn = manifest.engine.connect.return_value.__enter__.return_value
+        conn.execute.return_value.scalar.return_value = None
+
+        assert manifest.collection_has_documents() is False
+        assert conn.execute.call_count == 1
@@ -331,3 +331,33 @@ class TestRetrievalMrr:
         from rag.evaluation.metrics import retrieval_mrr
 
         assert retrieval_mrr([], "faq.csv:r1") == 0.0
+
+
+class TestLatencySummary:
+    def test_percentile_interpolates(self):
+        from rag.evaluation.metrics import percentile
+
+        values = [4.0, 1.0, 3.0, 2.0, 5.0]
+        assert percentile(values, 50) == 3.0
+        assert percentile(values, 90) == pytest.approx(4.6)
+        assert percentile(values, 100) == 5.0
+        assert percentile([], 50) == 0.0
+
+    def test_summary_keys(self):
+        from rag.evaluation.metrics import latency_summary
+
+        summary = latency_summary([float(i) for i in range(1, 101)])
+        assert summary["p50"] == pytest.approx(50.5)
+        assert summary["p99"] == pytest.approx(99.01)
+        assert summary["max"] == 100.0
+
+    def test_decode_tokens_per_sec_excludes_first_token(self):
+        from rag.evaluation.metrics import decode_tokens_per_sec
+
+        results = [
+            {"generated_tokens": 11, "timings": {"decode": 500_000_000}},
+            {"generated_tokens": 11, "timings": {"decode": 500_000_000}},
+            {"latency": 1.0},
+        ]
+        assert decode_tokens_per_sec(results) == pytest.approx(20.0)
+        assert decode_tokens_per_sec([{"latency": 1.0}]) == 0.0
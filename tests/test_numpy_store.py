@@ -0,0 +1,231 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+VECTORS = {
+    "アカウント削除": [1.0, 0.0, 0.0],
+    "料金プラン": [0.0, 1.0, 0.0],
+    "アカウント作成": [0.8, 0.6, 0.0],
+    "保証期間": [0.0, 0.0, 2.0],
+}
+
+
+class FakeEmbeddings:
+    def embed_documents(self, texts):
+        return [VECTORS[text] for text in texts]
+
+    def embed_query(self, text):
+        return VECTORS[text]
+
+    async def aembed_query(self, text):
+        return VECTORS[text]
+
+
+def _writer(path):
+    from rag.components.numpy_store import NumpyStoreWriter
+
+    writer = NumpyStoreWriter(FakeEmbeddings(), path)
+    writer.add_documents(
+        [Document(page_content=text, metadata={"source": f"faq.csv:r{i + 1}"}) for i, text in enumerate(VECTORS)],
+        ids=[f"id{i + 1}" for i in range(len(VECTORS))],
+    )
+    return writer
+
+
+@pytest.fixture
+def store(tmp_path):
+    from rag.components.numpy_store import NumpyVectorStore
+
+    path = tmp_path / "vectors"
+    _writer(path).save()
+    return NumpyVectorStore.load(FakeEmbeddings(), path)
+
+
+class TestNumpyStoreWriter:
+    def test_save_layout(self, tmp_path):
+        import json
+
+        path = _writer(tmp_path / "vectors").save()
+
+        vectors = np.load(path / "vectors.npy")
+        assert vectors.dtype == np.float32 and vectors.shape == (4, 3)
+        assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+        meta = json.loads((path / "meta.json").read_text())
+        assert meta["count"] == 4 and meta["dim"] == 3 and meta["corpus_version"]
+
+    def test_add_embeddings_generates_ids(self, tmp_path):
+        from rag.components.numpy_store import NumpyStoreWriter
+
+        writer = NumpyStoreWriter(FakeEmbeddings(), tmp_path / "vectors")
+        ids = writer.add_embeddings(["a", "b"], [[1.0, 0.0], [0.0, 1.0]])
+
+        assert len(ids) == 2 and len(set(ids)) == 2
+        assert len(writer) == 2
+
+    def test_context_manager_saves(self, tmp_path):
+        with _writer(tmp_path / "vectors"):
+            pass
+        assert (tmp_path / "vectors" / "vectors.npy").exists()
+
+    def test_context_manager_skips_save_on_error(self, tmp_path):
+        with pytest.raises(RuntimeError):
+            with _writer(tmp_path / "vectors"):
+                raise RuntimeError
+        assert not (tmp_path / "vectors").exists()
+        assert not (tmp_path / "vectors.tmp").exists()
+
+    def test_streams_rows_before_save(self, tmp_path):
+        writer = _writer(tmp_path / "vectors")
+        staged = tmp_path / "vectors.tmp"
+
+        # 保存前から一時ディレクトリに追記している
+        assert (staged / "vectors.npy").exists() and (staged / "store.bin").exists()
+        assert not (tmp_path / "vectors").exists()
+
+        writer.add_embeddings(["追加"], [[0.0, 3.0, 4.0]], ids=["id5"])
+        path = writer.save()
+
+        vectors = np.load(path / "vectors.npy")
+        assert vectors.shape == (5, 3)
+        assert vectors[4] == pytest.approx([0.0, 0.6, 0.8])
+        assert not staged.exists()
+
+    def test_rejects_dimension_change(self, tmp_path):
+        writer = _writer(tmp_path / "vectors")
+
+        with pytest.raises(ValueError):
+            writer.add_embeddings(["x"], [[1.0, 0.0]])
+
+    def test_resave_replaces_store_and_version(self, tmp_path):
+        from rag.components.numpy_store import NumpyStoreWriter, NumpyVectorStore
+
+        path = tmp_path / "vectors"
+        _writer(path).save()
+        first = NumpyVectorStore.load(FakeEmbeddings(), path).corpus_version
+
+        writer = NumpyStoreWriter(FakeEmbeddings(), path)
+        writer.add_embeddings(["保証期間"], [[0.0, 0.0, 1.0]], ids=["only"])
+        writer.save()
+        store = NumpyVectorStore.load(FakeEmbeddings(), path)
+
+        assert len(store) == 1
+        assert store.corpus_version != first
+        assert not (tmp_path / "vectors.tmp").exists()
+
+
+class TestNumpyVectorStore:
+    def test_loads_memory_mapped(self, store):
+        assert isinstance(store.vectors, np.memmap)
+        assert len(store) == 4
+
+    def test_search_orders_by_cosine_distance(self, store):
+        results = store.similarity_search_with_score("アカウント削除", k=3)
+
+        assert [doc.id for doc, _ in results] == ["id1", "id3", "id2"]
+        distances = [d for _, d in results]
+        assert distances == pytest.approx([0.0, 0.2, 1.0], abs=1e-6)
+
+    def test_distance_matches_one_minus_cosine_for_unnormalized_query(self, store):
+        results = store.similarity_search_with_score_by_vector([0.0, 0.0, 5.0], k=1)
+
+        doc, distance = results[0]
+        assert doc.page_content == "保証期間"
+        assert doc.metadata == {"source": "faq.csv:r4"}
+        assert distance == pytest.approx(0.0, abs=1e-6)
+
+    def test_k_larger_than_store(self, store):
+        assert len(store.similarity_search_with_score("料金プラン", k=10)) == 4
+
+    def test_ties_ordered_by_row(self, store):
+        results = store.similarity_search_with_score_by_vector([0.0, 0.0, -1.0], k=3)
+        # 1 / 2 / 3 行目はいずれも距離 1.0
+        assert [doc.id for doc, _ in results] == ["id1", "id2", "id3"]
+
+    def test_empty_store(self, tmp_path):
+        from rag.components.numpy_store import NumpyStoreWriter, NumpyVectorStore
+
+        path = NumpyStoreWriter(FakeEmbeddings(), tmp_path / "vectors").save()
+        store = NumpyVectorStore.load(FakeEmbeddings(), path)
+
+        assert store.similarity_search_with_score("料金プラン", k=5) == []
+
+    def test_async_search(self, store):
+        results = asyncio.run(store.asimilarity_search_with_score("料金プラン", k=1))
+        assert results[0][0].id == "id2"
+
+    def test_async_search_by_vector(self, store):
+        results = asyncio.run(store.asimilarity_search_with_score_by_vector([0.0, 1.0, 0.0], k=1))
+        assert results[0][0].id == "id2"
+
+    def test_rejects_unknown_version(self, tmp_path):
+        import json
+        from rag.components.numpy_store import NumpyVectorStore
+
+        path = _writer(tmp_path / "vectors").save()
+        (path / "meta.json").write_text(json.dumps({"version": 999}))
+
+        with pytest.raises(ValueError):
+            NumpyVectorStore.load(FakeEmbeddings(), path)
+
+    def test_score_threshold_filter(self, store):
+        from rag.pipeline.retrieval import TwoStageRetrieval
+
+        reranker = MagicMock()
+        reranker.compress_documents.side_effect = lambda docs, query: docs
+        strategy = TwoStageRetrieval(
+            vectorstore=store, reranker=reranker, search_k=4, rerank_top_k=4, score_threshold=0.5,
+        )
+
+        docs = strategy.retrieve("アカウント削除")
+
+        assert [doc.id for doc in docs] == ["id1", "id3"]
+
+
+class TestContainerBackend:
+    @patch("rag.core.container.VECTOR_BACKEND", "numpy")
+    @patch("rag.components.numpy_store.create_numpy_vectorstore")
+    def test_numpy_backend(self, mock_create):
+        from rag.core.container import AppContainer
+
+        embeddings = MagicMock()
+        container = AppContainer(embeddings=embeddings)
+
+        assert container.vectorstore is mock_create.return_value
+        assert container.async_vectorstore is mock_create.return_value
+        assert container.corpus_version() == mock_create.return_value.corpus_version
+        mock_create.assert_called_once_with(embeddings)
+
+    @patch("rag.core.container.VECTOR_BACKEND", "bogus")
+    def test_unknown_backend_raises(self):
+        from rag.core.container import AppContainer
+
+        with pytest.raises(ValueError):
+            AppContainer(embeddings=MagicMock()).vectorstore
+
+
+class TestIngestNumpy:
+    @patch("rag.data.ingest.VECTOR_BACKEND", "numpy")
+    @patch("rag.data.ingest.INGEST_WORKERS", 1)
+    @patch("rag.data.ingest.get_container")
+    @patch("rag.data.ingest.load_csvs", return_value=[("料金プラン", "faq.csv:r1", {})])
+    @patch("rag.data.ingest.load_pdfs", return_value=[])
+    def test_builds_store_without_db(self, mock_pdfs, mock_csvs, mock_get_container, tmp_path):
+        from rag.components.numpy_store import NumpyVectorStore
+        from rag.data.ingest import main
+        from rag.infra.manifest import chunk_id
+
+        container = mock_get_container.return_value
+        container.embeddings = FakeEmbeddings()
+        with patch("rag.data.ingest.NUMPY_STORE_PATH", str(tmp_path / "vectors")):
+            main(incremental=True)
+
+        store = NumpyVectorStore.load(FakeEmbeddings(), tmp_path / "vectors")
+        assert [doc.id for doc, _ in store.similarity_search_with_score("料金プラン", k=1)] == [
+            chunk_id("faq.csv:r1", 0)
+        ]
+        container.maintenance_vectorstore.delete_collection.assert_not_called()
+        container.manifest.load.assert_not_called()
+        container.vector_index.create.assert_not_called()
@@ -0,0 +1,202 @@
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+
+class _FakeTokenizer:
+    """長さ = 単語数 の input_ids / attention_mask を返す最小トークナイザー。"""
+
+    def __call__(self, texts, pairs=None, padding=True, truncation=True, max_length=None, return_tensors="np"):
+        if pairs is not None:
+            texts = [f"{a} {b}" for a, b in zip(texts, pairs)]
+        lengths = [len(t.split()) for t in texts]
+        width = max(lengths)
+        ids = np.array([[1] * n + [0] * (width - n) for n in lengths])
+        return {"input_ids": ids, "token_type_ids": np.zeros_like(ids), "attention_mask": (ids > 0).astype(int)}
+
+
+class _FakeSession:
+    def __init__(self, fn, inputs=("input_ids", "attention_mask")):
+        self.fn = fn
+        self.calls = []
+        self._inputs = [SimpleNamespace(name=n) for n in inputs]
+
+    def get_inputs(self):
+        return self._inputs
+
+    def run(self, output_names, feeds):
+        self.calls.append(feeds)
+        return [self.fn(feeds)]
+
+
+class TestMeanPoolNormalize:
+    def test_ignores_padding_and_normalizes(self):
+        from rag.components.onnx_backend import mean_pool_normalize
+
+        hidden = np.array([[[1.0, 0.0], [3.0, 0.0], [100.0, 100.0]]])
+        mask = np.array([[1, 1, 0]])
+        result = mean_pool_normalize(hidden, mask)
+
+        np.testing.assert_allclose(result, [[1.0, 0.0]])
+
+
+class TestOnnxEmbeddings:
+    def _embeddings(self, batch_size=32):
+        from rag.components.onnx_backend import OnnxEmbeddings
+
+        # hidden[..., 0] = 単語数, hidden[..., 1] = 1 → 方向が単語数で変わる
+        def fn(feeds):
+            ids = feeds["input_ids"]
+            n = ids.sum(axis=1, keepdims=True).astype(float)
+            return np.stack([np.broadcast_to(n, ids.shape), np.ones(ids.shape)], axis=-1)
+
+        session = _FakeSession(fn)
+        return OnnxEmbeddings(session, _FakeTokenizer(), batch_size=batch_size), session
+
+    def test_vectors_are_unit_length(self):
+        embeddings, _ = self._embeddings()
+        vectors = np.array(embeddings.embed_documents(["a b", "a b c d"]))
+        np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), [1.0, 1.0])
+
+    def test_only_declared_inputs_are_fed(self):
+        embeddings, session = self._embeddings()
+        embeddings.embed_documents(["a"])
+        assert set(session.calls[0]) == {"input_ids", "attention_mask"}
+
+    def test_batches_inputs(self):
+        embeddings, session = self._embeddings(batch_size=2)
+        vectors = embeddings.embed_documents(["a", "a b", "a b c"])
+        assert len(vectors) == 3
+        assert len(session.calls) == 2
+
+    def test_embed_query_matches_document(self):
+        embeddings, _ = self._embeddings()
+        assert embeddings.embed_query("a b") == embeddings.embed_documents(["a b"])[0]
+
+    def test_empty(self):
+        embeddings, session = self._embeddings()
+        assert embeddings.embed_documents([]) == []
+        assert session.calls == []
+
+
+class TestOnnxCrossEncoder:
+    def test_single_logit_sigmoid(self):
+        from rag.components.onnx_backend import OnnxCrossEncoder
+
+        session = _FakeSession(lambda feeds: np.zeros((len(feeds["input_ids"]), 1)))
+        scores = OnnxCrossEncoder(session, _FakeTokenizer()).score([("q", "p"), ("q", "pp")])
+        assert scores == [0.5, 0.5]
+
+    def test_ranking_follows_logits(self):
+        from rag.components.onnx_backend import OnnxCrossEncoder
+
+        session = _FakeSession(lambda feeds: feeds["input_ids"].sum(axis=1, keepdims=True).astype(float))
+        scores = OnnxCrossEncoder(session, _FakeTokenizer(), batch_size=1).score(
+            [("q", "a"), ("q", "a b c"), ("q", "a b")],
+        )
+        assert np.argsort(scores).tolist() == [0, 2, 1]
+        assert len(session.calls) == 3
+
+    def test_usable_as_reranker_model(self):
+        from langchain_core.documents import Document
+        from rag.components.onnx_backend import OnnxCrossEncoder
+        from rag.components.reranker import CrossEncoderReranker
+
+        session = _FakeSession(lambda feeds: feeds["input_ids"].sum(axis=1, keepdims=True).astype(float))
+        reranker = CrossEncoderReranker(top_n=1, model=OnnxCrossEncoder(session, _FakeTokenizer()))
+        docs = [Document(page_content="a"), Document(page_content="a b c")]
+        assert reranker.compress_documents(docs, "q") == [docs[1]]
+
+
+class TestModelPath:
+    def test_quantized_file(self, tmp_path):
+        from rag.components.onnx_backend import model_path
+
+        assert model_path("embedder", True, str(tmp_path)) == tmp_path / "embedder" / "model.int8.onnx"
+        assert model_path("embedder", False, str(tmp_path)) == tmp_path / "embedder" / "model.onnx"
+
+
+class TestOptionalDependency:
+    def test_module_imports_without_onnxruntime(self):
+        import importlib
+        import sys
+        import rag.components.onnx_backend as onnx_backend
+
+        with patch.dict(sys.modules, {"onnxruntime": None}):
+            importlib.reload(onnx_backend)
+            with pytest.raises(ImportError):
+                onnx_backend.create_session("model.onnx")
+        importlib.reload(onnx_backend)
+
+
+class TestBackendSelection:
+    @patch("rag.components.onnx_backend.create_onnx_embeddings")
+    def test_create_embeddings_onnx(self, mock_create):
+        from rag.components.embeddings import create_embeddings
+
+        assert create_embeddings(backend="onnx") is mock_create.return_value
+
+    def test_create_embeddings_unknown_backend(self):
+        from rag.components.embeddings import create_embeddings
+
+        with pytest.raises(ValueError):
+            create_embeddings(backend="tensorrt")
+
+    @patch("rag.components.onnx_backend.create_onnx_cross_encoder")
+    @patch("rag.components.reranker.HuggingFaceCrossEncoder")
+    def test_create_reranker_onnx(self, mock_hf, mock_create):
+        from rag.components.reranker import create_reranker
+
+        reranker = create_reranker(backend="onnx")
+        assert reranker._model is mock_create.return_value
+        mock_hf.assert_not_called()
+
+
+@pytest.fixture(scope="module")
+def eval_queries():
+    with open("data/eval_questions.json") as f:
+        return [q["query"] for q in json.load(f)]
+
+
+@pytest.fixture(scope="module", params=[False, True], ids=["fp32", "int8"])
+def quantized(request):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("langchain_huggingface")
+    from rag.components.onnx_backend import model_path, EMBEDDER_SUBDIR, RERANKER_SUBDIR
+
+    for subdir in (EMBEDDER_SUBDIR, RERANKER_SUBDIR):
+        if not model_path(subdir, request.param).exists():
+            pytest.skip("ONNX model not exported (python -m rag.components.onnx_backend export)")
+    return request.param
+
+
+@pytest.mark.heavy
+class TestOnnxParity:
+    """エクスポート済み ONNX モデルと PyTorch 版の出力一致（eval_questions.json のクエリ）。"""
+
+    def test_embeddings_match_torch(self, eval_queries, quantized):
+        from langchain_huggingface import HuggingFaceEmbeddings
+        from rag.components.onnx_backend import create_onnx_embeddings
+        from rag.core.config import EMBED_MODEL
+
+        ref = np.array(HuggingFaceEmbeddings(model_name=EMBED_MODEL).embed_documents(eval_queries))
+        got = np.array(create_onnx_embeddings(quantized).embed_documents(eval_queries))
+
+        cosine = (ref * got).sum(axis=1)
+        assert cosine.min() > (0.97 if quantized else 0.9999)
+
+    def test_reranker_ranking_matches_torch(self, eval_queries, quantized):
+        from langchain_community.cross_encoders import HuggingFaceCrossEncoder
+        from rag.components.onnx_backend import create_onnx_cross_encoder
+        from rag.core.config import RERANKER_MODEL
+
+        passages = eval_queries[1:] + eval_queries[:1]
+        pairs = [(q, p) for q in eval_queries for p in passages[:5]]
+        ref = np.array(HuggingFaceCrossEncoder(model_name=RERANKER_MODEL).score(pairs)).reshape(len(eval_queries), -1)
+        got = np.array(create_onnx_cross_encoder(quantized).score(pairs)).reshape(len(eval_queries), -1)
+
+        agreement = np.mean(ref.argmax(axis=1) == got.argmax(axis=1))
+        assert agreement >= (0.9 if quantized else 1.0)
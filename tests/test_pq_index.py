@@ -0,0 +1,260 @@
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+DIM = 16
+
+
+def _clustered(n, seed=0):
+    from rag.components.numpy_store import normalize
+
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(8, DIM))
+    return normalize(centers[rng.integers(0, 8, n)] + 0.3 * rng.normal(size=(n, DIM)))
+
+
+class FakeEmbeddings:
+    def __init__(self, vectors):
+        self.vectors = {f"t{i}": v for i, v in enumerate(vectors)}
+
+    def embed_documents(self, texts):
+        return [self.vectors[t] for t in texts]
+
+    def embed_query(self, text):
+        return self.vectors[text]
+
+    async def aembed_query(self, text):
+        return self.vectors[text]
+
+
+@pytest.fixture
+def stores(tmp_path):
+    from rag.components.numpy_store import NumpyVectorStore
+    from rag.components.pq_index import PQStoreWriter, PQVectorStore
+
+    vectors = _clustered(600)
+    embeddings = FakeEmbeddings(vectors)
+    writer = PQStoreWriter(embeddings, tmp_path / "vectors", nlist=8, m=4, train_size=600)
+    writer.add_documents(
+        [Document(page_content=f"t{i}", metadata={"source": f"s{i}"}) for i in range(len(vectors))],
+        ids=[f"id{i}" for i in range(len(vectors))],
+    )
+    writer.save()
+    exact = NumpyVectorStore.load(embeddings, tmp_path / "vectors")
+    approx = PQVectorStore.load(embeddings, tmp_path / "vectors", nprobe=4, rerank_factor=4)
+    return exact, approx
+
+
+class TestKmeans:
+    def test_recovers_separated_clusters(self):
+        from rag.components.pq_index import kmeans, nearest
+
+        x = np.concatenate([np.zeros((50, 2)), np.full((50, 2), 10.0)]).astype(np.float32)
+        centroids = kmeans(x, 2)
+
+        assert sorted(centroids[:, 0].round(3).tolist()) == [0.0, 10.0]
+        assert len(set(nearest(x[:50], centroids))) == 1
+
+    def test_k_capped_by_samples(self):
+        from rag.components.pq_index import kmeans
+
+        assert kmeans(np.eye(3, dtype=np.float32), 256).shape == (3, 3)
+
+
+class TestPQIndex:
+    def test_train_layout(self):
+        from rag.components.pq_index import PQIndex
+
+        vectors = _clustered(300)
+        index = PQIndex.train(vectors, nlist=5, m=4, train_size=300)
+
+        assert index.centroids.shape == (5, DIM)
+        assert index.codebooks.shape == (4, 256, DIM // 4)
+        assert index.codes.shape == (300, 4) and index.codes.dtype == np.uint8
+        assert sorted(index.order.tolist()) == list(range(300))
+        assert index.offsets[0] == 0 and index.offsets[-1] == 300
+
+    def test_codebook_sample_spans_all_rows(self):
+        from rag.components import pq_index
+
+        vectors = np.zeros((300, 4), dtype=np.float32)
+        vectors[:, 0] = np.arange(300)
+        with patch.object(pq_index, "_CODEBOOK_SAMPLE", 50), \
+                patch.object(pq_index, "kmeans", wraps=pq_index.kmeans) as kmeans:
+            pq_index.PQIndex.train(vectors, nlist=1, m=2, train_size=300)
+
+        residuals = kmeans.call_args_list[1].args[0]
+        assert len(residuals) == 50
+        # 中心（平均）より後ろの行も含まれる
+        assert residuals[:, 0].max() > 0
+
+    def test_auto_nlist(self):
+        from rag.components.pq_index import PQIndex
+
+        assert len(PQIndex.train(_clustered(100), nlist=0, m=4).centroids) == 10
+
+    def test_m_must_divide_dimension(self):
+        from rag.components.pq_index import PQIndex
+
+        with pytest.raises(ValueError):
+            PQIndex.train(_clustered(10), m=5)
+
+    def test_compresses_vectors(self):
+        from rag.components.pq_index import PQIndex
+
+        vectors = np.tile(_clustered(500), (1, 24))  # 384 次元
+        index = PQIndex.train(vectors, nlist=4, m=64, train_size=500)
+
+        # 件数に比例する部分は 1 件 64 + 4 バイト（float32 は 1536 バイト）。コードブックは件数によらず一定
+        per_vector = (index.codes.nbytes + index.order.nbytes) / len(vectors)
+        assert per_vector == 68
+        assert index.nbytes - index.codes.nbytes - index.order.nbytes == (
+            index.centroids.nbytes + index.codebooks.nbytes + index.offsets.nbytes
+        )
+
+    def test_save_load_roundtrip(self, tmp_path):
+        from rag.components.pq_index import PQIndex
+
+        index = PQIndex.train(_clustered(200), nlist=4, m=4)
+        index.save(tmp_path)
+        loaded = PQIndex.load(tmp_path)
+
+        assert np.array_equal(loaded.codes, index.codes)
+        assert np.array_equal(loaded.order, index.order)
+
+    def test_shortlist_size(self):
+        from rag.components.pq_index import PQIndex
+
+        vectors = _clustered(300)
+        index = PQIndex.train(vectors, nlist=4, m=4)
+
+        assert len(index.shortlist(vectors[0], nprobe=4, size=10)) == 10
+        assert len(index.shortlist(vectors[0], nprobe=4, size=1000)) == 300
+        assert len(index.shortlist(vectors[0], nprobe=4, size=0)) == 0
+
+
+class TestPQVectorStore:
+    def test_distances_are_exact(self, stores):
+        exact, approx = stores
+        query = exact.embeddings.embed_query("t5")
+
+        results = approx.similarity_search_with_score_by_vector(query, k=5)
+
+        assert results[0][0].id == "id5"
+        for doc, distance in results:
+            row = int(doc.id[2:])
+            assert distance == pytest.approx(1.0 - float(exact.vectors[row] @ query), abs=1e-5)
+        assert [d for _, d in results] == sorted(d for _, d in results)
+
+    def test_recall_against_exact(self, stores):
+        exact, approx = stores
+        recalls = []
+        for i in range(0, 600, 20):
+            query = exact.embeddings.embed_query(f"t{i}")
+            expected = set(exact.search_indices(query, 10)[0].tolist())
+            recalls.append(len(expected & set(approx.search_indices(query, 10)[0].tolist())) / 10)
+
+        assert np.mean(recalls) >= 0.9
+
+    def test_full_probe_with_full_rescoring_matches_exact(self, stores):
+        exact, approx = stores
+        approx.nprobe, approx.rerank_factor = 8, 600
+        query = exact.embeddings.embed_query("t42")
+
+        assert approx.search_indices(query, 10)[0].tolist() == exact.search_indices(query, 10)[0].tolist()
+
+    def test_meta_records_pq(self, stores):
+        _, approx = stores
+        assert approx.meta["pq"]["m"] == 4
+        assert approx.meta["pq"]["bytes"] == approx.index.nbytes
+
+    def test_empty_store(self, tmp_path):
+        from rag.components.pq_index import PQStoreWriter, PQVectorStore
+
+        PQStoreWriter(FakeEmbeddings([]), tmp_path / "vectors", m=4).save()
+        store = PQVectorStore.load(FakeEmbeddings([]), tmp_path / "vectors")
+
+        assert store.similarity_search_with_score_by_vector(np.ones(DIM), k=3) == []
+
+
+class TestPQComparison:
+    def test_report(self, stores, capsys):
+        from rag.evaluation.compression import print_pq_report, run_pq_comparison
+
+        exact, approx = stores
+        reranker = MagicMock()
+        reranker.compress_documents.side_effect = lambda docs, query: docs[:3]
+        questions = [
+            {"query": f"t{i}", "expected_source": f"s{i}", "expected_keywords": []} for i in range(0, 600, 60)
+        ]
+
+        report = run_pq_comparison(questions, exact, approx, reranker, k=10)
+
+        assert report["chunks"] == 600
+        assert report["exact"]["retrieval_at_k"] == 1.0
+        assert report["first_stage_recall"] >= 0.9
+        assert print_pq_report(report, tolerance=1.0)
+        assert "IVF-PQ vs Exact" in capsys.readouterr().out
+
+    def test_fails_outside_tolerance(self, capsys):
+        from rag.evaluation.compression import print_pq_report
+
+        report = {
+            "chunks": 1, "exact_bytes": 1536, "pq_bytes": 64, "k": 10, "first_stage_recall": 0.5,
+            "exact_ms_p50": 1.0, "pq_ms_p50": 0.5,
+            "exact": {"retrieval_at_k": 0.9, "mrr": 0.8}, "pq": {"retrieval_at_k": 0.8, "mrr": 0.7},
+        }
+
+        assert not print_pq_report(report, tolerance=0.05)
+        assert "FAIL" in capsys.readouterr().out
+
+
+class TestBackendWiring:
+    @patch("rag.core.container.VECTOR_BACKEND", "ivfpq")
+    @patch("rag.components.pq_index.create_pq_vectorstore")
+    def test_container(self, mock_create):
+        from rag.core.container import AppContainer
+
+        container = AppContainer(embeddings=MagicMock())
+
+        assert container.vectorstore is mock_create.return_value
+        assert container.async_vectorstore is mock_create.return_value
+        assert container.corpus_version() == mock_create.return_value.corpus_version
+
+    @patch("rag.data.ingest.VECTOR_BACKEND", "ivfpq")
+    @patch("rag.data.ingest.INGEST_WORKERS", 1)
+    @patch("rag.data.ingest.get_container")
+    @patch("rag.data.ingest.load_csvs")
+    @patch("rag.data.ingest.load_pdfs", return_value=[])
+    def test_ingest_trains_index(self, mock_pdfs, mock_csvs, mock_get_container, tmp_path):
+        from rag.components.pq_index import PQVectorStore
+        from rag.data.ingest import main
+
+        vectors = np.tile(_clustered(40), (1, 4))  # 既定の PQ_M=64 で割り切れる次元
+        embeddings = FakeEmbeddings(vectors)
+        mock_csvs.return_value = [(f"t{i}", f"faq.csv:r{i + 1}", {}) for i in range(40)]
+        mock_get_container.return_value.embeddings = embeddings
+        with patch("rag.data.ingest.NUMPY_STORE_PATH", str(tmp_path / "vectors")):
+            main()
+
+        store = PQVectorStore.load(embeddings, tmp_path / "vectors")
+        assert len(store) == 40
+        assert store.similarity_search_with_score("t7", k=1)[0][0].metadata["source"] == "faq.csv:r8"
+
+    @patch("rag.evaluation.compression.print_pq_report", return_value=False)
+    @patch("rag.evaluation.compression.run_pq_comparison")
+    @patch("rag.components.pq_index.create_pq_vectorstore")
+    @patch("rag.components.numpy_store.create_numpy_vectorstore")
+    @patch("rag.evaluation.evaluate.load_questions", return_value=[])
+    @patch("rag.evaluation.evaluate.get_container")
+    def test_main_pq_exits_on_failure(self, mock_get_container, mock_load, mock_exact, mock_pq,
+                                      mock_run, mock_print):
+        from rag.evaluation.evaluate import main_pq
+
+        with pytest.raises(SystemExit):
+            main_pq()
+        mock_run.assert_called_once_with(
+            [], mock_exact.return_value, mock_pq.return_value, mock_get_container.return_value.reranker,
+        )
@@ -21,3 +21,143 @@ class TestCreateReranker:
         from rag.components.reranker import create_reranker, CrossEncoderReranker
         result = create_reranker()
         assert isinstance(result, CrossEncoderReranker)
+
+
+class TestScoreAndSelect:
+    @patch("rag.components.reranker.HuggingFaceCrossEncoder")
+    def test_score_returns_list(self, mock_hf):
+        from rag.components.reranker import CrossEncoderReranker
+
+        mock_hf.return_value.score.return_value = [0.1, 0.9]
+        reranker = CrossEncoderReranker()
+        assert reranker.score([("q", "a"), ("q", "b")]) == [0.1, 0.9]
+
+    @patch("rag.components.reranker.HuggingFaceCrossEncoder")
+    def test_score_empty_skips_model(self, mock_hf):
+        from rag.components.reranker import CrossEncoderReranker
+
+        assert CrossEncoderReranker().score([]) == []
+        mock_hf.return_value.score.assert_not_called()
+
+    @patch("rag.components.reranker.HuggingFaceCrossEncoder")
+    def test_select_top(self, mock_hf):
+        from rag.components.reranker import CrossEncoderReranker
+
+        docs = [Document(page_content=t) for t in ["a", "b", "c"]]
+        reranker = CrossEncoderReranker(top_n=2)
+        assert reranker.select_top(docs, [0.2, 0.9, 0.5]) == [docs[1], docs[2]]
+
+
+class TestScoreCache:
+    def test_lru_eviction(self):
+        from rag.components.reranker import ScoreCache
+
+        cache = ScoreCache(max_size=2)
+        cache.put_many([(("q", "a"), 1.0), (("q", "b"), 2.0)])
+        cache.get_many([("q", "a")])
+        cache.put_many([(("q", "c"), 3.0)])
+
+        assert cache.get_many([("q", "a"), ("q", "b"), ("q", "c")]) == [1.0, None, 3.0]
+
+    def test_key_uses_content_not_id(self):
+        from rag.components.reranker import score_cache_key
+
+        assert score_cache_key("q", Document(page_content="same", id="id-1")) == score_cache_key(
+            "q", Document(page_content="same", id="id-2")
+        )
+        assert score_cache_key("q", Document(page_content="old", id="id-1")) != score_cache_key(
+            "q", Document(page_content="new", id="id-1")
+        )
+
+
+class TestCachedReranking:
+    @patch("rag.components.reranker.HuggingFaceCrossEncoder")
+    def test_scores_only_misses(self, mock_hf):
+        from rag.components.reranker import CrossEncoderReranker, ScoreCache
+
+        mock_hf.return_value.score.side_effect = lambda pairs: [float(len(p[1])) for p in pairs]
+        reranker = CrossEncoderReranker(top_n=2, score_cache=ScoreCache(max_size=100))
+        docs = [Document(page_content=t, id=t) for t in ["a", "bbb", "cc"]]
+
+        first = reranker.compress_documents(docs, "q")
+        second = reranker.compress_documents(docs + [Document(page_content="dddd", id="d")], "q")
+
+        assert [d.page_content for d in first] == ["bbb", "cc"]
+        assert [d.page_content for d in second] == ["dddd", "bbb"]
+        assert mock_hf.return_value.score.call_count == 2
+        assert mock_hf.return_value.score.call_args[0][0] == [("q", "dddd")]
+
+    @patch("rag.components.reranker.HuggingFaceCrossEncoder")
+    def test_rewritten_chunk_is_rescored(self, mock_hf):
+        from rag.components.reranker import CrossEncoderReranker, ScoreCache
+
+        mock_hf.return_value.score.side_effect = lambda pairs: [float(len(p[1])) for p in pairs]
+        reranker = CrossEncoderReranker(top_n=1, score_cache=ScoreCache())
+        reranker.score_documents("q", [Document(page_content="old", id="chunk-1")])
+
+        # 差分 ingest で同じ ID のチャンク本文が書き換わった
+        scores = reranker.score_documents("q", [Document(page_content="rewritten", id="chunk-1")])
+
+        assert scores == [9.0]
+        assert mock_hf.return_value.score.call_args[0][0] == [("q", "rewritten")]
+
+    @patch("rag.components.reranker.HuggingFaceCrossEncoder")
+    def test_different_query_misses(self, mock_hf):
+        from rag.components.reranker import CrossEncoderReranker, ScoreCache
+
+        mock_hf.return_value.score.return_value = [1.0]
+        reranker = CrossEncoderReranker(top_n=1, score_cache=ScoreCache())
+        docs = [Document(page_content="a", id="a")]
+        reranker.compress_documents(docs, "q1")
+        reranker.compress_documents(docs, "q2")
+
+        assert mock_hf.return_value.score.call_count == 2
+
+    @patch("rag.components.reranker.HuggingFaceCrossEncoder")
+    def test_select_top_keeps_order_on_ties(self, mock_hf):
+        from rag.components.reranker import CrossEncoderReranker
+
+        docs = [Document(page_content=t) for t in ["a", "b", "c", "d"]]
+        reranker = CrossEncoderReranker(top_n=3)
+        assert reranker.select_top(docs, [0.5, 0.9, 0.5, 0.1]) == [docs[1], docs[0], docs[2]]
+
+    @patch("rag.components.reranker.HuggingFaceCrossEncoder")
+    def test_create_reranker_cache_disabled_with_zero(self, mock_hf):
+        from rag.components.reranker import create_reranker
+
+        assert create_reranker(score_cache_size=0).score_cache is None
+        assert create_reranker(score_cache_size=10).score_cache.max_size == 10
+
+
+class TestBatchReranking:
+    @patch("rag.components.reranker.HuggingFaceCrossEncoder")
+    def test_single_score_call_across_queries(self, mock_hf):
+        from rag.components.reranker import CrossEncoderReranker
+
+        mock_hf.return_value.score.side_effect = lambda pairs: [float(len(p[1])) for p in pairs]
+        reranker = CrossEncoderReranker(top_n=1)
+        a = [Document(page_content=t) for t in ["a", "bbb"]]
+        b = [Document(page_content=t) for t in ["cc", "d"]]
+
+        result = reranker.compress_documents_batch([(a, "q1"), ([], "q2"), (b, "q3")])
+
+        assert result == [[a[1]], [], [b[0]]]
+        mock_hf.return_value.score.assert_called_once_with(
+            [("q1", "a"), ("q1", "bbb"), ("q3", "cc"), ("q3", "d")]
+        )
+
+    @patch("rag.components.reranker.HuggingFaceCrossEncoder")
+    def test_uses_and_fills_score_cache(self, mock_hf):
+        from rag.components.reranker import CrossEncoderReranker, ScoreCache
+
+        mock_hf.return_value.score.side_effect = lambda pairs: [float(len(p[1])) for p in pairs]
+        reranker = CrossEncoderReranker(top_n=2, score_cache=ScoreCache())
+        docs = [Document(page_content=t, id=t) for t in ["a", "bbb"]]
+        reranker.compress_documents(docs[:1], "q")
+
+        result = reranker.compress_documents_batch([(docs, "q")])
+        again = reranker.compress_documents(docs, "q")
+
+        assert result == [[docs[1], docs[0]]] and again == result[0]
+        assert mock_hf.return_value.score.call_count == 2
+        assert mock_hf.return_value.score.call_args[0][0] == [("q", "bbb")]
@@ -2,7 +2,10 @@ from unittest.mock import MagicMock
 from langchain_core.documents import Document
 import pytest
 
-from rag.pipeline.retrieval import TwoStageRetrieval
+from rag.pipeline.retrieval import (
+    TwoStageRetrieval, HybridRetrieval, LexicalRetrieval, reciprocal_rank_fusion,
+    batch_vector_search, batch_rerank,
+)
 
 
 @pytest.fixture
@@ -150,3 +153,414 @@ class TestTwoStageRetrieval:
 
         assert result == []
         mock_reranker.compress_documents.assert_not_called()
+
+
+class TestPrecomputedEmbedding:
+    def _docs(self, n=3):
+        return [Document(page_content=f"doc{i}", metadata={"source": f"s{i}"}) for i in range(n)]
+
+    def test_two_stage_searches_by_vector(self, mock_vectorstore, mock_reranker):
+        docs = self._docs()
+        mock_vectorstore.similarity_search_with_score_by_vector.return_value = [(d, 0.3) for d in docs]
+        mock_reranker.compress_documents.return_value = docs
+        strategy = TwoStageRetrieval(
+            vectorstore=mock_vectorstore, reranker=mock_reranker, search_k=5, rerank_top_k=3,
+        )
+
+        assert strategy.retrieve("query", embedding=[0.1, 0.2]) == docs
+        mock_vectorstore.similarity_search_with_score_by_vector.assert_called_once_with([0.1, 0.2], k=5)
+        mock_vectorstore.similarity_search_with_score.assert_not_called()
+
+    def test_store_without_by_vector_searches_by_text(self, mock_reranker):
+        class Store:
+            def similarity_search_with_score(self, query, k=4):
+                return [(Document(page_content=query), 0.1)]
+
+        mock_reranker.compress_documents.side_effect = lambda docs, query: docs
+        strategy = TwoStageRetrieval(vectorstore=Store(), reranker=mock_reranker, search_k=5, rerank_top_k=3)
+
+        assert strategy.retrieve("query", embedding=[0.1])[0].page_content == "query"
+
+    def test_async_store_searches_by_vector(self, mock_vectorstore, mock_reranker):
+        import asyncio
+        from unittest.mock import AsyncMock
+
+        docs = self._docs()
+        async_vs = MagicMock()
+        async_vs.asimilarity_search_with_score_by_vector = AsyncMock(return_value=[(d, 0.3) for d in docs])
+        mock_reranker.compress_documents.return_value = docs
+        strategy = HybridRetrieval(
+            vectorstore=mock_vectorstore, keyword_search=MagicMock(asearch=AsyncMock(return_value=[])),
+            reranker=mock_reranker, search_k=5, rerank_top_k=3, async_vectorstore=async_vs,
+        )
+
+        assert asyncio.run(strategy.aretrieve("query", embedding=[0.1, 0.2])) == docs
+        async_vs.asimilarity_search_with_score_by_vector.assert_awaited_once_with([0.1, 0.2], k=5)
+        async_vs.asimilarity_search_with_score.assert_not_called()
+
+
+class TestAsyncRetrieve:
+    def _docs(self, n=3):
+        return [Document(page_content=f"doc{i}", metadata={"source": f"s{i}"}) for i in range(n)]
+
+    def test_uses_async_vectorstore(self, mock_vectorstore, mock_reranker):
+        import asyncio
+        from unittest.mock import AsyncMock
+
+        docs = self._docs()
+        async_vs = MagicMock()
+        async_vs.asimilarity_search_with_score = AsyncMock(return_value=[(d, 0.3) for d in docs])
+        mock_reranker.compress_documents.return_value = docs[:2]
+        strategy = TwoStageRetrieval(
+            vectorstore=mock_vectorstore, reranker=mock_reranker,
+            search_k=10, rerank_top_k=2, async_vectorstore=async_vs,
+        )
+
+        result = asyncio.run(strategy.aretrieve("query"))
+
+        async_vs.asimilarity_search_with_score.assert_awaited_once_with("query", k=10)
+        mock_vectorstore.similarity_search_with_score.assert_not_called()
+        mock_reranker.compress_documents.assert_called_once_with(docs, "query")
+        assert result == docs[:2]
+
+    def test_falls_back_to_sync_vectorstore(self, mock_vectorstore, mock_reranker):
+        import asyncio
+
+        docs = self._docs()
+        mock_vectorstore.similarity_search_with_score.return_value = [(d, 0.3) for d in docs]
+        mock_reranker.compress_documents.return_value = docs
+        strategy = TwoStageRetrieval(
+            vectorstore=mock_vectorstore, reranker=mock_reranker, search_k=5, rerank_top_k=3,
+        )
+
+        result = asyncio.run(strategy.aretrieve("query"))
+
+        mock_vectorstore.similarity_search_with_score.assert_called_once_with("query", k=5)
+        assert result == docs
+
+    def test_filtered_out_skips_rerank(self, mock_vectorstore, mock_reranker):
+        import asyncio
+
+        mock_vectorstore.similarity_search_with_score.return_value = [(d, 0.9) for d in self._docs()]
+        strategy = TwoStageRetrieval(
+            vectorstore=mock_vectorstore, reranker=mock_reranker, search_k=5, rerank_top_k=3,
+        )
+
+        assert asyncio.run(strategy.aretrieve("query")) == []
+        mock_reranker.compress_documents.assert_not_called()
+
+    def test_matches_sync_retrieve(self, mock_vectorstore, mock_reranker):
+        import asyncio
+
+        docs = self._docs(5)
+        mock_vectorstore.similarity_search_with_score.return_value = [
+            (d, 0.1 * i) for i, d in enumerate(docs)
+        ]
+        mock_reranker.compress_documents.side_effect = lambda ds, q: list(reversed(ds))
+        strategy = TwoStageRetrieval(
+            vectorstore=mock_vectorstore, reranker=mock_reranker, search_k=5, rerank_top_k=2,
+        )
+
+        assert asyncio.run(strategy.aretrieve("q")) == strategy.retrieve("q")
+
+
+class TestRerankCascade:
+    def _strategy(self, vs, reranker, margin, top_k=2):
+        reranker.compress_documents.side_effect = lambda docs, q: docs
+        return TwoStageRetrieval(
+            vectorstore=vs, reranker=reranker, search_k=10, rerank_top_k=top_k,
+            score_threshold=0.9, rerank_distance_margin=margin,
+        )
+
+    def test_far_candidates_skip_rerank(self, mock_vectorstore, mock_reranker):
+        docs = [Document(page_content=f"d{i}") for i in range(5)]
+        mock_vectorstore.similarity_search_with_score.return_value = list(
+            zip(docs, [0.10, 0.12, 0.15, 0.40, 0.50])
+        )
+        strategy = self._strategy(mock_vectorstore, mock_reranker, margin=0.1, top_k=2)
+        strategy.retrieve("q")
+
+        reranked_input = mock_reranker.compress_documents.call_args[0][0]
+        assert reranked_input == docs[:3]
+
+    def test_keeps_at_least_top_k(self, mock_vectorstore, mock_reranker):
+        docs = [Document(page_content=f"d{i}") for i in range(4)]
+        mock_vectorstore.similarity_search_with_score.return_value = list(
+            zip(docs, [0.10, 0.60, 0.70, 0.80])
+        )
+        strategy = self._strategy(mock_vectorstore, mock_reranker, margin=0.05, top_k=2)
+        strategy.retrieve("q")
+
+        assert mock_reranker.compress_documents.call_args[0][0] == docs[:2]
+
+    def test_disabled_by_default(self, mock_vectorstore, mock_reranker):
+        docs = [Document(page_content=f"d{i}") for i in range(4)]
+        mock_vectorstore.similarity_search_with_score.return_value = list(
+            zip(docs, [0.10, 0.60, 0.70, 0.80])
+        )
+        strategy = self._strategy(mock_vectorstore, mock_reranker, margin=0.0, top_k=2)
+        strategy.retrieve("q")
+
+        assert mock_reranker.compress_documents.call_args[0][0] == docs
+
+
+def _doc(i):
+    return Document(id=f"id{i}", page_content=f"doc{i}", metadata={"source": f"s{i}"})
+
+
+class TestReciprocalRankFusion:
+    def test_doc_in_both_lists_ranks_first(self):
+        a, b, c = _doc(1), _doc(2), _doc(3)
+
+        fused = reciprocal_rank_fusion([[a, b], [c, b]], k=60)
+
+        assert fused[0] is b
+        assert set(d.id for d in fused) == {"id1", "id2", "id3"}
+
+    def test_ties_keep_first_seen_order(self):
+        a, c = _doc(1), _doc(3)
+
+        assert reciprocal_rank_fusion([[a], [c]]) == [a, c]
+
+    def test_dedupes_by_id(self):
+        vector = _doc(1)
+        keyword = Document(id="id1", page_content="doc1", metadata={})
+
+        fused = reciprocal_rank_fusion([[vector], [keyword]])
+
+        assert fused == [vector]
+
+    def test_falls_back_to_content_without_id(self):
+        fused = reciprocal_rank_fusion([
+            [Document(page_content="same")], [Document(page_content="same")],
+        ])
+        assert len(fused) == 1
+
+    def test_empty(self):
+        assert reciprocal_rank_fusion([[], []]) == []
+
+
+class TestHybridRetrieval:
+    def _strategy(self, vs, keyword, reranker, **kwargs):
+        params = dict(search_k=10, rerank_top_k=2, keyword_k=5, rerank_candidates=3)
+        params.update(kwargs)
+        return HybridRetrieval(vectorstore=vs, keyword_search=keyword, reranker=reranker, **params)
+
+    def test_fuses_vector_and_keyword_then_reranks(self, mock_vectorstore, mock_reranker):
+        docs = [_doc(i) for i in range(4)]
+        mock_vectorstore.similarity_search_with_score.return_value = [(docs[0], 0.2), (docs[1], 0.3)]
+        keyword = MagicMock()
+        keyword.search.return_value = [docs[2], docs[1]]
+        mock_reranker.compress_documents.side_effect = lambda ds, q: list(ds)
+
+        result = self._strategy(mock_vectorstore, keyword, mock_reranker).retrieve("質問")
+
+        mock_vectorstore.similarity_search_with_score.assert_called_once_with("質問", k=10)
+        keyword.search.assert_called_once_with("質問", 5)
+        candidates = mock_reranker.compress_documents.call_args[0][0]
+        assert candidates[0] is docs[1]
+        assert len(candidates) == 3
+        assert result == candidates[:2]
+
+    def test_keyword_hits_survive_vector_threshold(self, mock_vectorstore, mock_reranker):
+        exact = _doc(9)
+        mock_vectorstore.similarity_search_with_score.return_value = [(_doc(1), 0.9)]
+        keyword = MagicMock()
+        keyword.search.return_value = [exact]
+        mock_reranker.compress_documents.side_effect = lambda ds, q: list(ds)
+
+        result = self._strategy(mock_vectorstore, keyword, mock_reranker).retrieve("アカウント削除")
+
+        assert result == [exact]
+
+    def test_no_candidates_skips_rerank(self, mock_vectorstore, mock_reranker):
+        mock_vectorstore.similarity_search_with_score.return_value = []
+        keyword = MagicMock()
+        keyword.search.return_value = []
+
+        assert self._strategy(mock_vectorstore, keyword, mock_reranker).retrieve("q") == []
+        mock_reranker.compress_documents.assert_not_called()
+
+    def test_searches_run_concurrently(self, mock_vectorstore, mock_reranker):
+        import threading
+
+        # 両方の検索が同時に走っていなければ barrier がタイムアウトする
+        barrier = threading.Barrier(2, timeout=5)
+
+        def vector_search(query, k):
+            barrier.wait()
+            return [(_doc(1), 0.1)]
+
+        def keyword_search(query, k):
+            barrier.wait()
+            return [_doc(2)]
+
+        mock_vectorstore.similarity_search_with_score.side_effect = vector_search
+        keyword = MagicMock()
+        keyword.search.side_effect = keyword_search
+        mock_reranker.compress_documents.side_effect = lambda ds, q: list(ds)
+
+        result = self._strategy(mock_vectorstore, keyword, mock_reranker).retrieve("q")
+
+        assert [d.id for d in result] == ["id1", "id2"]
+
+    def test_aretrieve_gathers_async_searches(self, mock_vectorstore, mock_reranker):
+        import asyncio
+        from unittest.mock import AsyncMock
+
+        docs = [_doc(i) for i in range(3)]
+        async_vs = MagicMock()
+        async_vs.asimilarity_search_with_score = AsyncMock(return_value=[(docs[0], 0.1)])
+        keyword = MagicMock()
+        keyword.asearch = AsyncMock(return_value=[docs[1]])
+        mock_reranker.compress_documents.side_effect = lambda ds, q: list(ds)
+        strategy = self._strategy(mock_vectorstore, keyword, mock_reranker, async_vectorstore=async_vs)
+
+        result = asyncio.run(strategy.aretrieve("q"))
+
+        async_vs.asimilarity_search_with_score.assert_awaited_once_with("q", k=10)
+        keyword.asearch.assert_awaited_once_with("q", 5)
+        keyword.search.assert_not_called()
+        assert result == docs[:2]
+
+    def test_aretrieve_matches_sync(self, mock_vectorstore, mock_reranker):
+        import asyncio
+
+        docs = [_doc(i) for i in range(4)]
+        mock_vectorstore.similarity_search_with_score.return_value = [(docs[0], 0.1), (docs[1], 0.2)]
+
+        class SyncKeyword:
+            def search(self, query, k):
+                return [docs[3], docs[1]]
+
+        mock_reranker.compress_documents.side_effect = lambda ds, q: list(reversed(ds))
+        strategy = self._strategy(mock_vectorstore, SyncKeyword(), mock_reranker)
+
+        assert asyncio.run(strategy.aretrieve("q")) == strategy.retrieve("q")
+
+
+class TestLexicalRetrieval:
+    def test_reranks_keyword_candidates(self, mock_reranker):
+        docs = [_doc(i) for i in range(5)]
+        keyword = MagicMock()
+        keyword.search.return_value = docs
+        mock_reranker.compress_documents.side_effect = lambda ds, q: list(reversed(ds))
+        strategy = LexicalRetrieval(
+            keyword_search=keyword, reranker=mock_reranker,
+            rerank_top_k=2, keyword_k=20, rerank_candidates=3,
+        )
+
+        result = strategy.retrieve("q")
+
+        keyword.search.assert_called_once_with("q", 20)
+        mock_reranker.compress_documents.assert_called_once_with(docs[:3], "q")
+        assert result == [docs[2], docs[1]]
+
+    def test_no_hits_skips_rerank(self, mock_reranker):
+        import asyncio
+
+        keyword = MagicMock()
+        keyword.search.return_value = []
+        strategy = LexicalRetrieval(keyword_search=keyword, reranker=mock_reranker, rerank_top_k=2)
+
+        assert asyncio.run(strategy.aretrieve("q")) == []
+        mock_reranker.compress_documents.assert_not_called()
+
+    def test_hybrid_with_bm25_index(self, mock_vectorstore, mock_reranker, tmp_path):
+        from rag.components.bm25 import BM25Builder, BM25Index
+
+        builder = BM25Builder(tmp_path / "bm25")
+        builder.add("id1", "アカウント削除は設定画面から行えます", {})
+        builder.add("id2", "料金プランの変更について", {})
+        mock_vectorstore.similarity_search_with_score.return_value = [(_doc(2), 0.2)]
+        mock_reranker.compress_documents.side_effect = lambda ds, q: list(ds)
+        strategy = HybridRetrieval(
+            vectorstore=mock_vectorstore, keyword_search=BM25Index.from_builder(builder),
+            reranker=mock_reranker, search_k=5, rerank_top_k=3,
+        )
+
+        assert {d.id for d in strategy.retrieve("アカウント削除")} == {"id1", "id2"}
+
+
+class TestRetrieveBatch:
+    def test_batch_vector_search_embeds_once(self, mock_vectorstore):
+        mock_vectorstore.embeddings.embed_documents.return_value = [[1.0], [2.0]]
+        mock_vectorstore.similarity_search_with_score_by_vector.side_effect = (
+            lambda vector, k: [(_doc(int(vector[0])), 0.1)]
+        )
+
+        results = batch_vector_search(mock_vectorstore, ["q1", "q2"], 5)
+
+        mock_vectorstore.embeddings.embed_documents.assert_called_once_with(["q1", "q2"])
+        mock_vectorstore.similarity_search_with_score.assert_not_called()
+        assert [r[0][0].id for r in results] == ["id1", "id2"]
+
+    def test_batch_vector_search_without_by_vector(self):
+        class Store:
+            def similarity_search_with_score(self, query, k=4):
+                return [(Document(page_content=query), 0.1)]
+
+        results = batch_vector_search(Store(), ["a", "b", "c"], 3)
+        assert [r[0][0].page_content for r in results] == ["a", "b", "c"]
+
+    def test_batch_rerank_falls_back_per_query(self):
+        class Reranker:
+            def compress_documents(self, documents, query):
+                return list(reversed(documents))
+
+        docs = [_doc(1), _doc(2)]
+        assert batch_rerank(Reranker(), ["q1", "q2"], [docs, []]) == [[docs[1], docs[0]], []]
+
+    def test_two_stage_matches_retrieve(self, mock_vectorstore, mock_reranker):
+        docs = [_doc(i) for i in range(4)]
+        mock_vectorstore.embeddings.embed_documents.return_value = [[0.0], [1.0]]
+        mock_vectorstore.similarity_search_with_score_by_vector.side_effect = lambda vector, k: (
+            [(d, 0.2) for d in docs[:3]] if vector == [0.0] else [(docs[3], 0.9)]
+        )
+        mock_reranker.compress_documents_batch.side_effect = (
+            lambda requests: [list(reversed(ds)) for ds, _ in requests]
+        )
+        strategy = TwoStageRetrieval(
+            vectorstore=mock_vectorstore, reranker=mock_reranker, search_k=10, rerank_top_k=2,
+        )
+
+        result = strategy.retrieve_batch(["q1", "q2"])
+
+        assert result == [[docs[2], docs[1]], []]
+        mock_reranker.compress_documents_batch.assert_called_once_with(
+            [(docs[:3], "q1"), ([], "q2")]
+        )
+
+    def test_hybrid_fuses_per_query(self, mock_vectorstore, mock_reranker):
+        mock_vectorstore.embeddings.embed_documents.return_value = [[1.0], [2.0]]
+        mock_vectorstore.similarity_search_with_score_by_vector.side_effect = (
+            lambda vector, k: [(_doc(int(vector[0])), 0.1)]
+        )
+        keyword = MagicMock()
+        keyword.search.side_effect = lambda q, k: [_doc(10)] if q == "q1" else []
+        mock_reranker.compress_documents_batch.side_effect = (
+            lambda requests: [list(ds) for ds, _ in requests]
+        )
+        strategy = HybridRetrieval(
+            vectorstore=mock_vectorstore, keyword_search=keyword, reranker=mock_reranker,
+            search_k=5, rerank_top_k=3,
+        )
+
+        result = strategy.retrieve_batch(["q1", "q2"])
+
+        assert [[d.id for d in docs] for docs in result] == [["id1", "id10"], ["id2"]]
+
+    def test_lexical(self, mock_reranker):
+        keyword = MagicMock()
+        keyword.search.side_effect = lambda q, k: [_doc(i) for i in range(5)] if q == "q1" else []
+        mock_reranker.compress_documents_batch.side_effect = (
+            lambda requests: [list(ds) for ds, _ in requests]
+        )
+        strategy = LexicalRetrieval(
+            keyword_search=keyword, reranker=mock_reranker, rerank_top_k=2, rerank_candidates=3,
+        )
+
+        result = strategy.retrieve_batch(["q1", "q2"])
+
+        assert [[d.id for d in docs] for docs in result] == [["id0", "id1"], []]
+        assert [len(ds) for ds, _ in mock_reranker.compress_documents_batch.call_args[0][0]] == [3, 0]
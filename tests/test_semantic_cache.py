@@ -0,0 +1,77 @@
+import numpy as np
+
+
+class TestSemanticCache:
+    def test_empty_cache_misses(self):
+        from rag.pipeline.semantic_cache import SemanticCache
+
+        cache = SemanticCache(threshold=0.9, max_entries=4)
+        assert cache.lookup([1.0, 0.0], "v1") is None
+
+    def test_hit_above_threshold(self):
+        from rag.pipeline.semantic_cache import SemanticCache
+
+        cache = SemanticCache(threshold=0.9, max_entries=4)
+        cache.add([1.0, 0.0], {"answer": "a"}, "v1")
+        value, score = cache.lookup([0.99, 0.05], "v1")
+
+        assert value == {"answer": "a"}
+        assert score > 0.9
+
+    def test_miss_below_threshold(self):
+        from rag.pipeline.semantic_cache import SemanticCache
+
+        cache = SemanticCache(threshold=0.9, max_entries=4)
+        cache.add([1.0, 0.0], {"answer": "a"}, "v1")
+        assert cache.lookup([0.0, 1.0], "v1") is None
+
+    def test_scale_invariant(self):
+        from rag.pipeline.semantic_cache import SemanticCache
+
+        cache = SemanticCache(threshold=0.99, max_entries=4)
+        cache.add([3.0, 4.0], {"answer": "a"}, "v1")
+        _, score = cache.lookup([0.6, 0.8], "v1")
+        assert np.isclose(score, 1.0)
+
+    def test_returns_nearest(self):
+        from rag.pipeline.semantic_cache import SemanticCache
+
+        cache = SemanticCache(threshold=0.5, max_entries=4)
+        cache.add([1.0, 0.0], {"answer": "x"}, "v1")
+        cache.add([0.0, 1.0], {"answer": "y"}, "v1")
+        value, _ = cache.lookup([0.1, 0.9], "v1")
+        assert value == {"answer": "y"}
+
+    def test_version_change_clears(self):
+        from rag.pipeline.semantic_cache import SemanticCache
+
+        cache = SemanticCache(threshold=0.9, max_entries=4)
+        cache.add([1.0, 0.0], {"answer": "a"}, "v1")
+        assert cache.lookup([1.0, 0.0], "v2") is None
+        assert len(cache) == 0
+
+    def test_evicts_least_recently_used_row(self):
+        from rag.pipeline.semantic_cache import SemanticCache
+
+        cache = SemanticCache(threshold=0.99, max_entries=2)
+        cache.add([1.0, 0.0, 0.0], {"answer": "x"}, "v1")
+        cache.add([0.0, 1.0, 0.0], {"answer": "y"}, "v1")
+        cache.lookup([1.0, 0.0, 0.0], "v1")
+        cache.add([0.0, 0.0, 1.0], {"answer": "z"}, "v1")
+
+        assert len(cache) == 2
+        assert cache.lookup([0.0, 1.0, 0.0], "v1") is None
+        assert cache.lookup([1.0, 0.0, 0.0], "v1")[0] == {"answer": "x"}
+        assert cache.lookup([0.0, 0.0, 1.0], "v1")[0] == {"answer": "z"}
+
+
+class TestCreateSemanticCache:
+    def test_disabled_returns_none(self):
+        from rag.pipeline.semantic_cache import create_semantic_cache
+
+        assert create_semantic_cache(enabled=False) is None
+
+    def test_enabled_returns_cache(self):
+        from rag.pipeline.semantic_cache import create_semantic_cache, SemanticCache
+
+        assert isinstance(create_semantic_cache(enabled=True), SemanticCache)
@@ -0,0 +1,300 @@
+import json
+import socket
+import threading
+import urllib.error
+import urllib.request
+from unittest.mock import MagicMock, AsyncMock
+
+import pytest
+
+
+@pytest.fixture
+def fake_graph():
+    graph = MagicMock()
+    graph.ainvoke = AsyncMock(return_value={
+        "query": "q", "answer": "回答", "sources": ["doc.pdf:p1"], "contexts": ["本文"],
+        "reranked_documents": [object()],
+    })
+    return graph
+
+
+def _astream_of(chunks):
+    async def astream(*args, **kwargs):
+        for chunk in chunks:
+            yield chunk
+    return astream
+
+
+def _failing_astream(*args, **kwargs):
+    raise RuntimeError("boom")
+
+
+@pytest.fixture
+def running_server(fake_graph):
+    from rag.server import create_server
+
+    server = create_server(fake_graph, host="127.0.0.1", port=0)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _url(server, path):
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}{path}"
+
+
+def _post(server, path, body: bytes):
+    req = urllib.request.Request(
+        _url(server, path), data=body, headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=5) as res:
+            return res.status, json.loads(res.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+class TestServer:
+    def test_health(self, running_server):
+        with urllib.request.urlopen(_url(running_server, "/health"), timeout=5) as res:
+            assert res.status == 200
+            assert json.loads(res.read()) == {"status": "ok"}
+
+    def test_metrics_reports_pool_stats(self, running_server, monkeypatch):
+        monkeypatch.setattr("rag.server.pool_stats", lambda: {"sync": {"size": 5, "checked_out": 1}})
+        with urllib.request.urlopen(_url(running_server, "/metrics"), timeout=5) as res:
+            assert res.status == 200
+            assert json.loads(res.read()) == {"db_pool": {"sync": {"size": 5, "checked_out": 1}}}
+
+    def test_ask_returns_answer(self, running_server, fake_graph):
+        status, payload = _post(running_server, "/ask", json.dumps({"query": "質問"}).encode())
+
+        assert status == 200
+        assert payload == {
+            "answer": "回答", "sources": ["doc.pdf:p1"], "contexts": ["本文"], "cached": False,
+        }
+        fake_graph.ainvoke.assert_awaited_once_with({"query": "質問"})
+
+    def test_ask_reports_cache_hit(self, running_server, fake_graph):
+        fake_graph.ainvoke.return_value = {"answer": "a", "sources": [], "contexts": [], "cached": True}
+        _, payload = _post(running_server, "/ask", json.dumps({"query": "質問"}).encode())
+        assert payload["cached"] is True
+
+    def test_missing_query_is_400(self, running_server, fake_graph):
+        status, payload = _post(running_server, "/ask", b"{}")
+
+        assert status == 400
+        fake_graph.ainvoke.assert_not_awaited()
+
+    def test_invalid_json_is_400(self, running_server):
+        status, _ = _post(running_server, "/ask", b"not json")
+        assert status == 400
+
+    def test_unknown_path_is_404(self, running_server):
+        status, _ = _post(running_server, "/other", b"{}")
+        assert status == 404
+
+    def test_graph_error_is_500(self, running_server, fake_graph):
+        fake_graph.ainvoke.side_effect = RuntimeError("boom")
+        status, payload = _post(running_server, "/ask", json.dumps({"query": "q"}).encode())
+
+        assert status == 500
+        assert payload["error"] == "boom"
+
+
+class TestStreamingEndpoint:
+    def test_streams_ndjson_tokens_then_result(self, running_server, fake_graph):
+        fake_graph.astream = _astream_of([
+            ("custom", {"token": "回"}),
+            ("custom", {"token": "答"}),
+            ("values", {"answer": "回答", "sources": ["s"], "contexts": ["c"]}),
+        ])
+        req = urllib.request.Request(
+            _url(running_server, "/ask"),
+            data=json.dumps({"query": "質問", "stream": True}).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(req, timeout=5) as res:
+            lines = [json.loads(line) for line in res]
+
+        assert lines[0] == {"token": "回"}
+        assert lines[1] == {"token": "答"}
+        assert lines[2] == {"result": {"answer": "回答", "sources": ["s"], "contexts": ["c"], "cached": False}}
+
+    def test_client_receives_tokens(self, running_server, fake_graph):
+        from cli.ask import _ask_server
+
+        fake_graph.astream = _astream_of([
+            ("custom", {"token": "回"}),
+            ("values", {"answer": "回", "sources": [], "contexts": []}),
+        ])
+        tokens = []
+        host, port = running_server.server_address[:2]
+        result = _ask_server("質問", host=host, port=port, on_token=tokens.append)
+
+        assert tokens == ["回"]
+        assert result["answer"] == "回"
+
+    def test_stream_error_reported(self, running_server, fake_graph):
+        from cli.ask import _ask_server
+
+        fake_graph.astream = _failing_astream
+        host, port = running_server.server_address[:2]
+        with pytest.raises(RuntimeError, match="boom"):
+            _ask_server("質問", host=host, port=port, on_token=lambda t: None)
+
+
+class TestAskClient:
+    def test_roundtrip_through_server(self, running_server):
+        from cli.ask import _ask_server
+
+        host, port = running_server.server_address[:2]
+        result = _ask_server("質問", host=host, port=port)
+        assert result["answer"] == "回答"
+        assert result["sources"] == ["doc.pdf:p1"]
+
+    def test_returns_none_when_server_not_running(self):
+        from cli.ask import _ask_server
+
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        assert _ask_server("質問", host="127.0.0.1", port=port) is None
+
+    def test_server_error_raises(self, running_server, fake_graph):
+        from cli.ask import _ask_server
+
+        fake_graph.ainvoke.side_effect = RuntimeError("boom")
+        host, port = running_server.server_address[:2]
+        with pytest.raises(RuntimeError, match="boom"):
+            _ask_server("質問", host=host, port=port)
+
+
+class TestSerializedLLM:
+    def test_delegates_invoke(self):
+        from rag.server import SerializedLLM
+
+        llm = MagicMock()
+        llm.invoke.return_value = "out"
+        assert SerializedLLM(llm).invoke("prompt") == "out"
+        llm.invoke.assert_called_once_with("prompt")
+
+    def test_delegates_stream(self):
+        from rag.server import SerializedLLM
+
+        llm = MagicMock()
+        llm.stream.return_value = iter(["a", "b"])
+        assert list(SerializedLLM(llm).stream("prompt")) == ["a", "b"]
+
+    def test_calls_do_not_overlap(self):
+        import time
+        from rag.server import SerializedLLM
+
+        active = []
+        overlaps = []
+
+        class SlowLLM:
+            def invoke(self, prompt):
+                active.append(prompt)
+                if len(active) > 1:
+                    overlaps.append(prompt)
+                time.sleep(0.01)
+                active.remove(prompt)
+                return prompt
+
+        llm = SerializedLLM(SlowLLM())
+        threads = [threading.Thread(target=llm.invoke, args=(str(i),)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert overlaps == []
+
+
+class TestAsyncHelpers:
+    def test_serialized_llm_ainvoke(self):
+        import asyncio
+        from rag.server import SerializedLLM
+
+        llm = MagicMock()
+        llm.invoke.return_value = "out"
+        assert asyncio.run(SerializedLLM(llm).ainvoke("prompt")) == "out"
+
+    def test_serialized_llm_astream(self):
+        import asyncio
+        from rag.server import SerializedLLM
+
+        llm = MagicMock()
+        llm.stream.return_value = iter(["a", "b"])
+
+        async def collect():
+            return [t async for t in SerializedLLM(llm).astream("prompt")]
+
+        assert asyncio.run(collect()) == ["a", "b"]
+
+    def test_waiting_generations_do_not_occupy_default_executor(self):
+        import asyncio
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        from rag.server import SerializedLLM
+
+        class SlowLLM:
+            def invoke(self, prompt):
+                time.sleep(0.05)
+                return prompt
+
+        llm = SerializedLLM(SlowLLM())
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            loop.set_default_executor(ThreadPoolExecutor(max_workers=1))
+            generations = [asyncio.ensure_future(llm.ainvoke(str(i))) for i in range(4)]
+            await asyncio.sleep(0)
+            # 生成待ちが 4 件あっても、検索・リランク用の default executor はすぐに使える
+            start = time.perf_counter()
+            await loop.run_in_executor(None, lambda: None)
+            waited = time.perf_counter() - start
+            return waited, await asyncio.gather(*generations)
+
+        waited, answers = asyncio.run(run())
+        llm.close()
+        assert waited < 0.04
+        assert answers == ["0", "1", "2", "3"]
+
+    def test_aiter_in_thread_propagates_errors(self):
+        import asyncio
+        from rag.server import aiter_in_thread
+
+        def broken():
+            yield 1
+            raise ValueError("bad")
+
+        async def collect():
+            return [x async for x in aiter_in_thread(broken())]
+
+        with pytest.raises(ValueError, match="bad"):
+            asyncio.run(collect())
+
+    def test_runner_overlaps_concurrent_requests(self):
+        import asyncio
+        import time
+        from rag.server import AsyncRunner
+
+        runner = AsyncRunner()
+        try:
+            async def io_bound():
+                await asyncio.sleep(0.2)
+                return "ok"
+
+            start = time.perf_counter()
+            threads = [threading.Thread(target=runner.run, args=(io_bound(),)) for _ in range(5)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            assert time.perf_counter() - start < 0.6
+        finally:
+            runner.close()
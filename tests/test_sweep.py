@@ -0,0 +1,180 @@
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from rag.evaluation.sweep import (
+    MatrixVectorStore, chunk_configs, load_grid, print_sweep_report, retrieval_configs, run_sweep,
+)
+
+VOCAB = ["パスワード", "アカウント", "料金", "解約"]
+
+
+class KeywordEmbeddings:
+    """語彙の出現回数をベクトルにする決定的な Embeddings。"""
+
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(t.count(w)) + 0.01 for w in VOCAB] for t in texts]
+
+
+class OverlapModel:
+    def __init__(self):
+        self.calls = []
+
+    def score(self, pairs):
+        self.calls.append(list(pairs))
+        return [float(sum(w in q and w in p for w in VOCAB)) + len(p) * 1e-4 for q, p in pairs]
+
+
+def _reranker(model, top_n=5):
+    from rag.components.reranker import CrossEncoderReranker, ScoreCache
+    return CrossEncoderReranker(top_n=top_n, score_cache=ScoreCache(max_size=10_000), model=model)
+
+
+CORPUS = (
+    [("パスワードを忘れた場合はリセットしてください。\n\nアカウントの削除は設定画面から。", "guide.pdf:p1")],
+    [
+        ("料金プランは月額制です", "faq.csv:r1", {}),
+        ("解約はいつでも可能です", "faq.csv:r2", {}),
+    ],
+)
+QUESTIONS = [
+    {"query": "パスワード", "expected_source": "guide.pdf:p1", "expected_keywords": ["パスワード"]},
+    {"query": "解約", "expected_source": "faq.csv:r2", "expected_keywords": ["解約"]},
+]
+
+
+class TestGrid:
+    def test_load_grid_fills_defaults(self, tmp_path):
+        from rag.core.config import SEARCH_K
+
+        path = tmp_path / "grid.yaml"
+        path.write_text("CHUNK_SIZE: [300, 500]\nSCORE_THRESHOLD: 0.4\n")
+        grid = load_grid(path)
+
+        assert grid["CHUNK_SIZE"] == [300, 500]
+        assert grid["SCORE_THRESHOLD"] == [0.4]
+        assert grid["SEARCH_K"] == [SEARCH_K]
+
+    def test_unknown_parameter(self, tmp_path):
+        path = tmp_path / "grid.yaml"
+        path.write_text("CHUNK_SIZ: [300]\n")
+        with pytest.raises(ValueError, match="CHUNK_SIZ"):
+            load_grid(path)
+
+    def test_configs_skip_invalid_overlap(self):
+        grid = {"CHUNK_SIZE": [100, 300], "CHUNK_OVERLAP": [50, 200],
+                "SEARCH_K": [5, 10], "RERANK_TOP_K": [3], "SCORE_THRESHOLD": [0.4, 0.5]}
+
+        assert chunk_configs(grid) == [
+            {"CHUNK_SIZE": 100, "CHUNK_OVERLAP": 50},
+            {"CHUNK_SIZE": 300, "CHUNK_OVERLAP": 50},
+            {"CHUNK_SIZE": 300, "CHUNK_OVERLAP": 200},
+        ]
+        assert len(retrieval_configs(grid)) == 4
+
+
+class TestMatrixVectorStore:
+    def test_cosine_distance_order(self):
+        docs = [Document(page_content=t) for t in ["a", "b", "c"]]
+        store = MatrixVectorStore(docs, [[1, 0], [0, 1], [1, 1]], ["q"], [[1, 0]])
+
+        results = store.similarity_search_with_score("q", k=2)
+
+        assert [d.page_content for d, _ in results] == ["a", "c"]
+        assert results[0][1] == pytest.approx(0.0, abs=1e-6)
+        assert results[1][1] == pytest.approx(1 - 1 / np.sqrt(2))
+
+    def test_empty_corpus(self):
+        store = MatrixVectorStore([], [], ["q"], [[1.0, 0.0]])
+        assert store.similarity_search_with_score("q", k=5) == []
+
+
+class TestRunSweep:
+    def _grid(self, **overrides):
+        grid = {"CHUNK_SIZE": [20, 500], "CHUNK_OVERLAP": [5], "SEARCH_K": [2, 4],
+                "RERANK_TOP_K": [1, 2], "SCORE_THRESHOLD": [0.5, 1.0]}
+        grid.update(overrides)
+        return grid
+
+    def test_rows_cover_grid(self):
+        rows = run_sweep(QUESTIONS, self._grid(), embeddings=KeywordEmbeddings(),
+                         reranker=_reranker(OverlapModel()), corpus=CORPUS)
+
+        assert len(rows) == 2 * 8
+        assert {(r["CHUNK_SIZE"], r["SEARCH_K"], r["RERANK_TOP_K"], r["SCORE_THRESHOLD"]) for r in rows} == {
+            (c, k, t, s) for c in (20, 500) for k in (2, 4) for t in (1, 2) for s in (0.5, 1.0)
+        }
+        assert all(0.0 <= r["retrieval_at_k"] <= 1.0 for r in rows)
+        assert max(r["retrieval_at_k"] for r in rows) == 1.0
+        assert rows[0]["chunks"] > rows[-1]["chunks"]
+
+    def test_reuses_query_embeddings_and_scores(self):
+        embeddings = KeywordEmbeddings()
+        model = OverlapModel()
+
+        run_sweep(QUESTIONS, self._grid(), embeddings=embeddings, reranker=_reranker(model), corpus=CORPUS)
+
+        # クエリ 1 回 + チャンク分割設定ごとに 1 回
+        assert len(embeddings.calls) == 3
+        assert embeddings.calls[0] == ["パスワード", "解約"]
+        # cross-encoder はチャンク分割設定ごとに 1 回（以降の検索設定はキャッシュのみ）
+        assert len(model.calls) == 2
+
+    def test_threshold_changes_candidates(self):
+        rows = run_sweep(QUESTIONS, self._grid(CHUNK_SIZE=[500], SEARCH_K=[4], RERANK_TOP_K=[2]),
+                         embeddings=KeywordEmbeddings(), reranker=_reranker(OverlapModel()), corpus=CORPUS)
+        by_threshold = {r["SCORE_THRESHOLD"]: r for r in rows}
+
+        assert by_threshold[0.5]["avg_candidates"] < by_threshold[1.0]["avg_candidates"]
+
+
+class TestSweepReport:
+    @patch("builtins.print")
+    def test_prints_table_and_best(self, mock_print):
+        row = {"CHUNK_SIZE": 500, "CHUNK_OVERLAP": 100, "SEARCH_K": 10, "RERANK_TOP_K": 3,
+               "SCORE_THRESHOLD": 0.5, "chunks": 10, "retrieval_at_k": 0.5, "mrr": 0.25,
+               "context_relevance": 0.75, "avg_candidates": 4.0, "est_latency_ms": 12.0,
+               "est_latency_p90_ms": 20.0}
+        better = dict(row, SEARCH_K=20, retrieval_at_k=1.0)
+        print_sweep_report([row, better])
+        printed = "\n".join(str(c.args[0]) for c in mock_print.call_args_list if c.args)
+
+        assert "50.0%" in printed and "0.250" in printed
+        assert "Best: CHUNK_SIZE=500 CHUNK_OVERLAP=100 SEARCH_K=20" in printed
+        assert "Configurations evaluated: 2" in printed
+
+
+class TestMainSweep:
+    @patch("rag.evaluation.sweep.print_sweep_report")
+    @patch("rag.evaluation.sweep.run_sweep", return_value=[])
+    @patch("rag.evaluation.sweep.load_grid")
+    @patch("rag.evaluation.evaluate.load_questions", return_value=[])
+    def test_main_sweep(self, mock_load, mock_grid, mock_run, mock_print):
+        from rag.evaluation.evaluate import main_sweep
+
+        main_sweep("grid.yaml")
+
+        mock_grid.assert_called_once_with("grid.yaml")
+        mock_run.assert_called_once_with([], mock_grid.return_value)
+        mock_print.assert_called_once_with([])
+
+
+def test_sweep_grid_file_is_valid():
+    import os
+
+    path = os.path.join(os.path.dirname(__file__), "..", "env", "config", "sweep.yaml")
+    grid = load_grid(path)
+    assert all(len(values) >= 1 for values in grid.values())
+
+
+def test_makefile_target():
+    import os
+
+    with open(os.path.join(os.path.dirname(__file__), "..", "Makefile")) as f:
+        assert "evaluate-sweep:" in f.read()
@@ -0,0 +1,90 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+from rag.pipeline.timing import TokenTimer, collect, merge_timings, record, stage
+
+
+class TestStage:
+    def test_noop_outside_collect(self):
+        with stage("x"):
+            pass
+        record("y", 10)
+
+    def test_collect_records_block_and_stages(self):
+        with collect("node") as timings:
+            with stage("a"):
+                time.sleep(0.01)
+            with stage("a"):
+                pass
+        assert timings["a"] >= 10_000_000
+        assert timings["node"] >= timings["a"]
+
+    def test_records_on_exception(self):
+        try:
+            with collect("node") as timings:
+                with stage("a"):
+                    raise ValueError
+        except ValueError:
+            pass
+        assert set(timings) == {"a", "node"}
+
+    def test_nested_collect_is_isolated(self):
+        with collect("outer") as outer:
+            with collect("inner") as inner:
+                with stage("a"):
+                    pass
+            with stage("b"):
+                pass
+        assert set(inner) == {"a", "inner"}
+        assert set(outer) == {"b", "outer"}
+
+    def test_propagates_to_gathered_tasks(self):
+        async def work(name):
+            with stage(name):
+                await asyncio.sleep(0)
+
+        async def main():
+            with collect("node") as timings:
+                await asyncio.gather(work("a"), work("b"))
+            return timings
+
+        assert {"a", "b", "node"} <= set(asyncio.run(main()))
+
+
+class TestTokenTimer:
+    def test_prefill_and_decode(self):
+        with collect("generate") as timings:
+            timer = TokenTimer()
+            time.sleep(0.01)
+            for _ in range(3):
+                timer.tick()
+            assert timer.finish() == 3
+        assert timings["prefill"] >= 10_000_000
+        assert "decode" in timings
+
+    def test_no_tokens(self):
+        with collect("generate") as timings:
+            assert TokenTimer().finish() == 0
+        assert timings["decode"] == 0
+
+    def test_ttft_and_tokens_per_sec(self):
+        ticks = [0, 1_000_000_000, 1_500_000_000, 2_000_000_000]
+        with patch("rag.pipeline.timing.perf_counter_ns", side_effect=ticks):
+            timer = TokenTimer()
+            for _ in range(3):
+                timer.tick()
+
+        assert timer.ttft == 1.0
+        assert timer.tokens_per_sec == 2.0
+
+    def test_rates_need_tokens(self):
+        timer = TokenTimer()
+        assert timer.ttft is None and timer.tokens_per_sec is None
+        timer.tick()
+        assert timer.ttft is not None and timer.tokens_per_sec is None
+
+
+def test_merge_timings():
+    assert merge_timings({"a": 1}, {"b": 2}) == {"a": 1, "b": 2}
+    assert merge_timings(None, {"b": 2}) == {"b": 2}
@@ -0,0 +1,131 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+
+def _manager(**kwargs):
+    from rag.infra.vector_index import VectorIndexManager
+
+    engine = MagicMock()
+    conn = engine.begin.return_value.__enter__.return_value
+    return VectorIndexManager(engine=engine, **kwargs), conn
+
+
+def _sql(conn):
+    return [str(c.args[0]) for c in conn.execute.call_args_list]
+
+
+class TestIvfflatLists:
+    def test_small_corpus(self):
+        from rag.infra.vector_index import ivfflat_lists
+
+        assert ivfflat_lists(0) == 1
+        assert ivfflat_lists(50_000) == 50
+
+    def test_large_corpus_uses_sqrt(self):
+        from rag.infra.vector_index import ivfflat_lists
+
+        assert ivfflat_lists(4_000_000) == 2000
+
+
+class TestSearchOptions:
+    def test_format(self):
+        from rag.infra.vector_index import search_options
+
+        assert search_options(ef_search=100, probes=5) == "-c hnsw.ef_search=100 -c ivfflat.probes=5"
+
+
+class TestCreateIndexSql:
+    def test_hnsw_cosine(self):
+        manager, _ = _manager(index_type="hnsw", m=16, ef_construction=64)
+        sql = manager.create_index_sql()
+
+        assert "USING hnsw (embedding vector_cosine_ops)" in sql
+        assert "m = 16, ef_construction = 64" in sql
+
+    def test_ivfflat_auto_lists(self):
+        manager, _ = _manager(index_type="ivfflat", lists=0)
+        assert "WITH (lists = 20)" in manager.create_index_sql(rows=20_000)
+
+    def test_ivfflat_fixed_lists(self):
+        manager, _ = _manager(index_type="ivfflat", lists=7)
+        assert "WITH (lists = 7)" in manager.create_index_sql(rows=20_000)
+
+    def test_l2_operator(self):
+        manager, _ = _manager(distance="l2")
+        assert "vector_l2_ops" in manager.create_index_sql()
+
+    def test_unknown_type_raises(self):
+        with pytest.raises(ValueError):
+            _manager(index_type="diskann")
+
+    def test_unknown_distance_raises(self):
+        with pytest.raises(ValueError):
+            _manager(distance="manhattan")
+
+
+class TestVectorIndexManager:
+    def test_create_fixes_dimension_then_indexes(self):
+        manager, conn = _manager(index_type="hnsw", dimension=384)
+        conn.execute.return_value.scalar.return_value = -1
+        manager.create()
+
+        sql = _sql(conn)
+        assert any("ALTER COLUMN embedding TYPE vector(384)" in s for s in sql)
+        assert any("CREATE INDEX IF NOT EXISTS" in s for s in sql)
+        assert "ANALYZE" in sql[-1]
+
+    def test_create_skips_alter_when_dimension_set(self):
+        manager, conn = _manager(index_type="hnsw", dimension=384)
+        conn.execute.return_value.scalar.return_value = 384
+        manager.create()
+
+        assert not any("ALTER" in s for s in _sql(conn))
+
+    def test_ivfflat_counts_rows(self):
+        manager, conn = _manager(index_type="ivfflat", lists=0)
+        conn.execute.return_value.scalar.side_effect = [384, 5000]
+        manager.create()
+
+        assert any("WITH (lists = 5)" in s for s in _sql(conn))
+
+    def test_none_type_skips_ann_index(self):
+        manager, conn = _manager(index_type="none")
+        manager.create()
+
+        sql = _sql(conn)
+        assert not any("ix_langchain_pg_embedding_vector" in s for s in sql)
+        assert any("ix_cmetadata_gin" in s and "jsonb_path_ops" in s for s in sql)
+
+    def test_drop(self):
+        manager, conn = _manager()
+        manager.drop()
+
+        sql = _sql(conn)
+        assert "DROP INDEX IF EXISTS ix_langchain_pg_embedding_vector" in sql[0]
+        assert "DROP INDEX IF EXISTS ix_cmetadata_gin" in sql[1]
+
+    def test_rebuild_drops_then_creates(self):
+        manager, conn = _manager()
+        conn.execute.return_value.scalar.return_value = 384
+        manager.rebuild()
+
+        sql = _sql(conn)
+        assert "DROP INDEX" in sql[0]
+        assert any("CREATE INDEX" in s for s in sql[1:])
+
+    def test_keyword_creates_trigram_index(self):
+        manager, conn = _manager(keyword=True)
+        conn.execute.return_value.scalar.return_value = 384
+        manager.create()
+
+        sql = _sql(conn)
+        assert "CREATE EXTENSION IF NOT EXISTS pg_trgm" in sql
+        assert any("ix_langchain_pg_embedding_document_trgm" in s and "gin_trgm_ops" in s for s in sql)
+
+    def test_no_trigram_index_by_default(self):
+        manager, conn = _manager(keyword=False)
+        conn.execute.return_value.scalar.return_value = 384
+        manager.create()
+
+        assert not any("gin_trgm_ops" in s for s in _sql(conn))